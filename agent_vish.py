@@ -1,28 +1,54 @@
 # agent_vish.py
+import asyncio
+import json
 import logging
+import os
 import re
-from typing import Callable, List, Dict, Any, Tuple
+import time
+from contextlib import nullcontext
+from typing import AsyncIterator, Callable, List, Dict, Any, Tuple
 from skills.analytics_skill import analytics_skill
-import requests
-from typing import Optional
+from memory.memory_manager import MemoryManager
+from memory.shared_store import LocalStore
+from runtime import http_pool, profiler
+from runtime.cascade import CLOUD, ModelCascade
+from runtime.deadline import Deadline, MIN_USEFUL_TIMEOUT, timeout_for
+from runtime.llm_scheduler import GenerationScheduler
+from runtime.log_setup import configure_logging
+from runtime.output_profile import OutputProfile, ReplyBudget, StreamSink, output_stats, profile_for, stream_sink
+from runtime.residency import ModelResidency
+from typing import NamedTuple, Optional
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging: queued, written by a background thread (LOG_LEVEL, LOG_FORMAT)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-CLEAN_PATTERN = re.compile(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]")
+CLEAN_PATTERN = re.compile(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]+")
+# Same set plus the C1 range, for untrusted text coming in from clients
+SANITIZE_PATTERN = re.compile(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]+")
+# Both patterns agree on ASCII (C1 is outside it), so one delete table serves both
+_ASCII_CONTROL_TABLE = dict.fromkeys(c for c in range(0x80) if CLEAN_PATTERN.match(chr(c)))
+
+def _collapse(s: str, pattern: re.Pattern) -> str:
+    # ASCII text, the common case, takes str.translate's C fast path and the
+    # regex handles the rest. split()/join() collapses whitespace runs and trims
+    # the ends using the same whitespace definition as re's \s.
+    s = s.translate(_ASCII_CONTROL_TABLE) if s.isascii() else pattern.sub("", s)
+    return " ".join(s.split())
 
 def clean_text(s: str) -> str:
     if not isinstance(s, str):
         return ""
     # Collapse whitespace and remove control chars to enforce single-line
-    s = CLEAN_PATTERN.sub("", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    # Ensure no newlines remain
-    return s.replace("\n", " ")
+    return _collapse(s, CLEAN_PATTERN)
+
+def sanitize_text(s: str) -> str:
+    """Single sanitizer for inbound messages: drops C0/C1 control chars and DEL,
+    collapses all whitespace (newlines included) to single spaces and trims.
+    Apply it once where a message enters the system."""
+    if not isinstance(s, str):
+        return ""
+    return _collapse(s, SANITIZE_PATTERN)
 
 # Core content constants (single-line enforced)
 BIO = (
@@ -49,6 +75,40 @@ FALLBACK = (
     "Try: about vishal, skills, projects, or features. You can connect with Vishal on LinkedIn (linkedin.com/in/vishalanand797) or drop him an email at vishalanand.work@gmail.com."
 )
 
+# Static intent catalog, cleaned once per AgentVish rather than per reply
+STATIC_INTENTS = {
+    "bio": BIO,
+    "skills": SKILLS,
+    "projects": PROJECTS,
+    "features": FEATURES,
+    "help": HELP,
+    "fallback": FALLBACK,
+}
+
+def keyword_intent(msg_lower: str) -> str:
+    """Substring keyword rules; used when the classifier is unsure or unavailable"""
+    if any(kw in msg_lower for kw in ["analytics", "google analytics", "sheets", "myoperator"]):
+        return "analytics"
+    if any(kw in msg_lower for kw in ["bio", "about", "who", "vishal"]):
+        return "bio"
+    if any(kw in msg_lower for kw in ["skill", "expertise", "experience"]):
+        return "skills"
+    if any(kw in msg_lower for kw in ["project", "work", "portfolio"]):
+        return "projects"
+    if any(kw in msg_lower for kw in ["feature", "capability", "can you"]):
+        return "features"
+    if any(kw in msg_lower for kw in ["help", "how", "what"]):
+        return "help"
+    return "fallback"
+
+class Reply(NamedTuple):
+    """A reply plus how it was produced, for the API response and metrics."""
+    text: str
+    intent: str
+    source: str  # "static", "analytics", "faq", "cache" or "llm"
+    degraded: bool = False  # an LLM answer was wanted but a fallback (or one the cascade rejected) was served
+    provider: str = ""  # for "llm" replies: "ollama:<tier>" or the cloud model, e.g. "perplexity"
+
 DEBUG_SUMMARY_PREFIX = "Debug: "
 
 # Response helpers to force single-line outputs everywhere
@@ -69,138 +129,351 @@ def debug_summary(info: Any) -> str:
 class LocalLLMRouter:
     """Simple local LLM router using Ollama - no API tokens required"""
     
-    def __init__(self, base_url: str = "http://localhost:11434"):
-        self.base_url = base_url
-        self.default_model = "llama3.2:1b"  # Fast, lightweight model
+    name = "ollama"
+    
+    def __init__(self, base_url: Optional[str] = None,
+                 scheduler: Optional[GenerationScheduler] = None,
+                 cascade: Optional[ModelCascade] = None,
+                 residency: Optional[ModelResidency] = None):
+        self.base_url = base_url or os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+        self.default_model = os.environ.get("OLLAMA_MODEL", "llama3.2:1b")  # Fast, lightweight model
+        # Queues generations so the model server's cores are not oversubscribed
+        self.scheduler = scheduler if scheduler is not None else GenerationScheduler.from_env()
+        # Fast model first, larger models or the cloud when its answer fails the self-check
+        self.cascade = cascade if cascade is not None else ModelCascade.from_env(
+            self.generate, self.default_model, cloud=cloud_router)
+        # Keeps the cascade's local models loaded in Ollama (keep_alive, preload, pings)
+        self.residency = residency if residency is not None else ModelResidency.from_env(
+            self.base_url, [t.model for t in self.cascade.tiers if t.model != CLOUD])
         self.available = self._check_availability()
     
     def _check_availability(self) -> bool:
         """Check if Ollama is running"""
+        import requests  # deferred: keeps `import agent_vish` cheap on cold start
         try:
             response = requests.get(f"{self.base_url}/api/tags", timeout=2)
             return response.status_code == 200
         except:
             return False
     
-    def route(self, query: str, context: dict = None) -> Optional[str]:
-        """Route query to local LLM"""
+    def route(self, query: str, context: dict = None,
+              deadline: Optional[Deadline] = None) -> Optional[str]:
+        """Answer through the model cascade within what is left of the request deadline"""
         if not self.available:
             return None
+        if timeout_for(deadline, 30) < MIN_USEFUL_TIMEOUT:
+            return None
         
         try:
-            payload = {
-                "model": self.default_model,
-                "prompt": query,
-                "stream": False
-            }
-            
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                return response.json().get("response", "")
-            return None
-            
+            return self.cascade.answer(query, context, deadline)
         except Exception as e:
             logger.warning(f"Local LLM routing failed: {e}")
             return None
+    
+    async def agenerate(self, message: str, history: Optional[List[Dict]] = None,
+                        deadline: Optional[Deadline] = None,
+                        profile: Optional[OutputProfile] = None) -> Optional[str]:
+        """Provider.agenerate through the cascade. The scheduler and cascade
+        are synchronous, so this holds a default-executor thread while the
+        provider loop stays free."""
+        loop = asyncio.get_running_loop()
+        context = {"history": history or [], "profile": profile}
+        return await loop.run_in_executor(None, self.route, message, context, deadline)
+    
+    async def astream(self, message: str, history: Optional[List[Dict]] = None,
+                      deadline: Optional[Deadline] = None,
+                      profile: Optional[OutputProfile] = None) -> AsyncIterator[str]:
+        """Provider.astream from the fast model's NDJSON stream. Streamed
+        answers skip the scheduler and the cascade's checks."""
+        timeout = timeout_for(deadline, 30)
+        if not self.available or timeout < MIN_USEFUL_TIMEOUT:
+            return
+        payload = {"model": self.default_model, "prompt": message, "stream": True}
+        payload.update(self.residency.payload_options())
+        payload.update(self._profile_fields(profile))
+        lines = http_pool.async_client(self.base_url).stream_lines("/api/generate", payload, timeout=timeout)
+        try:
+            async for line in lines:
+                chunk = json.loads(line)
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    break
+        finally:
+            await lines.aclose()
+    
+    def generate(self, model: str, prompt: str, deadline: Optional[Deadline] = None,
+                 profile: Optional[OutputProfile] = None) -> Optional[dict]:
+        """Scheduled /api/generate call; the response body, or None"""
+        timeout = timeout_for(deadline, 30)
+        if timeout < MIN_USEFUL_TIMEOUT:
+            return None
+        # Shorter prompts are scheduled first; identical prompts share one generation
+        # (streamed only to the caller that queued it)
+        key = (model, prompt, profile.name if profile is not None else None)
+        sink = stream_sink()  # read here: the scheduler runs the call on its own thread
+        return self.scheduler.run(key, len(prompt.split()),
+                                  lambda: self._generate(model, prompt, deadline, profile, sink), timeout)
+    
+    @staticmethod
+    def _profile_fields(profile: Optional[OutputProfile]) -> dict:
+        """Payload fields that hold Ollama to an output profile"""
+        if profile is None:
+            return {}
+        fields = {"options": {"num_predict": profile.max_tokens, "stop": list(profile.stop)}}
+        if profile.instruction:
+            fields["system"] = profile.instruction
+        return fields
+    
+    def _generate(self, model: str, prompt: str, deadline: Optional[Deadline],
+                  profile: Optional[OutputProfile] = None, sink: Optional[StreamSink] = None) -> Optional[dict]:
+        """One /api/generate call, with whatever budget is left after queueing.
+        Under a profile the reply is streamed and the connection closed (which
+        stops the generation) as soon as the reply budget is filled."""
+        timeout = timeout_for(deadline, 30)
+        if timeout < MIN_USEFUL_TIMEOUT:
+            return None
+        streaming = profile is not None
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": streaming
+        }
+        payload.update(self.residency.payload_options())
+        payload.update(self._profile_fields(profile))
+        if self.cascade.wants_logprobs:
+            payload["logprobs"] = True
+        
+        start = time.perf_counter()
+        response = http_pool.session(self.base_url).post(
+            f"{self.base_url}/api/generate",
+            json=payload,
+            timeout=timeout,
+            stream=streaming
+        )
+        
+        if response.status_code != 200:
+            response.close()
+            return None
+        body = self._read_stream(response, profile, start, sink) if streaming else response.json()
+        self.residency.observe(model, body, time.perf_counter() - start)
+        return body
+    
+    def _read_stream(self, response, profile: OutputProfile, start: float,
+                     sink: Optional[StreamSink] = None) -> dict:
+        """NDJSON chunks up to the end of the generation or the reply budget, as one body;
+        sink gets the kept text as it grows"""
+        budget = ReplyBudget(profile)
+        body = {"done": True, "done_reason": "budget"}
+        logprobs = []
+        sent = None
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                logprobs.extend(chunk.get("logprobs") or ())
+                if chunk.get("done"):
+                    body = chunk
+                    break
+                full = budget.add(chunk.get("response", ""))
+                if sink is not None:
+                    kept = budget.text
+                    if sent is None and kept:
+                        sink(kept, True)
+                        sent = kept
+                    elif sent is not None and len(kept) > len(sent) and kept.startswith(sent):
+                        sink(kept[len(sent):], False)
+                        sent = kept
+                if full:
+                    break
+        finally:
+            response.close()
+        body["response"] = budget.text
+        if logprobs:
+            body["logprobs"] = logprobs
+        output_stats.record(self.name, profile, budget.received, budget.text,
+                            time.perf_counter() - start, body.get("done_reason") == "budget")
+        return body
+
+
+def cloud_router():
+    """AIRouterSkill for the cascade's cloud tier (imports the provider SDK wrappers)"""
+    from skills.ai_router_skill import AIRouterSkill
+    return AIRouterSkill({})
 
 
 class AgentVish:
     """Main agent class for Vishal's bot."""
     
-    def __init__(self):
+    def __init__(self, store=None, llm_gate=None, classifier=None, faq=None):
+        # Response cache and session history. Per-process by default; pass a
+        # memory.shared_store.SQLiteStore to share them across worker processes.
+        self.store = store if store is not None else LocalStore()
+        # Context manager factory yielding True when an LLM call may proceed,
+        # called with the seconds left in the request budget (api.py passes
+        # AdmissionController.llm_slot); when it yields False the message is
+        # answered from the static catalog.
+        self.llm_gate = llm_gate
+
+        # Local intent model trained from data/intents.jsonl; keyword rules
+        # decide when it is missing or below INTENT_CONFIDENCE_THRESHOLD
+        # (imported here: the classifier needs NumPy, `import agent_vish` does not)
+        from skills.intent_classifier import DEFAULT_THRESHOLD, load_classifier
+        self.classifier = classifier if classifier is not None else load_classifier("intents.jsonl", "intent")
+        self.classifier_threshold = float(os.environ.get("INTENT_CONFIDENCE_THRESHOLD", DEFAULT_THRESHOLD))
+
+        # Local FAQ answers (data/faq.jsonl), tried before any LLM call
+        # (deferred like core_skills._faq_engine: indexing needs NumPy)
+        from skills.faq_engine import load_faq
+        self.faq = faq if faq is not None else load_faq()
+
         # Intents map to response constants
         self.intents: Dict[str, Callable[[], str]] = {
-            "bio": lambda: single_line(BIO),
-            "skills": lambda: single_line(SKILLS),
-            "projects": lambda: single_line(PROJECTS),
-            "features": lambda: single_line(FEATURES),
-            "help": lambda: single_line(HELP),
-            "fallback": lambda: single_line(FALLBACK),
-                    }
-
-                    # Initialize AI Router for intelligent model selection
-                    try:
-                        self.ai_router = LocalLLMRouter()
-                                    if self.ai_router.available:
-                                                        logger.info("Local LLM Router initialized successfully")
-                                                    else:
+            name: (lambda reply=single_line(text): reply)
+            for name, text in STATIC_INTENTS.items()
+        }
+
+        # Initialize AI Router for intelligent model selection
+        try:
+            self.ai_router = LocalLLMRouter()
+            if self.ai_router.available:
+                logger.info("Local LLM Router initialized successfully")
+            else:
                 logger.warning("Ollama not available - install: curl -fsSL https://ollama.com/install.sh | sh")
                 self.ai_router = None
-                                except Exception as e:
-                                                logger.warning(f"Local LLM Router not available: {e}")
-                                                self.ai_router = None
-        }
+        except Exception as e:
+            logger.warning(f"Local LLM Router not available: {e}")
+            self.ai_router = None
     
-    def receive_message(self, msg: str) -> str:
+    def receive_message(self, msg: str, session_id: Optional[str] = None,
+                        deadline: Optional[Deadline] = None) -> str:
         """
         Process incoming messages and route to correct intent.
         
         Args:
-            msg: User input text
+            msg: User input text, already passed through sanitize_text
+            session_id: Optional conversation key; when given, the exchange is
+                recorded in the store's session history
+            deadline: Request budget shared by every provider call
             
         Returns:
             Single-line response string
         """
+        return self.respond(msg, session_id, deadline).text
+    
+    def respond(self, msg: str, session_id: Optional[str] = None,
+                deadline: Optional[Deadline] = None, channel: Optional[str] = None) -> Reply:
+        """Like receive_message, but also reports how the reply was produced.
+        channel picks the output profile LLM answers are generated under."""
+        memory = None
+        if session_id and msg:
+            memory = MemoryManager(store=self.store, session_id=session_id)
+        reply = self._route_message(msg, memory, deadline, profile_for(channel))
+        if memory is not None:
+            memory.add_message("user", msg)
+            memory.add_message("assistant", reply.text)
+        return reply
+    
+    def classify(self, msg_lower: str) -> str:
+        """Intent for a normalized message"""
+        if self.classifier is not None:
+            intent, confidence = self.classifier.predict(msg_lower)
+            if confidence >= self.classifier_threshold:
+                return intent
+        return keyword_intent(msg_lower)
+
+    def classify_batch(self, messages: List[str]) -> List[str]:
+        """classify() for many messages, sharing one vectorized model pass"""
+        lowered = [m.lower().strip() for m in messages]
+        if self.classifier is None:
+            return [keyword_intent(m) for m in lowered]
+        return [
+            intent if confidence >= self.classifier_threshold else keyword_intent(m)
+            for m, (intent, confidence) in zip(lowered, self.classifier.predict_batch(lowered))
+        ]
+
+    def _route_message(self, msg: str, memory: Optional[MemoryManager],
+                       deadline: Optional[Deadline], profile: OutputProfile) -> Reply:
         if not msg:
-            return self.handle_intent("fallback")
+            return Reply(self.handle_intent("fallback"), "fallback", "static")
         
         # Normalize message
         msg_lower = msg.lower().strip()
         
-        # Intent keyword matching
-        # Analytics intent - route to analytics_skill
-        if any(kw in msg_lower for kw in ["analytics", "google analytics", "sheets", "myoperator"]):
+        # Local classifier first, keyword rules when it is unsure
+        intent = self.classify(msg_lower)
+        profiler.tag(intent=intent)
+        if intent == "analytics":
             try:
-                result = analytics_skill(msg)
+                result = analytics_skill(msg, deadline=deadline)
                 result_str = str(result) if result else "No analytics data available."
                 # Truncate to 250 chars if needed
                 if len(result_str) > 250:
                     result_str = result_str[:247] + "..."
-                return single_line(result_str)
+                return Reply(single_line(result_str), "analytics", "analytics")
             except Exception as e:
                 logger.exception("Analytics skill failed")
                 error_msg = f"Analytics error: {str(e)}"
                 if len(error_msg) > 250:
                     error_msg = error_msg[:247] + "..."
-                return single_line(error_msg)
-        elif any(kw in msg_lower for kw in ["bio", "about", "who", "vishal"]):
-            intent = "bio"
-        elif any(kw in msg_lower for kw in ["skill", "expertise", "experience"]):
-            intent = "skills"
-        elif any(kw in msg_lower for kw in ["project", "work", "portfolio"]):
-            intent = "projects"
-        elif any(kw in msg_lower for kw in ["feature", "capability", "can you"]):
-            intent = "features"
-        elif any(kw in msg_lower for kw in ["help", "how", "what"]):
-            intent = "help"
-        else:
-            intent = "fallback"
-
-                # Try AI Router for intelligent response
-                if self.ai_router:
-                                try:
-                                                    context = {"message": msg, "normalized_message": msg_lower}
-                                                    ai_response = self.ai_router.generate_response(msg, context)
-                                                    if ai_response:
-                                                                            return single_line(ai_response)
-                                                                    except Exception as e:
-                                                                                        logger.error(f"AI Router error: {e}")
-                                                                                        # Fall through to default fallback
+                return Reply(single_line(error_msg), "analytics", "analytics", degraded=True)
+
+        # Questions the FAQ answers confidently never reach an LLM
+        if intent == "fallback" and self.faq is not None:
+            match = self.faq.lookup(msg_lower)
+            if match is not None:
+                profiler.tag(intent="faq")
+                return Reply(single_line(match.answer), "faq", "faq")
+
+        # Try AI Router for intelligent response when no static intent matched
+        degraded = False
+        if intent == "fallback" and self.ai_router:
+            history = memory.get_messages(last_n=6) if memory is not None else []
+            # The cache is shared by every session, so a reply that may lean on
+            # this conversation's history is neither served from it nor stored
+            cache_key = None if history else f"llm:{profile.name}:{msg_lower}"
+            cached = self.store.cache_get(cache_key) if cache_key else None
+            if cached:
+                return Reply(cached, intent, "cache")
+            degraded = True  # cleared only if the LLM answers in time
+            if deadline is not None and deadline.expired():
+                logger.warning("Request budget spent before LLM call, answering from static catalog")
+            else:
+                gate_wait = None if deadline is None else deadline.remaining()
+                with (self.llm_gate(gate_wait) if self.llm_gate else nullcontext(True)) as admitted:
+                    if not admitted:
+                        logger.warning("LLM capacity saturated, answering from static catalog")
+                    else:
+                        try:
+                            context = {"message": msg, "normalized_message": msg_lower, "profile": profile}
+                            if memory is not None:
+                                context["history"] = history
+                            ai_response = self.ai_router.route(msg, context, deadline=deadline)
+                            if ai_response:
+                                reply = single_line(ai_response)
+                                # An answer the cascade rejected but kept for lack of a better one
+                                # is served this once, not cached
+                                rejected = bool(context.get("rejected"))
+                                if cache_key and not rejected:
+                                    self.store.cache_set(cache_key, reply)
+                                # The cloud tier names the model that answered; local tiers are Ollama
+                                provider = context.get("answered_by") or \
+                                    f"{self.ai_router.name}:{context.get('tier', 'default')}"
+                                return Reply(reply, intent, "llm", provider=provider, degraded=rejected)
+                        except Exception as e:
+                            logger.error(f"AI Router error: {e}")
+                            # Fall through to default fallback
         
         reply = self.handle_intent(intent)
         
         # Final fallback: ensure we never return empty
         if not reply or not reply.strip():
-            return single_line(FALLBACK)
+            return Reply(single_line(FALLBACK), "fallback", "static", degraded)
         
-        return reply
+        return Reply(reply, intent, "static", degraded)
     
-    def handle_intent(self, intent: str, debug: Any | None = None) -> str:
+    def handle_intent(self, intent: str, debug: Optional[Any] = None) -> str:
         """Handle intent routing and return appropriate response."""
         key = (intent or "").strip().lower()
         fn = self.intents.get(key, self.intents["fallback"])  # default to fallback
@@ -221,7 +494,7 @@ class AgentVish:
             return debug_summary({"error": str(e)})
 
 # Backwards compatibility: keep module-level function
-def handle_intent(intent: str, debug: Any | None = None) -> str:
+def handle_intent(intent: str, debug: Optional[Any] = None) -> str:
     """Module-level function for backwards compatibility."""
     agent = AgentVish()
     return agent.handle_intent(intent, debug)
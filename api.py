@@ -1,31 +1,88 @@
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify, send_file
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 import sys
 import logging
 from datetime import datetime
 import json
 import re
-from werkzeug.exceptions import BadRequest
+import hmac
+import importlib
+import time
+import uuid
 
 # Add the current directory to Python path to import agent_vish
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import AgentVish (not AgenticAIBot) - no fallback mock
-from agent_vish import AgentVish
+from agent_vish import AgentVish, sanitize_text
+from memory.shared_store import open_store
+from runtime.admission import AdmissionController
+from runtime.artifacts import artifact_stats
+from runtime.chat_socket import ChatSockets
+from runtime.deadline import Deadline
+from runtime.event_log import install as install_event_log
+from runtime.jobs import TERMINAL, JobStore
+from runtime.log_setup import configure_logging, logging_stats
+from runtime.memory_watch import MemoryWatch
+from runtime.output_profile import output_stats, stream_to
+from runtime import profiler
+from runtime.static_assets import StaticAssets, choose_encoding, etag_for
+
+try:
+    from flask_sock import Sock
+except ImportError:  # optional: without flask-sock there is no /ws/chat and the page uses /chat
+    Sock = None
 
 # Initialize Flask app
 app = Flask(__name__, static_folder='public', static_url_path='')
 CORS(app)  # Enable CORS for all routes
+# Render's proxy appends the caller's address to X-Forwarded-For; trust that one
+# hop for request.remote_addr and nothing the client wrote before it
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+
+# Persistent chat connections at /ws/chat (runtime/chat_socket.py; WS_* limits)
+chat_sockets = ChatSockets.from_env()
+if Sock is not None:
+    app.config["SOCK_SERVER_OPTIONS"] = chat_sockets.server_options()
+    sock = Sock(app)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (queued; see runtime/log_setup.py for LOG_LEVEL and LOG_FORMAT)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# Initialize Agent Vish - no fallback, must use real agent
-agent_vish = AgentVish()
+# Initialize Agent Vish - no fallback, must use real agent.
+# SHARED_STORE_PATH points every gunicorn worker on the host at one SQLite file
+# for the response cache and session history; unset keeps them per-process.
+# Admission control: per-client rate limits and a cap on concurrent LLM calls
+admission = AdmissionController.from_env()
+agent_vish = AgentVish(store=open_store(os.environ.get("SHARED_STORE_PATH")),
+                       llm_gate=admission.llm_slot)
 logger.info("Agent Vish initialized successfully")
 
+# One columnar event per /chat reply for offline analysis (runtime/event_log.py;
+# EVENT_LOG_DIR, EVENT_LOG=off to disable)
+event_log = install_event_log()
+
+# Memory growth per request type, allocation snapshots and the recycle
+# threshold gunicorn.conf.py checks after each request (runtime/memory_watch.py)
+memory_watch = MemoryWatch.from_env()
+
+# Background jobs (report_skill on large uploads); run by `python -m runtime.jobs`,
+# which gunicorn.conf.py starts next to the workers. Opened on first use.
+REPORT_EXTENSIONS = (".csv", ".tsv", ".xlsx", ".xls", ".json", ".jsonl", ".parquet")
+_job_store = None
+
+def job_store() -> JobStore:
+    global _job_store
+    if _job_store is None:
+        _job_store = JobStore()
+    return _job_store
+
+# The chat UI, fingerprinted and precompressed in memory (see runtime/static_assets.py)
+static_assets = StaticAssets(os.path.join(app.root_path, "public")).build()
+
 # Updated control chars pattern: includes DEL and C0/C1, but preserves normal whitespace
 CONTROL_CHARS_PATTERN = re.compile(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]")
 WHITESPACE_NORMALIZE_PATTERN = re.compile(r"[\t\r\n\v\f]+")
@@ -41,37 +98,137 @@ def strip_control_chars(s: str) -> str:
     # Trim leading/trailing spaces
     return s.strip()
 
+def parse_chat_body(raw: bytes):
+    """Parse a /chat body straight from bytes; None means invalid JSON.
+
+    Fast path: one json.loads over the bytes. strict=False accepts raw control
+    characters inside strings, which sanitize_text removes from the message
+    afterwards. Only bodies that still fail (e.g. control characters between
+    tokens) pay for strip_control_chars and a second parse.
+    """
+    if not raw:
+        return {}
+    try:
+        data = json.loads(raw, strict=False)
+    except ValueError:
+        cleaned = strip_control_chars(raw.decode("utf-8", "replace"))
+        try:
+            data = json.loads(cleaned, strict=False) if cleaned else {}
+        except ValueError:
+            return None
+    return data if isinstance(data, dict) else {}
+
+def warm_up():
+    """Prime process-wide state ahead of the first request.
+
+    Under gunicorn preload (see gunicorn.conf.py) this runs once in the master
+    before workers fork, so the warmed objects are shared copy-on-write.
+    PRELOAD_MODULES is a comma-separated list of extra modules to import here,
+    e.g. "pandas,openai" on instances that serve reports or ChatGPT.
+    """
+    for name in os.environ.get("PRELOAD_MODULES", "").split(","):
+        if name.strip():
+            importlib.import_module(name.strip())
+    agent_vish.receive_message("help")
+    # Load the local models now, not on the first user's request
+    if agent_vish.ai_router is not None:
+        agent_vish.ai_router.residency.preload()
+
+def start_keep_warm():
+    """Start this worker's background threads: keep-warm pings for the local models and memory snapshots"""
+    if agent_vish.ai_router is not None:
+        agent_vish.ai_router.residency.start()
+    memory_watch.start_periodic()
+
+def client_id() -> str:
+    """Client identity for rate limiting: the address the proxy saw (see ProxyFix above)"""
+    return request.remote_addr or "unknown"
+
+def admin_denied():
+    """None for an admin caller, else the error response; the admin endpoints 404 while ADMIN_TOKEN is unset"""
+    expected = os.environ.get("ADMIN_TOKEN", "")
+    if not expected:
+        return jsonify({"error": "Not found"}), 404
+    supplied = request.headers.get("X-Admin-Token", "")
+    auth = request.headers.get("Authorization", "")
+    if auth.startswith("Bearer "):
+        supplied = auth[7:].strip()
+    if not hmac.compare_digest(supplied.encode(), expected.encode()):
+        return jsonify({"error": "Forbidden"}), 403
+    return None
+
+@app.before_request
+def start_request_profile():
+    g.memory_before = memory_watch.begin()
+    profiler.clear()
+    # X-Profile: 1 from an admin runs this request under cProfile (see runtime/profiler.py)
+    if "X-Profile" in request.headers and admin_denied() is None:
+        g.request_profile = profiler.RequestProfile(request.path).__enter__()
+
+@app.after_request
+def finish_request_profile(response):
+    profile = g.pop("request_profile", None)
+    if profile is not None:
+        profile.__exit__(None, None, None)
+        response.headers["X-Profile-Id"] = profile.save()
+    before = g.pop("memory_before", None)
+    if before is not None:
+        memory_watch.end(g.get("memory_kind") or request.endpoint or "unmatched", before)
+    return response
+
+def asset_response(asset):
+    """Serve an in-memory asset in the smallest encoding the client accepts, or 304"""
+    encoding = choose_encoding(asset, request.accept_encodings)
+    etag = etag_for(asset, encoding)
+    headers = {"Cache-Control": asset.cache_control, "ETag": f'"{etag}"', "Vary": "Accept-Encoding"}
+    if request.if_none_match.contains_weak(etag):
+        return app.response_class(status=304, headers=headers)
+    response = app.response_class(asset.encodings[encoding], content_type=asset.content_type, headers=headers)
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    """Liveness for the platform health checker: no I/O, a two-byte body"""
+    return app.response_class(b"ok", mimetype="text/plain", headers={"Cache-Control": "no-store"})
+
 @app.route("/", methods=["GET"])
-def health():
-    return app.send_static_file('chat.html')
+def index():
+    return asset_response(static_assets.get("/chat.html"))
+
+@app.route("/assets/<path:name>", methods=["GET"])
+def serve_asset(name):
+    asset = static_assets.get(f"/assets/{name}")
+    if asset is None:
+        return jsonify({"error": "Not found"}), 404
+    return asset_response(asset)
 @app.route("/chat", methods=["POST"])
 def chat():
+    # One budget for the whole request (RESPONSE_TIMEOUT, default 30 s)
+    deadline = Deadline.from_env()
+    started = time.perf_counter()
     try:
-        # Read raw data safely first
-        raw = request.get_data(cache=False, as_text=True) or ""
-        # Remove control characters that could break JSON parsing
-        cleaned = strip_control_chars(raw)
+        retry_after = admission.check_rate(client_id())
+        if retry_after:
+            resp = jsonify({
+                "error": "Rate limited",
+                "message": "Too many messages, please slow down."
+            })
+            resp.headers["Retry-After"] = str(max(1, int(retry_after + 0.999)))
+            return resp, 429
         
-        # Attempt to parse JSON explicitly
-        try:
-            data = json.loads(cleaned) if cleaned else {}
-        except json.JSONDecodeError as je:
-            logger.error("JSON decode failed: %s", je)
+        data = parse_chat_body(request.get_data(cache=False))
+        if data is None:
+            logger.error("JSON decode failed for /chat body")
             return jsonify({
                 "error": "Invalid JSON",
                 "message": "Request body must be valid JSON without control characters.",
                 "hint": "Send {\"message\": \"text\"} with Content-Type: application/json"
             }), 400
         
-        # Fallback to Flask's get_json if empty and content-type is proper
-        if not data:
-            try:
-                data = request.get_json(silent=True) or {}
-            except BadRequest:
-                pass
-        
-        msg = data.get("message", "").strip()
-        msg = strip_control_chars(msg)
+        # Sanitized exactly once here; AgentVish trusts it from this point on
+        msg = sanitize_text(data.get("message"))
         
         if not msg:
             return jsonify({
@@ -79,13 +236,22 @@ def chat():
                 "message": "Provide a non-empty 'message' field"
             }), 400
         
-        logger.info("Received message: %s", msg[:200] + ("..." if len(msg) > 200 else ""))
+        logger.info("Received message: %.200s", msg)
+        
+        session_id = sanitize_text(data.get("session_id"))[:128] or None
         
         # Always call the real AgentVish - no fallback
-        reply = agent_vish.receive_message(msg)
+        # Output profile for LLM answers ("chat" by default, see runtime/output_profile.py)
+        channel = sanitize_text(data.get("channel"))[:32] or None
+        result = respond_and_log(msg, session_id, channel, deadline, started)
+        reply = result.text
+        g.memory_kind = f"chat:{result.source}"
         
-        resp = {"ok": True, "reply": reply, "timestamp": datetime.utcnow().isoformat() + "Z"}
-        logger.info("Response generated: %s", (reply[:200] + ("..." if len(reply) > 200 else "")))
+        resp = {"ok": True, "reply": reply, "source": result.source, "degraded": result.degraded,
+                "timestamp": datetime.utcnow().isoformat() + "Z"}
+        if session_id:
+            resp["session_id"] = session_id
+        logger.info("Response generated: %.200s", reply)
         
         return jsonify(resp), 200
         
@@ -96,9 +262,330 @@ def chat():
             "message": "An unexpected error occurred. Please try again later."
         }), 500
 
+def respond_and_log(msg, session_id, channel, deadline, started):
+    """agent_vish.respond plus the event log entry; shared by /chat and /ws/chat"""
+    result = agent_vish.respond(msg, session_id=session_id, deadline=deadline, channel=channel)
+    if event_log is not None:
+        event_log.record(result.intent, result.source, result.provider, channel or "chat",
+                         (time.perf_counter() - started) * 1000, result.source == "cache", result.degraded, msg)
+    return result
+
+def socket_answer(client, frame, sink):
+    """Reply or error frame for one /ws/chat message (runs on the connection's thread, outside the request)"""
+    started = time.perf_counter()
+    deadline = Deadline.from_env()
+    profiler.clear()
+    retry_after = admission.check_rate(client)
+    if retry_after:
+        return {"type": "error", "error": "Rate limited", "message": "Too many messages, please slow down.",
+                "retry_after": max(1, int(retry_after + 0.999))}
+    # Sanitized once here, as in /chat
+    msg = sanitize_text(frame.get("message"))
+    if not msg:
+        return {"type": "error", "error": "Empty message", "message": "Provide a non-empty 'message' field"}
+    channel = sanitize_text(frame.get("channel"))[:32] or None
+    with stream_to(sink):
+        result = respond_and_log(msg, frame["session_id"], channel, deadline, started)
+    return {"type": "reply", "reply": result.text, "source": result.source, "degraded": result.degraded,
+            "timestamp": datetime.utcnow().isoformat() + "Z"}
+
+@app.before_request
+def reserve_chat_socket():
+    # Checked before the upgrade, so a refused client gets a plain 503 and stays on /chat
+    if request.path != "/ws/chat" or Sock is None:
+        return None
+    if not request.environ.get("wsgi.multithread"):
+        # A sync worker would be tied up for the whole connection
+        return jsonify({"error": "Unavailable", "message": "WebSockets need threaded workers; use /chat"}), 503
+    if not chat_sockets.reserve():
+        resp = jsonify({"error": "Unavailable", "message": "Too many open connections; use /chat"})
+        resp.headers["Retry-After"] = "30"
+        return resp, 503
+    g.chat_socket_slot = True
+    return None
+
+@app.teardown_request
+def release_chat_socket(exc):
+    if g.pop("chat_socket_slot", False):
+        chat_sockets.release()
+
+def chat_socket(ws):
+    """/ws/chat: one chat session over a WebSocket (protocol in runtime/chat_socket.py)"""
+    client = client_id()
+    session_id = sanitize_text(request.args.get("session_id"))[:128] or None
+    chat_sockets.serve(ws, lambda frame, sink: socket_answer(client, frame, sink), session_id)
+
+if Sock is not None:
+    sock.route("/ws/chat")(chat_socket)
+
+def job_view(job):
+    """A job as returned to clients (without server paths)"""
+    view = {key: job[key] for key in ("id", "kind", "lane", "status", "error", "created", "started", "finished")}
+    if job["status"] == "done":
+        view["result"] = job["result"]
+    return view
+
+@app.route("/jobs/report", methods=["POST"])
+def submit_report_job():
+    """Queue report_skill over an uploaded file (multipart "file") or a Google Sheet ({"sheet": {...}}); admin only"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    limit = int(os.environ.get("JOBS_MAX_UPLOAD_MB", "200")) * 1024 * 1024
+    if request.content_length and request.content_length > limit:
+        return jsonify({"error": "Upload too large", "message": f"Files up to {limit // 1024 // 1024} MB"}), 413
+    upload = request.files.get("file")
+    lane = request.args.get("lane") or request.form.get("lane")
+    if upload is not None:
+        ext = os.path.splitext(upload.filename or "")[1].lower()
+        if ext not in REPORT_EXTENSIONS:
+            return jsonify({"error": "Unsupported file",
+                            "message": f"Upload one of: {', '.join(REPORT_EXTENSIONS)}"}), 400
+        directory = os.environ.get("JOBS_UPLOAD_DIR") or os.path.join(os.path.dirname(job_store().path),
+                                                                      "agent_vish_uploads")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, uuid.uuid4().hex + ext)
+        upload.save(path)
+        payload = {"path": path, "upload": path}
+    else:
+        body = request.get_json(silent=True) or {}
+        sheet = body.get("sheet")
+        if not isinstance(sheet, dict) or not sheet.get("spreadsheet_id"):
+            return jsonify({"error": "Nothing to analyse",
+                            "message": "Send a multipart 'file' or {\"sheet\": {\"spreadsheet_id\": ..., \"sheet\": ...}}"}), 400
+        spreadsheet_id = sanitize_text(str(sheet["spreadsheet_id"]))[:128]
+        # The runner reads the sheet with this server's credentials, so only configured ones
+        allowed = {s.strip() for s in os.environ.get("JOBS_SPREADSHEET_IDS", "").split(",")} | \
+            {os.environ.get("SHEETS_SPREADSHEET_ID", "")}
+        if spreadsheet_id not in allowed - {""}:
+            return jsonify({"error": "Spreadsheet not allowed",
+                            "message": "Add it to JOBS_SPREADSHEET_IDS or SHEETS_SPREADSHEET_ID"}), 403
+        payload = {"sheet": {"spreadsheet_id": spreadsheet_id,
+                             "sheet": sanitize_text(str(sheet.get("sheet") or "Sheet1"))[:128]}}
+        lane = lane or body.get("lane")
+    try:
+        job_id = job_store().submit("report", payload, lane=lane)
+    except ValueError as e:
+        if "upload" in payload:
+            os.remove(payload["upload"])
+        return jsonify({"error": "Invalid lane", "message": str(e)}), 400
+    logger.info("Queued report job %s (%s)", job_id, "upload" if "upload" in payload else "sheet")
+    return jsonify({"job_id": job_id, "status": "queued", "poll": f"/jobs/{job_id}",
+                    "events": f"/jobs/{job_id}/events"}), 202
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_store().get(job_id)
+    if job is None:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify(job_view(job)), 200
+
+@app.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    status = job_store().cancel(job_id)
+    if status is None:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify({"job_id": job_id, "status": status}), 202 if status == "running" else 200
+
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    """Server-sent events: the job's status on every change and the result once it finishes.
+
+    Each connection lasts at most JOBS_EVENTS_WINDOW seconds (default 25) so a
+    slow job does not hold a worker; EventSource reconnects on its own.
+    """
+    if job_store().get(job_id) is None:
+        return jsonify({"error": "Not found"}), 404
+    window = float(os.environ.get("JOBS_EVENTS_WINDOW", "25"))
+
+    def events():
+        yield "retry: 1000\n\n"
+        ends, last = time.monotonic() + window, None
+        while True:
+            job = job_store().get(job_id)
+            if job is None:
+                return
+            if job["status"] != last:
+                last = job["status"]
+                event = "result" if last in TERMINAL else "status"
+                yield f"event: {event}\ndata: {json.dumps(job_view(job))}\n\n"
+            if last in TERMINAL or time.monotonic() > ends:
+                return
+            time.sleep(0.25)
+
+    return app.response_class(events(), mimetype="text/event-stream",
+                              headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"})
+
+@app.route("/stats/jobs", methods=["GET"])
+def jobs_stats():
+    """Background jobs: counts per lane and status, oldest queued job and mean run time"""
+    return jsonify(job_store().stats()), 200
+
+@app.route("/stats/admission", methods=["GET"])
+def admission_stats():
+    """Current limits, LLM queue depth and shed/rate-limit counters for this worker"""
+    return jsonify(admission.stats()), 200
+
+@app.route("/stats/llm", methods=["GET"])
+def llm_stats():
+    """Local-LLM generation scheduler: queue depth, batch sizes and queue wait for this worker"""
+    router = agent_vish.ai_router
+    if router is None:
+        return jsonify({"error": "Local LLM router unavailable"}), 503
+    return jsonify(router.scheduler.stats()), 200
+
+@app.route("/stats/cascade", methods=["GET"])
+def cascade_stats():
+    """Model cascade: per-tier answers, escalation reasons, latency and cost saved for this worker"""
+    router = agent_vish.ai_router
+    if router is None:
+        return jsonify({"error": "Local LLM router unavailable"}), 503
+    return jsonify(router.cascade.stats()), 200
+
+@app.route("/stats/output", methods=["GET"])
+def output_profile_stats():
+    """Output profiles: per-provider tokens received, kept and saved, and streams cut early, for this worker"""
+    return jsonify(output_stats.stats()), 200
+
+@app.route("/stats/models", methods=["GET"])
+def model_stats():
+    """Model residency: keep_alive, loads observed and cold-start latency for this worker"""
+    router = agent_vish.ai_router
+    if router is None:
+        return jsonify({"error": "Local LLM router unavailable"}), 503
+    return jsonify(router.residency.stats()), 200
+
+@app.route("/stats/logging", methods=["GET"])
+def log_stats():
+    """Log records waiting to be written and records dropped by sampling or a full queue"""
+    return jsonify(logging_stats()), 200
+
+@app.route("/stats/sheets", methods=["GET"])
+def sheets_stats():
+    """Google Sheets sync: syncs by kind (fresh/unchanged/incremental/full) and rows fetched, for this worker"""
+    from skills.sheets_sync import default_sync  # imported on first use, as analytics_skill does
+    return jsonify(default_sync().stats()), 200
+
+@app.route("/admin/profile", methods=["POST"])
+def sample_profile():
+    """Sample every thread of this worker for ?seconds= (default 10) and return collapsed stacks or a JSON summary"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    try:
+        seconds = float(request.args.get("seconds", "10"))
+        interval = float(request.args.get("interval_ms", "5")) / 1000
+    except ValueError:
+        return jsonify({"error": "seconds and interval_ms must be numbers"}), 400
+    session = profiler.sample(seconds, interval)
+    if session is None:
+        return jsonify({"error": "A profiling session is already running in this worker"}), 409
+    if request.args.get("format") == "json":
+        return jsonify(dict(session.summary(), pid=os.getpid())), 200
+    return app.response_class(session.collapsed(include_idle=request.args.get("idle") == "1"),
+                              mimetype="text/plain", headers={"X-Profile-Samples": str(session.samples)})
+
+@app.route("/admin/profile/requests", methods=["GET"])
+def list_request_profiles():
+    """Requests recently profiled with X-Profile, newest first"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    return jsonify({"profiles": profiler.recent_request_profiles()}), 200
+
+@app.route("/admin/profile/requests/<profile_id>", methods=["GET"])
+def get_request_profile(profile_id):
+    """One request profile: JSON with the pstats report, its text (?format=text) or the .prof file (?format=prof)"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    loaded = profiler.load_request_profile(profile_id)
+    if loaded is None:
+        return jsonify({"error": "Profile not found"}), 404
+    record, prof_path = loaded
+    fmt = request.args.get("format")
+    if fmt == "prof":
+        return send_file(prof_path, mimetype="application/octet-stream", as_attachment=True,
+                         download_name=f"{profile_id}.prof")
+    if fmt == "text":
+        return app.response_class(record["report"], mimetype="text/plain")
+    return jsonify(record), 200
+
+@app.route("/stats/sockets", methods=["GET"])
+def socket_stats():
+    """WebSocket chat: open and refused connections, messages, busy refusals, for this worker"""
+    if Sock is None:
+        return jsonify({"error": "WebSockets unavailable (flask-sock is not installed)"}), 503
+    return jsonify(chat_sockets.stats()), 200
+
+@app.route("/stats/events", methods=["GET"])
+def event_log_stats():
+    """Conversation event log: events recorded, dropped (buffer full) and written, and segments, for this worker"""
+    if event_log is None:
+        return jsonify({"error": "Event log disabled"}), 503
+    return jsonify(event_log.stats()), 200
+
+@app.route("/stats/artifacts", methods=["GET"])
+def artifacts_stats():
+    """Prebuilt artifacts this worker mapped, or why it built that index itself"""
+    return jsonify(artifact_stats()), 200
+
+@app.route("/stats/memory", methods=["GET"])
+def memory_stats():
+    """RSS growth per request type (sampled), whether allocations are traced, and the recycle threshold, for this worker"""
+    return jsonify(memory_watch.stats()), 200
+
+def snapshot_arg(name):
+    value = request.args.get(name)
+    return int(value) if value else None
+
+@app.route("/admin/memory/snapshots", methods=["GET", "POST", "DELETE"])
+def memory_snapshots():
+    """List snapshots; POST takes one (tracing from then on, ?frames=), DELETE stops tracing"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    if request.method == "POST":
+        frames = request.args.get("frames", "")
+        memory_watch.start(int(frames) if frames.isdigit() else None)
+        return jsonify(memory_watch.snapshot(sanitize_text(request.args.get("label"))[:64])), 201
+    if request.method == "DELETE":
+        memory_watch.stop()
+    return jsonify({"tracing": memory_watch.tracing(), "snapshots": memory_watch.snapshots()}), 200
+
+@app.route("/admin/memory/top", methods=["GET"])
+def memory_top():
+    """Largest allocation sites in ?snapshot= (default the newest); ?key=lineno|filename|traceback, ?limit="""
+    denied = admin_denied()
+    if denied:
+        return denied
+    try:
+        return jsonify(memory_watch.top(snapshot_arg("snapshot"), int(request.args.get("limit", 20)),
+                                        request.args.get("key", "lineno"))), 200
+    except KeyError:
+        return jsonify({"error": "Snapshot not found"}), 404
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+@app.route("/admin/memory/diff", methods=["GET"])
+def memory_diff():
+    """Allocation growth between snapshots ?from= (default the oldest) and ?to= (default the newest)"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    try:
+        return jsonify(memory_watch.diff(snapshot_arg("from"), snapshot_arg("to"), int(request.args.get("limit", 20)),
+                                         request.args.get("key", "lineno"))), 200
+    except KeyError:
+        return jsonify({"error": "Snapshot not found"}), 404
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
 @app.route("/chat.html")
 def serve_chat_html():
-    return app.send_static_file("chat.html")
+    return asset_response(static_assets.get("/chat.html"))
 
 if __name__ == "__main__":
+    warm_up()
+    start_keep_warm()
     app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 10000)))
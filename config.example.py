@@ -27,7 +27,7 @@ LOG_FILE = "bot.log"
 # Optional Features
 ENABLE_ANALYTICS = False
 ENABLE_AUTO_RESPONSES = True
-RESPONSE_TIMEOUT = 30  # seconds
+RESPONSE_TIMEOUT = 30  # seconds; end-to-end budget for one /chat request, shared by all provider calls
 
 # Admin Settings
 ADMIN_USER_IDS = []  # Add admin user IDs here
@@ -0,0 +1,58 @@
+# gunicorn.conf.py - picked up automatically by `gunicorn api:app` from the project root
+import gc
+import os
+import subprocess
+import sys
+
+# GUNICORN_PRELOAD=1 imports the app once in the master and warms it before
+# forking, so workers start with shared, already-initialised state.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "").lower() in ("1", "true", "yes")
+
+# Sync workers unless GUNICORN_THREADS > 1, which switches to threaded
+# (gthread) workers: needed for /ws/chat, since an open connection holds a
+# thread for as long as it lasts. With sync workers /ws/chat refuses and the
+# page uses /chat. render.yaml opts in.
+threads = int(os.environ.get("GUNICORN_THREADS", "1"))
+
+
+def when_ready(server):
+    # Background jobs run in their own process (see runtime/jobs.py), started
+    # here so there is one runner per host; JOBS_RUNNER=off when a separate
+    # service runs `python -m runtime.jobs` instead.
+    if os.environ.get("JOBS_RUNNER", "local").lower() != "off":
+        server.job_runner = subprocess.Popen([sys.executable, "-m", "runtime.jobs"],
+                                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    if preload_app:
+        import api
+        api.warm_up()
+        # Move everything allocated so far out of the collector's reach so
+        # GC passes in the workers don't touch (and un-share) those pages.
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    import api
+    if not preload_app:
+        api.warm_up()
+    # Threads do not survive fork, so each worker runs its own keep-warm pings
+    api.start_keep_warm()
+
+
+def post_request(worker, req, environ, resp):
+    # MEMORY_RECYCLE_MB: retire a worker whose RSS has grown past the limit once
+    # this request is answered; the master replaces it (as with max_requests)
+    import api
+    if worker.alive and api.memory_watch.should_recycle():
+        worker.log.info("Worker %s above MEMORY_RECYCLE_MB (%.0f MB), recycling", worker.pid,
+                        api.memory_watch.recycle_mb)
+        worker.alive = False
+
+
+def on_exit(server):
+    runner = getattr(server, "job_runner", None)
+    if runner is not None and runner.poll() is None:
+        runner.terminate()
+        try:
+            runner.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            runner.kill()
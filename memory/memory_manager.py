@@ -3,15 +3,21 @@ class MemoryManager:
     A simple memory manager for storing and retrieving conversation history.
     """
     
-    def __init__(self, max_memory_size=100):
+    def __init__(self, max_memory_size=100, store=None, session_id=None):
         """
         Initialize the memory manager.
         
         Args:
             max_memory_size (int): Maximum number of messages to store
+            store (optional): LocalStore/SQLiteStore from memory.shared_store; when
+                given with session_id, history lives there instead of in this
+                object, so every worker process sees the same conversation
+            session_id (str, optional): Conversation key within the store
         """
         self.max_memory_size = max_memory_size
         self.memory = []
+        self.store = store if session_id else None
+        self.session_id = session_id
     
     def add_message(self, role, content):
         """
@@ -21,6 +27,10 @@ class MemoryManager:
             role (str): The role of the message sender (e.g., 'user', 'assistant')
             content (str): The content of the message
         """
+        if self.store is not None:
+            self.store.session_append(self.session_id, role, content)
+            return
+        
         message = {"role": role, "content": content}
         self.memory.append(message)
         
@@ -38,6 +48,8 @@ class MemoryManager:
         Returns:
             list: List of messages
         """
+        if self.store is not None:
+            return self.store.session_messages(self.session_id, last_n or self.max_memory_size)
         if last_n:
             return self.memory[-last_n:]
         return self.memory
@@ -46,6 +58,8 @@ class MemoryManager:
         """
         Clear all messages from memory.
         """
+        if self.store is not None:
+            self.store.session_clear(self.session_id)
         self.memory = []
     
     def get_memory_size(self):
@@ -55,4 +69,6 @@ class MemoryManager:
         Returns:
             int: Number of messages
         """
+        if self.store is not None:
+            return self.store.session_size(self.session_id)
         return len(self.memory)
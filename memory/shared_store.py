@@ -0,0 +1,275 @@
+"""
+Cache and session stores for Agent Vish.
+
+LocalStore keeps everything in the current process. SQLiteStore keeps it in a
+SQLite file (WAL mode) that every gunicorn worker on the host opens, so the
+response cache and a user's conversation history survive a follow-up landing
+on a different worker. Both expose the same methods; use open_store() to pick
+one from configuration.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalStore:
+    """
+    Per-process cache and session store guarded by a lock.
+    """
+
+    def __init__(self, max_cache_entries=10000, max_sessions=5000,
+                 max_session_messages=100, default_ttl=3600):
+        """
+        Initialize the store.
+
+        Args:
+            max_cache_entries (int): Cache entries kept before evicting least recently used
+            max_sessions (int): Sessions kept before evicting least recently updated
+            max_session_messages (int): Messages kept per session
+            default_ttl (float): Cache entry lifetime in seconds
+        """
+        self.max_cache_entries = max_cache_entries
+        self.max_sessions = max_sessions
+        self.max_session_messages = max_session_messages
+        self.default_ttl = default_ttl
+        self._cache = OrderedDict()
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cache_get(self, key):
+        """
+        Return the cached value for key, or None if missing or expired.
+        """
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.time():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return value
+
+    def cache_set(self, key, value, ttl=None):
+        """
+        Store value under key for ttl seconds (default_ttl when omitted).
+        """
+        expires = time.time() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._cache[key] = (value, expires)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_cache_entries:
+                self._cache.popitem(last=False)
+
+    def session_append(self, session_id, role, content):
+        """
+        Append a message to a session's history.
+        """
+        with self._lock:
+            messages = self._sessions.pop(session_id, [])
+            messages.append({"role": role, "content": content})
+            if len(messages) > self.max_session_messages:
+                del messages[:-self.max_session_messages]
+            self._sessions[session_id] = messages
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def session_messages(self, session_id, last_n=None):
+        """
+        Return a session's messages, oldest first.
+        """
+        with self._lock:
+            messages = list(self._sessions.get(session_id, ()))
+        return messages[-last_n:] if last_n else messages
+
+    def session_clear(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def session_size(self, session_id):
+        with self._lock:
+            return len(self._sessions.get(session_id, ()))
+
+
+class SQLiteStore:
+    """
+    Cache and session store in a SQLite file shared by all processes on a host.
+
+    Each process (and thread) gets its own connection, opened lazily so a
+    store created before gunicorn forks is still safe to use in the workers.
+    Writes run in short IMMEDIATE transactions; WAL mode lets readers proceed
+    while one process writes. Size bounds are enforced every prune_interval
+    writes instead of on every write, so a table may briefly exceed its bound.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            stored REAL NOT NULL,
+            expires REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS cache_stored ON cache (stored);
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id);
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            updated REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated);
+    """
+
+    def __init__(self, path, max_cache_entries=10000, max_sessions=5000,
+                 max_session_messages=100, default_ttl=3600, prune_interval=64):
+        """
+        Initialize the store, creating the database file if needed.
+
+        Args:
+            path (str): SQLite database file shared by the worker processes
+            max_cache_entries (int): Cache entries kept, oldest writes evicted first
+            max_sessions (int): Sessions kept, least recently updated evicted first
+            max_session_messages (int): Messages kept per session
+            default_ttl (float): Cache entry lifetime in seconds
+            prune_interval (int): Writes between size-bound enforcement passes
+        """
+        self.path = path
+        self.max_cache_entries = max_cache_entries
+        self.max_sessions = max_sessions
+        self.max_session_messages = max_session_messages
+        self.default_ttl = default_ttl
+        self.prune_interval = prune_interval
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()  # threaded workers write concurrently
+        with self._connect() as conn:
+            conn.executescript(self._SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _write(self, statements):
+        """Run (sql, params) pairs in one IMMEDIATE transaction"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, params in statements:
+                conn.execute(sql, params)
+            with self._writes_lock:
+                self._writes += 1
+                prune = self._writes % self.prune_interval == 0
+            if prune:
+                self._prune(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _prune(self, conn):
+        now = time.time()
+        conn.execute("DELETE FROM cache WHERE expires < ?", (now,))
+        conn.execute(
+            "DELETE FROM cache WHERE key IN "
+            "(SELECT key FROM cache ORDER BY stored DESC LIMIT -1 OFFSET ?)",
+            (self.max_cache_entries,),
+        )
+        conn.execute(
+            "DELETE FROM messages WHERE session_id IN "
+            "(SELECT session_id FROM sessions ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,),
+        )
+        conn.execute(
+            "DELETE FROM sessions WHERE session_id IN "
+            "(SELECT session_id FROM sessions ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,),
+        )
+
+    def cache_get(self, key):
+        """
+        Return the cached value for key, or None if missing or expired.
+        """
+        row = self._connect().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires >= ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def cache_set(self, key, value, ttl=None):
+        """
+        Store value under key for ttl seconds (default_ttl when omitted).
+        """
+        now = time.time()
+        expires = now + (self.default_ttl if ttl is None else ttl)
+        self._write([(
+            "INSERT OR REPLACE INTO cache (key, value, stored, expires) VALUES (?, ?, ?, ?)",
+            (key, value, now, expires),
+        )])
+
+    def session_append(self, session_id, role, content):
+        """
+        Append a message to a session's history and trim it, atomically.
+        """
+        self._write([
+            ("INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)",
+             (session_id, role, content)),
+            ("DELETE FROM messages WHERE session_id = ? AND id <= "
+             "(SELECT id FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+             (session_id, session_id, self.max_session_messages)),
+            ("INSERT OR REPLACE INTO sessions (session_id, updated) VALUES (?, ?)",
+             (session_id, time.time())),
+        ])
+
+    def session_messages(self, session_id, last_n=None):
+        """
+        Return a session's messages, oldest first.
+        """
+        limit = last_n or self.max_session_messages
+        rows = self._connect().execute(
+            "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+            (session_id, limit),
+        ).fetchall()
+        return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+    def session_clear(self, session_id):
+        self._write([
+            ("DELETE FROM messages WHERE session_id = ?", (session_id,)),
+            ("DELETE FROM sessions WHERE session_id = ?", (session_id,)),
+        ])
+
+    def session_size(self, session_id):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+
+
+def open_store(path=None, **kwargs):
+    """
+    Open the configured store.
+
+    Args:
+        path (str, optional): SQLite file shared across worker processes; when
+            omitted (the SHARED_STORE_PATH setting is unset) a per-process
+            LocalStore is returned
+        **kwargs: Size and TTL bounds passed to the store
+
+    Returns:
+        LocalStore or SQLiteStore
+    """
+    if path:
+        return SQLiteStore(path, **kwargs)
+    return LocalStore(**kwargs)
@@ -0,0 +1,256 @@
+"""
+Local columnar copies of Google Sheets.
+
+A synced sheet is kept on disk as one file per column under
+SHEETS_CACHE_DIR/<key>/: numeric columns as float64 .npy arrays (NaN for
+empty cells), anything else as a JSON list (null for empty cells), plus a
+meta.json with the header, row count and the Drive version the copy was
+taken at. Every gunicorn worker on the host reads the same files; writers
+take an flock on the sheet's directory and replace files atomically, so a
+reader never sees half a sync. report_skill's output for the current
+generation of a copy is kept next to it (report.<generation>.json), so the
+job runner and every worker share one analysis per version of the sheet.
+
+SheetTable is the in-memory form: rows can be appended, overwritten in
+place without rebuilding the other columns.
+"""
+
+import fcntl
+import json
+import math
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "agent_vish_sheets")
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _empty(value: Any) -> bool:
+    return value is None or value == ""
+
+
+def _column(values: Sequence[Any]) -> np.ndarray:
+    """float64 when every non-empty cell is a number, else an object array with None for empty cells"""
+    if all(_is_number(v) or _empty(v) for v in values):
+        return np.array([math.nan if _empty(v) else v for v in values], dtype=np.float64)
+    column = np.empty(len(values), dtype=object)
+    column[:] = [None if _empty(v) else v for v in values]
+    return column
+
+
+def _merge(column: np.ndarray, start: int, values: np.ndarray) -> np.ndarray:
+    """column with values written from start, widening to object when the types no longer agree"""
+    end = start + len(values)
+    if column.dtype != values.dtype:
+        column = column.astype(object)
+        if values.dtype != object:
+            values = values.astype(object)
+            values[np.isnan(values.astype(np.float64))] = None
+        else:
+            column[np.array([isinstance(v, float) and math.isnan(v) for v in column], dtype=bool)] = None
+    if end > len(column):
+        grown = np.empty(end, dtype=column.dtype)
+        grown[:len(column)] = column
+        column = grown
+    column[start:end] = values
+    return column
+
+
+class SheetTable:
+    """
+    A sheet's data rows held column by column.
+    """
+
+    def __init__(self, header: List[str], columns: Optional[Dict[str, np.ndarray]] = None, rows: int = 0):
+        self.header = list(header)
+        self.columns = columns if columns is not None else {
+            name: np.empty(0, dtype=np.float64) for name in self.header}
+        self.rows = rows
+
+    @classmethod
+    def from_rows(cls, header: List[str], rows: List[List[Any]]) -> "SheetTable":
+        table = cls(header)
+        table.write(0, rows)
+        return table
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def write(self, start: int, rows: List[List[Any]]) -> int:
+        """
+        Overwrite rows from data row start (appending past the end); returns how many rows differed.
+        """
+        if not rows:
+            return 0
+        width = len(self.header)
+        padded = [list(row[:width]) + [None] * (width - len(row)) for row in rows]
+        changed = np.zeros(len(rows), dtype=bool) if start < self.rows else None
+        for i, name in enumerate(self.header):
+            values = _column([row[i] for row in padded])
+            old = self.columns[name]
+            if changed is not None:
+                overlap = min(len(values), self.rows - start)
+                before, after = old[start:start + overlap], values[:overlap]
+                if before.dtype == after.dtype == np.float64:
+                    differs = ~((before == after) | (np.isnan(before) & np.isnan(after)))
+                else:
+                    differs = np.array([not _same(a, b) for a, b in zip(before, after)], dtype=bool)
+                changed[:overlap] |= differs
+            self.columns[name] = _merge(old, start, values)
+        end = start + len(rows)
+        appended = max(0, end - self.rows)
+        self.rows = max(self.rows, end)
+        if changed is None:
+            return 0
+        return int(changed[:len(rows) - appended].sum())
+
+    def to_frame(self):
+        """A pandas DataFrame over the columns (pandas imported here, as in report_skill's callers)"""
+        import pandas as pd
+        return pd.DataFrame({name: self.columns[name] for name in self.header}, columns=self.header)
+
+
+def _same(a: Any, b: Any) -> bool:
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+
+class ColumnarSheetCache:
+    """
+    Sheet copies under one directory, keyed by spreadsheet id and sheet title.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.environ.get("SHEETS_CACHE_DIR") or DEFAULT_CACHE_DIR
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, re.sub(r"[^A-Za-z0-9_.-]+", "_", key))
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        """
+        Exclusive lock on key across processes on this host.
+        """
+        directory = self.path(key)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, ".lock"), "w") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def meta(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        The stored meta.json for key, or None when there is no copy yet.
+        """
+        try:
+            with open(os.path.join(self.path(key), "meta.json")) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def load(self, key: str) -> Optional[Tuple[Dict[str, Any], SheetTable]]:
+        """
+        (meta, table) for key, or None when there is no complete copy.
+        """
+        meta = self.meta(key)
+        if meta is None:
+            return None
+        directory = self.path(key)
+        columns = {}
+        try:
+            for i, name in enumerate(meta["header"]):
+                kind = meta["kinds"][i]
+                file = os.path.join(directory, meta["files"][i])
+                if kind == "number":
+                    columns[name] = np.load(file, allow_pickle=False)
+                else:
+                    with open(file) as handle:
+                        column = np.empty(meta["rows"], dtype=object)
+                        column[:] = json.load(handle)
+                        columns[name] = column
+        except (OSError, ValueError, KeyError, IndexError):
+            return None
+        return meta, SheetTable(meta["header"], columns, meta["rows"])
+
+    def touch(self, key: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """
+        Update fields in key's meta.json without rewriting the columns.
+        """
+        record = self.meta(key)
+        if record is None:
+            return None
+        record.update(fields)
+        self._write_meta(key, record)
+        return record
+
+    def _write_meta(self, key: str, record: Dict[str, Any]):
+        directory = self.path(key)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".json")
+        with os.fdopen(fd, "w") as handle:
+            json.dump(record, handle)
+        os.replace(tmp, os.path.join(directory, "meta.json"))
+
+    def save(self, key: str, table: SheetTable, **meta: Any) -> Dict[str, Any]:
+        """
+        Write table's columns and meta.json (meta last, so readers only ever see complete copies).
+        """
+        directory = self.path(key)
+        os.makedirs(directory, exist_ok=True)
+        generation = (self.meta(key) or {}).get("generation", 0) + 1
+        kinds, files = [], []
+        for i, name in enumerate(table.header):
+            column = table.columns[name][:table.rows]
+            if column.dtype == np.float64:
+                kinds.append("number")
+                files.append(f"c{i}.{generation}.npy")
+                with open(os.path.join(directory, files[-1]), "wb") as handle:
+                    np.save(handle, column, allow_pickle=False)
+            else:
+                kinds.append("text")
+                files.append(f"c{i}.{generation}.json")
+                with open(os.path.join(directory, files[-1]), "w") as handle:
+                    json.dump([None if isinstance(v, float) and math.isnan(v) else v for v in column.tolist()],
+                              handle, separators=(",", ":"))
+        record = dict(meta, header=table.header, rows=table.rows, kinds=kinds, files=files,
+                      generation=generation)
+        self._write_meta(key, record)
+        # Column files and reports from older generations are no longer referenced
+        for entry in os.listdir(directory):
+            if entry not in files and re.match(r"(c\d+|report)\.\d+\.(npy|json)$", entry):
+                try:
+                    os.remove(os.path.join(directory, entry))
+                except OSError:
+                    pass
+        return record
+
+    def save_report(self, key: str, generation: int, report: Dict[str, Any]):
+        """
+        Store a JSON-able report of generation `generation` of key's copy.
+        """
+        directory = self.path(key)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".json")
+        with os.fdopen(fd, "w") as handle:
+            json.dump(report, handle)
+        os.replace(tmp, os.path.join(directory, f"report.{generation}.json"))
+
+    def load_report(self, key: str, generation: int) -> Optional[Dict[str, Any]]:
+        """
+        The stored report of that generation of key's copy, or None.
+        """
+        try:
+            with open(os.path.join(self.path(key), f"report.{generation}.json")) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,251 @@
+function sanitizeInput(input) {
+  if (typeof input !== 'string') return '';
+  return input.trim().replace(/[<>]/g, '').substring(0, 1000);
+}
+
+function escapeHtml(text) {
+  const div = document.createElement('div');
+  div.textContent = text;
+  return div.innerHTML;
+}
+
+async function fetchWithRetry(url, options, maxRetries = 3) {
+  for (let i = 0; i < maxRetries; i++) {
+    try {
+      const response = await fetch(url, options);
+      if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+      return await response.json();
+    } catch (error) {
+      if (i === maxRetries - 1) throw error;
+      await new Promise(resolve => setTimeout(resolve, Math.pow(2, i) * 1000));
+    }
+  }
+}
+
+function showError(message) {
+  const errorEl = document.getElementById('error');
+  errorEl.textContent = message;
+  errorEl.classList.add('active');
+  setTimeout(() => {
+    errorEl.classList.remove('active');
+  }, 5000);
+}
+
+function setLoading(isLoading) {
+  const loadingEl = document.getElementById('loading');
+  const sendBtn = document.getElementById('sendBtn');
+  const userInput = document.getElementById('userInput');
+  
+  if (isLoading) {
+    loadingEl.classList.add('active');
+    sendBtn.disabled = true;
+    userInput.disabled = true;
+  } else {
+    loadingEl.classList.remove('active');
+    sendBtn.disabled = false;
+    userInput.disabled = false;
+  }
+}
+
+function addMessage(text, isUser) {
+  const msgsContainer = document.getElementById('msgs');
+  const msgDiv = document.createElement('div');
+  msgDiv.className = `msg ${isUser ? 'user' : 'bot'}`;
+  
+  const avatar = document.createElement('div');
+  avatar.className = 'avatar';
+  avatar.textContent = isUser ? '👤' : '🤖';
+  
+  const bubble = document.createElement('div');
+  bubble.className = 'bubble';
+  bubble.textContent = text;
+  
+  msgDiv.appendChild(avatar);
+  msgDiv.appendChild(bubble);
+  msgsContainer.appendChild(msgDiv);
+  msgsContainer.scrollTop = msgsContainer.scrollHeight;
+  return bubble;
+}
+
+// One WebSocket per page (/ws/chat), bound to the chat session. Messages are
+// pipelined over it and LLM replies stream in token by token; whenever the
+// socket is unavailable, messages go to /chat instead.
+const chatSocket = {
+  ws: null,
+  ready: false,
+  sessionId: sessionStorage.getItem('chatSessionId'),
+  nextId: 1,
+  pending: new Map(),  // id -> {resolve, reject, bubble, timer}
+  failures: 0,
+  lastFrame: 0,
+
+  connect() {
+    if (!('WebSocket' in window) || this.failures >= 5) return;
+    const scheme = location.protocol === 'https:' ? 'wss' : 'ws';
+    const query = this.sessionId ? `?session_id=${encodeURIComponent(this.sessionId)}` : '';
+    const ws = new WebSocket(`${scheme}://${location.host}/ws/chat${query}`);
+    this.ws = ws;
+    ws.onmessage = (event) => this.receive(JSON.parse(event.data));
+    ws.onclose = () => {
+      this.ready = false;
+      this.ws = null;
+      this.failures += 1;
+      // Anything still waiting is answered over HTTP instead
+      for (const entry of this.pending.values()) {
+        this.drop(entry);
+        entry.reject(new Error('socket closed'));
+      }
+      this.pending.clear();
+      setTimeout(() => this.connect(), Math.min(30000, 1000 * Math.pow(2, this.failures)));
+    };
+  },
+
+  receive(frame) {
+    this.lastFrame = Date.now();
+    if (frame.type === 'ready') {
+      this.ready = true;
+      this.failures = 0;
+      this.sessionId = frame.session_id;
+      sessionStorage.setItem('chatSessionId', frame.session_id);
+      return;
+    }
+    const entry = this.pending.get(frame.id);
+    if (!entry) return;
+    if (frame.type === 'token') {
+      if (!entry.bubble) entry.bubble = addMessage('', false);
+      entry.bubble.textContent = frame.restart ? frame.text : entry.bubble.textContent + frame.text;
+    } else if (frame.type === 'reply' || frame.type === 'error') {
+      clearTimeout(entry.timer);
+      this.pending.delete(frame.id);
+      if (frame.type === 'reply') {
+        frame.bubble = entry.bubble;
+      } else {
+        this.drop(entry);
+      }
+      entry.resolve(frame);
+    }
+  },
+
+  // Forget a message's partial reply (it is answered again or shown as an error)
+  drop(entry) {
+    clearTimeout(entry.timer);
+    if (entry.bubble) entry.bubble.parentElement.remove();
+  },
+
+  // Resolves with the reply or error frame; rejects when the socket cannot answer.
+  // A timed-out message is flagged: the server may still be answering it, so it
+  // must not be sent again over /chat.
+  ask(message) {
+    return new Promise((resolve, reject) => {
+      const id = this.nextId++;
+      const timer = setTimeout(() => {
+        this.drop(this.pending.get(id));
+        this.pending.delete(id);
+        const error = new Error('timed out');
+        error.timedOut = true;
+        reject(error);
+      }, 35000);
+      this.pending.set(id, { resolve, reject, bubble: null, timer });
+      this.ws.send(JSON.stringify({ type: 'message', id, message, stream: true }));
+    });
+  },
+
+  // Ping while idle; a socket that stays silent is closed and reconnected
+  heartbeat() {
+    if (!this.ready) return;
+    if (Date.now() - this.lastFrame > 45000) {
+      this.ws.close();
+    } else if (Date.now() - this.lastFrame > 20000) {
+      this.ws.send(JSON.stringify({ type: 'ping' }));
+    }
+  },
+};
+
+async function askOverHttp(message) {
+  const body = { message };
+  if (chatSocket.sessionId) body.session_id = chatSocket.sessionId;
+  return fetchWithRetry('/chat', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json'
+    },
+    body: JSON.stringify(body),
+  });
+}
+
+// The socket when it is up, else /chat. A message the socket refused (busy) or
+// lost with the connection also goes to /chat; one that timed out does not.
+async function ask(message) {
+  if (chatSocket.ready) {
+    try {
+      const frame = await chatSocket.ask(message);
+      if (frame.type === 'reply' || frame.error !== 'Busy') return frame;
+    } catch (error) {
+      if (error.timedOut) throw error;
+      console.warn('WebSocket chat failed, using /chat:', error);
+    }
+  }
+  return askOverHttp(message);
+}
+
+async function sendMessage() {
+  const userInput = document.getElementById('userInput');
+  const rawMessage = userInput.value;
+  const sanitizedMessage = sanitizeInput(rawMessage);
+  
+  if (!sanitizedMessage) {
+    showError('Please enter a valid message');
+    return;
+  }
+  
+  userInput.value = '';
+  addMessage(sanitizedMessage, true);
+  // Over the socket, further messages may be sent while this one is answered
+  const pipelined = chatSocket.ready;
+  setLoading(!pipelined);
+  
+  try {
+    const data = await ask(sanitizedMessage);
+    const replyText = data.reply || data.message || 'Sorry, I encountered an error. Please try again.';
+    if (data.bubble) {
+      data.bubble.textContent = replyText;  // the streamed text, settled
+    } else {
+      addMessage(replyText, false);
+    }
+  } catch (error) {
+    console.error('Error:', error);
+    showError('Failed to get response. Please try again.');
+    addMessage('Sorry, I encountered an error. Please try again.', false);
+  } finally {
+    if (!pipelined) setLoading(false);
+    userInput.focus();
+  }
+}
+
+function initializeChat() {
+  const sendBtn = document.getElementById('sendBtn');
+  const userInput = document.getElementById('userInput');
+  
+  if (!sendBtn || !userInput) {
+    console.error('Required elements not found');
+    return;
+  }
+  
+  sendBtn.addEventListener('click', sendMessage);
+  userInput.addEventListener('keypress', (e) => {
+    if (e.key === 'Enter' && !e.shiftKey) {
+      e.preventDefault();
+      sendMessage();
+    }
+  });
+  
+  userInput.focus();
+  chatSocket.connect();
+  setInterval(() => chatSocket.heartbeat(), 10000);
+}
+
+if (document.readyState === 'loading') {
+  document.addEventListener('DOMContentLoaded', initializeChat);
+} else {
+  initializeChat();
+}
@@ -0,0 +1,170 @@
+"""Admission Control for Agent Vish
+
+Per-client token-bucket rate limits plus a cap on concurrent LLM calls with a
+bounded, deadline-limited wait queue. When the LLM path is saturated callers
+are told to shed load (answer from the static intent catalog) instead of
+piling up behind 30 s provider calls.
+
+Limits apply per worker process; a host's total LLM concurrency is
+workers x LLM_MAX_CONCURRENT.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Iterator, Optional
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def retry_after(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` will be available"""
+        missing = tokens - self.tokens
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+
+class AdmissionController:
+    """Rate limits per client and gates LLM-bound work"""
+
+    def __init__(self, rate_per_sec: float = 2.0, burst: float = 10.0,
+                 max_concurrent_llm: int = 4, max_queue: int = 8,
+                 queue_timeout: float = 2.0, max_clients: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            rate_per_sec: Sustained requests per second allowed per client (0 disables)
+            burst: Requests a client may send back-to-back
+            max_concurrent_llm: LLM calls allowed in flight at once
+            max_queue: Callers allowed to wait for an LLM slot; more are shed
+            queue_timeout: Longest a caller waits for a slot before being shed
+            max_clients: Client buckets remembered (least recently seen evicted)
+        """
+        self.rate_per_sec = rate_per_sec
+        self.burst = burst
+        self.max_concurrent_llm = max_concurrent_llm
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_clients = max_clients
+        self.clock = clock
+
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._buckets_lock = threading.Lock()
+        self._slots = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self._counters = {"admitted": 0, "queued": 0, "shed_queue_full": 0,
+                          "shed_timeout": 0, "shed_deadline": 0, "rate_limited": 0}
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """Build from RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST, LLM_MAX_CONCURRENT,
+        LLM_MAX_QUEUE and LLM_QUEUE_TIMEOUT"""
+        env = os.environ
+        return cls(
+            rate_per_sec=float(env.get("RATE_LIMIT_PER_SEC", 2.0)),
+            burst=float(env.get("RATE_LIMIT_BURST", 10.0)),
+            max_concurrent_llm=int(env.get("LLM_MAX_CONCURRENT", 4)),
+            max_queue=int(env.get("LLM_MAX_QUEUE", 8)),
+            queue_timeout=float(env.get("LLM_QUEUE_TIMEOUT", 2.0)),
+        )
+
+    def check_rate(self, client_id: str) -> float:
+        """Take a token for client_id; returns 0 when allowed, else seconds to retry after"""
+        if self.rate_per_sec <= 0:
+            return 0.0
+        with self._buckets_lock:
+            bucket = self._buckets.pop(client_id, None)
+            if bucket is None:
+                bucket = TokenBucket(self.rate_per_sec, self.burst, self.clock)
+            self._buckets[client_id] = bucket
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            if bucket.try_acquire():
+                return 0.0
+            self._counters["rate_limited"] += 1
+            return max(bucket.retry_after(), 0.001)
+
+    def acquire_llm(self, timeout: Optional[float] = None) -> bool:
+        """Wait for an LLM slot; False means the caller should shed load.
+
+        The wait is bounded by queue_timeout and, when given, by timeout
+        (typically what is left of the request's deadline).
+        """
+        timeout = self.queue_timeout if timeout is None else min(self.queue_timeout, timeout)
+        with self._slots:
+            if self._in_flight < self.max_concurrent_llm and not self._waiting:
+                self._in_flight += 1
+                self._counters["admitted"] += 1
+                return True
+            if timeout <= 0:
+                # The caller's deadline is spent; the queue may have room
+                self._counters["shed_deadline"] += 1
+                return False
+            if self._waiting >= self.max_queue:
+                self._counters["shed_queue_full"] += 1
+                return False
+            self._waiting += 1
+            self._counters["queued"] += 1
+            try:
+                admitted = self._slots.wait_for(
+                    lambda: self._in_flight < self.max_concurrent_llm, timeout=timeout)
+                if not admitted:
+                    self._counters["shed_timeout"] += 1
+                    return False
+                self._in_flight += 1
+                self._counters["admitted"] += 1
+                return True
+            finally:
+                self._waiting -= 1
+
+    def release_llm(self):
+        with self._slots:
+            self._in_flight -= 1
+            self._slots.notify()
+
+    @contextmanager
+    def llm_slot(self, timeout: Optional[float] = None) -> Iterator[bool]:
+        """`with controller.llm_slot() as admitted:` - releases the slot on exit"""
+        admitted = self.acquire_llm(timeout)
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release_llm()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._slots:
+            state = {"llm_in_flight": self._in_flight, "queue_depth": self._waiting}
+            counters = dict(self._counters)
+        with self._buckets_lock:
+            state["tracked_clients"] = len(self._buckets)
+        return {
+            "limits": {
+                "rate_per_sec": self.rate_per_sec,
+                "burst": self.burst,
+                "max_concurrent_llm": self.max_concurrent_llm,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout,
+            },
+            "state": state,
+            "counters": counters,
+        }
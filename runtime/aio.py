@@ -0,0 +1,49 @@
+"""Provider Event Loop
+
+Flask handles each request on a worker thread, but provider calls are
+coroutines. Rather than spin up an event loop (or a thread) per call, every
+process runs one loop on a daemon thread; sync code hands coroutines to it
+with run_sync() and waits for the result. Pooled HTTP clients are bound to
+this loop, so they live as long as the process does.
+
+Like the other background threads, the loop is per process: a fork gets a
+fresh one on first use.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Awaitable, Optional
+
+_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_pid: Optional[int] = None
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """The process's provider loop, started on first use"""
+    global _loop, _pid
+    with _lock:
+        if _pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="provider-loop", daemon=True).start()
+            _loop, _pid = loop, os.getpid()
+        return _loop
+
+
+def run_sync(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the provider loop and wait for it.
+
+    On timeout the coroutine is cancelled (closing whatever connection it
+    was reading) and TimeoutError is raised.
+    """
+    loop = get_loop()
+    if threading.current_thread().name == "provider-loop":
+        raise RuntimeError("run_sync called from the provider loop; await the coroutine instead")
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result(timeout)
+    except FutureTimeout:
+        future.cancel()
+        raise TimeoutError(f"provider call did not finish within {timeout:.1f}s")
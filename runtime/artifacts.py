@@ -0,0 +1,264 @@
+"""Prebuilt, memory-mapped artifacts for warm starts
+
+The intent classifiers, the FAQ index and the doc embeddings are otherwise
+built from data/ in every gunicorn worker on every boot. `python -m
+runtime.artifacts build` builds them once into ARTIFACTS_DIR (default
+./artifacts), and workers map the files read-only: the arrays are views onto
+the page cache, shared by every process on the host, and loading one is a
+header parse.
+
+One file per artifact, <name>.art:
+
+    magic (8 bytes) | header length (uint64 LE) | header JSON | arrays
+
+The header records the file format, the builder's version, the arrays
+(dtype, shape, offset; each 64-byte aligned), JSON metadata, a SHA-256 of the
+array bytes and the source files with their SHA-256. A loader passes the
+version it understands and the sources it would build from; a file that is
+missing, corrupt, from another version or built from different or changed
+sources is skipped and the caller builds in process, as without artifacts.
+ARTIFACTS=off turns loading off. Workers do not hash the payload, which
+would read every page of it: the build writes the checksum and `python -m
+runtime.artifacts verify` checks it. ARTIFACTS_VERIFY=1 checks it at load too.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAGIC = b"AVART\x00\x01\n"
+FORMAT = 1
+ALIGN = 64
+
+# name -> what happened when this process last asked for it (for /stats/artifacts)
+_status: Dict[str, Dict[str, Any]] = {}
+
+
+class Artifact(NamedTuple):
+    name: str
+    header: Dict[str, Any]
+    arrays: Dict[str, np.ndarray]   # read-only views onto the mapping
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        return self.header["meta"]
+
+
+def artifact_dir(directory: Optional[str] = None) -> str:
+    return directory or os.environ.get("ARTIFACTS_DIR") or os.path.join(ROOT, "artifacts")
+
+
+def artifact_path(name: str, directory: Optional[str] = None) -> str:
+    return os.path.join(artifact_dir(directory), f"{name}.art")
+
+
+def source_key(path: str) -> str:
+    """path relative to the project root when inside it, so a build elsewhere matches"""
+    path = os.path.abspath(path)
+    return os.path.relpath(path, ROOT) if path.startswith(ROOT + os.sep) else path
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(sources: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Content hash, size and mtime of each source file"""
+    prints = {}
+    for path in sources:
+        stat = os.stat(path)
+        prints[source_key(path)] = {"sha256": _sha256_file(path), "size": stat.st_size,
+                                     "mtime_ns": stat.st_mtime_ns}
+    return prints
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGN) * ALIGN
+
+
+def write_artifact(name: str, version: int, arrays: Dict[str, np.ndarray], meta: Dict[str, Any],
+                   sources: Iterable[str] = (), directory: Optional[str] = None) -> Dict[str, Any]:
+    """Write <name>.art atomically; processes that mapped the old file keep reading it"""
+    layout, offset = {}, 0
+    arrays = {key: np.ascontiguousarray(value) for key, value in arrays.items()}
+    for key, value in arrays.items():
+        layout[key] = {"dtype": value.dtype.str, "shape": list(value.shape), "offset": offset,
+                       "nbytes": value.nbytes}
+        offset = _align(offset + value.nbytes)
+    payload = bytearray(offset)
+    for key, value in arrays.items():
+        start = layout[key]["offset"]
+        payload[start:start + value.nbytes] = value.tobytes()
+    header = {
+        "format": FORMAT, "name": name, "version": version, "built": time.time(),
+        "arrays": layout, "meta": meta, "sources": fingerprint(sources),
+        "checksum": hashlib.sha256(payload).hexdigest(),
+    }
+    encoded = json.dumps(header).encode()
+    prefix = MAGIC + struct.pack("<Q", len(encoded)) + encoded
+    prefix += b"\0" * (_align(len(prefix)) - len(prefix))
+
+    path = artifact_path(name, directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as handle:
+        handle.write(prefix)
+        handle.write(payload)
+    os.replace(tmp, path)
+    return header
+
+
+def read_artifact(path: str, verify: bool = True) -> Artifact:
+    """Map path read-only; ValueError when it is not a valid artifact file"""
+    with open(path, "rb") as handle:
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapped[:len(MAGIC)] != MAGIC:
+        raise ValueError("not an artifact file")
+    (length,) = struct.unpack("<Q", mapped[len(MAGIC):len(MAGIC) + 8])
+    header_end = len(MAGIC) + 8 + length
+    header = json.loads(mapped[len(MAGIC) + 8:header_end])
+    if header.get("format") != FORMAT:
+        raise ValueError(f"file format {header.get('format')}, expected {FORMAT}")
+    start = _align(header_end)
+    payload = memoryview(mapped)[start:]
+    try:
+        if verify and hashlib.sha256(payload).hexdigest() != header["checksum"]:
+            raise ValueError("checksum mismatch")
+        arrays = {}
+        for key, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = spec["nbytes"] // dtype.itemsize
+            if spec["offset"] + spec["nbytes"] > len(payload):
+                raise ValueError(f"array {key} runs past the end of the file")
+            arrays[key] = np.frombuffer(mapped, dtype, count, start + spec["offset"]).reshape(spec["shape"])
+    finally:
+        payload.release()
+    return Artifact(header["name"], header, arrays)
+
+
+def stale_reason(header: Dict[str, Any], version: int, sources: Optional[Iterable[str]]) -> Optional[str]:
+    """Why an artifact does not match what the caller would build, or None when it does"""
+    if header.get("version") != version:
+        return f"version {header.get('version')}, expected {version}"
+    if sources is None:
+        return None
+    recorded = header.get("sources", {})
+    wanted = {source_key(path): path for path in sources}
+    if set(wanted) != set(recorded):
+        return "built from different sources"
+    for key, path in wanted.items():
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return f"{key} is missing"
+        entry = recorded[key]
+        # Unchanged size and mtime: no need to read the file (a checkout touches mtimes, so hash then)
+        if (stat.st_size, stat.st_mtime_ns) == (entry["size"], entry["mtime_ns"]):
+            continue
+        if stat.st_size != entry["size"] or _sha256_file(path) != entry["sha256"]:
+            return f"{key} changed"
+    return None
+
+
+def load_artifact(name: str, version: int, sources: Optional[Iterable[str]] = None,
+                  directory: Optional[str] = None) -> Optional[Artifact]:
+    """The artifact when it is present and current, else None (the caller builds it instead).
+
+    sources=None skips the source check for callers that reconcile changes themselves.
+    """
+    if os.environ.get("ARTIFACTS", "").lower() in ("0", "off", "false"):
+        return None
+    path = artifact_path(name, directory)
+    if not os.path.exists(path):
+        _status[name] = {"loaded": False, "reason": "not built"}
+        return None
+    try:
+        artifact = read_artifact(path, verify=os.environ.get("ARTIFACTS_VERIFY", "0") == "1")
+        reason = stale_reason(artifact.header, version, sources)
+    except (OSError, ValueError, KeyError) as e:
+        reason = f"unreadable: {e}"
+    if reason:
+        logger.warning("Ignoring artifact %s (%s); building it in process", path, reason)
+        _status[name] = {"loaded": False, "reason": reason}
+        return None
+    _status[name] = {"loaded": True, "version": version, "built": artifact.header["built"],
+                     "bytes": sum(spec["nbytes"] for spec in artifact.header["arrays"].values())}
+    return artifact
+
+
+def artifact_stats() -> Dict[str, Dict[str, Any]]:
+    """Artifacts this process asked for: loaded (with size and build time) or why not"""
+    return {name: dict(status) for name, status in sorted(_status.items())}
+
+
+def builders() -> Dict[str, Callable[[Optional[str]], Dict[str, Any]]]:
+    """name -> function that builds that artifact into a directory and returns its header"""
+    from skills.doc_index import build_doc_artifact
+    from skills.faq_engine import build_faq_artifact
+    from skills.intent_classifier import build_classifier_artifact
+    return {
+        "intents": lambda directory: build_classifier_artifact("intents.jsonl", "intent", directory),
+        "query_types": lambda directory: build_classifier_artifact("query_types.jsonl", "query_type", directory),
+        "faq": build_faq_artifact,
+        "docs": build_doc_artifact,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m runtime.artifacts", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build", "verify", "list"])
+    parser.add_argument("names", nargs="*", help="artifacts to build or check (default: all)")
+    parser.add_argument("--dir", help="output directory (default: ARTIFACTS_DIR or ./artifacts)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    available = builders()
+    unknown = [name for name in args.names if name not in available]
+    if unknown:
+        parser.error(f"unknown artifact(s): {', '.join(unknown)}; choose from {', '.join(available)}")
+    names = args.names or list(available)
+    failed = 0
+    for name in names:
+        path = artifact_path(name, args.dir)
+        if args.command == "build":
+            start = time.perf_counter()
+            header = available[name](args.dir)
+            size = os.path.getsize(path)
+            print(f"{name:<12} v{header['version']}  {size / 1024:>9.1f} KB  "
+                  f"{len(header['sources']):>3} source(s)  {(time.perf_counter() - start) * 1000:>7.1f} ms")
+            continue
+        try:
+            artifact = read_artifact(path, verify=args.command == "verify")
+        except (OSError, ValueError, KeyError) as e:
+            failed += 1
+            print(f"{name:<12} {e}")
+            continue
+        header = artifact.header
+        reason = stale_reason(header, header["version"], [os.path.join(ROOT, key) if not os.path.isabs(key) else key
+                                                         for key in header["sources"]])
+        failed += bool(reason)
+        built = time.strftime("%Y-%m-%d %H:%M", time.localtime(header["built"]))
+        print(f"{name:<12} v{header['version']}  {os.path.getsize(path) / 1024:>9.1f} KB  built {built}  "
+              f"{reason or 'current'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
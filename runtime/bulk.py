@@ -0,0 +1,301 @@
+"""Offline bulk processing of message corpora
+
+Re-scores historical messages (WhatsApp exports, CRM notes, ...) through the
+bot without the web service: reads JSONL, shards it into chunks across a
+process pool with one warm AgentVish per process, and writes one JSONL result
+per input line in input order.
+
+    python -m runtime.bulk messages.jsonl -o scored.jsonl
+    python -m runtime.bulk messages.jsonl -o intents.jsonl --mode intent --workers 8
+    python -m runtime.bulk messages.jsonl -o scored.jsonl --resume
+
+Each input line is an object with the message under --field (default
+"message") and optionally an "id", or a bare JSON string. Output lines carry
+the input "line" number and "id" plus, in "respond" mode, the intent, source,
+provider, degraded flag and reply; in "intent" mode just the intent, from one
+vectorized classifier pass per chunk. LLM calls are off unless --llm is given
+(a corpus would otherwise queue millions of generations), so fallback
+messages get the FAQ answer or the static fallback.
+
+After each chunk is written, <output>.ckpt records how far the input and the
+output got; --resume truncates the output to that point and carries on. It
+refuses when the output is missing or shorter than the checkpoint says.
+Throughput goes to stderr every --progress seconds and a summary to stdout.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+MODES = ("respond", "intent")
+CHECKPOINT_SUFFIX = ".ckpt"
+
+# The agent of this process (one per pool worker, built by _init_worker)
+_agent = None
+
+
+class Chunk(NamedTuple):
+    numbers: List[int]  # 1-based input line number of each line
+    lines: List[bytes]
+    end_line: int  # input lines consumed through this chunk, blank ones included
+    end_offset: int  # input byte offset just past the chunk
+
+
+class ChunkResult(NamedTuple):
+    output: bytes  # JSONL, one line per input line
+    counts: Dict[str, int]  # "source:<source>" or "intent:<intent>" and "errors"
+
+
+def _init_worker(llm: bool = False):
+    """Build this process's agent once; every chunk it gets reuses it"""
+    global _agent
+    from agent_vish import AgentVish
+
+    _agent = AgentVish()
+    if not llm:
+        _agent.ai_router = None
+
+
+def _parse(line: bytes, field: str) -> Tuple[Optional[str], Any, Optional[str]]:
+    """(message, id, error) for one input line"""
+    try:
+        row = json.loads(line)
+    except ValueError as e:
+        return None, None, f"invalid JSON: {e}"
+    if isinstance(row, str):
+        return row, None, None
+    if not isinstance(row, dict):
+        return None, None, "expected an object or a string"
+    message = row.get(field)
+    if not isinstance(message, str):
+        return None, row.get("id"), f"no {field!r} string"
+    return message, row.get("id"), None
+
+
+def process_chunk(chunk: Chunk, mode: str = "respond", field: str = "message") -> ChunkResult:
+    """Score one chunk with this process's agent"""
+    from agent_vish import sanitize_text
+
+    if _agent is None:
+        _init_worker()
+    records: List[Dict[str, Any]] = []
+    messages: List[Tuple[int, str]] = []  # (index into records, message) still to score
+    for number, line in zip(chunk.numbers, chunk.lines):
+        message, row_id, error = _parse(line, field)
+        record: Dict[str, Any] = {"line": number}
+        if row_id is not None:
+            record["id"] = row_id
+        if error:
+            record["error"] = error
+        else:
+            messages.append((len(records), sanitize_text(message)))
+        records.append(record)
+
+    counts: Counter = Counter(errors=len(records) - len(messages))
+    if mode == "intent":
+        for (index, _), intent in zip(messages, _agent.classify_batch([m for _, m in messages])):
+            records[index]["intent"] = intent
+            counts[f"intent:{intent}"] += 1
+    else:
+        for index, message in messages:
+            record = records[index]
+            try:
+                reply = _agent.respond(message)
+            except Exception as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+                counts["errors"] += 1
+                continue
+            record.update(intent=reply.intent, source=reply.source, provider=reply.provider,
+                          degraded=reply.degraded, reply=reply.text)
+            counts[f"source:{reply.source}"] += 1
+    output = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode()
+    return ChunkResult(output, dict(counts))
+
+
+def read_chunks(handle, chunk_size: int, line: int = 0, offset: int = 0) -> Iterator[Chunk]:
+    """Chunks of up to chunk_size non-blank lines from a binary file object positioned
+    after `line` lines, `offset` bytes in"""
+    numbers: List[int] = []
+    lines: List[bytes] = []
+    for text in handle:
+        offset += len(text)
+        line += 1
+        if text.strip():
+            numbers.append(line)
+            lines.append(text)
+            if len(lines) >= chunk_size:
+                yield Chunk(numbers, lines, line, offset)
+                numbers, lines = [], []
+    if lines:
+        yield Chunk(numbers, lines, line, offset)
+
+
+def checkpoint_path(output: str) -> str:
+    return output + CHECKPOINT_SUFFIX
+
+
+def read_checkpoint(output: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(checkpoint_path(output)) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def _write_checkpoint(output: str, state: Dict[str, Any]):
+    path = checkpoint_path(output)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as handle:
+        json.dump(state, handle)
+    os.replace(tmp, path)
+
+
+def _pool(workers: int, llm: bool) -> ProcessPoolExecutor:
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    if "forkserver" in methods:
+        # Imported once in the fork server, not in every worker
+        ctx.set_forkserver_preload(["agent_vish"])
+    return ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker, initargs=(llm,))
+
+
+class _InProcess:
+    """Stand-in for the pool when workers=0: runs each chunk on submit"""
+
+    def __init__(self, llm: bool):
+        _init_worker(llm)
+
+    def submit(self, fn, *args) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        pass
+
+
+def run(input_path: str, output_path: str, mode: str = "respond", field: str = "message",
+        workers: Optional[int] = None, chunk_size: int = 1000, llm: bool = False, resume: bool = False,
+        progress: float = 5.0, log=None) -> Dict[str, Any]:
+    """Score input_path into output_path and return the run's summary.
+
+    Args:
+        input_path: JSONL file, or "-" for stdin (which cannot be resumed)
+        output_path: JSONL results, in input order; <output>.ckpt is kept next to it
+        mode: "respond" (full routing) or "intent" (classification only)
+        field: Key of the message in each input object
+        workers: Processes (default: all cores); 0 runs in this process
+        chunk_size: Lines per task sent to a worker
+        llm: Let fallback messages reach the local LLM / cloud cascade
+        resume: Continue from the checkpoint instead of starting over
+        progress: Seconds between throughput lines on log (default stderr; 0 for none)
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}; choose from {', '.join(MODES)}")
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    log = log or sys.stderr
+    settings = {"input": os.path.abspath(input_path) if input_path != "-" else "-", "mode": mode, "field": field}
+    state = {**settings, "input_offset": 0, "lines": 0, "output_bytes": 0, "counts": {}}
+    if resume:
+        saved = read_checkpoint(output_path)
+        if saved is not None:
+            if input_path == "-":
+                raise ValueError("stdin input cannot be resumed")
+            changed = [key for key in settings if saved.get(key) != settings[key]]
+            if changed:
+                raise ValueError(f"Checkpoint {checkpoint_path(output_path)} was written with a different "
+                                 f"{', '.join(changed)}; remove it to start over")
+            written = os.path.getsize(output_path) if os.path.exists(output_path) else None
+            if written is None or written < saved["output_bytes"]:
+                raise ValueError(f"{output_path} is {'missing' if written is None else 'shorter than its checkpoint'}; "
+                                 f"remove {checkpoint_path(output_path)} to start over")
+            state = saved
+
+    source = sys.stdin.buffer if input_path == "-" else open(input_path, "rb")
+    out = open(output_path, "r+b" if resume and os.path.exists(output_path) else "wb")
+    pool = _InProcess(llm) if workers == 0 else _pool(workers, llm)
+    counts: Counter = Counter(state["counts"])
+    resumed_lines = state["lines"]
+    started = last_report = time.monotonic()
+    try:
+        if state["input_offset"]:
+            source.seek(state["input_offset"])
+        out.truncate(state["output_bytes"])
+        out.seek(state["output_bytes"])
+
+        pending: Deque[Tuple[Chunk, Future]] = deque()
+
+        def write_next():
+            chunk, future = pending.popleft()
+            result: ChunkResult = future.result()
+            out.write(result.output)
+            out.flush()
+            counts.update(result.counts)
+            state.update(input_offset=chunk.end_offset, lines=chunk.end_line,
+                         output_bytes=out.tell(), counts=dict(counts))
+            _write_checkpoint(output_path, state)
+
+        # At most two chunks per worker in flight: the pool stays busy while
+        # results are written in order, and memory stays bounded
+        window = max(1, workers) * 2
+        for chunk in read_chunks(source, chunk_size, state["lines"], state["input_offset"]):
+            pending.append((chunk, pool.submit(process_chunk, chunk, mode, field)))
+            while len(pending) >= window or (pending and pending[0][1].done()):
+                write_next()
+            now = time.monotonic()
+            if progress and now - last_report >= progress:
+                last_report = now
+                done = state["lines"] - resumed_lines
+                log.write(f"{state['lines']} lines, {done / (now - started):.0f}/s\n")
+                log.flush()
+        while pending:
+            write_next()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        out.close()
+        if source is not sys.stdin.buffer:
+            source.close()
+
+    seconds = time.monotonic() - started
+    processed = state["lines"] - resumed_lines
+    return {"lines": state["lines"], "processed": processed, "resumed_from": resumed_lines,
+            "seconds": round(seconds, 3), "per_second": round(processed / seconds, 1) if seconds else 0.0,
+            "workers": workers, "errors": counts.get("errors", 0),
+            "counts": {key: value for key, value in sorted(counts.items()) if key != "errors"}}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m runtime.bulk", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL messages, or - for stdin")
+    parser.add_argument("-o", "--output", required=True, help="JSONL results (checkpoint: <output>.ckpt)")
+    parser.add_argument("--mode", choices=MODES, default="respond")
+    parser.add_argument("--field", default="message", help="key of the message in each object")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores; 0: this one)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="lines per task")
+    parser.add_argument("--llm", action="store_true", help="let fallback messages reach the LLM cascade")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    parser.add_argument("--progress", type=float, default=5.0, help="seconds between throughput lines")
+    args = parser.parse_args(argv)
+    try:
+        summary = run(args.input, args.output, args.mode, args.field, args.workers, args.chunk_size,
+                      args.llm, args.resume, args.progress)
+    except ValueError as e:
+        parser.error(str(e))
+    counts = ", ".join(f"{key.split(':', 1)[1]} {value}" for key, value in summary["counts"].items())
+    print(f"{summary['processed']} lines in {summary['seconds']:.1f} s ({summary['per_second']:.0f}/s, "
+          f"{summary['workers']} workers), {summary['errors']} errors; {counts}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""Model Cascade for LLM answers
+
+The fast local model answers first. A cheap self-check looks at its answer
+(empty, refusal, too short, cut off at the token limit, repetitive, low mean
+log-probability when the server reports it) and, if that passes, a one-word
+verifier prompt on the fast model asks whether the answer addresses the
+question. A failed check escalates to the next tier: a larger local model,
+then the cloud providers. The last tier's answer is always accepted.
+
+Tiers come from LLM_CASCADE, a comma-separated list of Ollama model names and
+the word "cloud" (AIRouterSkill), each optionally followed by @<USD per 1k
+tokens>:
+
+    LLM_CASCADE="llama3.2:1b,llama3.1:8b,cloud@0.002"
+
+Unset, the cascade is the single OLLAMA_MODEL tier, i.e. no escalation.
+Per-tier counters, escalation reasons and the latency and cost saved against
+sending everything to the last tier are reported by stats().
+"""
+
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from runtime import profiler
+from runtime.deadline import Deadline, MIN_USEFUL_TIMEOUT, timeout_for
+from runtime.output_profile import PROFILES, OutputProfile, estimate_tokens, stream_to
+
+CLOUD = "cloud"
+MIN_ANSWER_WORDS = 3
+MIN_DISTINCT_TRIGRAMS = 0.5  # share of an answer's word trigrams that are distinct
+REFUSAL_PATTERN = re.compile(
+    r"^\W*(i'?m sorry|i am sorry|sorry,|i cannot|i can'?t|i am unable|i'?m unable|i'?m not able"
+    r"|i don'?t know|i do not know|as an ai)|i don'?t have (enough |any )?information"
+)
+VERIFIER_PROMPT = (
+    "Question: {question}\n"
+    "Answer: {answer}\n"
+    "Does the answer directly and correctly address the question? Reply with YES or NO only."
+)
+# Failures that make an answer worse than the static catalog, so it is never
+# used even when no later tier answers in time
+HARD_FAILURES = {"empty", "refusal"}
+
+
+class Tier(NamedTuple):
+    name: str
+    model: str  # Ollama model name, or CLOUD
+    cost_per_1k: float  # USD per 1k tokens, prompt and answer
+
+
+class Attempt(NamedTuple):
+    text: str
+    tokens: int
+    meta: Dict[str, Any]
+
+
+def parse_tiers(spec: str, default_model: str) -> List[Tier]:
+    """Tiers from an LLM_CASCADE string; an empty spec means default_model alone"""
+    tiers = []
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        model, _, cost = item.rpartition("@") if "@" in item else (item, "", "")
+        try:
+            cost_per_1k = float(cost) if cost else 0.0
+        except ValueError:
+            raise ValueError(f"Invalid cost in LLM_CASCADE tier {item!r}")
+        # stats() keys counters by tier name; a repeat would merge two tiers
+        if any(t.name == model for t in tiers):
+            raise ValueError(f"Duplicate LLM_CASCADE tier {model!r}")
+        tiers.append(Tier(model, model, cost_per_1k))
+    return tiers or [Tier(default_model, default_model, 0.0)]
+
+
+def check_answer(answer: str, meta: Optional[Dict[str, Any]] = None,
+                 min_logprob: Optional[float] = None) -> Optional[str]:
+    """Why an answer should be escalated, or None when it looks usable"""
+    meta = meta or {}
+    text = (answer or "").strip()
+    if not text:
+        return "empty"
+    if REFUSAL_PATTERN.search(text[:160].lower()):
+        return "refusal"
+    words = text.lower().split()
+    if len(words) < MIN_ANSWER_WORDS:
+        return "too_short"
+    if meta.get("done_reason") == "length":
+        return "truncated"
+    if len(words) >= 30:
+        trigrams = list(zip(words, words[1:], words[2:]))
+        if len(set(trigrams)) / len(trigrams) < MIN_DISTINCT_TRIGRAMS:
+            return "repetitive"
+    logprobs = [p["logprob"] for p in meta.get("logprobs") or () if "logprob" in p]
+    if min_logprob is not None and logprobs and sum(logprobs) / len(logprobs) < min_logprob:
+        return "low_logprob"
+    return None
+
+
+class ModelCascade:
+    """Tries tiers cheapest first until an answer passes the self-check"""
+
+    def __init__(self, tiers: List[Tier],
+                 generate: Callable[[str, str, Optional[Deadline], Optional[OutputProfile]],
+                                    Optional[Dict[str, Any]]],
+                 cloud: Optional[Callable[[], Any]] = None, verify: bool = True,
+                 min_logprob: Optional[float] = None,
+                 clock: Callable[[], float] = time.perf_counter):
+        """
+        Args:
+            tiers: Models in escalation order
+            generate: (model, prompt, deadline, profile) -> Ollama /api/generate JSON body, or None
+            cloud: Factory for the cloud tier's AIRouterSkill, built on first use
+            verify: Ask the first tier's model to vet answers before accepting them
+            min_logprob: Escalate when the mean token log-probability is below this
+        """
+        names = [t.name for t in tiers]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate tier names in {names}")
+        self.tiers = tiers
+        self.generate = generate
+        self.cloud_factory = cloud
+        self.verify = verify
+        self.min_logprob = min_logprob
+        self.clock = clock
+        self._cloud = None
+        self._lock = threading.Lock()
+        self._tier_stats = {t.name: {"attempts": 0, "accepted": 0, "failed": 0, "latency": 0.0,
+                                     "escalated": Counter()} for t in tiers}
+        # Per accepting tier: whole-path latency, spend and tokens of accepted answers
+        self._paths = {t.name: {"latency": 0.0, "cost": 0.0, "tokens": 0} for t in tiers}
+        self._answers = 0
+
+    @classmethod
+    def from_env(cls, generate, default_model: str, cloud=None) -> "ModelCascade":
+        """Build from LLM_CASCADE, LLM_CASCADE_VERIFY and LLM_CASCADE_MIN_LOGPROB"""
+        env = os.environ
+        min_logprob = env.get("LLM_CASCADE_MIN_LOGPROB")
+        return cls(
+            parse_tiers(env.get("LLM_CASCADE", ""), default_model),
+            generate,
+            cloud=cloud,
+            verify=env.get("LLM_CASCADE_VERIFY", "1") not in ("0", "false", "no"),
+            min_logprob=float(min_logprob) if min_logprob else None,
+        )
+
+    @property
+    def wants_logprobs(self) -> bool:
+        return self.min_logprob is not None
+
+    def _call(self, tier: Tier, query: str, context: Optional[Dict[str, Any]],
+              deadline: Optional[Deadline]) -> Optional[Attempt]:
+        profiler.tag(provider=tier.name)
+        if tier.model == CLOUD:
+            if self._cloud is None and self.cloud_factory is not None:
+                self._cloud = self.cloud_factory()
+            if self._cloud is None:
+                return None
+            from skills.ai_router_skill import ALL_MODELS_FAILED_REPLY
+            text = self._cloud.route_query(query, context or {}, deadline)
+            if not text or text == ALL_MODELS_FAILED_REPLY:
+                return None
+            return Attempt(text, estimate_tokens(query) + estimate_tokens(text), {})
+        body = self.generate(tier.model, query, deadline, (context or {}).get("profile"))
+        if body is None:
+            return None
+        text = body.get("response", "")
+        tokens = (body.get("prompt_eval_count") or estimate_tokens(query)) + \
+            (body.get("eval_count") or estimate_tokens(text))
+        return Attempt(text, tokens, body)
+
+    def _verified(self, query: str, answer: str, deadline: Optional[Deadline]) -> bool:
+        """One-word verdict from the first tier's model; unsure counts as YES"""
+        prompt = VERIFIER_PROMPT.format(question=query, answer=answer)
+        with stream_to(None):  # the verdict is not part of the reply
+            body = self.generate(self.tiers[0].model, prompt, deadline, PROFILES["verdict"])
+        verdict = (body or {}).get("response", "").strip().lower()
+        return not verdict.startswith("no")
+
+    def answer(self, query: str, context: Optional[Dict[str, Any]] = None,
+               deadline: Optional[Deadline] = None) -> Optional[str]:
+        """First answer that passes the checks, escalating tier by tier"""
+        start = self.clock()
+        spent = 0.0
+        fallback: Optional[str] = None  # best rejected answer, used if no later tier answers
+        for position, tier in enumerate(self.tiers):
+            if timeout_for(deadline, 30) < MIN_USEFUL_TIMEOUT:
+                break
+            last = position == len(self.tiers) - 1
+            called = self.clock()
+            attempt = self._call(tier, query, context, deadline)
+            elapsed = self.clock() - called
+            if attempt is not None:
+                spent += attempt.tokens / 1000 * tier.cost_per_1k
+            reason = None
+            if attempt is None:
+                reason = "failed"
+            elif not last:
+                reason = check_answer(attempt.text, attempt.meta, self.min_logprob)
+                if reason is None and self.verify and not self._verified(query, attempt.text, deadline):
+                    reason = "verifier"
+            elif not attempt.text.strip():
+                reason = "empty"
+            with self._lock:
+                stats = self._tier_stats[tier.name]
+                stats["attempts"] += 1
+                stats["latency"] += elapsed
+                if reason is None:
+                    stats["accepted"] += 1
+                    path = self._paths[tier.name]
+                    path["latency"] += self.clock() - start
+                    path["cost"] += spent
+                    path["tokens"] += attempt.tokens
+                    self._answers += 1
+                elif reason == "failed":
+                    stats["failed"] += 1
+                else:
+                    stats["escalated"][reason] += 1
+            if reason is None:
+                self._note_tier(context, tier)
+                return attempt.text
+            if attempt is not None and reason not in HARD_FAILURES:
+                fallback = attempt.text
+                self._note_tier(context, tier, reason)
+        return fallback
+
+    @staticmethod
+    def _note_tier(context: Optional[Dict[str, Any]], tier: Tier, rejected: Optional[str] = None):
+        """Tell the caller which tier the returned answer came from (for its event log),
+        and under "rejected" why the checks turned it down when it is only the fallback"""
+        if context is not None:
+            context["tier"] = tier.name
+            if rejected:
+                context["rejected"] = rejected
+            else:
+                context.pop("rejected", None)
+            if tier.model != CLOUD:
+                context.pop("answered_by", None)  # set by a cloud attempt that was not kept
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-tier counters plus latency and cost saved against always using the last tier"""
+        with self._lock:
+            tiers = {name: dict(s, escalated=dict(s["escalated"])) for name, s in self._tier_stats.items()}
+            paths = {name: dict(p) for name, p in self._paths.items()}
+            answers = self._answers
+        top = self.tiers[-1]
+        top_stats = tiers[top.name]
+        top_latency = top_stats["latency"] / top_stats["attempts"] if top_stats["attempts"] else None
+        rows = []
+        for tier in self.tiers:
+            s, path = tiers[tier.name], paths[tier.name]
+            accepted = s["accepted"]
+            row = {
+                "name": tier.name,
+                "cost_per_1k": tier.cost_per_1k,
+                "attempts": s["attempts"],
+                "accepted": accepted,
+                "failed": s["failed"],
+                "escalated": s["escalated"],
+                "mean_latency_ms": round(s["latency"] / s["attempts"] * 1000, 1) if s["attempts"] else None,
+                "latency_saved_ms": None,
+                "cost_saved": round(path["tokens"] / 1000 * top.cost_per_1k - path["cost"], 6),
+            }
+            if top_latency is not None and accepted:
+                row["latency_saved_ms"] = round((top_latency * accepted - path["latency"]) * 1000, 1)
+            rows.append(row)
+        first = tiers[self.tiers[0].name]
+        return {
+            "tiers": rows,
+            "answers": answers,
+            "escalation_rate": round(1 - first["accepted"] / first["attempts"], 3) if first["attempts"] else 0.0,
+            "verify": self.verify,
+        }
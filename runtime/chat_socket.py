@@ -0,0 +1,196 @@
+"""WebSocket chat channel
+
+/chat costs a full HTTP request per message: headers, CORS, a JSON body.
+/ws/chat keeps one connection per chat window instead, bound to one session
+(?session_id=..., or one the server picks), so the session history stays on
+the server and each message is a small JSON frame.
+
+Client -> server:
+    {"type": "message", "id": 7, "message": "...", "channel": "chat", "stream": true}
+    {"type": "ping"}
+Server -> client:
+    {"type": "ready", "session_id": "...", "max_pending": 8}
+    {"type": "token", "id": 7, "text": "...", "restart": false}   (stream: true, LLM replies)
+    {"type": "reply", "id": 7, "reply": "...", "source": "llm", "degraded": false}
+    {"type": "error", "id": 7, "error": "Busy", "message": "...", "retry_after": 1}
+    {"type": "pong"}
+
+Messages may be pipelined: they are answered in order by one thread per
+connection while the connection keeps reading. Up to WS_MAX_PENDING wait;
+more are refused with a "Busy" error rather than buffered, and a client that
+stops reading eventually blocks its own answers, not the worker. Tokens are
+provisional (a token frame with restart: true starts the text over); the
+reply frame is the answer. Protocol pings every WS_PING_INTERVAL seconds
+drop dead connections, and one idle for WS_IDLE_TIMEOUT is closed. Each
+connection holds a worker thread, so at most WS_MAX_CONNECTIONS per worker
+are accepted; the page falls back to /chat when refused.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from runtime.output_profile import StreamSink
+
+logger = logging.getLogger(__name__)
+
+# answer(frame, sink) -> the reply or error frame for one message frame; sink is
+# None unless the client asked for tokens
+Answer = Callable[[Dict[str, Any], Optional[StreamSink]], Dict[str, Any]]
+
+CLOSE_GOING_AWAY = 1001
+
+
+def _daemon_thread(target) -> threading.Thread:
+    # simple-websocket's reader thread; an open connection must not keep a worker from exiting
+    return threading.Thread(target=target, daemon=True)
+
+
+class ChatSockets:
+    """
+    Connection limits and counters for one worker's WebSocket chat sessions.
+    """
+
+    def __init__(self, max_connections: int = 16, max_pending: int = 8, ping_interval: float = 25.0,
+                 idle_timeout: float = 600.0, max_message_bytes: int = 16384):
+        """
+        Args:
+            max_connections: Open connections per worker; more get 503 before the upgrade
+            max_pending: Messages a connection may have waiting for an answer
+            ping_interval: Seconds between protocol pings (0 disables them)
+            idle_timeout: Seconds without a client frame before the server closes
+            max_message_bytes: Larger frames close the connection
+        """
+        self.max_connections = max_connections
+        self.max_pending = max_pending
+        self.ping_interval = ping_interval
+        self.idle_timeout = idle_timeout
+        self.max_message_bytes = max_message_bytes
+        self._lock = threading.Lock()
+        self._open = 0
+        self._counts = {"connections": 0, "refused": 0, "messages": 0, "busy": 0, "errors": 0, "idle_closed": 0}
+
+    @classmethod
+    def from_env(cls) -> "ChatSockets":
+        """Build from WS_MAX_CONNECTIONS (default half of GUNICORN_THREADS, so HTTP keeps
+        threads), WS_MAX_PENDING, WS_PING_INTERVAL, WS_IDLE_TIMEOUT and WS_MAX_MESSAGE_KB"""
+        env = os.environ
+        threads = int(env.get("GUNICORN_THREADS", 1))
+        return cls(
+            max_connections=int(env.get("WS_MAX_CONNECTIONS") or max(1, threads // 2)),
+            max_pending=int(env.get("WS_MAX_PENDING", 8)),
+            ping_interval=float(env.get("WS_PING_INTERVAL", 25)),
+            idle_timeout=float(env.get("WS_IDLE_TIMEOUT", 600)),
+            max_message_bytes=int(float(env.get("WS_MAX_MESSAGE_KB", 16)) * 1024),
+        )
+
+    def server_options(self) -> Dict[str, Any]:
+        """simple-websocket Server options (flask-sock's SOCK_SERVER_OPTIONS)"""
+        return {"ping_interval": self.ping_interval or None, "max_message_size": self.max_message_bytes,
+                "thread_class": _daemon_thread}
+
+    def reserve(self) -> bool:
+        """Take a connection slot; False when the worker is full"""
+        with self._lock:
+            if self._open >= self.max_connections:
+                self._counts["refused"] += 1
+                return False
+            self._open += 1
+            self._counts["connections"] += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._open = max(0, self._open - 1)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def serve(self, ws, answer: Answer, session_id: Optional[str] = None):
+        """Run one connection until the client goes away or idles out"""
+        session_id = session_id or uuid.uuid4().hex
+        send_lock = threading.Lock()
+        pending: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(self.max_pending)
+        closed = threading.Event()
+
+        def send(frame: Dict[str, Any]):
+            with send_lock:
+                ws.send(json.dumps(frame))
+
+        def work():
+            while not closed.is_set():
+                frame = pending.get()
+                if frame is None:
+                    return
+                frame_id = frame.get("id")
+                sink = None
+                if frame.get("stream"):
+                    def sink(text: str, restart: bool):
+                        send({"type": "token", "id": frame_id, "text": text, "restart": restart})
+                try:
+                    result = answer(frame, sink)
+                except Exception:
+                    logger.exception("WebSocket chat message failed")
+                    result = {"type": "error", "error": "Server error",
+                              "message": "An unexpected error occurred. Please try again later."}
+                if result.get("type") == "error":
+                    self._count("errors")
+                try:
+                    send(dict(result, id=frame_id))
+                except Exception:
+                    return  # the connection is gone
+
+        worker = threading.Thread(target=work, name="ws-chat", daemon=True)
+        worker.start()
+        last_seen = time.monotonic()
+        try:
+            send({"type": "ready", "session_id": session_id, "max_pending": self.max_pending})
+            while True:
+                raw = ws.receive(timeout=max(0.05, self.idle_timeout - (time.monotonic() - last_seen)))
+                if raw is None:
+                    if time.monotonic() - last_seen >= self.idle_timeout:
+                        self._count("idle_closed")
+                        ws.close(CLOSE_GOING_AWAY, "idle")
+                        return
+                    continue
+                last_seen = time.monotonic()
+                try:
+                    frame = json.loads(raw, strict=False)
+                except ValueError:
+                    frame = None
+                if not isinstance(frame, dict):
+                    send({"type": "error", "error": "Invalid JSON", "message": "Send one JSON object per frame."})
+                    continue
+                kind = frame.get("type", "message")
+                if kind == "ping":
+                    send({"type": "pong"})
+                    continue
+                if kind != "message":
+                    send({"type": "error", "id": frame.get("id"), "error": "Unknown type",
+                          "message": "Frames are {\"type\": \"message\"} or {\"type\": \"ping\"}."})
+                    continue
+                frame["session_id"] = session_id
+                try:
+                    pending.put_nowait(frame)
+                    self._count("messages")
+                except queue.Full:
+                    self._count("busy")
+                    send({"type": "error", "id": frame.get("id"), "error": "Busy", "retry_after": 1,
+                          "message": f"At most {self.max_pending} messages may wait for an answer."})
+        finally:
+            closed.set()
+            try:
+                pending.put_nowait(None)
+            except queue.Full:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._counts, open=self._open, max_connections=self.max_connections,
+                        max_pending=self.max_pending)
@@ -0,0 +1,53 @@
+"""Request Deadlines for Agent Vish
+
+A Deadline is created once per /chat request and handed down through the
+agent, the routers and every provider call. Each layer asks it how long it
+may wait instead of using its own hard-coded timeout, so a chain of fallbacks
+can never take longer than the request's budget.
+"""
+
+import os
+import time
+from typing import Callable, Optional
+
+# Below this many seconds a provider call cannot usefully complete
+MIN_USEFUL_TIMEOUT = 0.05
+
+
+class Deadline:
+    """A point in time by which the reply must be ready"""
+
+    def __init__(self, budget: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            budget: Seconds from now until the deadline
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.budget = budget
+        self.clock = clock
+        self.expires_at = clock() + budget
+
+    @classmethod
+    def from_env(cls) -> "Deadline":
+        """Deadline of RESPONSE_TIMEOUT seconds (default 30) from now"""
+        return cls(float(os.environ.get("RESPONSE_TIMEOUT", 30)))
+
+    def remaining(self) -> float:
+        """Seconds left, never negative"""
+        return max(0.0, self.expires_at - self.clock())
+
+    def expired(self) -> bool:
+        return self.remaining() < MIN_USEFUL_TIMEOUT
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Timeout for the next blocking call: what is left, capped at `cap`"""
+        remaining = self.remaining()
+        return remaining if cap is None else min(cap, remaining)
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.3f}s of {self.budget}s)"
+
+
+def timeout_for(deadline: Optional[Deadline], default: float) -> float:
+    """Per-call timeout for code that may run with or without a deadline"""
+    return default if deadline is None else deadline.timeout(default)
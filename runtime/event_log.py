@@ -0,0 +1,431 @@
+"""Conversation event log for offline analysis
+
+One event per /chat reply: when, which intent, how it was answered (source
+and provider), how long it took, whether it came from the cache, and a hash
+of the message (never the text), so questions can be counted without being
+stored. record() appends a tuple to an in-memory buffer; a background thread
+drains it every EVENT_LOG_FLUSH_SECONDS into column buffers and writes a
+segment once EVENT_LOG_SEGMENT_EVENTS events or EVENT_LOG_SEGMENT_SECONDS
+have accumulated. A full buffer (EVENT_LOG_BUFFER) drops events rather than
+slowing requests.
+
+A segment is a compressed .npz file in EVENT_LOG_DIR with one array per
+column (text columns dictionary-encoded) and a small "stats" member: row
+count, min/max of every numeric column and each text column's dictionary.
+Every worker writes its own segments; the oldest are removed past
+EVENT_LOG_MAX_MB. EVENT_LOG=off disables the log.
+
+scan() reads them back with column projection and predicate pushdown:
+segments whose stats rule a predicate out are never opened, and within a
+segment only the predicate columns are read before the mask is known.
+
+    python -m runtime.event_log --where intent=fallback --group-by provider
+    python -m runtime.event_log --where "latency_ms>2000" --since 24h --group-by intent
+"""
+
+import argparse
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Column name -> dtype; "text" columns are stored as codes into a per-segment dictionary
+COLUMNS: Dict[str, str] = {
+    "ts": "float64",
+    "intent": "text",
+    "source": "text",
+    "provider": "text",
+    "channel": "text",
+    "latency_ms": "float32",
+    "cache_hit": "bool",
+    "degraded": "bool",
+    "message_hash": "uint64",
+    "message_chars": "uint32",
+}
+FIELDS = tuple(COLUMNS)
+
+OPERATORS = ("==", "!=", ">=", "<=", ">", "<", "in")
+_WHERE = re.compile(r"^\s*(\w+)\s*(==|!=|>=|<=|=|>|<)\s*(.*?)\s*$")
+
+
+def message_hash(text: str) -> int:
+    """Stable 64-bit hash of a normalised message"""
+    return int.from_bytes(hashlib.blake2b(text.strip().lower().encode(), digest_size=8).digest(), "little")
+
+
+def default_dir() -> str:
+    return os.environ.get("EVENT_LOG_DIR") or os.path.join(tempfile.gettempdir(), "agent_vish_events")
+
+
+class EventLog:
+    """
+    Buffers events from request threads and writes them as columnar segments on a background thread.
+    """
+
+    def __init__(self, directory: Optional[str] = None, segment_events: int = 50000,
+                 segment_seconds: float = 300.0, flush_seconds: float = 0.5, buffer_size: int = 100000,
+                 max_mb: float = 512.0):
+        self.directory = directory or default_dir()
+        self.segment_events = segment_events
+        self.segment_seconds = segment_seconds
+        self.flush_seconds = flush_seconds
+        self.buffer_size = buffer_size
+        self.max_mb = max_mb
+        self._buffer: Deque[Tuple] = deque()
+        self._columns: Dict[str, list] = {name: [] for name in FIELDS}
+        self._segment_started = 0.0
+        self._sequence = 0
+        self._lock = threading.Lock()  # held by whoever is turning buffered events into a segment
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._counts = {"recorded": 0, "dropped": 0, "written": 0, "segments": 0, "write_errors": 0}
+        self._counts_lock = threading.Lock()  # request threads count without waiting on a flush
+
+    @classmethod
+    def from_env(cls) -> Optional["EventLog"]:
+        """Build from EVENT_LOG_DIR, EVENT_LOG_SEGMENT_EVENTS, EVENT_LOG_SEGMENT_SECONDS,
+        EVENT_LOG_FLUSH_SECONDS, EVENT_LOG_BUFFER and EVENT_LOG_MAX_MB; None when EVENT_LOG=off"""
+        env = os.environ
+        if env.get("EVENT_LOG", "").lower() in ("0", "off", "false"):
+            return None
+        return cls(
+            directory=env.get("EVENT_LOG_DIR"),
+            segment_events=int(env.get("EVENT_LOG_SEGMENT_EVENTS", 50000)),
+            segment_seconds=float(env.get("EVENT_LOG_SEGMENT_SECONDS", 300)),
+            flush_seconds=float(env.get("EVENT_LOG_FLUSH_SECONDS", 0.5)),
+            buffer_size=int(env.get("EVENT_LOG_BUFFER", 100000)),
+            max_mb=float(env.get("EVENT_LOG_MAX_MB", 512)),
+        )
+
+    def record(self, intent: str, source: str, provider: str, channel: str, latency_ms: float,
+               cache_hit: bool, degraded: bool, message: str, ts: Optional[float] = None):
+        """Queue one event; called on the request thread, so it only appends a tuple"""
+        if len(self._buffer) >= self.buffer_size:
+            with self._counts_lock:
+                self._counts["dropped"] += 1
+            return
+        self._buffer.append((ts or time.time(), intent, source, provider, channel, latency_ms, cache_hit,
+                             degraded, message_hash(message), len(message)))
+        with self._counts_lock:
+            self._counts["recorded"] += 1
+        if self._thread is None:
+            self.start()
+
+    def start(self) -> "EventLog":
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+                self._thread.start()
+        return self
+
+    def restart_after_fork(self):
+        # The writer thread does not survive fork; the child starts its own on its first event
+        self._thread = None
+        self._lock = threading.Lock()
+        self._counts_lock = threading.Lock()
+        self._buffer.clear()
+        self._columns = {name: [] for name in FIELDS}
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            self.flush(force=False)
+        self.flush(force=True)
+
+    def stop(self):
+        """Write everything buffered and stop the writer thread"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=10)
+        self._thread = None
+        self.flush(force=True)
+
+    def flush(self, force: bool = True):
+        """Move buffered events into the open segment; write it when it is full, old, or force is set"""
+        with self._lock:
+            buffer = self._buffer
+            while buffer:
+                columns = self._columns
+                if not columns["ts"]:
+                    self._segment_started = time.monotonic()
+                for name, value in zip(FIELDS, buffer.popleft()):
+                    columns[name].append(value)
+                if len(columns["ts"]) >= self.segment_events:
+                    self._rotate()
+            rows = len(self._columns["ts"])
+            if rows and (force or time.monotonic() - self._segment_started >= self.segment_seconds):
+                self._rotate()
+
+    def _rotate(self):
+        columns, self._columns = self._columns, {name: [] for name in FIELDS}
+        try:
+            self._write(columns)
+        except OSError:
+            with self._counts_lock:
+                self._counts["write_errors"] += 1
+            logger.exception("Could not write an event log segment to %s", self.directory)
+
+    def _write(self, columns: Dict[str, list]):
+        arrays, stats = encode_columns(columns)
+        os.makedirs(self.directory, exist_ok=True)
+        self._sequence += 1
+        name = f"events-{int(stats['ts']['min'] * 1000)}-{os.getpid()}-{self._sequence}"
+        tmp = os.path.join(self.directory, f".{name}.tmp.npz")
+        np.savez_compressed(tmp, stats=np.array(json.dumps(stats)), **arrays)
+        os.replace(tmp, os.path.join(self.directory, f"{name}.npz"))
+        with self._counts_lock:
+            self._counts["written"] += stats["rows"]
+            self._counts["segments"] += 1
+        self._prune()
+
+    def _prune(self):
+        paths = segment_paths(self.directory)
+        sizes = [os.path.getsize(path) for path in paths]
+        total, limit = sum(sizes), self.max_mb * 1024 * 1024
+        for path, size in zip(paths, sizes):
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._counts_lock:
+            counts = dict(self._counts)
+        return dict(counts, buffered=len(self._buffer), directory=self.directory)
+
+
+def encode_columns(columns: Dict[str, list]) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Column lists -> arrays (text as codes) plus the stats used for pruning"""
+    arrays: Dict[str, np.ndarray] = {}
+    stats: Dict[str, Any] = {"rows": len(columns["ts"])}
+    for name, kind in COLUMNS.items():
+        values = columns[name]
+        if kind == "text":
+            dictionary = sorted(set(values))
+            index = {value: code for code, value in enumerate(dictionary)}
+            arrays[name] = np.array([index[value] for value in values], dtype=np.uint32)
+            stats[name] = {"dictionary": dictionary}
+        else:
+            array = np.array(values, dtype=kind)
+            arrays[name] = array
+            if kind != "bool" and len(array):
+                stats[name] = {"min": array.min().item(), "max": array.max().item()}
+    return arrays, stats
+
+
+def segment_paths(directory: str) -> List[str]:
+    """Segments oldest first (by the first event's time in the name)"""
+    if not os.path.isdir(directory):
+        return []
+    names = [name for name in os.listdir(directory) if name.startswith("events-") and name.endswith(".npz")]
+    names.sort(key=lambda name: int(name.split("-")[1]))
+    return [os.path.join(directory, name) for name in names]
+
+
+# -- querying ---------------------------------------------------------------
+
+Predicate = Tuple[str, str, Any]
+
+
+def parse_where(expression: str) -> Predicate:
+    """'intent=fallback', 'latency_ms>2000' or 'provider!=' -> (column, operator, value)"""
+    match = _WHERE.match(expression)
+    if not match or match.group(1) not in COLUMNS:
+        raise ValueError(f"Invalid predicate {expression!r}; expected <column><op><value> with a column "
+                         f"from {', '.join(FIELDS)}")
+    column, op, raw = match.groups()
+    op = "==" if op == "=" else op
+    kind = COLUMNS[column]
+    if kind == "text":
+        if op not in ("==", "!="):
+            raise ValueError(f"{column} only supports = and !=")
+        values = raw.split(",")
+        return (column, "in", values) if op == "==" and len(values) > 1 else (column, op, raw)
+    if kind == "bool":
+        return column, op, raw.lower() in ("1", "true", "yes")
+    return column, op, float(raw)
+
+
+def _compare(values: np.ndarray, op: str, value: Any) -> np.ndarray:
+    if op == "in":
+        return np.isin(values, value)
+    return {"==": np.equal, "!=": np.not_equal, ">": np.greater, ">=": np.greater_equal,
+            "<": np.less, "<=": np.less_equal}[op](values, value)
+
+
+def _segment_may_match(stats: Dict[str, Any], predicates: Sequence[Predicate]) -> bool:
+    """False when the segment's stats prove no row can satisfy every predicate"""
+    for column, op, value in predicates:
+        info = stats.get(column)
+        if info is None:
+            if COLUMNS[column] != "bool":
+                return False  # an empty numeric column
+            continue
+        if "dictionary" in info:
+            dictionary = info["dictionary"]
+            if op == "==" and value not in dictionary:
+                return False
+            if op == "in" and not set(value) & set(dictionary):
+                return False
+            if op == "!=" and dictionary == [value]:
+                return False
+            continue
+        low, high = info["min"], info["max"]
+        if ((op == "==" and not low <= value <= high) or (op == ">" and high <= value)
+                or (op == ">=" and high < value) or (op == "<" and low >= value)
+                or (op == "<=" and low > value) or (op == "!=" and low == high == value)):
+            return False
+    return True
+
+
+def _decode(segment, column: str, stats: Dict[str, Any], rows: Optional[np.ndarray] = None) -> np.ndarray:
+    values = segment[column]
+    if rows is not None:
+        values = values[rows]
+    if COLUMNS[column] == "text":
+        dictionary = np.array(stats[column]["dictionary"] or [""], dtype=object)
+        return dictionary[values]
+    return values
+
+
+def _predicate_mask(segment, stats: Dict[str, Any], predicates: Sequence[Predicate]) -> np.ndarray:
+    mask = np.ones(stats["rows"], dtype=bool)
+    for column, op, value in predicates:
+        if COLUMNS[column] == "text":
+            # Compare codes, not strings: translate the value through this segment's dictionary
+            dictionary = stats[column]["dictionary"]
+            wanted = [dictionary.index(v) for v in (value if op == "in" else [value]) if v in dictionary]
+            hit = np.isin(segment[column], wanted)
+            mask &= ~hit if op == "!=" else hit
+        else:
+            mask &= _compare(segment[column], op, value)
+    return mask
+
+
+def scan(directory: Optional[str] = None, columns: Optional[Sequence[str]] = None,
+         where: Iterable[Predicate] = (), since: Optional[float] = None,
+         until: Optional[float] = None) -> Iterator[Dict[str, np.ndarray]]:
+    """Matching rows of each segment, one dict of column arrays per segment that has any.
+
+    Args:
+        directory: Segment folder (default EVENT_LOG_DIR)
+        columns: Columns to return (default all); only these and the predicate columns are read
+        where: (column, operator, value) predicates, all of which must hold
+        since, until: Time bounds (epoch seconds) on ts
+    """
+    columns = list(columns or FIELDS)
+    predicates = list(where)
+    if since is not None:
+        predicates.append(("ts", ">=", since))
+    if until is not None:
+        predicates.append(("ts", "<", until))
+    for column in columns + [p[0] for p in predicates]:
+        if column not in COLUMNS:
+            raise ValueError(f"Unknown column {column!r}")
+    for path in segment_paths(directory or default_dir()):
+        try:
+            segment = np.load(path, allow_pickle=False)
+        except (OSError, ValueError):
+            logger.warning("Skipping unreadable event segment %s", path)
+            continue
+        with segment:
+            stats = json.loads(str(segment["stats"]))
+            if not stats["rows"] or not _segment_may_match(stats, predicates):
+                continue
+            rows = None
+            if predicates:
+                mask = _predicate_mask(segment, stats, predicates)
+                if not mask.any():
+                    continue
+                rows = None if mask.all() else np.flatnonzero(mask)
+            yield {column: _decode(segment, column, stats, rows) for column in columns}
+
+
+def query(directory: Optional[str] = None, columns: Optional[Sequence[str]] = None,
+          where: Iterable[Predicate] = (), since: Optional[float] = None, until: Optional[float] = None):
+    """scan() concatenated into one pandas DataFrame"""
+    import pandas as pd
+
+    columns = list(columns or FIELDS)
+    parts = list(scan(directory, columns, where, since, until))
+    if not parts:
+        return pd.DataFrame({column: pd.Series(dtype=object if COLUMNS[column] == "text" else COLUMNS[column])
+                             for column in columns})
+    return pd.DataFrame({column: np.concatenate([part[column] for part in parts]) for column in columns})
+
+
+def _parse_age(value: str) -> float:
+    """'90m', '24h', '7d' or epoch seconds -> epoch seconds"""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value and value[-1] in units:
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m runtime.event_log", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", help="segment folder (default: EVENT_LOG_DIR)")
+    parser.add_argument("--where", action="append", default=[], help="column<op>value, repeatable")
+    parser.add_argument("--since", help="e.g. 24h, 7d or epoch seconds")
+    parser.add_argument("--until", help="e.g. 1h or epoch seconds")
+    parser.add_argument("--group-by", help="count events and mean/p95 latency per value of this column")
+    parser.add_argument("--columns", help="comma-separated columns to print (without --group-by)")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+    try:
+        where = [parse_where(expression) for expression in args.where]
+    except ValueError as e:
+        parser.error(str(e))
+    since = _parse_age(args.since) if args.since else None
+    until = _parse_age(args.until) if args.until else None
+
+    if args.group_by:
+        frame = query(args.dir, [args.group_by, "latency_ms"], where, since, until)
+        if frame.empty:
+            print("no matching events")
+            return 0
+        grouped = frame.groupby(args.group_by)["latency_ms"]
+        summary = grouped.agg(events="size", mean_ms="mean", p95_ms=lambda s: s.quantile(0.95))
+        print(summary.sort_values("events", ascending=False).head(args.limit).round(1).to_string())
+        return 0
+    columns = args.columns.split(",") if args.columns else None
+    frame = query(args.dir, columns, where, since, until)
+    print(f"{len(frame)} matching events")
+    if not frame.empty:
+        print(frame.tail(args.limit).to_string(index=False))
+    return 0
+
+
+_installed: Optional[EventLog] = None
+
+
+def install() -> Optional[EventLog]:
+    """The process-wide event log (from the environment), flushed at exit and reset in forked children"""
+    global _installed
+    if _installed is None:
+        _installed = EventLog.from_env()
+        if _installed is not None:
+            os.register_at_fork(after_in_child=_installed.restart_after_fork)
+            atexit.register(_installed.stop)
+    return _installed
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""Pooled HTTP Clients for the providers
+
+One client per base URL per process, kept for the life of the process so
+calls reuse warm connections instead of paying a TCP and TLS handshake
+each time:
+    - async_client(): for coroutines on the provider loop. Uses httpx, with
+      HTTP/2 when the h2 package is installed. Without httpx it falls back
+      to a requests session driven from a small bounded thread pool.
+    - sdk_http_client(): an HTTP/2 client to hand to the OpenAI SDK.
+    - session(): a requests.Session for sync callers (the Ollama scheduler's
+      workers and the residency pings).
+"""
+
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_CONNECTIONS = 20
+
+_lock = threading.Lock()
+_async_clients: Dict[Tuple[int, str], "AsyncHTTPClient"] = {}
+_sessions: Dict[Tuple[int, str], Any] = {}
+
+
+def _load_httpx():
+    """httpx module, or None when it is not installed"""
+    try:
+        import httpx
+        return httpx
+    except ImportError:
+        return None
+
+
+def _requests_session(pool_size: int):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class AsyncHTTPClient:
+    """JSON POSTs and line streams over one pooled client"""
+
+    def __init__(self, base_url: str, max_connections: int = MAX_CONNECTIONS):
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        httpx = _load_httpx()
+        self.http2 = httpx is not None and importlib.util.find_spec("h2") is not None
+        if httpx is not None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, http2=self.http2,
+                limits=httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_connections))
+            self._session = self._executor = None
+        else:
+            self._client = None
+            self._session = _requests_session(max_connections)
+            self._executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="http-pool")
+
+    @property
+    def transport(self) -> str:
+        if self._client is None:
+            return "requests"
+        return "httpx-h2" if self.http2 else "httpx"
+
+    async def post_json(self, path: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None,
+                        timeout: float = 30.0) -> Tuple[int, Any]:
+        """POST payload as JSON; returns (status, decoded body or None)"""
+        if self._client is not None:
+            response = await self._client.post(path, json=payload, headers=headers, timeout=timeout)
+            status, text = response.status_code, response.text
+        else:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(self._executor, lambda: self._session.post(
+                self.base_url + path, json=payload, headers=headers, timeout=timeout))
+            status, text = response.status_code, response.text
+        try:
+            return status, json.loads(text) if text else None
+        except ValueError:
+            return status, None
+
+    async def stream_lines(self, path: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None,
+                           timeout: float = 30.0) -> AsyncIterator[str]:
+        """POST and yield the response body line by line as it arrives.
+
+        Raises RuntimeError on a non-200 status. Stopping iteration early (or
+        cancelling the task) closes the response.
+        """
+        if self._client is not None:
+            async with self._client.stream("POST", path, json=payload, headers=headers,
+                                           timeout=timeout) as response:
+                if response.status_code != 200:
+                    raise RuntimeError(f"HTTP {response.status_code} from {self.base_url}{path}")
+                async for line in response.aiter_lines():
+                    if line:
+                        yield line
+            return
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(self._executor, lambda: self._session.post(
+            self.base_url + path, json=payload, headers=headers, timeout=timeout, stream=True))
+        try:
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code} from {self.base_url}{path}")
+            lines = response.iter_lines(decode_unicode=True)
+            while True:
+                line = await loop.run_in_executor(self._executor, next, lines, None)
+                if line is None:
+                    break
+                if line:
+                    yield line
+        finally:
+            response.close()
+
+
+def sdk_http_client():
+    """An HTTP/2 httpx.AsyncClient for SDKs that accept one, or None to keep
+    the SDK's own pool (httpx or h2 not installed)"""
+    httpx = _load_httpx()
+    if httpx is None or importlib.util.find_spec("h2") is None:
+        return None
+    return httpx.AsyncClient(http2=True, limits=httpx.Limits(
+        max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS))
+
+
+def async_client(base_url: str) -> AsyncHTTPClient:
+    """This process's pooled async client for base_url"""
+    key = (os.getpid(), base_url.rstrip("/"))
+    with _lock:
+        client = _async_clients.get(key)
+        if client is None:
+            client = _async_clients[key] = AsyncHTTPClient(base_url)
+            logger.info("HTTP pool for %s (%s)", key[1], client.transport)
+        return client
+
+
+def session(base_url: str):
+    """This process's pooled requests.Session for base_url"""
+    key = (os.getpid(), base_url.rstrip("/"))
+    with _lock:
+        pooled = _sessions.get(key)
+        if pooled is None:
+            pooled = _sessions[key] = _requests_session(MAX_CONNECTIONS)
+        return pooled
@@ -0,0 +1,479 @@
+"""Background jobs for work too heavy for a request
+
+report_skill over a large upload can take minutes, far past the request
+timeout, and would hold a gunicorn worker the whole time. Instead /jobs/report
+submits a job and returns its id; a JobRunner in its own process picks jobs up
+and runs each in a child process, and the result is stored for polling
+(GET /jobs/<id>) or pushed over server-sent events (GET /jobs/<id>/events).
+
+    JobStore   jobs in a SQLite file (WAL) shared by the web workers and the
+               runner; claiming is one IMMEDIATE transaction, so any number of
+               runners can share a queue
+    Lane       priority lane with default limits: "interactive" (someone is
+               waiting, claimed first) and "bulk"
+    JobRunner  fills up to JOBS_WORKERS slots, always keeping one free for the
+               interactive lane. Children run niced so /chat keeps its CPU, and
+               are killed when they pass their RSS or time limit or the job is
+               cancelled
+
+gunicorn.conf.py starts `python -m runtime.jobs` next to the web workers
+unless JOBS_RUNNER=off (e.g. when a separate worker service runs it).
+"""
+
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import os
+import signal
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from runtime.memory_watch import rss_mb as _rss_mb
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB = os.path.join(tempfile.gettempdir(), "agent_vish_jobs.sqlite3")
+TERMINAL = ("done", "failed", "cancelled")
+MAX_ATTEMPTS = 2  # a job whose runner died is retried once
+
+
+class Lane(NamedTuple):
+    name: str
+    priority: int  # lower is claimed first
+    memory_mb: int  # default RSS limit per job
+    seconds: float  # default wall-clock limit per job
+
+
+LANES: Dict[str, Lane] = {
+    "interactive": Lane("interactive", 0, 1024, 120.0),
+    "bulk": Lane("bulk", 1, 2048, 900.0),
+}
+DEFAULT_LANE = "interactive"
+
+
+def lane_for(name: Optional[str]) -> Lane:
+    lane = LANES.get((name or DEFAULT_LANE).strip().lower())
+    if lane is None:
+        raise ValueError(f"Unknown lane {name!r}; expected one of {', '.join(LANES)}")
+    return lane
+
+
+def jsonable(value: Any) -> Any:
+    """value with numpy scalars unwrapped and NaN/inf as None, so it survives json.dumps and the browser"""
+    if isinstance(value, dict):
+        return {str(k): jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [jsonable(v) for v in value]
+    if hasattr(value, "item") and callable(value.item) and not isinstance(value, (str, bytes)):
+        try:
+            value = value.item()
+        except (TypeError, ValueError):
+            return str(value)
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+class JobStore:
+    """
+    Jobs and their results in a SQLite file every process on the host opens.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            lane TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            memory_mb INTEGER NOT NULL,
+            seconds REAL NOT NULL,
+            created REAL NOT NULL,
+            started REAL,
+            finished REAL,
+            runner INTEGER,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            cancel INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority, created);
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get("JOBS_DB") or DEFAULT_DB
+        self._local = threading.local()
+        self._connect().executescript(self._SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            value = fn(conn)
+            conn.execute("COMMIT")
+            return value
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _row(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        job["cancel"] = bool(job["cancel"])
+        return job
+
+    def submit(self, kind: str, payload: Dict[str, Any], lane: Optional[str] = None,
+               memory_mb: Optional[int] = None, seconds: Optional[float] = None) -> str:
+        """
+        Queue a job; returns its id. Limits default to the lane's.
+        """
+        lane_info = lane_for(lane)
+        job_id = uuid.uuid4().hex
+        self._transaction(lambda conn: conn.execute(
+            "INSERT INTO jobs (id, kind, lane, priority, status, payload, memory_mb, seconds, created) "
+            "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?)",
+            (job_id, kind, lane_info.name, lane_info.priority, json.dumps(payload),
+             memory_mb or lane_info.memory_mb, seconds or lane_info.seconds, time.time())))
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._row(self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def claim(self, lanes: Iterable[str], runner: int) -> Optional[Dict[str, Any]]:
+        """
+        Mark the highest-priority, oldest queued job in lanes as running and return it.
+        """
+        lanes = list(lanes)
+        if not lanes:
+            return None
+
+        def take(conn):
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE status = 'queued' AND lane IN ({','.join('?' * len(lanes))}) "
+                "ORDER BY priority, created LIMIT 1", lanes).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = 'running', started = ?, runner = ?, attempts = attempts + 1 "
+                         "WHERE id = ?", (time.time(), runner, row["id"]))
+            return row["id"]
+
+        job_id = self._transaction(take)
+        return self.get(job_id) if job_id else None
+
+    def finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> bool:
+        """
+        Record a running job's outcome; False if it was no longer running.
+        """
+        cursor = self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ? WHERE id = ? AND status = 'running'",
+            (status, json.dumps(jsonable(result)) if result is not None else None, error, time.time(), job_id)))
+        return cursor.rowcount == 1
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """
+        Cancel a job: queued jobs at once, running ones once the runner sees the flag. Returns the status.
+        """
+        def mark(conn):
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row["status"] == "queued":
+                conn.execute("UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ?", (time.time(), job_id))
+                return "cancelled"
+            if row["status"] == "running":
+                conn.execute("UPDATE jobs SET cancel = 1 WHERE id = ?", (job_id,))
+            return row["status"]
+        return self._transaction(mark)
+
+    def cancelled(self, job_ids: List[str]) -> List[str]:
+        """
+        The job_ids that have a cancellation request.
+        """
+        if not job_ids:
+            return []
+        rows = self._connect().execute(
+            f"SELECT id FROM jobs WHERE cancel = 1 AND id IN ({','.join('?' * len(job_ids))})", job_ids).fetchall()
+        return [row["id"] for row in rows]
+
+    def recover(self, alive: Callable[[int], bool]) -> int:
+        """
+        Requeue (or fail, after MAX_ATTEMPTS) running jobs whose runner process is gone.
+        """
+        def sweep(conn):
+            rows = conn.execute("SELECT id, runner, attempts FROM jobs WHERE status = 'running'").fetchall()
+            orphans = [row for row in rows if not alive(row["runner"])]
+            for row in orphans:
+                if row["attempts"] >= MAX_ATTEMPTS:
+                    conn.execute("UPDATE jobs SET status = 'failed', error = 'runner exited', finished = ? "
+                                 "WHERE id = ?", (time.time(), row["id"]))
+                else:
+                    conn.execute("UPDATE jobs SET status = 'queued', runner = NULL, started = NULL "
+                                 "WHERE id = ?", (row["id"],))
+            return len(orphans)
+        return self._transaction(sweep)
+
+    def prune(self, older_than: float) -> int:
+        """
+        Delete finished jobs older than older_than seconds.
+        """
+        cutoff = time.time() - older_than
+        return self._transaction(lambda conn: conn.execute(
+            f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(TERMINAL))}) AND finished < ?",
+            (*TERMINAL, cutoff))).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        lanes: Dict[str, Dict[str, int]] = {name: {} for name in LANES}
+        for row in conn.execute("SELECT lane, status, COUNT(*) AS n FROM jobs GROUP BY lane, status"):
+            lanes.setdefault(row["lane"], {})[row["status"]] = row["n"]
+        oldest = conn.execute("SELECT MIN(created) FROM jobs WHERE status = 'queued'").fetchone()[0]
+        durations = conn.execute(
+            "SELECT lane, AVG(finished - started) AS mean FROM jobs WHERE status = 'done' GROUP BY lane").fetchall()
+        return {
+            "lanes": lanes,
+            "oldest_queued_s": round(time.time() - oldest, 1) if oldest else None,
+            "mean_run_s": {row["lane"]: round(row["mean"], 2) for row in durations},
+            "limits": {name: {"memory_mb": lane.memory_mb, "seconds": lane.seconds} for name, lane in LANES.items()},
+        }
+
+
+# Job kinds -> handler(payload) returning a JSON-able result; run in the child process
+
+def load_frame(path: str):
+    """A DataFrame from an uploaded CSV, TSV, Excel, JSON or Parquet file"""
+    import pandas as pd
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xls"):
+        return pd.read_excel(path)
+    if ext == ".tsv":
+        return pd.read_csv(path, sep="\t")
+    if ext == ".json":
+        return pd.read_json(path)
+    if ext == ".jsonl":
+        return pd.read_json(path, lines=True)
+    if ext == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def run_report(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """report_skill over payload["path"] (an upload) or payload["sheet"] (a synced Google Sheet)"""
+    from skills.core_skills import report_skill
+
+    if "sheet" in payload:
+        # Through the sync, which keeps the report with the copy for /chat to pick up
+        from skills.sheets_sync import default_sync
+        sheet = payload["sheet"]
+        report = default_sync().report(sheet["spreadsheet_id"], sheet.get("sheet", "Sheet1"))
+        if report is None:
+            raise ValueError("sheet could not be synced")
+    else:
+        report = report_skill(load_frame(payload["path"]))
+    if "error" in report["summary"]:
+        raise ValueError(report["summary"]["error"])
+    return report
+
+
+HANDLERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {"report": run_report}
+
+
+def _child(db_path: str, job: Dict[str, Any], handler: Callable[[Dict[str, Any]], Any], nice: int):
+    """Entry point of a job's process; handler is resolved by the runner and pickled by reference"""
+    if nice:
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+    store = JobStore(db_path)
+    try:
+        result = handler(job["payload"])
+        store.finish(job["id"], "done", result=result)
+    except MemoryError:
+        store.finish(job["id"], "failed", error=f"memory limit ({job['memory_mb']} MB)")
+    except Exception as e:
+        store.finish(job["id"], "failed", error=f"{type(e).__name__}: {e}")
+    finally:
+        JobRunner._cleanup(job)
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class _Running(NamedTuple):
+    job: Dict[str, Any]
+    process: Any
+    started: float
+
+
+class JobRunner:
+    """
+    Runs queued jobs in child processes within their lane's limits.
+    """
+
+    def __init__(self, store: Optional[JobStore] = None, workers: Optional[int] = None,
+                 poll_interval: float = 0.1, nice: Optional[int] = None, retention: float = 86400.0):
+        self.store = store or JobStore()
+        self.workers = max(1, workers or int(os.environ.get("JOBS_WORKERS", "0"))
+                           or max(1, (os.cpu_count() or 2) - 1))
+        # With more than one slot, bulk jobs never take the last one
+        self.bulk_slots = self.workers - 1 if self.workers > 1 else 1
+        self.poll_interval = poll_interval
+        self.nice = nice if nice is not None else int(os.environ.get("JOBS_NICE", "10"))
+        self.retention = retention
+        methods = multiprocessing.get_all_start_methods()
+        self._ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        if "forkserver" in methods:
+            # Imported once in the fork server, not in every job
+            self._ctx.set_forkserver_preload(["pandas", "skills.core_skills"])
+        self._running: Dict[str, _Running] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counts = {"started": 0, "done": 0, "failed": 0, "cancelled": 0, "killed_memory": 0,
+                        "killed_time": 0}
+        self._last_prune = 0.0
+
+    def start(self) -> "JobRunner":
+        self.store.recover(_pid_alive)
+        self._thread = threading.Thread(target=self._loop, name="job-runner", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        for running in list(self._running.values()):
+            self._kill(running, "cancelled", "runner stopped")
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("job runner tick failed")
+            self._stop.wait(self.poll_interval)
+
+    def tick(self):
+        """One pass: reap finished children, enforce limits and cancellations, start queued jobs"""
+        now = time.monotonic()
+        for job_id in self.store.cancelled(list(self._running)):
+            self._kill(self._running[job_id], "cancelled", "cancelled")
+        for running in list(self._running.values()):
+            job, process = running.job, running.process
+            if not process.is_alive():
+                process.join()
+                del self._running[job["id"]]
+                if self.store.finish(job["id"], "failed", error=f"job process exited with code {process.exitcode}"):
+                    self._counts["failed"] += 1
+                else:
+                    status = (self.store.get(job["id"]) or {}).get("status", "failed")
+                    self._counts[status] = self._counts.get(status, 0) + 1
+                self._cleanup(job)
+            elif now - running.started > job["seconds"]:
+                self._counts["killed_time"] += 1
+                self._kill(running, "failed", f"time limit ({job['seconds']:g} s)")
+            elif _rss_mb(process.pid) > job["memory_mb"]:
+                self._counts["killed_memory"] += 1
+                self._kill(running, "failed", f"memory limit ({job['memory_mb']} MB)")
+        while len(self._running) < self.workers:
+            bulk = sum(1 for r in self._running.values() if r.job["lane"] == "bulk")
+            lanes = [name for name in LANES if name != "bulk" or bulk < self.bulk_slots]
+            job = self.store.claim(lanes, os.getpid())
+            if job is None:
+                break
+            handler = HANDLERS.get(job["kind"])
+            if handler is None:
+                self.store.finish(job["id"], "failed", error=f"unknown job kind {job['kind']!r}")
+                self._counts["failed"] += 1
+                continue
+            process = self._ctx.Process(target=_child, args=(self.store.path, job, handler, self.nice),
+                                        name=f"job-{job['id'][:8]}", daemon=True)
+            process.start()
+            self._running[job["id"]] = _Running(job, process, time.monotonic())
+            self._counts["started"] += 1
+        if time.time() - self._last_prune > 600:
+            self._last_prune = time.time()
+            self.store.prune(self.retention)
+
+    def _kill(self, running: _Running, status: str, error: str):
+        running.process.kill()
+        running.process.join()
+        self._running.pop(running.job["id"], None)
+        if self.store.finish(running.job["id"], status, error=error):
+            self._counts[status] += 1
+        self._cleanup(running.job)
+
+    @staticmethod
+    def _cleanup(job: Dict[str, Any]):
+        """Remove a job's uploaded input once it has finished (by the child, or the runner if it was killed)"""
+        path = job["payload"].get("upload")
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "running": len(self._running), **self._counts}
+
+    def run_forever(self):
+        """Run until SIGTERM or SIGINT (the `python -m runtime.jobs` entry point)"""
+        signal.signal(signal.SIGTERM, lambda *_: self._stop.set())
+        self.start()
+        try:
+            while not self._stop.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            pass
+        self.stop()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m runtime.jobs", description="Run queued background jobs")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent jobs (default: JOBS_WORKERS or cores - 1)")
+    parser.add_argument("--db", default=None, help="Job database (default: JOBS_DB)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").split(",")[0])
+    runner = JobRunner(JobStore(args.db), workers=args.workers)
+    logger.info("job runner: %d workers on %s", runner.workers, runner.store.path)
+    runner.run_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
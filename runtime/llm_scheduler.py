@@ -0,0 +1,199 @@
+"""Generation Scheduler for the local LLM
+
+Ollama runs generations on the same CPU cores; a dozen concurrent requests
+each get a sliver of them plus the cost of thrashing caches, so every one of
+them finishes late. The scheduler sits in front of LocalLLMRouter and
+    - queues generation requests (bounded; callers past max_queue are shed),
+    - runs at most max_concurrent of them, the number the model server
+      handles efficiently (match OLLAMA_NUM_PARALLEL),
+    - waits batch_window after a request arrives so requests arriving
+      together are dispatched together, shortest prompt first, with ageing
+      so long prompts are not starved,
+    - coalesces identical (model, prompt) requests into one generation,
+and records how long requests waited in the queue.
+
+Like the admission limits, it is per worker process; it only has something
+to schedule when a worker serves requests concurrently (gthread workers).
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional
+
+# Queue-position credit per second waited, in prompt words; a 400-word prompt
+# overtakes fresh 10-word prompts after about two seconds
+AGING_WORDS_PER_SEC = 200.0
+
+
+class _Job:
+    __slots__ = ("key", "cost", "call", "enqueued", "future", "waiters")
+
+    def __init__(self, key: Hashable, cost: float, call: Callable[[], Any], enqueued: float):
+        self.key = key
+        self.cost = cost
+        self.call = call
+        self.enqueued = enqueued
+        self.future: Future = Future()
+        self.waiters = 1
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(1, math.ceil(q / 100 * len(sorted_values))) - 1]
+
+
+class GenerationScheduler:
+    """Bounded, batching, shortest-prompt-first queue for LLM generations"""
+
+    def __init__(self, max_concurrent: int = 2, batch_window: float = 0.01,
+                 max_queue: int = 64, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            max_concurrent: Generations in flight at once (0 disables scheduling)
+            batch_window: Seconds to hold a new request so others can join its batch
+            max_queue: Requests allowed to wait; more are rejected
+        """
+        self.max_concurrent = max_concurrent
+        self.batch_window = batch_window
+        self.max_queue = max_queue
+        self.clock = clock
+
+        self._cond = threading.Condition()
+        self._pid = None
+        self._queue: List[_Job] = []
+        self._by_key: Dict[Hashable, _Job] = {}  # queued or running, for coalescing
+        self._in_flight = 0
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._waits: Deque[float] = deque(maxlen=1024)
+        self._counters = {"submitted": 0, "dispatched": 0, "coalesced": 0, "rejected": 0,
+                          "timed_out": 0, "batches": 0}
+
+    @classmethod
+    def from_env(cls) -> "GenerationScheduler":
+        """Build from OLLAMA_MAX_CONCURRENT, OLLAMA_BATCH_WINDOW_MS and OLLAMA_MAX_QUEUE"""
+        env = os.environ
+        return cls(
+            max_concurrent=int(env.get("OLLAMA_MAX_CONCURRENT", 2)),
+            batch_window=float(env.get("OLLAMA_BATCH_WINDOW_MS", 10)) / 1000,
+            max_queue=int(env.get("OLLAMA_MAX_QUEUE", 64)),
+        )
+
+    def _ensure_started(self):
+        # Threads do not survive fork: a scheduler created in the gunicorn
+        # master (preload_app) starts its own dispatcher in each worker
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._queue, self._by_key, self._in_flight = [], {}, 0
+        self._pool = ThreadPoolExecutor(max_workers=max(1, self.max_concurrent), thread_name_prefix="llm-gen")
+        threading.Thread(target=self._dispatch_loop, name="llm-scheduler", daemon=True).start()
+
+    def submit(self, key: Hashable, cost: float, call: Callable[[], Any]) -> Optional[Future]:
+        """Queue call(); returns its Future, or None when the queue is full.
+
+        key identifies the generation (e.g. (model, prompt)); a request with
+        the same key as one queued or running shares its result. cost orders
+        the queue, smallest first (prompt length).
+        """
+        with self._cond:
+            self._ensure_started()
+            self._counters["submitted"] += 1
+            job = self._by_key.get(key)
+            if job is not None:
+                job.waiters += 1
+                self._counters["coalesced"] += 1
+                return job.future
+            if len(self._queue) >= self.max_queue:
+                self._counters["rejected"] += 1
+                return None
+            job = _Job(key, cost, call, self.clock())
+            self._queue.append(job)
+            self._by_key[key] = job
+            self._cond.notify_all()
+            return job.future
+
+    def run(self, key: Hashable, cost: float, call: Callable[[], Any],
+            timeout: Optional[float] = None) -> Any:
+        """Schedule call() and wait for it; None when rejected or not done within timeout"""
+        if self.max_concurrent <= 0:
+            return call()
+        future = self.submit(key, cost, call)
+        if future is None:
+            return None
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            with self._cond:
+                self._counters["timed_out"] += 1
+                job = self._by_key.get(key)
+                if job is not None and job.future is future:
+                    job.waiters -= 1
+                    if job.waiters == 0 and job in self._queue:
+                        self._queue.remove(job)
+                        del self._by_key[key]
+            return None
+
+    def _dispatch_loop(self):
+        with self._cond:
+            while True:
+                free = self.max_concurrent - self._in_flight
+                if not self._queue or free <= 0:
+                    self._cond.wait()
+                    continue
+                now = self.clock()
+                # Hold the oldest request for the batch window unless enough
+                # requests are already waiting to fill every free slot
+                hold = min(j.enqueued for j in self._queue) + self.batch_window - now
+                if hold > 0 and len(self._queue) < free:
+                    self._cond.wait(hold)
+                    continue
+                self._queue.sort(key=lambda j: j.cost - (now - j.enqueued) * AGING_WORDS_PER_SEC)
+                batch, self._queue = self._queue[:free], self._queue[free:]
+                self._counters["batches"] += 1
+                self._counters["dispatched"] += len(batch)
+                for job in batch:
+                    self._waits.append(now - job.enqueued)
+                    self._in_flight += 1
+                    self._pool.submit(self._execute, job)
+
+    def _execute(self, job: _Job):
+        result, error = None, None
+        try:
+            result = job.call()
+        except BaseException as e:
+            error = e
+        # Free the slot before waking callers so they see settled stats
+        with self._cond:
+            self._in_flight -= 1
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+            self._cond.notify_all()
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            waits = sorted(self._waits)
+            counters = dict(self._counters)
+            state = {"queue_depth": len(self._queue), "in_flight": self._in_flight}
+        batches = counters["batches"]
+        return {
+            "limits": {"max_concurrent": self.max_concurrent, "batch_window": self.batch_window,
+                       "max_queue": self.max_queue},
+            "state": state,
+            "counters": counters,
+            "mean_batch_size": round(counters["dispatched"] / batches, 2) if batches else 0.0,
+            "queue_wait_ms": {
+                "p50": round(_percentile(waits, 50) * 1000, 2),
+                "p95": round(_percentile(waits, 95) * 1000, 2),
+                "max": round(waits[-1] * 1000, 2) if waits else 0.0,
+                "samples": len(waits),
+            },
+        }
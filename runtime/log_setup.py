@@ -0,0 +1,219 @@
+"""Logging Setup for Agent Vish
+
+Request threads never write log output themselves. The root logger gets a
+QueueHandler that puts the unformatted record on a bounded queue; a
+background thread formats and writes it. A full queue drops records instead
+of blocking. Before a record is queued, per-category sampling and rate
+limits can drop it for the price of a dict lookup.
+
+LOG_LEVEL holds the root level, optionally followed by per-category rules,
+where a category is a logger name prefix:
+
+    LOG_LEVEL="INFO,api:sample=0.1,skills.ai_router_skill=WARNING,agent_vish:rate=20"
+
+    api:sample=0.1      keep one in ten records below WARNING from api.*
+    =WARNING            level for that category
+    :rate=20            at most 20 records/s below ERROR (bursts of 20)
+
+LOG_FORMAT=json writes one JSON object per line instead of text.
+LOG_QUEUE_SIZE bounds the queue (default 10000).
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from runtime.admission import TokenBucket
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class CategoryRule(NamedTuple):
+    level: Optional[int]
+    sample: float  # share of records below WARNING kept
+    rate: float  # records per second below ERROR, 0 for unlimited
+
+
+def parse_log_level(spec: str) -> Tuple[int, Dict[str, CategoryRule]]:
+    """'INFO,api:sample=0.1' -> (logging.INFO, {"api": CategoryRule(None, 0.1, 0.0)})"""
+    root, rules = logging.INFO, {}
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        head, *options = item.split(":")
+        name, has_level, level = head.partition("=")
+        if not has_level and not options:  # a bare level is the root's
+            root = _level(head)
+            continue
+        sample, rate = 1.0, 0.0
+        for option in options:
+            key, _, value = option.partition("=")
+            if key == "sample":
+                sample = float(value)
+            elif key == "rate":
+                rate = float(value)
+            else:
+                raise ValueError(f"Unknown LOG_LEVEL option {option!r} in {item!r}")
+        rules[name] = CategoryRule(_level(level) if level else None, sample, rate)
+    return root, rules
+
+
+def _level(name: str) -> int:
+    level = logging.getLevelName(name.strip().upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown log level {name!r}")
+    return level
+
+
+class SamplingFilter(logging.Filter):
+    """Drops records by category: a sampled share below WARNING, a rate limit below ERROR"""
+
+    def __init__(self, rules: Dict[str, CategoryRule], rng: Optional[random.Random] = None):
+        super().__init__()
+        self.rules = {name: rule for name, rule in rules.items() if rule.sample < 1.0 or rule.rate > 0}
+        self.rng = rng or random.Random()
+        self._buckets = {name: TokenBucket(rule.rate, rule.rate) for name, rule in self.rules.items() if rule.rate > 0}
+        self._by_logger: Dict[str, Optional[str]] = {}  # logger name -> matching category
+        self._lock = threading.Lock()
+        self.dropped: Dict[str, int] = {}
+
+    def _category(self, name: str) -> Optional[str]:
+        category = self._by_logger.get(name, "")
+        if category == "":
+            matches = [c for c in self.rules if name == c or name.startswith(c + ".")]
+            category = max(matches, key=len) if matches else None
+            self._by_logger[name] = category
+        return category
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.rules or record.levelno >= logging.ERROR:
+            return True
+        category = self._category(record.name)
+        if category is None:
+            return True
+        rule = self.rules[category]
+        keep = record.levelno >= logging.WARNING or rule.sample >= 1.0 or self.rng.random() < rule.sample
+        if keep and category in self._buckets:
+            with self._lock:
+                keep = self._buckets[category].try_acquire()
+        if not keep:
+            with self._lock:
+                self.dropped[category] = self.dropped.get(category, 0) + 1
+        return keep
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info or record.exc_text:
+            entry["exc"] = record.exc_text or self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks or formats on the caller's thread"""
+
+    def __init__(self, maxsize: int):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The record is formatted by the listener thread. Arguments are kept
+        # as they are, so a mutable object logged and then changed shows its
+        # later state. Nothing on the request path does that.
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+
+class QueuedLogging:
+    """The installed queue handler and the thread draining it"""
+
+    def __init__(self, output, formatter: logging.Formatter, maxsize: int, sampling: SamplingFilter):
+        self.output_handler = logging.StreamHandler(output)
+        self.output_handler.setFormatter(formatter)
+        self.maxsize = maxsize
+        self.sampling = sampling
+        self.handler = DroppingQueueHandler(maxsize)
+        self.handler.addFilter(sampling)
+        self.listener: Optional[logging.handlers.QueueListener] = None
+
+    def start(self):
+        self.listener = logging.handlers.QueueListener(self.handler.queue, self.output_handler,
+                                                       respect_handler_level=True)
+        self.listener.start()
+
+    def restart_after_fork(self):
+        # Only the forking thread survives fork: the child gets a fresh queue
+        # (the old one's lock may have been held by the dead listener) and a
+        # new listener thread
+        self.handler.queue = queue.Queue(self.maxsize)
+        self.start()
+
+    def stop(self):
+        """Flush queued records and stop the listener"""
+        if self.listener is not None and self.listener._thread is not None:
+            try:
+                self.listener.stop()
+            except queue.Full:
+                pass  # no room for the stop sentinel; the daemon thread dies with the process
+
+    def stats(self) -> Dict[str, Any]:
+        return {"queued": self.handler.queue.qsize(), "dropped_queue_full": self.handler.dropped,
+                "dropped_sampled": dict(self.sampling.dropped)}
+
+
+_installed: Optional[QueuedLogging] = None
+
+
+def configure_logging(output=None) -> QueuedLogging:
+    """Route all logging through the background queue; safe to call more than once"""
+    global _installed
+    if _installed is not None:
+        return _installed
+    root_level, rules = parse_log_level(os.environ.get("LOG_LEVEL", "INFO"))
+    formatter = JSONFormatter() if os.environ.get("LOG_FORMAT", "").lower() == "json" else \
+        logging.Formatter(TEXT_FORMAT)
+    installed = QueuedLogging(output or sys.stderr, formatter,
+                              int(os.environ.get("LOG_QUEUE_SIZE", 10000)), SamplingFilter(rules))
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(installed.handler)
+    root.setLevel(root_level)
+    for name, rule in rules.items():
+        if rule.level is not None:
+            logging.getLogger(name).setLevel(rule.level)
+    installed.start()
+    os.register_at_fork(after_in_child=installed.restart_after_fork)
+    atexit.register(installed.stop)
+    _installed = installed
+    return installed
+
+
+def logging_stats() -> Dict[str, Any]:
+    """Queue depth and records dropped, for this process"""
+    return _installed.stats() if _installed is not None else {}
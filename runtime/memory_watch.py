@@ -0,0 +1,240 @@
+"""Memory growth tracking for long-running workers
+
+Three pieces, all per worker process:
+
+    RSS per request type  every Nth request (MEMORY_SAMPLE_RATE) reads the
+                          resident set size before and after and records the
+                          growth against its endpoint, or for /chat against the
+                          reply source ("chat:llm", "chat:faq", ...)
+    Allocation snapshots  tracemalloc snapshots taken on demand through the
+                          admin endpoints or every MEMORY_SNAPSHOT_INTERVAL
+                          seconds, with the top allocation sites of one
+                          snapshot and the growth between any two
+    Recycling             with MEMORY_RECYCLE_MB set, gunicorn.conf.py retires
+                          a worker once its RSS crosses that many MB; it
+                          finishes the request in hand and the master forks a
+                          fresh one (the same path as max_requests)
+
+tracemalloc slows every allocation while it traces, so it is off until the
+first snapshot (or MEMORY_TRACE_FRAMES) turns it on and stop() turns it off
+again. The RSS sampling costs one read of /proc/self/statm per sampled request.
+"""
+
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+STAT_KEYS = ("lineno", "filename", "traceback")
+
+
+def rss_mb(pid: Optional[int] = None) -> float:
+    """Resident set size of pid (default this process) in MB from /proc (0 where there is no /proc)"""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class MemoryWatch:
+    """
+    RSS growth per request type, tracemalloc snapshots and the recycle threshold for one worker.
+    """
+
+    def __init__(self, sample_rate: float = 0.05, trace_frames: int = 0, snapshot_interval: float = 0.0,
+                 keep: int = 10, recycle_mb: float = 0.0):
+        # Every Nth request is measured (sample_rate 0 disables the RSS sampling)
+        self.sample_every = round(1 / sample_rate) if sample_rate > 0 else 0
+        self.trace_frames = trace_frames
+        self.snapshot_interval = snapshot_interval
+        self.keep = max(2, keep)
+        self.recycle_mb = recycle_mb
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._kinds: Dict[str, Dict[str, float]] = {}
+        self._snapshots: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 1
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_env(cls) -> "MemoryWatch":
+        """Build from MEMORY_SAMPLE_RATE, MEMORY_TRACE_FRAMES, MEMORY_SNAPSHOT_INTERVAL,
+        MEMORY_SNAPSHOTS and MEMORY_RECYCLE_MB"""
+        env = os.environ
+        return cls(
+            sample_rate=float(env.get("MEMORY_SAMPLE_RATE", 0.05)),
+            trace_frames=int(env.get("MEMORY_TRACE_FRAMES", 0)),
+            snapshot_interval=float(env.get("MEMORY_SNAPSHOT_INTERVAL", 0)),
+            keep=int(env.get("MEMORY_SNAPSHOTS", 10)),
+            recycle_mb=float(env.get("MEMORY_RECYCLE_MB", 0)),
+        )
+
+    # RSS per request type
+
+    def begin(self) -> Optional[float]:
+        """RSS before a request when this one is sampled, else None"""
+        if not self.sample_every:
+            return None
+        with self._lock:
+            self._requests += 1
+            if self._requests % self.sample_every:
+                return None
+        return rss_mb()
+
+    def end(self, kind: str, before: float):
+        """Record the RSS change of a sampled request"""
+        after = rss_mb()
+        growth = after - before
+        with self._lock:
+            entry = self._kinds.get(kind)
+            if entry is None:
+                entry = self._kinds[kind] = {"sampled": 0, "grew": 0, "growth_mb": 0.0, "max_growth_mb": 0.0,
+                                             "last_rss_mb": 0.0}
+            entry["sampled"] += 1
+            entry["last_rss_mb"] = after
+            if growth > 0:
+                entry["grew"] += 1
+                entry["growth_mb"] += growth
+                entry["max_growth_mb"] = max(entry["max_growth_mb"], growth)
+
+    # Recycling
+
+    def should_recycle(self) -> bool:
+        """True once this worker's RSS is above MEMORY_RECYCLE_MB"""
+        if self.recycle_mb <= 0:
+            return False
+        return rss_mb() > self.recycle_mb
+
+    # Allocation snapshots
+
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: Optional[int] = None):
+        """Start tracing allocations (frames of traceback kept per allocation, default 1)"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(max(1, frames or self.trace_frames or 1))
+            logger.info("tracemalloc started with %d frame(s)", tracemalloc.get_traceback_limit())
+
+    def stop(self):
+        """Stop tracing and drop the snapshots; allocations run at full speed again"""
+        self._stop.set()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+
+    def snapshot(self, label: str = "") -> Dict[str, Any]:
+        """Take an allocation snapshot (starting tracing if needed) and keep the newest MEMORY_SNAPSHOTS"""
+        self.start()
+        snap = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        traced, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots[snapshot_id] = {
+                "id": snapshot_id, "label": label, "taken": time.time(), "rss_mb": round(rss_mb(), 2),
+                "traced_mb": round(traced / 1024 / 1024, 2), "peak_traced_mb": round(peak / 1024 / 1024, 2),
+                "snapshot": snap,
+            }
+            while len(self._snapshots) > self.keep:
+                self._snapshots.popitem(last=False)
+            return self._describe(self._snapshots[snapshot_id])
+
+    @staticmethod
+    def _describe(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in entry.items() if key != "snapshot"}
+
+    def snapshots(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._describe(entry) for entry in self._snapshots.values()]
+
+    def _get(self, snapshot_id: Optional[int], default_last: bool = True) -> Dict[str, Any]:
+        with self._lock:
+            if not self._snapshots:
+                raise KeyError("no snapshots")
+            if snapshot_id is None:
+                snapshot_id = next(reversed(self._snapshots)) if default_last else next(iter(self._snapshots))
+            return self._snapshots[snapshot_id]
+
+    def top(self, snapshot_id: Optional[int] = None, limit: int = 20, key: str = "lineno") -> Dict[str, Any]:
+        """The largest allocation sites in a snapshot (default the newest)"""
+        if key not in STAT_KEYS:
+            raise ValueError(f"key must be one of {', '.join(STAT_KEYS)}")
+        entry = self._get(snapshot_id)
+        stats = entry["snapshot"].statistics(key)
+        return dict(self._describe(entry), top=[_stat_row(stat) for stat in stats[:limit]])
+
+    def diff(self, first: Optional[int] = None, second: Optional[int] = None, limit: int = 20,
+             key: str = "lineno") -> Dict[str, Any]:
+        """Allocation sites that grew most from snapshot first (default the oldest) to second (default the newest)"""
+        if key not in STAT_KEYS:
+            raise ValueError(f"key must be one of {', '.join(STAT_KEYS)}")
+        old, new = self._get(first, default_last=False), self._get(second)
+        stats = new["snapshot"].compare_to(old["snapshot"], key)
+        return {
+            "from": self._describe(old), "to": self._describe(new),
+            "rss_growth_mb": round(new["rss_mb"] - old["rss_mb"], 2),
+            "traced_growth_mb": round(new["traced_mb"] - old["traced_mb"], 2),
+            "top": [dict(_stat_row(stat), size_diff_kb=round(stat.size_diff / 1024, 1), count_diff=stat.count_diff)
+                    for stat in stats[:limit]],
+        }
+
+    def start_periodic(self) -> "MemoryWatch":
+        """Snapshot every MEMORY_SNAPSHOT_INTERVAL seconds in a daemon thread (no-op when the interval is 0)"""
+        if self.trace_frames:
+            self.start()
+        if self.snapshot_interval <= 0 or self._thread is not None:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="memory-snapshots", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.snapshot_interval):
+            try:
+                self.snapshot("periodic")
+            except Exception:
+                logger.exception("Periodic memory snapshot failed")
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            kinds = {}
+            for kind, entry in sorted(self._kinds.items()):
+                kinds[kind] = dict(entry, growth_mb=round(entry["growth_mb"], 2),
+                                   max_growth_mb=round(entry["max_growth_mb"], 2),
+                                   last_rss_mb=round(entry["last_rss_mb"], 2),
+                                   mean_growth_mb=round(entry["growth_mb"] / entry["sampled"], 3))
+            snapshots = len(self._snapshots)
+        return {
+            "pid": os.getpid(),
+            "rss_mb": round(rss_mb(), 2),
+            "sample_every": self.sample_every,
+            "requests": self._requests,
+            "kinds": kinds,
+            "tracing": tracemalloc.is_tracing(),
+            "snapshots": snapshots,
+            "recycle_mb": self.recycle_mb,
+        }
+
+
+def _stat_row(stat) -> Dict[str, Any]:
+    frames = stat.traceback.format() if len(stat.traceback) > 1 else []
+    frame = stat.traceback[0]
+    return {"site": f"{frame.filename}:{frame.lineno}", "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count, "traceback": [line.strip() for line in frames if line.strip()]}
@@ -0,0 +1,174 @@
+"""Output Profiles for LLM replies
+
+Every reply is collapsed to one line before it is sent, so long answers are
+mostly waiting for text that gets thrown away. A channel's OutputProfile
+tells each provider what the channel can show:
+    - instruction: appended to the system prompt ("one concise sentence")
+    - max_tokens: the provider-side generation cap
+    - stop: stop sequences, e.g. a newline once the sentence is done
+    - max_chars: the reply budget; a stream is closed as soon as it is filled
+
+Channels are picked per request ("channel" in the /chat body), defaulting to
+OUTPUT_CHANNEL or "chat". OutputStats counts, per provider, what was
+received, what was kept and an estimate of the tokens and latency saved
+compared with the old limits. stream_to() lets a caller (the WebSocket
+channel) watch the kept text arrive.
+"""
+
+import math
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+
+DEFAULT_CHANNEL = "chat"
+SENTENCE_END = re.compile(r"[.!?](?=\s|$)")
+
+
+class OutputProfile(NamedTuple):
+    name: str
+    max_chars: int  # reply budget in characters
+    max_tokens: int  # provider-side cap
+    stop: Tuple[str, ...]
+    instruction: str
+
+
+PROFILES: Dict[str, OutputProfile] = {
+    # The chat widget: one line, one sentence
+    "chat": OutputProfile("chat", 300, 96, ("\n",),
+                          "Reply with one concise sentence on a single line, without lists or markdown."),
+    # Callers that show a short paragraph (still collapsed to one line)
+    "detail": OutputProfile("detail", 1200, 360, ("\n\n",),
+                            "Reply concisely in one short paragraph, without lists or markdown."),
+    # The cascade verifier's YES/NO
+    "verdict": OutputProfile("verdict", 16, 4, ("\n",), ""),
+}
+
+# max_tokens each provider asked for before profiles. Gemini and Ollama were
+# unbounded; their savings are counted against the profile's own cap, i.e.
+# only what the early stream cutoff saved.
+PREVIOUS_MAX_TOKENS: Dict[str, int] = {"chatgpt": 500, "perplexity": 1000}
+
+
+def profile_for(channel: Optional[str] = None) -> OutputProfile:
+    """Profile for a channel name; unknown or empty names get the default channel's"""
+    name = (channel or os.environ.get("OUTPUT_CHANNEL") or DEFAULT_CHANNEL).strip().lower()
+    return PROFILES.get(name) or PROFILES[DEFAULT_CHANNEL]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return max(1, math.ceil(len(text) / 4))
+
+
+def clip(text: str, max_chars: int) -> str:
+    """Cut text to max_chars, at a sentence end when one falls in the second half"""
+    if len(text) <= max_chars:
+        return text
+    head = text[:max_chars]
+    ends = [m.end() for m in SENTENCE_END.finditer(head)]
+    if ends and ends[-1] >= max_chars // 2:
+        return head[:ends[-1]]
+    return head[:max_chars - 3].rsplit(" ", 1)[0] + "..."
+
+
+class ReplyBudget:
+    """Collects streamed pieces until a stop sequence or the character budget ends the reply"""
+
+    def __init__(self, profile: OutputProfile):
+        self.profile = profile
+        self.received = ""
+        self.full = False
+
+    def add(self, piece: str) -> bool:
+        """Take one piece; True once the reply is complete and the stream can be closed"""
+        self.received += piece
+        body = self.received.lstrip()  # a leading newline is not a stop
+        for stop in self.profile.stop:
+            if stop in body:
+                self.full = True
+        if len(body) >= self.profile.max_chars:
+            self.full = True
+        return self.full
+
+    @property
+    def text(self) -> str:
+        body = self.received.lstrip()
+        for stop in self.profile.stop:
+            body = body.split(stop, 1)[0]
+        return clip(body.rstrip(), self.profile.max_chars)
+
+
+class OutputStats:
+    """Per-provider tokens received, kept and saved by the caps and early stream cutoff"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._providers: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, provider: str, profile: OutputProfile, received: str, kept: str,
+               elapsed: float, cut: bool):
+        """One call: the text that arrived, the reply kept from it, and whether the stream was closed early"""
+        tokens = estimate_tokens(received) if received else 0
+        baseline = PREVIOUS_MAX_TOKENS.get(provider, profile.max_tokens)
+        with self._lock:
+            stats = self._providers.setdefault(provider, {
+                "calls": 0, "streams_cut": 0, "tokens_received": 0, "tokens_kept": 0,
+                "tokens_saved": 0, "seconds": 0.0, "latency_saved": 0.0})
+            stats["calls"] += 1
+            stats["streams_cut"] += cut
+            stats["tokens_received"] += tokens
+            stats["tokens_kept"] += estimate_tokens(kept) if kept else 0
+            stats["seconds"] += elapsed
+            if tokens:
+                # Upper bound: what the baseline cap allowed beyond what we took
+                saved = max(0, baseline - tokens)
+                stats["tokens_saved"] += saved
+                stats["latency_saved"] += saved * elapsed / tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            providers = {name: dict(s) for name, s in self._providers.items()}
+        rows = {}
+        for name, s in providers.items():
+            rows[name] = {
+                "calls": s["calls"],
+                "streams_cut": s["streams_cut"],
+                "tokens_received": s["tokens_received"],
+                "tokens_kept": s["tokens_kept"],
+                "tokens_discarded": s["tokens_received"] - s["tokens_kept"],
+                "mean_latency_ms": round(s["seconds"] / s["calls"] * 1000, 1),
+                "ms_per_token": round(s["seconds"] / s["tokens_received"] * 1000, 2) if s["tokens_received"] else None,
+                "tokens_saved": s["tokens_saved"],
+                "latency_saved_ms": round(s["latency_saved"] * 1000, 1),
+            }
+        return {"providers": rows, "profiles": {name: p._asdict() for name, p in PROFILES.items()}}
+
+
+# Shared by every provider in the process; served at /stats/output
+output_stats = OutputStats()
+
+# sink(piece, restart) for replies streamed on this thread; see stream_to
+StreamSink = Callable[[str, bool], None]
+_sink = threading.local()
+
+
+@contextmanager
+def stream_to(sink: Optional[StreamSink]) -> Iterator[None]:
+    """Pass reply text to sink as LLM calls made on this thread stream it in.
+
+    restart is True on the first piece of each generation: a cascade that
+    escalates starts over with the next tier's answer. sink=None silences
+    calls whose text is not the reply (the cascade's verifier).
+    """
+    previous = getattr(_sink, "sink", None)
+    _sink.sink = sink
+    try:
+        yield
+    finally:
+        _sink.sink = previous
+
+
+def stream_sink() -> Optional[StreamSink]:
+    return getattr(_sink, "sink", None)
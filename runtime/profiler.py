@@ -0,0 +1,318 @@
+"""On-demand profiling for production workers
+
+Two tools, both behind the admin endpoints in api.py (ADMIN_TOKEN):
+
+    SamplingProfiler  a thread that snapshots every thread's Python stack
+                      every few milliseconds for N seconds and returns
+                      collapsed stacks ("frame;frame;frame count" lines) that
+                      flamegraph.pl, speedscope or inferno read directly
+    RequestProfile    cProfile around one request, switched on by an
+                      X-Profile header; saved under PROFILE_DIR so any worker
+                      can serve it back
+
+Samples are attributed with labels the hot path sets through tag() and
+phase(): the intent, the provider or cascade tier, and report_skill's
+phases show up as the root frames of each stack ("intent:faq;...").
+While nothing is profiling, tag() is one global read and phase() returns a
+shared no-op context, so they can stay on the request path.
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Number of profilers currently running; labels are only recorded while it is non-zero
+_active = 0
+_active_lock = threading.Lock()
+# thread ident -> {label: value} for the request the thread is serving
+_labels: Dict[int, Dict[str, str]] = {}
+_NO_PHASE = nullcontext()
+LABEL_ORDER = ("intent", "provider", "phase")
+
+MAX_SECONDS = 60.0
+DEFAULT_INTERVAL = 0.005
+
+
+def _activate(delta: int):
+    global _active
+    with _active_lock:
+        _active = max(0, _active + delta)
+        if not _active:
+            _labels.clear()
+
+
+def active() -> bool:
+    return _active > 0
+
+
+def tag(**labels: str):
+    """Attribute what this thread does from now on (until clear()) to labels, e.g. intent="faq" """
+    if not _active:
+        return
+    _labels.setdefault(threading.get_ident(), {}).update(labels)
+
+
+def clear():
+    """Forget this thread's labels (at the start and end of a request)"""
+    if _active:
+        _labels.pop(threading.get_ident(), None)
+
+
+def labels() -> Dict[str, str]:
+    return dict(_labels.get(threading.get_ident(), {}))
+
+
+def phase(name: str):
+    """Context manager labelling the enclosed work phase=name; a shared no-op while nothing profiles"""
+    if not _active:
+        return _NO_PHASE
+    return _phase(name)
+
+
+@contextmanager
+def _phase(name: str) -> Iterator[None]:
+    current = _labels.setdefault(threading.get_ident(), {})
+    previous = current.get("phase")
+    current["phase"] = name
+    try:
+        yield
+    finally:
+        if previous is None:
+            current.pop("phase", None)
+        else:
+            current["phase"] = previous
+
+
+def _frame_name(code) -> str:
+    path = code.co_filename
+    parts = path.replace("\\", "/").rsplit("/", 2)
+    short = "/".join(parts[-2:]) if len(parts) > 1 else path
+    return f"{code.co_name} ({short}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples every thread's stack at a fixed interval and counts collapsed stacks.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = max(0.001, interval)
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._names: Dict[Any, str] = {}
+        self._exclude = set()
+        self.started = self.elapsed = 0.0
+
+    def _sample(self, skip: int):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == skip or ident in self._exclude:
+                continue
+            stack: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                name = self._names.get(code)
+                if name is None:
+                    name = self._names[code] = _frame_name(code)
+                stack.append(name)
+                frame = frame.f_back
+            stack.reverse()
+            thread_labels = _labels.get(ident, {})
+            roots = [names.get(ident, f"thread-{ident}")]
+            roots += [f"{key}:{thread_labels[key]}" for key in LABEL_ORDER if key in thread_labels]
+            self.stacks[";".join(roots + stack)] += 1
+        self.samples += 1
+
+    def _run(self):
+        me = threading.get_ident()
+        next_at = time.perf_counter()
+        while not self._stop.is_set():
+            self._sample(me)
+            next_at += self.interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                next_at = time.perf_counter()  # fell behind; don't burst to catch up
+
+    def start(self) -> "SamplingProfiler":
+        _activate(+1)
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.elapsed = time.perf_counter() - self.started
+            _activate(-1)
+        return self
+
+    def run(self, seconds: float) -> "SamplingProfiler":
+        """Sample for seconds (capped at MAX_SECONDS), blocking the caller (whose own stack is left out)"""
+        self._exclude.add(threading.get_ident())
+        self.start()
+        try:
+            time.sleep(min(max(seconds, 0.0), MAX_SECONDS))
+        finally:
+            self.stop()
+        return self
+
+    def collapsed(self, include_idle: bool = False) -> str:
+        """Collapsed stacks, heaviest first; idle threads (waiting in a lock or a select) are left out by default"""
+        lines = []
+        for stack, count in self.stacks.most_common():
+            if not include_idle and _idle(stack):
+                continue
+            lines.append(f"{stack} {count}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def summary(self, top: int = 25) -> Dict[str, Any]:
+        """Sample counts, the hottest leaf frames and time per label"""
+        leaves: Counter = Counter()
+        by_label: Counter = Counter()
+        busy = 0
+        for stack, count in self.stacks.items():
+            if _idle(stack):
+                continue
+            busy += count
+            frames = stack.split(";")
+            leaves[frames[-1]] += count
+            for frame in frames[1:1 + len(LABEL_ORDER)]:
+                if frame.split(":", 1)[0] in LABEL_ORDER:
+                    by_label[frame] += count
+        return {
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "seconds": round(self.elapsed, 3),
+            "busy_stack_samples": busy,
+            "top_frames": [{"frame": frame, "samples": count} for frame, count in leaves.most_common(top)],
+            "labels": dict(by_label.most_common()),
+        }
+
+
+# Leaf frames (function, file) of threads that are blocked rather than running Python code
+IDLE_LEAVES = {("wait", "threading.py"), ("_wait_for_tstate_lock", "threading.py"), ("select", "selectors.py"),
+               ("_worker", "thread.py"), ("accept", "socket.py"), ("readinto", "socket.py"),
+               ("get", "queue.py"), ("_recv_into", "socket.py")}
+_LEAF = re.compile(r"^(.*) \((?:.*/)?([^/]+):\d+\)$")
+
+
+def _idle(stack: str) -> bool:
+    match = _LEAF.match(stack.rsplit(";", 1)[-1])
+    return bool(match) and (match.group(1), match.group(2)) in IDLE_LEAVES
+
+
+class RequestProfile:
+    """
+    Deterministic profile (cProfile) of one request on the current thread.
+    """
+
+    def __init__(self, path: str):
+        import cProfile  # deferred: the hot path only needs tag() and phase()
+        self.id = uuid.uuid4().hex[:16]
+        self.path = path
+        self._profile = cProfile.Profile()
+        self._start = 0.0
+
+    def __enter__(self) -> "RequestProfile":
+        _activate(+1)
+        clear()
+        self._start = time.perf_counter()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self._profile.disable()
+        self.wall_ms = (time.perf_counter() - self._start) * 1000
+        self.labels = labels()
+        clear()
+        _activate(-1)
+
+    def report(self, limit: int = 40) -> str:
+        import io
+        import pstats
+        out = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=out)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    def save(self, directory: Optional[str] = None) -> str:
+        """Write <id>.json (labels, wall time, pstats text) and <id>.prof (for snakeviz or pstats)"""
+        directory = profile_dir(directory)
+        os.makedirs(directory, exist_ok=True)
+        self._profile.dump_stats(os.path.join(directory, f"{self.id}.prof"))
+        record = {"id": self.id, "path": self.path, "labels": self.labels, "wall_ms": round(self.wall_ms, 3),
+                  "created": time.time(), "report": self.report()}
+        with open(os.path.join(directory, f"{self.id}.json"), "w") as handle:
+            json.dump(record, handle)
+        _prune(directory)
+        return self.id
+
+
+def profile_dir(directory: Optional[str] = None) -> str:
+    return directory or os.environ.get("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "agent_vish_profiles")
+
+
+def _prune(directory: str, keep: int = 200):
+    """Keep the newest request profiles only"""
+    records = sorted((e for e in os.listdir(directory) if e.endswith(".json")),
+                     key=lambda e: os.path.getmtime(os.path.join(directory, e)))
+    for entry in records[:-keep]:
+        for ext in (".json", ".prof"):
+            try:
+                os.remove(os.path.join(directory, entry[:-5] + ext))
+            except OSError:
+                pass
+
+
+def load_request_profile(profile_id: str, directory: Optional[str] = None) -> Optional[Tuple[Dict[str, Any], str]]:
+    """(record, path of the .prof file) for a saved request profile"""
+    if not profile_id.isalnum():
+        return None
+    directory = profile_dir(directory)
+    try:
+        with open(os.path.join(directory, f"{profile_id}.json")) as handle:
+            return json.load(handle), os.path.join(directory, f"{profile_id}.prof")
+    except (OSError, ValueError):
+        return None
+
+
+def recent_request_profiles(limit: int = 50, directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    directory = profile_dir(directory)
+    if not os.path.isdir(directory):
+        return []
+    rows = []
+    for entry in sorted((e for e in os.listdir(directory) if e.endswith(".json")),
+                        key=lambda e: os.path.getmtime(os.path.join(directory, e)), reverse=True)[:limit]:
+        loaded = load_request_profile(entry[:-5], directory)
+        if loaded:
+            record = loaded[0]
+            rows.append({key: record[key] for key in ("id", "path", "labels", "wall_ms", "created")})
+    return rows
+
+
+_sampler_lock = threading.Lock()
+
+
+def sample(seconds: float, interval: float = DEFAULT_INTERVAL) -> Optional[SamplingProfiler]:
+    """Run one sampling session in this process; None if one is already running"""
+    if not _sampler_lock.acquire(blocking=False):
+        return None
+    try:
+        return SamplingProfiler(interval).run(seconds)
+    finally:
+        _sampler_lock.release()
@@ -0,0 +1,229 @@
+"""Model Residency for Ollama
+
+Ollama unloads a model after it has been idle for its keep_alive (5 minutes
+by default), and the next request pays the load, often several seconds,
+before its first token. The residency manager keeps the models the cascade
+uses in memory while people are likely to be chatting:
+    - preload() loads every model at service start (a generate call with no
+      prompt only loads the model),
+    - every generate call carries keep_alive (OLLAMA_KEEP_ALIVE),
+    - during business hours a background thread pings any model that has not
+      been used for OLLAMA_PING_INTERVAL seconds, resetting its idle timer,
+and records every load it observes (Ollama reports load_duration) together
+with the latency of requests that had to wait for one.
+
+Outside business hours nothing is pinged and models unload on their own.
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from runtime import http_pool
+from runtime.llm_scheduler import _percentile
+
+logger = logging.getLogger(__name__)
+
+# A load_duration above this means the model was not resident; a warm model
+# still reports a few milliseconds
+COLD_LOAD_SECONDS = 0.5
+DAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def parse_hours(spec: str) -> Tuple[int, int]:
+    """'09:00-19:00' -> minutes after midnight (540, 1140)"""
+    try:
+        start, end = (part.strip() for part in spec.split("-"))
+        return tuple(int(h) * 60 + int(m) for h, m in (t.split(":") for t in (start, end)))
+    except ValueError:
+        raise ValueError(f"Invalid hours {spec!r}, expected HH:MM-HH:MM")
+
+
+def parse_days(spec: str) -> frozenset:
+    """'mon-fri' or 'mon,wed,sat' -> weekday numbers (Monday is 0)"""
+    days = set()
+    for part in spec.lower().split(","):
+        first, _, last = part.strip().partition("-")
+        if first not in DAY_NAMES or (last and last not in DAY_NAMES):
+            raise ValueError(f"Invalid days {spec!r}, expected e.g. mon-fri")
+        start, end = DAY_NAMES.index(first), DAY_NAMES.index(last or first)
+        days.update(range(start, end + 1) if start <= end else [*range(start, 7), *range(0, end + 1)])
+    return frozenset(days)
+
+
+class ModelResidency:
+    """Preloads models, keeps them warm during business hours, records cold loads"""
+
+    def __init__(self, base_url: str, models: List[str], keep_alive: Optional[str] = "30m",
+                 ping_interval: float = 240.0, hours: Tuple[int, int] = (9 * 60, 19 * 60),
+                 days: frozenset = frozenset(range(5)), tz: Optional[str] = None,
+                 now: Optional[Callable[[], datetime]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            base_url: Ollama server
+            models: Models to keep resident
+            keep_alive: Sent with every generate call (None leaves the server default)
+            ping_interval: Idle seconds after which a model is pinged (0 disables pings)
+            hours: Business hours as minutes after midnight, start inclusive
+            days: Weekdays (Monday is 0) pings run on
+            tz: IANA time zone for business hours (default: server local time)
+        """
+        self.base_url = base_url
+        self.models = list(dict.fromkeys(models))
+        self.keep_alive = keep_alive
+        self.ping_interval = ping_interval
+        self.hours = hours
+        self.days = days
+        self.tz = tz
+        self.clock = clock
+        self._now = now or self._local_now
+        self._lock = threading.Lock()
+        self._pid = None
+        self._stop = threading.Event()
+        self._last_used: Dict[str, float] = {}
+        self._loads: Dict[str, int] = {m: 0 for m in self.models}
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=50)
+        self._cold_latencies: Deque[float] = deque(maxlen=1024)
+        self._counters = {"requests": 0, "cold_requests": 0, "preloads": 0, "pings": 0, "ping_failures": 0}
+
+    @classmethod
+    def from_env(cls, base_url: str, models: List[str]) -> "ModelResidency":
+        """Build from OLLAMA_KEEP_ALIVE, OLLAMA_PING_INTERVAL, OLLAMA_WARM_HOURS,
+        OLLAMA_WARM_DAYS and OLLAMA_WARM_TZ"""
+        env = os.environ
+        return cls(
+            base_url,
+            models,
+            keep_alive=env.get("OLLAMA_KEEP_ALIVE", "30m") or None,
+            ping_interval=float(env.get("OLLAMA_PING_INTERVAL", 240)),
+            hours=parse_hours(env.get("OLLAMA_WARM_HOURS", "09:00-19:00")),
+            days=parse_days(env.get("OLLAMA_WARM_DAYS", "mon-fri")),
+            tz=env.get("OLLAMA_WARM_TZ") or None,
+        )
+
+    def _local_now(self) -> datetime:
+        if self.tz:
+            from zoneinfo import ZoneInfo
+            return datetime.now(ZoneInfo(self.tz))
+        return datetime.now()
+
+    def in_business_hours(self) -> bool:
+        now = self._now()
+        minute = now.hour * 60 + now.minute
+        start, end = self.hours
+        in_window = start <= minute < end if start <= end else minute >= start or minute < end
+        return in_window and now.weekday() in self.days
+
+    def payload_options(self) -> Dict[str, Any]:
+        """Extra fields for every /api/generate payload"""
+        return {} if self.keep_alive is None else {"keep_alive": self.keep_alive}
+
+    def observe(self, model: str, body: Optional[Dict[str, Any]], elapsed: float,
+                source: str = "request"):
+        """Record a generate call: when it was made and whether it had to load the model"""
+        load = ((body or {}).get("load_duration") or 0) / 1e9
+        with self._lock:
+            self._last_used[model] = self.clock()
+            if source == "request":
+                self._counters["requests"] += 1
+            if load < COLD_LOAD_SECONDS:
+                return
+            self._loads[model] = self._loads.get(model, 0) + 1
+            self._events.append({"model": model, "source": source, "load_ms": round(load * 1000, 1),
+                                 "latency_ms": round(elapsed * 1000, 1), "at": time.time()})
+            if source == "request":
+                self._counters["cold_requests"] += 1
+                self._cold_latencies.append(elapsed)
+        logger.info(f"Ollama loaded {model} in {load:.1f}s ({source})")
+
+    def _load(self, model: str, source: str) -> bool:
+        """Generate call without a prompt: loads the model and resets its idle timer"""
+        payload = {"model": model, **self.payload_options()}
+        start = self.clock()
+        try:
+            response = http_pool.session(self.base_url).post(f"{self.base_url}/api/generate", json=payload,
+                                                             timeout=120)
+        except Exception as e:
+            logger.warning(f"Could not {source} {model}: {e}")
+            return False
+        if response.status_code != 200:
+            logger.warning(f"Could not {source} {model}: HTTP {response.status_code}")
+            return False
+        self.observe(model, response.json(), self.clock() - start, source)
+        return True
+
+    def preload(self) -> int:
+        """Load every model now; returns how many loaded"""
+        loaded = sum(self._load(model, "preload") for model in self.models)
+        with self._lock:
+            self._counters["preloads"] += loaded
+        return loaded
+
+    def ping_idle(self) -> int:
+        """Ping models idle for ping_interval, if in business hours; returns pings sent"""
+        if not self.in_business_hours():
+            return 0
+        now = self.clock()
+        with self._lock:
+            idle = [m for m in self.models if now - self._last_used.get(m, -math.inf) >= self.ping_interval]
+        sent = 0
+        for model in idle:
+            ok = self._load(model, "ping")
+            with self._lock:
+                self._counters["pings" if ok else "ping_failures"] += 1
+            sent += ok
+        return sent
+
+    def start(self):
+        """Start the keep-warm thread for this process (once per pid: threads do not survive fork)"""
+        if self.ping_interval <= 0 or not self.models:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+        threading.Thread(target=self._ping_loop, args=(self._stop,), name="ollama-keep-warm", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            self._pid = None
+
+    def _ping_loop(self, stop: threading.Event):
+        # Wake at a fraction of the interval so a model is pinged soon after it goes idle
+        while not stop.wait(max(0.05, self.ping_interval / 4)):
+            try:
+                self.ping_idle()
+            except Exception as e:
+                logger.warning(f"Keep-warm ping failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        now = self.clock()
+        with self._lock:
+            counters = dict(self._counters)
+            cold = sorted(self._cold_latencies)
+            events = list(self._events)[-10:]
+            models = {m: {"loads": self._loads.get(m, 0),
+                          "idle_s": round(now - self._last_used[m], 1) if m in self._last_used else None}
+                      for m in self.models}
+        return {
+            "keep_alive": self.keep_alive,
+            "ping_interval": self.ping_interval,
+            "business_hours": self.in_business_hours(),
+            "models": models,
+            "counters": counters,
+            "cold_start_latency_ms": {
+                "p50": round(_percentile(cold, 50) * 1000, 1),
+                "p99": round(_percentile(cold, 99) * 1000, 1),
+                "max": round(cold[-1] * 1000, 1) if cold else 0.0,
+                "samples": len(cold),
+            },
+            "recent_loads": events,
+        }
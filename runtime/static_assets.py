@@ -0,0 +1,133 @@
+"""Static Assets for the chat UI
+
+Reads public/ once at startup and keeps every file in memory with its
+gzip and (when the brotli package is installed) brotli encodings, so a
+request costs a dict lookup and no disk or compression work.
+
+Files other than HTML are served under /assets/<name>.<content hash>.<ext>
+with a one-year immutable Cache-Control: a changed file gets a new URL, so
+browsers never need to revalidate. HTML pages keep their URLs; references
+to other assets inside them are rewritten to the fingerprinted URLs, and the
+pages are served with an ETag and Cache-Control: no-cache, so a repeat
+visit is a 304 without a body.
+
+    python -m runtime.static_assets      # list assets and encoded sizes
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from typing import Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+PUBLIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "public")
+ASSET_PREFIX = "/assets"
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+HTML_EXTENSIONS = (".html", ".htm")
+# Types worth compressing; images and fonts already are
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+REFERENCE_PATTERN = re.compile(r'(?P<attr>\b(?:src|href)=")(?P<path>/?[\w./-]+)(?P<end>")')
+
+
+def _brotli():
+    """brotli module, or None when it is not installed"""
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+class Asset(NamedTuple):
+    url: str
+    content_type: str
+    etag: str
+    cache_control: str
+    encodings: Dict[str, bytes]  # "identity", "gzip", "br" -> body
+
+
+class StaticAssets:
+    """In-memory, precompressed copies of the files under a directory"""
+
+    def __init__(self, root: str = PUBLIC_DIR, prefix: str = ASSET_PREFIX):
+        self.root = root
+        self.prefix = prefix
+        self.assets: Dict[str, Asset] = {}  # by URL
+        self.urls: Dict[str, str] = {}  # file path relative to root -> URL
+
+    def build(self) -> "StaticAssets":
+        """Fingerprint and compress every file; HTML last, so its references can be rewritten"""
+        brotli = _brotli()
+        if brotli is None:
+            logger.warning("brotli not installed - static assets are served with gzip only")
+        files = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for filename in sorted(filenames):
+                if not filename.startswith("."):
+                    path = os.path.join(dirpath, filename)
+                    files.append(os.path.relpath(path, self.root).replace(os.sep, "/"))
+        files.sort(key=lambda name: name.endswith(HTML_EXTENSIONS))
+        for name in files:
+            with open(os.path.join(self.root, name), "rb") as f:
+                body = f.read()
+            if name.endswith(HTML_EXTENSIONS):
+                body = self._rewrite_references(body.decode("utf-8")).encode("utf-8")
+            self._add(name, body, brotli)
+        return self
+
+    def _rewrite_references(self, html: str) -> str:
+        def fingerprinted(match: re.Match) -> str:
+            url = self.urls.get(match.group("path").lstrip("/"))
+            return match.group(0) if url is None else f'{match.group("attr")}{url}{match.group("end")}'
+        return REFERENCE_PATTERN.sub(fingerprinted, html)
+
+    def _add(self, name: str, body: bytes, brotli):
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type == "application/javascript":
+            content_type += "; charset=utf-8"
+        if name.endswith(HTML_EXTENSIONS):
+            url, cache_control = f"/{name}", REVALIDATE
+        else:
+            stem, ext = os.path.splitext(name)
+            url, cache_control = f"{self.prefix}/{stem}.{digest}{ext}", IMMUTABLE
+        encodings = {"identity": body}
+        if content_type.startswith(COMPRESSIBLE):
+            compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed["br"] = brotli.compress(body, quality=11)
+            # Small files can grow when compressed
+            encodings.update({k: v for k, v in compressed.items() if len(v) < len(body)})
+        self.assets[url] = Asset(url, content_type, digest, cache_control, encodings)
+        self.urls[name] = url
+
+    def get(self, url: str) -> Optional[Asset]:
+        return self.assets.get(url)
+
+    def url_for(self, name: str) -> str:
+        """Served URL of a file under root (fingerprinted unless it is HTML)"""
+        return self.urls[name]
+
+
+def choose_encoding(asset: Asset, accept_encoding) -> str:
+    """Smallest encoding the client accepts; accept_encoding is werkzeug's request.accept_encodings"""
+    accepted = [e for e in asset.encodings if e == "identity" or accept_encoding[e] > 0]
+    return min(accepted, key=lambda e: len(asset.encodings[e]))
+
+
+def etag_for(asset: Asset, encoding: str) -> str:
+    # Each encoding is a different representation, so it gets its own strong ETag
+    return asset.etag if encoding == "identity" else f"{asset.etag}-{encoding}"
+
+
+if __name__ == "__main__":
+    assets = StaticAssets().build()
+    for url, asset in sorted(assets.assets.items()):
+        sizes = ", ".join(f"{name} {len(body):,}" for name, body in asset.encodings.items())
+        print(f"{url:<40} {sizes}")
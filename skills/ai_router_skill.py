@@ -1,18 +1,33 @@
 """
 AI Router Skill - Intelligent routing to ChatGPT, Gemini, or Perplexity
 Routes queries to the most suitable AI model based on query type
+
+Every model implements the Provider protocol (skills/provider.py), so the
+fallback chain runs as one coroutine on the provider loop. With
+PROVIDER_HEDGE_DELAY set (seconds), the next model is also started when the
+current one has not answered by then; the first answer wins and the other
+calls are cancelled. When the context carries an OutputProfile, replies are
+streamed and each stream is closed once the profile's reply budget is full.
 """
+import asyncio
 import logging
+import os
 import re
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 # Import all AI skills
 from skills.chatgpt_skill import ChatGPTSkill
 from skills.gemini_skill import GeminiSkill
 from skills.perplexity_skill import PerplexitySkill
+from skills.intent_classifier import DEFAULT_THRESHOLD, load_classifier
+from runtime.aio import run_sync
+from runtime.deadline import Deadline
+from skills.provider import Provider, SYNC_GRACE_SECONDS, generate_within
 
 logger = logging.getLogger(__name__)
 
+ALL_MODELS_FAILED_REPLY = "I apologize, but I'm having trouble connecting to my AI services right now. Please try again in a moment."
+
 class AIRouterSkill:
     """
     Intelligent AI router that selects the best model for each query
@@ -29,21 +44,21 @@ class AIRouterSkill:
         
         # Initialize all AI skills
         try:
-            self.chatgpt = ChatGPTSkill(config)
+            self.chatgpt = ChatGPTSkill()
             logger.info("ChatGPT skill initialized")
         except Exception as e:
             logger.warning(f"ChatGPT skill not available: {e}")
             self.chatgpt = None
             
         try:
-            self.gemini = GeminiSkill(config)
+            self.gemini = GeminiSkill()
             logger.info("Gemini skill initialized")
         except Exception as e:
             logger.warning(f"Gemini skill not available: {e}")
             self.gemini = None
             
         try:
-            self.perplexity = PerplexitySkill(config)
+            self.perplexity = PerplexitySkill()
             logger.info("Perplexity skill initialized")
         except Exception as e:
             logger.warning(f"Perplexity skill not available: {e}")
@@ -62,6 +77,13 @@ class AIRouterSkill:
             'teach', 'tell me about', 'can you', 'could you', 'please',
             'advice', 'recommend', 'suggest', 'think', 'opinion'
         ]
+
+        # Local query-type model from data/query_types.jsonl; the keyword
+        # lists above decide when it is missing or unsure
+        self.classifier = load_classifier("query_types.jsonl", "query_type")
+        self.classifier_threshold = float(os.environ.get("INTENT_CONFIDENCE_THRESHOLD", DEFAULT_THRESHOLD))
+        hedge_delay = os.environ.get("PROVIDER_HEDGE_DELAY")
+        self.hedge_delay: Optional[float] = float(hedge_delay) if hedge_delay else None
     
     def classify_query(self, message: str) -> str:
         """
@@ -69,79 +91,135 @@ class AIRouterSkill:
         Returns: 'research', 'conversation', or 'general'
         """
         message_lower = message.lower()
+
+        if self.classifier is not None:
+            query_type, confidence = self.classifier.predict(message_lower)
+            if confidence >= self.classifier_threshold:
+                logger.debug("Query classified as '%s' (confidence: %.2f)", query_type, confidence)
+                return query_type
         
         # Check for research keywords
         for keyword in self.research_keywords:
             if keyword in message_lower:
-                logger.info(f"Query classified as 'research' (keyword: {keyword})")
+                logger.debug("Query classified as 'research' (keyword: %s)", keyword)
                 return 'research'
         
         # Check for conversation keywords
         for keyword in self.conversation_keywords:
             if keyword in message_lower:
-                logger.info(f"Query classified as 'conversation' (keyword: {keyword})")
+                logger.debug("Query classified as 'conversation' (keyword: %s)", keyword)
                 return 'conversation'
         
         # Default to general
-        logger.info("Query classified as 'general'")
+        logger.debug("Query classified as 'general'")
         return 'general'
     
-    def route_query(self, message: str, context: Dict[str, Any]) -> Optional[str]:
-        """
-        Route the query to the most appropriate AI model
-        Implements fallback strategy if primary model is unavailable
-        """
-        query_type = self.classify_query(message)
-        
-        # Route based on query type with fallbacks
+    def _models_for(self, query_type: str) -> List[Tuple[str, Optional[Provider]]]:
+        """Models in priority order for the query type"""
         if query_type == 'research':
             # Research → Perplexity > ChatGPT > Gemini
-            models = [
+            return [
                 ('Perplexity', self.perplexity),
                 ('ChatGPT', self.chatgpt),
                 ('Gemini', self.gemini)
             ]
-        elif query_type == 'conversation':
+        if query_type == 'conversation':
             # Conversation → ChatGPT > Gemini > Perplexity
-            models = [
+            return [
                 ('ChatGPT', self.chatgpt),
                 ('Gemini', self.gemini),
                 ('Perplexity', self.perplexity)
             ]
-        else:
-            # General → Gemini > ChatGPT > Perplexity
-            models = [
-                ('Gemini', self.gemini),
-                ('ChatGPT', self.chatgpt),
-                ('Perplexity', self.perplexity)
-            ]
-        
-        # Try each model in priority order
-        for model_name, model in models:
+        # General → Gemini > ChatGPT > Perplexity
+        return [
+            ('Gemini', self.gemini),
+            ('ChatGPT', self.chatgpt),
+            ('Perplexity', self.perplexity)
+        ]
+    
+    async def aroute_query(self, message: str, context: Dict[str, Any],
+                           deadline: Optional[Deadline] = None) -> str:
+        """
+        Route the query to the most appropriate AI model
+        Implements fallback strategy if primary model is unavailable.
+        All attempts share one deadline: each model gets only the time left,
+        and no further fallback is started once it is spent.
+        """
+        history = (context or {}).get("history")
+        profile = (context or {}).get("profile")
+        waiting = []
+        for model_name, model in self._models_for(self.classify_query(message)):
             if model is None:
-                logger.debug(f"{model_name} not available, trying next")
-                continue
+                logger.debug("%s not available, trying next", model_name)
+            else:
+                waiting.append((model_name, model))
+        
+        running: Dict[asyncio.Task, str] = {}
+        start_next = True
+        try:
+            while waiting or running:
+                if start_next and waiting:
+                    model_name, model = waiting.pop(0)
+                    if deadline is not None and deadline.expired():
+                        logger.warning(f"Request deadline spent, not trying {model_name}")
+                        waiting.clear()
+                        if not running:
+                            break
+                    else:
+                        logger.info("Routing query to %s", model_name)
+                        if profile is not None:
+                            call = generate_within(model, message, history, deadline, profile)
+                        else:
+                            call = model.agenerate(message, history, deadline=deadline)
+                        running[asyncio.ensure_future(call)] = model_name
+                start_next = False
                 
-            try:
-                logger.info(f"Routing query to {model_name}")
-                response = model.generate_response(message, context)
-                if response:
-                    logger.info(f"Successfully got response from {model_name}")
-                    return f"[{model_name}] {response}"
-            except Exception as e:
-                logger.error(f"Error with {model_name}: {e}")
-                continue
+                hedging = self.hedge_delay is not None and bool(waiting)
+                timeout = self.hedge_delay if hedging else (deadline.remaining() if deadline is not None else None)
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if hedging:
+                        start_next = True  # still no answer: race the next model
+                        continue
+                    break  # deadline passed
+                for task in done:
+                    model_name = running.pop(task)
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        logger.error(f"Error with {model_name}: {e}")
+                        response = None
+                    if response:
+                        logger.info("Successfully got response from %s", model_name)
+                        if context is not None:
+                            context["answered_by"] = model_name
+                        return f"[{model_name}] {response}"
+                    start_next = True
+        finally:
+            for task in running:
+                task.cancel()
         
         # All models failed
         logger.error("All AI models failed to respond")
-        return "I apologize, but I'm having trouble connecting to my AI services right now. Please try again in a moment."
+        return ALL_MODELS_FAILED_REPLY
+    
+    def route_query(self, message: str, context: Dict[str, Any],
+                    deadline: Optional[Deadline] = None) -> Optional[str]:
+        """aroute_query() for sync callers (the cascade's cloud tier, generate_response)"""
+        timeout = deadline.remaining() + SYNC_GRACE_SECONDS if deadline is not None else None
+        try:
+            return run_sync(self.aroute_query(message, context, deadline), timeout)
+        except TimeoutError:
+            logger.error("All AI models failed to respond")
+            return ALL_MODELS_FAILED_REPLY
     
-    def generate_response(self, message: str, context: Dict[str, Any]) -> str:
+    def generate_response(self, message: str, context: Dict[str, Any],
+                          deadline: Optional[Deadline] = None) -> str:
         """
         Main entry point for generating AI responses
         """
         try:
-            return self.route_query(message, context)
+            return self.route_query(message, context, deadline)
         except Exception as e:
             logger.error(f"Error in AI router: {e}")
             return "I encountered an error processing your request. Please try rephrasing your question."
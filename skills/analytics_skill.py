@@ -1,15 +1,21 @@
 """Analytics Skill Module
 
 Handles queries related to Google Analytics, Google Sheets, and MyOperator stats.
-Provides friendly responses about potential live integrations.
+Provides friendly responses about potential live integrations. Google Sheets
+queries are answered from a synced local copy when SHEETS_SPREADSHEET_ID is
+set (see skills/sheets_sync.py); a report that is not ready yet is queued as
+a background job and the reply gives its id.
 """
 
-def analytics_skill(query):
+import os
+
+def analytics_skill(query, deadline=None):
     """
     Process analytics-related queries and return appropriate responses.
     
     Args:
         query (str): The user query string
+        deadline (Deadline, optional): Request budget for live data sources
         
     Returns:
         str: Response message with information about analytics integration
@@ -22,7 +28,7 @@ def analytics_skill(query):
     
     # Google Sheets queries
     elif 'google sheets' in query_lower:
-        return handle_google_sheets(query)
+        return handle_google_sheets(query, deadline)
     
     # MyOperator stats queries
     elif 'myoperator' in query_lower:
@@ -57,17 +63,24 @@ def handle_google_analytics(query):
     )
 
 
-def handle_google_sheets(query):
+def handle_google_sheets(query, deadline=None):
     """
     Handle Google Sheets related queries.
     
     Args:
         query (str): The user query
+        deadline (Deadline, optional): Request budget for syncing the sheet
         
     Returns:
         str: Friendly response about Google Sheets integration
     """
-    # Stub API call - would connect to Google Sheets API in production
+    spreadsheet_id = os.environ.get("SHEETS_SPREADSHEET_ID")
+    if spreadsheet_id:
+        reply = sheet_report_reply(spreadsheet_id, os.environ.get("SHEETS_SHEET", "Sheet1"), deadline)
+        if reply:
+            return reply
+
+    # Stub API call - used until a spreadsheet is configured
     sheets_data = stub_google_sheets_api()
     
     return (
@@ -82,6 +95,38 @@ def handle_google_sheets(query):
     )
 
 
+def sheet_report_reply(spreadsheet_id, sheet, deadline=None):
+    """
+    Summarise report_skill's analysis of the synced copy of a sheet.
+
+    /chat only ever passes SHEETS_SPREADSHEET_ID here, so that is the one
+    spreadsheet an unauthenticated caller can make this server read or
+    queue report jobs for.
+
+    Args:
+        spreadsheet_id (str): The spreadsheet's id
+        sheet (str): The sheet (tab) title
+        deadline (Deadline, optional): Request budget for syncing the sheet
+
+    Returns:
+        str: Short report, a note naming the job that is computing it, or
+        None when there is nothing to report
+    """
+    from skills.sheets_sync import default_sync
+    report, job_id = default_sync().chat_report(spreadsheet_id, sheet, deadline)
+    if job_id is not None:
+        return f"📈 The {sheet} report is being prepared (job {job_id}). Ask again in a minute, or follow /jobs/{job_id}."
+    if report is None or 'error' in report['summary']:
+        return None
+    summary = report['summary']
+    lines = [
+        f"📈 {sheet}: {summary['total_rows']} rows × {summary['total_columns']} columns "
+        f"({summary['numeric_column_count']} numeric, {summary['total_missing_values']} missing values)."
+    ]
+    lines.extend(f"• {r}" for r in report['recommendations'][:3])
+    return "\n".join(lines)
+
+
 def handle_myoperator_stats(query):
     """
     Handle MyOperator statistics queries.
@@ -1,35 +1,55 @@
 """ChatGPT Integration Skill for Agent Vish
 
 Provides OpenAI GPT integration for intelligent conversational responses.
+Each process makes one AsyncOpenAI client on first use and keeps it, so
+calls reuse its connection pool.
 """
 
 import os
 import logging
-from typing import Optional, List, Dict
+import importlib.util
+from typing import Any, AsyncIterator, Optional, List, Dict
 
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
+from runtime.deadline import Deadline, MIN_USEFUL_TIMEOUT, timeout_for
+from runtime.http_pool import sdk_http_client
+from runtime.output_profile import OutputProfile
+from skills.doc_index import default_doc_index, doc_context
+from skills.provider import generate_sync
 
 logger = logging.getLogger(__name__)
 
 
+def _load_openai():
+    """Import the OpenAI SDK on first use; it is slow to import and most
+    messages never reach ChatGPT."""
+    try:
+        from openai import AsyncOpenAI
+    except ImportError:
+        return None
+    return AsyncOpenAI
+
+
 class ChatGPTSkill:
     """Skill for querying OpenAI ChatGPT models"""
     
+    name = "chatgpt"
+    
     def __init__(self):
         """Initialize ChatGPT skill with API key"""
-        if OpenAI is None:
+        self._client_class = _load_openai()
+        if self._client_class is None:
             raise ImportError("openai package not installed. Run: pip install openai")
         
         api_key = os.environ.get("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
         
-        self.client = OpenAI(api_key=api_key)
+        self.api_key = api_key
+        self.base_url = os.environ.get("OPENAI_BASE_URL")  # None: the SDK default
+        self._clients: Dict[int, Any] = {}  # pid -> AsyncOpenAI
         self.model = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
         self.system_prompt = self._get_system_prompt()
+        self.doc_index = default_doc_index()
         logger.info(f"ChatGPT skill initialized with model: {self.model}")
     
     def _get_system_prompt(self) -> str:
@@ -49,8 +69,91 @@ Critical Rules:
 - Suggest contacting MyOperator support for account-specific issues
 """
     
+    def _build_messages(self, user_message: str, context: Optional[List[Dict]] = None,
+                        profile: Optional[OutputProfile] = None) -> List[Dict]:
+        """System prompt, relevant doc chunks, recent history and the message"""
+        messages = [{"role": "system", "content": self.system_prompt}]
+        if profile is not None and profile.instruction:
+            messages.append({"role": "system", "content": profile.instruction})
+        
+        docs = doc_context(user_message, self.doc_index)
+        if docs:
+            messages.append({"role": "system", "content": docs})
+        
+        # Add conversation context if provided
+        if context:
+            messages.extend(context[-5:])  # Last 5 messages for context
+        
+        # Add current user message
+        messages.append({"role": "user", "content": user_message})
+        return messages
+    
+    def _client(self):
+        """This process's AsyncOpenAI client"""
+        pid = os.getpid()
+        client = self._clients.get(pid)
+        if client is None:
+            # No SDK retries: a retry would overrun the request deadline
+            client = self._client_class(api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                                        http_client=sdk_http_client())
+            self._clients = {pid: client}
+        return client
+    
+    async def _complete(self, user_message: str, context: Optional[List[Dict]], deadline: Optional[Deadline],
+                        profile: Optional[OutputProfile] = None, temperature: float = 0.7,
+                        max_tokens: int = 500, stream: bool = False):
+        timeout = timeout_for(deadline, 30)
+        if timeout < MIN_USEFUL_TIMEOUT:
+            logger.warning("ChatGPT skipped: request deadline already spent")
+            return None
+        options = {}
+        if profile is not None:
+            max_tokens = profile.max_tokens
+            if profile.stop:
+                options["stop"] = list(profile.stop[:4])  # the API takes up to four
+        logger.info(f"Querying ChatGPT: {user_message[:50]}...")
+        return await self._client().with_options(timeout=timeout).chat.completions.create(
+            model=self.model,
+            messages=self._build_messages(user_message, context, profile),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            n=1,
+            stream=stream,
+            **options
+        )
+    
+    async def agenerate(self, message: str, history: Optional[List[Dict]] = None,
+                        deadline: Optional[Deadline] = None, profile: Optional[OutputProfile] = None,
+                        temperature: float = 0.7, max_tokens: int = 500) -> Optional[str]:
+        """Provider.agenerate: the answer, or None on timeout or API error"""
+        try:
+            response = await self._complete(message, history, deadline, profile, temperature, max_tokens)
+        except Exception as e:
+            logger.error(f"ChatGPT query failed: {e}")
+            return None
+        if response is None:
+            return None
+        answer = response.choices[0].message.content
+        logger.info(f"ChatGPT response: {(answer or '')[:50]}...")
+        return answer
+    
+    async def astream(self, message: str, history: Optional[List[Dict]] = None,
+                      deadline: Optional[Deadline] = None,
+                      profile: Optional[OutputProfile] = None) -> AsyncIterator[str]:
+        """Provider.astream: answer pieces as the API streams them"""
+        chunks = await self._complete(message, history, deadline, profile, stream=True)
+        if chunks is None:
+            return
+        try:
+            async for chunk in chunks:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await chunks.close()
+    
     def query(self, user_message: str, context: Optional[List[Dict]] = None, 
-             temperature: float = 0.7, max_tokens: int = 500) -> str:
+             temperature: float = 0.7, max_tokens: int = 500,
+             deadline: Optional[Deadline] = None) -> str:
         """Query ChatGPT with user message and optional context
         
         Args:
@@ -58,44 +161,20 @@ Critical Rules:
             context: Optional conversation history [{"role": "user/assistant", "content": "..."}]
             temperature: Controls randomness (0.0-1.0). Lower = more focused
             max_tokens: Maximum response length
+            deadline: Request deadline; the call gets only the time left on it
             
         Returns:
             AI-generated response string
         """
-        try:
-            messages = [{"role": "system", "content": self.system_prompt}]
-            
-            # Add conversation context if provided
-            if context:
-                messages.extend(context[-5:])  # Last 5 messages for context
-            
-            # Add current user message
-            messages.append({"role": "user", "content": user_message})
-            
-            logger.info(f"Querying ChatGPT: {user_message[:50]}...")
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                n=1
-            )
-            
-            answer = response.choices[0].message.content
-            logger.info(f"ChatGPT response: {answer[:50]}...")
-            
-            return answer
-            
-        except Exception as e:
-            logger.error(f"ChatGPT query failed: {e}")
-            return f"I'm having trouble processing that right now. Please try again or contact support."
+        answer = generate_sync(self, user_message, context, deadline,
+                               temperature=temperature, max_tokens=max_tokens)
+        return answer or "I'm having trouble processing that right now. Please try again or contact support."
     
     def is_available(self) -> bool:
         """Check if ChatGPT service is available"""
         try:
             api_key = os.environ.get("OPENAI_API_KEY")
-            return bool(api_key and OpenAI)
+            return bool(api_key and importlib.util.find_spec("openai"))
         except:
             return False
 
@@ -1,5 +1,6 @@
-import pandas as pd
-import numpy as np
+from functools import lru_cache
+
+from runtime import profiler
 
 def greet_skill(user_input):
     """
@@ -14,31 +15,31 @@ def greet_skill(user_input):
     
     return None
 
+@lru_cache(maxsize=1)
+def _faq_engine():
+    # Deferred: indexing data/faq.jsonl needs numpy, which greet_skill doesn't
+    from skills.faq_engine import load_faq
+    return load_faq()
+
 def faq_skill(user_input):
     """
-    FAQ skill - responds to frequently asked questions
+    FAQ skill - responds to frequently asked questions from data/faq.jsonl
+    (BM25 over the questions, typo tolerant; see skills/faq_engine.py)
     """
-    faqs = {
-        'what is your name': 'I am Agent Vish, your virtual assistant.',
-        'what can you do': 'I can help you with greetings, answer FAQs, and assist with various tasks.',
-        'how are you': 'I am doing great! Thank you for asking. How can I assist you?',
-        'who created you': 'I was created by Vishal Anand.'
-    }
-    
-    user_input_lower = user_input.lower().strip()
-    
-    for question, answer in faqs.items():
-        if question in user_input_lower:
-            return answer
-    
-    return None
+    engine = _faq_engine()
+    if engine is None or not user_input:
+        return None
+    match = engine.lookup(user_input)
+    return match.answer if match else None
 
 def report_skill(df):
     """
     Report analysis skill - processes CSV/Excel data and generates summary with recommendations.
     
     Args:
-        df (pandas.DataFrame): Input dataframe containing the report data
+        df (pandas.DataFrame): Input dataframe containing the report data.
+            pandas is only needed by the caller building df, so importing this
+            module stays cheap for the greeting/FAQ skills.
     
     Returns:
         dict: Dictionary containing 'summary' and 'recommendations' keys with analysis results
@@ -50,64 +51,69 @@ def report_skill(df):
             'recommendations': []
         }
         
-        # Basic dataset information
-        result['summary']['total_rows'] = len(df)
-        result['summary']['total_columns'] = len(df.columns)
-        result['summary']['columns'] = list(df.columns)
-        result['summary']['column_types'] = df.dtypes.astype(str).to_dict()
+        with profiler.phase("report:overview"):
+            # Basic dataset information
+            result['summary']['total_rows'] = len(df)
+            result['summary']['total_columns'] = len(df.columns)
+            result['summary']['columns'] = list(df.columns)
+            result['summary']['column_types'] = df.dtypes.astype(str).to_dict()
         
-        # Missing value analysis
-        missing_values = df.isnull().sum().to_dict()
-        result['summary']['missing_values'] = missing_values
-        total_missing = sum(missing_values.values())
-        result['summary']['total_missing_values'] = total_missing
+            # Missing value analysis
+            missing_values = df.isnull().sum().to_dict()
+            result['summary']['missing_values'] = missing_values
+            total_missing = sum(missing_values.values())
+            result['summary']['total_missing_values'] = total_missing
         
-        # Memory usage
-        result['summary']['memory_usage_mb'] = round(df.memory_usage(deep=True).sum() / 1024 / 1024, 2)
+            # Memory usage
+            result['summary']['memory_usage_mb'] = round(df.memory_usage(deep=True).sum() / 1024 / 1024, 2)
         
-        # Numeric columns analysis
-        numeric_columns = df.select_dtypes(include=['number']).columns.tolist()
-        result['summary']['numeric_columns'] = numeric_columns
-        result['summary']['numeric_column_count'] = len(numeric_columns)
+        with profiler.phase("report:numeric"):
+            # Numeric columns analysis
+            numeric_columns = df.select_dtypes(include=['number']).columns.tolist()
+            result['summary']['numeric_columns'] = numeric_columns
+            result['summary']['numeric_column_count'] = len(numeric_columns)
         
-        if len(numeric_columns) > 0:
-            # Statistical summary for numeric columns
-            stats = df[numeric_columns].describe().to_dict()
-            result['summary']['statistics'] = stats
+            if len(numeric_columns) > 0:
+                # Statistical summary for numeric columns
+                stats = df[numeric_columns].describe().to_dict()
+                result['summary']['statistics'] = stats
             
-            # Correlation analysis
-            if len(numeric_columns) > 1:
-                correlation_matrix = df[numeric_columns].corr()
-                # Find strong correlations (>0.7 or <-0.7)
-                strong_correlations = []
-                for i in range(len(correlation_matrix.columns)):
-                    for j in range(i+1, len(correlation_matrix.columns)):
-                        corr_value = correlation_matrix.iloc[i, j]
-                        if abs(corr_value) > 0.7:
-                            strong_correlations.append({
-                                'column1': correlation_matrix.columns[i],
-                                'column2': correlation_matrix.columns[j],
-                                'correlation': round(corr_value, 3)
-                            })
-                result['summary']['strong_correlations'] = strong_correlations
+                # Correlation analysis
+                if len(numeric_columns) > 1:
+                    correlation_matrix = df[numeric_columns].corr()
+                    # Find strong correlations (>0.7 or <-0.7)
+                    strong_correlations = []
+                    for i in range(len(correlation_matrix.columns)):
+                        for j in range(i+1, len(correlation_matrix.columns)):
+                            corr_value = correlation_matrix.iloc[i, j]
+                            if abs(corr_value) > 0.7:
+                                strong_correlations.append({
+                                    'column1': correlation_matrix.columns[i],
+                                    'column2': correlation_matrix.columns[j],
+                                    'correlation': round(corr_value, 3)
+                                })
+                    result['summary']['strong_correlations'] = strong_correlations
         
-        # Categorical columns analysis
-        categorical_columns = df.select_dtypes(include=['object', 'category']).columns.tolist()
-        result['summary']['categorical_columns'] = categorical_columns
-        result['summary']['categorical_column_count'] = len(categorical_columns)
+        with profiler.phase("report:categorical"):
+            # Categorical columns analysis
+            categorical_columns = df.select_dtypes(include=['object', 'category']).columns.tolist()
+            result['summary']['categorical_columns'] = categorical_columns
+            result['summary']['categorical_column_count'] = len(categorical_columns)
         
-        if len(categorical_columns) > 0:
-            # Unique value counts for categorical columns
-            unique_counts = {col: df[col].nunique() for col in categorical_columns}
-            result['summary']['unique_value_counts'] = unique_counts
+            if len(categorical_columns) > 0:
+                # Unique value counts for categorical columns
+                unique_counts = {col: df[col].nunique() for col in categorical_columns}
+                result['summary']['unique_value_counts'] = unique_counts
         
-        # Duplicate rows analysis
-        duplicate_count = df.duplicated().sum()
-        result['summary']['duplicate_rows'] = duplicate_count
+        with profiler.phase("report:duplicates"):
+            # Duplicate rows analysis
+            duplicate_count = df.duplicated().sum()
+            result['summary']['duplicate_rows'] = duplicate_count
         
-        # Generate recommendations based on analysis
-        recommendations = generate_recommendations(df, result['summary'])
-        result['recommendations'] = recommendations
+        with profiler.phase("report:recommendations"):
+            # Generate recommendations based on analysis
+            recommendations = generate_recommendations(df, result['summary'])
+            result['recommendations'] = recommendations
         
         return result
         
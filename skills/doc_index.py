@@ -0,0 +1,386 @@
+"""Document Retrieval for Agent Vish
+
+A local retrieval index over a folder of MyOperator docs (data/docs, or
+DOCS_PATH). Documents are split into heading-aware chunks of a few hundred
+words, embedded on the CPU with a signed feature-hashing embedding (words,
+word bigrams and character trigrams; no model download), and searched by
+brute-force cosine similarity in NumPy. Corpora past `ivf_min_chunks` chunks
+get an IVF partition (spherical k-means) so a query only scans the chunks
+of its nearest few clusters.
+
+sync() re-indexes only files whose content changed, and with DOC_INDEX_CACHE
+set the index is kept on disk so a restart embeds nothing that is unchanged.
+`python -m runtime.artifacts build` prebuilds the index into a file workers
+map read-only; sync() then re-embeds only documents changed since the build.
+The provider skills put the top-k chunks, and only those, into their prompts.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from runtime.artifacts import Artifact, load_artifact, source_key, write_artifact
+from skills.intent_classifier import DATA_DIR, TOKEN_PATTERN, word_features
+
+logger = logging.getLogger(__name__)
+
+DOCS_DIR = os.path.join(DATA_DIR, "docs")
+DOC_EXTENSIONS = (".md", ".txt")
+
+# Chunks scoring below this are not worth the prompt space
+DEFAULT_MIN_SCORE = 0.15
+
+# Too common to say anything about relevance
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or "
+    "our so that the this to we what when where which who why will with you your".split()
+)
+
+HEADING_PATTERN = re.compile(r"^#{1,6}\s+(.*)$")
+
+# Bump when what to_artifact() writes changes, so older artifact files are ignored
+ARTIFACT_VERSION = 1
+
+
+class Chunk(NamedTuple):
+    source: str   # path relative to the docs folder
+    heading: str
+    text: str
+
+
+def chunk_document(text: str, max_words: int = 120, overlap: int = 30) -> List[Tuple[str, str]]:
+    """Split a markdown/plain-text document into (heading, text) chunks.
+
+    Paragraphs under the same heading are packed together up to max_words;
+    a longer paragraph is cut into windows of max_words that overlap by
+    `overlap` words so no sentence loses all of its context.
+    """
+    sections: List[Tuple[str, List[str]]] = [("", [])]
+    paragraph: List[str] = []
+
+    def end_paragraph():
+        if paragraph:
+            sections[-1][1].append(" ".join(paragraph))
+            paragraph.clear()
+
+    for line in text.splitlines():
+        heading = HEADING_PATTERN.match(line.strip())
+        if heading:
+            end_paragraph()
+            sections.append((heading.group(1).strip(), []))
+        elif line.strip():
+            paragraph.append(line.strip())
+        else:
+            end_paragraph()
+    end_paragraph()
+
+    chunks = []
+    step = max(1, max_words - overlap)
+    for heading, paragraphs in sections:
+        packed: List[str] = []
+        for para in paragraphs:
+            words = para.split()
+            if len(packed) + len(words) > max_words and packed:
+                chunks.append((heading, " ".join(packed)))
+                packed = []
+            if len(words) <= max_words:
+                packed.extend(words)
+                continue
+            for start in range(0, len(words), step):
+                chunks.append((heading, " ".join(words[start:start + max_words])))
+                if start + max_words >= len(words):
+                    break
+        if packed:
+            chunks.append((heading, " ".join(packed)))
+    return chunks
+
+
+class HashingEmbedder:
+    """Dense text embedding by signed feature hashing; deterministic across
+    processes, so cached vectors stay valid"""
+
+    def __init__(self, dim: int = 512):
+        if dim & (dim - 1):
+            raise ValueError("dim must be a power of two")
+        self.dim = dim
+        self._word_cache: Dict[str, List[Tuple[int, float]]] = {}
+
+    def _word_slots(self, word: str) -> List[Tuple[int, float]]:
+        slots = self._word_cache.get(word)
+        if slots is None:
+            slots = []
+            for i, feature in enumerate(word_features(word)):
+                h = zlib.crc32(feature.encode())
+                # The word itself counts fully, each of its trigrams a little
+                weight = 1.0 if i == 0 else 0.3
+                slots.append((h & (self.dim - 1), weight if h & 0x80000000 else -weight))
+            if len(self._word_cache) < 100000:
+                self._word_cache[word] = slots
+        return slots
+
+    def embed_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = [w for w in TOKEN_PATTERN.findall(text.lower()) if w not in STOPWORDS]
+        for word in words:
+            for slot, value in self._word_slots(word):
+                vector[slot] += value
+        for first, second in zip(words, words[1:]):
+            h = zlib.crc32(f"{first} {second}".encode())
+            vector[h & (self.dim - 1)] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.sqrt(vector @ vector)
+        return vector / norm if norm > 0 else vector
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            matrix[i] = self.embed_one(text)
+        return matrix
+
+
+class DocIndex:
+    """Chunk vectors plus metadata, searched brute force or through IVF"""
+
+    def __init__(self, embedder: Optional[HashingEmbedder] = None, max_words: int = 120,
+                 overlap: int = 30, ivf_min_chunks: int = 20000, nprobe: int = 8):
+        """
+        Args:
+            embedder: Text embedder (default: HashingEmbedder())
+            max_words: Chunk size in words
+            overlap: Words shared by consecutive windows of a long paragraph
+            ivf_min_chunks: Build the IVF partition once the index is this large
+            nprobe: IVF clusters scanned per query
+        """
+        self.embedder = embedder or HashingEmbedder()
+        self.max_words = max_words
+        self.overlap = overlap
+        self.ivf_min_chunks = ivf_min_chunks
+        self.nprobe = nprobe
+
+        self.chunks: List[Chunk] = []
+        self.vectors = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self.files: Dict[str, str] = {}  # source -> content digest
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments: Optional[np.ndarray] = None
+
+    # -- building -----------------------------------------------------------
+
+    def add_document(self, source: str, text: str):
+        """Index (or re-index) one document"""
+        if source in self.files:
+            self.remove_document(source)
+        pieces = chunk_document(text, self.max_words, self.overlap)
+        self.files[source] = hashlib.sha1(text.encode()).hexdigest()
+        if not pieces:
+            return
+        vectors = self.embedder.embed([f"{heading} {body}" for heading, body in pieces])
+        self.chunks.extend(Chunk(source, heading, body) for heading, body in pieces)
+        self.vectors = np.vstack([self.vectors, vectors])
+        if self.centroids is not None:
+            self.assignments = np.concatenate([self.assignments, self._nearest_cluster(vectors)])
+        elif len(self.chunks) >= self.ivf_min_chunks:
+            self.build_ivf()
+
+    def remove_document(self, source: str):
+        self.files.pop(source, None)
+        keep = np.fromiter((c.source != source for c in self.chunks), dtype=bool, count=len(self.chunks))
+        if keep.all():
+            return
+        self.chunks = [c for c, k in zip(self.chunks, keep) if k]
+        self.vectors = self.vectors[keep]
+        if self.assignments is not None:
+            self.assignments = self.assignments[keep]
+
+    def sync(self, root: str) -> Dict[str, int]:
+        """Bring the index in line with the files under root, re-embedding only
+        documents whose content changed"""
+        seen = set()
+        added = updated = 0
+        for source, path in doc_files(root):
+            seen.add(source)
+            with open(path, encoding="utf-8", errors="replace") as f:
+                text = f.read()
+            digest = hashlib.sha1(text.encode()).hexdigest()
+            if self.files.get(source) == digest:
+                continue
+            updated += source in self.files
+            added += source not in self.files
+            self.add_document(source, text)
+        removed = [source for source in self.files if source not in seen]
+        for source in removed:
+            self.remove_document(source)
+        return {"added": added, "updated": updated, "removed": len(removed), "chunks": len(self.chunks)}
+
+    def build_ivf(self, nlist: Optional[int] = None, iterations: int = 10, seed: int = 0):
+        """Partition the chunk vectors with spherical k-means (default: sqrt(n) clusters)"""
+        n = len(self.chunks)
+        nlist = min(n, nlist or max(1, int(np.sqrt(n))))
+        if nlist == 0:
+            return
+        rng = np.random.default_rng(seed)
+        centroids = self.vectors[rng.choice(n, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = (self.vectors @ centroids.T).argmax(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, self.vectors)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            nonempty = norms[:, 0] > 0
+            centroids[nonempty] = sums[nonempty] / norms[nonempty]
+        self.centroids = centroids
+        self.assignments = (self.vectors @ centroids.T).argmax(axis=1)
+
+    def _nearest_cluster(self, vectors: np.ndarray) -> np.ndarray:
+        return (vectors @ self.centroids.T).argmax(axis=1)
+
+    # -- querying -----------------------------------------------------------
+
+    def search(self, query: str, k: int = 3, min_score: float = 0.0) -> List[Tuple[Chunk, float]]:
+        """Top-k chunks by cosine similarity, best first"""
+        if not self.chunks or k <= 0:
+            return []
+        q = self.embedder.embed_one(query)
+        if self.centroids is not None:
+            nprobe = min(self.nprobe, len(self.centroids))
+            probe = np.argpartition(-(self.centroids @ q), nprobe - 1)[:nprobe]
+            candidates = np.flatnonzero(np.isin(self.assignments, probe))
+            scores = self.vectors[candidates] @ q
+        else:
+            candidates = None
+            scores = self.vectors @ q
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        ids = top if candidates is None else candidates[top]
+        return [(self.chunks[i], float(scores[t])) for i, t in zip(ids, top) if scores[t] >= min_score]
+
+    def context_for(self, query: str, k: int = 3, min_score: float = DEFAULT_MIN_SCORE) -> str:
+        """Prompt section with the top-k relevant chunks, or "" when none is relevant"""
+        hits = self.search(query, k, min_score)
+        if not hits:
+            return ""
+        lines = ["Relevant MyOperator documentation (prefer it over general knowledge):"]
+        for chunk, _ in hits:
+            label = f"{chunk.source} > {chunk.heading}" if chunk.heading else chunk.source
+            lines.append(f"[{label}] {chunk.text}")
+        return "\n".join(lines)
+
+    # -- persistence --------------------------------------------------------
+
+    def to_artifact(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """Arrays and metadata for runtime.artifacts.write_artifact"""
+        arrays = {"vectors": self.vectors}
+        if self.centroids is not None:
+            arrays.update(centroids=self.centroids, assignments=self.assignments)
+        meta = {"dim": self.embedder.dim, "max_words": self.max_words, "overlap": self.overlap,
+                "files": self.files, "chunks": [list(c) for c in self.chunks]}
+        return arrays, meta
+
+    @classmethod
+    def from_artifact(cls, artifact: Artifact, **kwargs) -> "DocIndex":
+        """An index whose vectors are the artifact's read-only mapping (changes copy them)"""
+        meta = artifact.meta
+        kwargs.update(max_words=meta["max_words"], overlap=meta["overlap"])
+        index = cls(embedder=HashingEmbedder(meta["dim"]), **kwargs)
+        index.vectors = artifact.arrays["vectors"]
+        index.centroids = artifact.arrays.get("centroids")
+        index.assignments = artifact.arrays.get("assignments")
+        index.files = meta["files"]
+        index.chunks = [Chunk(*c) for c in meta["chunks"]]
+        return index
+
+    def save(self, path: str):
+        meta = {
+            "dim": self.embedder.dim, "max_words": self.max_words, "overlap": self.overlap,
+            "files": self.files, "chunks": [list(c) for c in self.chunks],
+        }
+        arrays = {"vectors": self.vectors, "meta": np.array(json.dumps(meta))}
+        if self.centroids is not None:
+            arrays.update(centroids=self.centroids, assignments=self.assignments)
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "DocIndex":
+        """Index saved by save(); chunking settings come from the file"""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            kwargs.update(max_words=meta["max_words"], overlap=meta["overlap"])
+            index = cls(embedder=HashingEmbedder(meta["dim"]), **kwargs)
+            index.vectors = data["vectors"]
+            if "centroids" in data:
+                index.centroids = data["centroids"]
+                index.assignments = data["assignments"]
+        index.files = meta["files"]
+        index.chunks = [Chunk(*c) for c in meta["chunks"]]
+        return index
+
+
+def doc_files(root: str) -> Iterator[Tuple[str, str]]:
+    """(source relative to root, path) of every indexable document under root"""
+    for folder, _, names in os.walk(root):
+        for name in sorted(names):
+            if name.endswith(DOC_EXTENSIONS) and not name.upper().startswith("README"):
+                path = os.path.join(folder, name)
+                yield os.path.relpath(path, root), path
+
+
+@lru_cache(maxsize=1)
+def default_doc_index() -> Optional[DocIndex]:
+    """The process-wide index over DOCS_PATH (default data/docs), or None when
+    there are no docs. Starts from the prebuilt "docs" artifact when it was
+    built from the same folder, else from DOC_INDEX_CACHE, an .npz file kept
+    in sync across restarts."""
+    root = os.environ.get("DOCS_PATH", DOCS_DIR)
+    cache = os.environ.get("DOC_INDEX_CACHE")
+    if not os.path.isdir(root):
+        return None
+    index = None
+    # Documents changed since the build are reconciled by sync() below
+    artifact = load_artifact("docs", ARTIFACT_VERSION)
+    mapped = artifact is not None and artifact.meta.get("root") == source_key(root)
+    if mapped:
+        index = DocIndex.from_artifact(artifact)
+        cache = None
+    elif cache and os.path.exists(cache):
+        try:
+            index = DocIndex.load(cache)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable doc index cache {cache}: {e}")
+    index = index or DocIndex()
+    try:
+        changes = index.sync(root)
+    except OSError as e:
+        logger.warning(f"Doc index unavailable ({root}): {e}")
+        return None
+    logger.info(f"Doc index: {changes}")
+    if mapped and (changes["added"] or changes["updated"] or changes["removed"]):
+        logger.warning("Docs changed since the docs artifact was built; run `python -m runtime.artifacts build docs`")
+    if cache and (changes["added"] or changes["updated"] or changes["removed"]):
+        index.save(cache)
+    return index if index.chunks else None
+
+
+def build_doc_artifact(directory: Optional[str] = None) -> Dict[str, Any]:
+    """Index DOCS_PATH (default data/docs) and write the "docs" artifact"""
+    root = os.environ.get("DOCS_PATH", DOCS_DIR)
+    index = DocIndex()
+    index.sync(root)
+    arrays, meta = index.to_artifact()
+    meta["root"] = source_key(root)
+    return write_artifact("docs", ARTIFACT_VERSION, arrays, meta, [path for _, path in doc_files(root)], directory)
+
+
+def doc_context(query: str, index: Optional[DocIndex]) -> str:
+    """Prompt section for query from index (top DOCS_TOP_K chunks, default 3)"""
+    if index is None:
+        return ""
+    return index.context_for(query, k=int(os.environ.get("DOCS_TOP_K", 3)))
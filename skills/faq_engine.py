@@ -0,0 +1,256 @@
+"""FAQ Engine for Agent Vish
+
+Answers frequently asked questions locally so they never reach a paid LLM.
+Questions (and their alternate phrasings) from data/faq.jsonl are indexed in
+an inverted index with precomputed BM25 weights; a lookup only touches the
+posting lists of the query's words, so it stays fast with thousands of
+entries. Misspelt words are matched to indexed words one edit away through a
+symmetric-delete table.
+
+Confidence combines two shares: how much of the best question's own BM25
+score the message reproduces, and how much of the message's IDF weight the
+question accounts for. A message that is the question scores 1.0; one that
+shares only "what is" with it, or buries one matching word in a longer
+request, scores low.
+
+`python -m runtime.artifacts build` writes the index (postings as flat
+arrays) to a file workers map instead of indexing data/faq.jsonl themselves.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from runtime.artifacts import Artifact, load_artifact, write_artifact
+from skills.intent_classifier import DATA_DIR, TOKEN_PATTERN
+
+logger = logging.getLogger(__name__)
+
+# Minimum confidence for lookup() to answer
+DEFAULT_THRESHOLD = 0.6
+
+# Words shorter than this are never fuzzy-matched; too many collide
+MIN_FUZZY_LENGTH = 4
+# Score multiplier for a word matched one edit away
+FUZZY_WEIGHT = 0.8
+
+# Bump when what to_artifact() writes changes, so older artifact files are ignored
+ARTIFACT_VERSION = 1
+
+
+class FAQMatch(NamedTuple):
+    answer: str
+    question: str
+    confidence: float
+
+
+def _deletes(word: str) -> Set[str]:
+    """All strings one deletion away from word"""
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class FAQEngine:
+    """BM25 over an inverted index of FAQ questions, with fuzzy word matching"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, threshold: float = DEFAULT_THRESHOLD):
+        """
+        Args:
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalisation
+            threshold: Minimum confidence for lookup() to return a match
+        """
+        self.k1 = k1
+        self.b = b
+        self.threshold = threshold
+        self.answers: List[str] = []
+        self.questions: List[str] = []      # one per indexed document
+        self.answer_of: List[int] = []      # document -> index into answers
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._deleted: Dict[str, List[str]] = {}  # one-deletion variant -> indexed words
+        self._self_scores: Optional[np.ndarray] = None
+        self._idf: Dict[str, float] = {}
+        self._max_idf = 0.0
+        self._counters = {"lookups": 0, "answered": 0}
+        self._counters_lock = threading.Lock()
+
+    @classmethod
+    def from_jsonl(cls, path: str, **kwargs) -> "FAQEngine":
+        """Build from rows of {"question", "answer", "alternates": [...]}"""
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    entries.append(([row["question"]] + row.get("alternates", []), row["answer"]))
+        return cls(**kwargs).build(entries)
+
+    def build(self, entries: Iterable[Tuple[List[str], str]]) -> "FAQEngine":
+        """Index (questions, answer) pairs; every phrasing becomes its own document"""
+        self.answers, self.questions, self.answer_of = [], [], []
+        docs: List[List[str]] = []
+        for questions, answer in entries:
+            self.answers.append(answer)
+            for question in questions:
+                self.questions.append(question)
+                self.answer_of.append(len(self.answers) - 1)
+                docs.append(TOKEN_PATTERN.findall(question.lower()))
+        if not docs:
+            raise ValueError("no FAQ entries to index")
+
+        n_docs = len(docs)
+        lengths = np.array([len(d) for d in docs], dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * lengths / max(lengths.mean(), 1.0))
+
+        raw: Dict[str, Tuple[List[int], List[int]]] = {}
+        for doc_id, words in enumerate(docs):
+            counts: Dict[str, int] = {}
+            for word in words:
+                counts[word] = counts.get(word, 0) + 1
+            for word, tf in counts.items():
+                ids, tfs = raw.setdefault(word, ([], []))
+                ids.append(doc_id)
+                tfs.append(tf)
+
+        # Document-side BM25 is query independent, so each posting stores its
+        # final weight and a lookup is just gathers and adds
+        self._postings = {}
+        self._idf = {}
+        self._max_idf = float(np.log(1.0 + (n_docs - 0.5) / 1.5))  # a word in one document
+        self._self_scores = np.zeros(n_docs, dtype=np.float32)
+        for word, (ids, tfs) in raw.items():
+            ids_arr = np.array(ids, dtype=np.intp)
+            tf = np.array(tfs, dtype=np.float32)
+            idf = np.log(1.0 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            weights = (idf * tf * (self.k1 + 1) / (tf + norm[ids_arr])).astype(np.float32)
+            self._postings[word] = (ids_arr, weights)
+            self._idf[word] = float(idf)
+            self._self_scores[ids_arr] += weights
+        self._index_deletes()
+        return self
+
+    def _index_deletes(self):
+        self._deleted = {}
+        for word in self._postings:
+            if len(word) >= MIN_FUZZY_LENGTH:
+                for variant in _deletes(word):
+                    self._deleted.setdefault(variant, []).append(word)
+
+    def to_artifact(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """The index as flat arrays (posting lists back to back) plus metadata"""
+        words = list(self._postings)
+        offsets = np.zeros(len(words) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(self._postings[word][0]) for word in words])
+        arrays = {
+            "offsets": offsets,
+            "ids": np.concatenate([self._postings[word][0] for word in words]).astype(np.int64),
+            "weights": np.concatenate([self._postings[word][1] for word in words]),
+            "idf": np.array([self._idf[word] for word in words], dtype=np.float64),
+            "self_scores": self._self_scores,
+        }
+        meta = {"words": words, "answers": self.answers, "questions": self.questions,
+                "answer_of": self.answer_of, "k1": self.k1, "b": self.b, "max_idf": self._max_idf}
+        return arrays, meta
+
+    @classmethod
+    def from_artifact(cls, artifact: Artifact, threshold: float = DEFAULT_THRESHOLD) -> "FAQEngine":
+        """An index whose posting lists are slices of the artifact's read-only mapping"""
+        meta, arrays = artifact.meta, artifact.arrays
+        engine = cls(k1=meta["k1"], b=meta["b"], threshold=threshold)
+        engine.answers, engine.questions, engine.answer_of = meta["answers"], meta["questions"], meta["answer_of"]
+        offsets = arrays["offsets"].tolist()
+        ids, weights = arrays["ids"].astype(np.intp, copy=False), arrays["weights"]
+        engine._postings = {word: (ids[offsets[i]:offsets[i + 1]], weights[offsets[i]:offsets[i + 1]])
+                            for i, word in enumerate(meta["words"])}
+        engine._idf = dict(zip(meta["words"], arrays["idf"].tolist()))
+        engine._max_idf = meta["max_idf"]
+        engine._self_scores = arrays["self_scores"]
+        engine._index_deletes()
+        return engine
+
+    def _expand(self, word: str) -> List[Tuple[str, float]]:
+        """Indexed words matching word, exactly or within one edit, with weights"""
+        if word in self._postings:
+            return [(word, 1.0)]
+        if len(word) < MIN_FUZZY_LENGTH:
+            return []
+        # Missing letter: word is a deletion of an indexed word
+        candidates = set(self._deleted.get(word, ()))
+        for variant in _deletes(word):
+            if variant in self._postings:  # extra letter
+                candidates.add(variant)
+            candidates.update(self._deleted.get(variant, ()))  # substituted or swapped
+        return [(c, FUZZY_WEIGHT) for c in candidates]
+
+    def best_match(self, text: str) -> Optional[FAQMatch]:
+        """Highest-scoring question for text, whatever its confidence"""
+        scores = np.zeros(len(self.questions), dtype=np.float32)
+        expanded = [self._expand(word) for word in set(TOKEN_PATTERN.findall(text.lower()))]
+        if not any(expanded):
+            return None
+        for matches in expanded:
+            for indexed, weight in matches:
+                ids, weights = self._postings[indexed]
+                scores[ids] += weights * weight
+        best = int(scores.argmax())
+
+        # How much of the question the message covers, and how much of the
+        # message the question explains (unknown words count at full IDF)
+        question_share = min(1.0, float(scores[best] / self._self_scores[best]))
+        explained = total = 0.0
+        for matches in expanded:
+            total += max((self._idf[w] * f for w, f in matches), default=self._max_idf)
+            explained += max((self._idf[w] * f for w, f in matches
+                              if self._contains(w, best)), default=0.0)
+        confidence = question_share * (explained / total) ** 0.5
+        return FAQMatch(self.answers[self.answer_of[best]], self.questions[best], confidence)
+
+    def _contains(self, word: str, doc_id: int) -> bool:
+        ids = self._postings[word][0]
+        i = int(np.searchsorted(ids, doc_id))
+        return i < len(ids) and ids[i] == doc_id
+
+    def lookup(self, text: str) -> Optional[FAQMatch]:
+        """Best match when its confidence reaches the threshold, else None"""
+        match = self.best_match(text)
+        answered = match is not None and match.confidence >= self.threshold
+        with self._counters_lock:
+            self._counters["lookups"] += 1
+            self._counters["answered"] += answered
+        return match if answered else None
+
+    def stats(self) -> Dict[str, float]:
+        """Entries indexed and the share of lookups answered (the deflection rate)"""
+        lookups, answered = self._counters["lookups"], self._counters["answered"]
+        return {
+            "entries": len(self.answers),
+            "questions": len(self.questions),
+            "lookups": lookups,
+            "answered": answered,
+            "deflection_rate": answered / lookups if lookups else 0.0,
+        }
+
+
+def load_faq(filename: str = "faq.jsonl") -> Optional[FAQEngine]:
+    """Map the prebuilt index of data/<filename> or index it now, or None when
+    it cannot be loaded"""
+    path = os.path.join(DATA_DIR, filename)
+    threshold = float(os.environ.get("FAQ_CONFIDENCE_THRESHOLD", DEFAULT_THRESHOLD))
+    artifact = load_artifact(os.path.splitext(filename)[0], ARTIFACT_VERSION, [path])
+    if artifact is not None:
+        return FAQEngine.from_artifact(artifact, threshold=threshold)
+    try:
+        return FAQEngine.from_jsonl(path, threshold=threshold)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"FAQ engine unavailable ({path}): {e}")
+        return None
+
+
+def build_faq_artifact(directory: Optional[str] = None, filename: str = "faq.jsonl") -> Dict[str, Any]:
+    """Index data/<filename> and write the <filename stem> artifact"""
+    path = os.path.join(DATA_DIR, filename)
+    arrays, meta = FAQEngine.from_jsonl(path).to_artifact()
+    return write_artifact(os.path.splitext(filename)[0], ARTIFACT_VERSION, arrays, meta, [path], directory)
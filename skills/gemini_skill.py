@@ -1,25 +1,40 @@
 """Google Gemini Pro Integration Skill for Agent Vish
 
-Provides Gemini Pro AI integration for intelligent responses.
+Provides Gemini Pro AI integration for intelligent responses. The SDK keeps
+one async gRPC channel per process, opened on the first call.
 """
 
 import os
 import logging
-from typing import Optional, List, Dict
+import importlib.util
+from typing import AsyncIterator, Optional, List, Dict
 
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
+from runtime.deadline import Deadline, MIN_USEFUL_TIMEOUT, timeout_for
+from runtime.output_profile import OutputProfile
+from skills.doc_index import default_doc_index, doc_context
+from skills.provider import generate_sync
 
 logger = logging.getLogger(__name__)
 
 
+def _load_genai():
+    """Import google.generativeai on first use; it pulls in grpc and protobuf
+    and dominates import time when loaded eagerly."""
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        return None
+    return genai
+
+
 class GeminiSkill:
     """Skill for querying Google Gemini Pro models"""
     
+    name = "gemini"
+    
     def __init__(self):
         """Initialize Gemini skill with API key"""
+        genai = _load_genai()
         if genai is None:
             raise ImportError("google-generativeai package not installed. Run: pip install google-generativeai")
         
@@ -32,10 +47,12 @@ class GeminiSkill:
         # Use gemini-pro (you have Pro access)
         model_name = os.environ.get("GEMINI_MODEL", "gemini-pro")
         self.model = genai.GenerativeModel(model_name)
+        self.doc_index = default_doc_index()
         
         logger.info(f"Gemini skill initialized with model: {model_name}")
     
-    def _build_prompt(self, user_message: str, context: Optional[List[Dict]] = None) -> str:
+    def _build_prompt(self, user_message: str, context: Optional[List[Dict]] = None,
+                      profile: Optional[OutputProfile] = None) -> str:
         """Build a comprehensive prompt with system instructions and context"""
         system_prompt = """You are Agent Vish, an intelligent AI assistant for MyOperator.
 
@@ -53,6 +70,12 @@ Critical Rules:
 """
         
         prompt_parts = [system_prompt]
+        if profile is not None and profile.instruction:
+            prompt_parts.append(profile.instruction)
+        
+        docs = doc_context(user_message, self.doc_index)
+        if docs:
+            prompt_parts.append(docs)
         
         # Add conversation context if provided
         if context:
@@ -68,27 +91,32 @@ Critical Rules:
         
         return "\n".join(prompt_parts)
     
-    def query(self, user_message: str, context: Optional[List[Dict]] = None) -> str:
-        """Query Gemini Pro with user message and optional context
-        
-        Args:
-            user_message: The user's message/question
-            context: Optional conversation history [{"role": "user/assistant", "content": "..."}]
-            
-        Returns:
-            AI-generated response string
-        """
+    @staticmethod
+    def _generation_config(profile: Optional[OutputProfile]) -> Optional[Dict]:
+        if profile is None:
+            return None
+        return {"max_output_tokens": profile.max_tokens, "stop_sequences": list(profile.stop)}
+    
+    async def agenerate(self, message: str, history: Optional[List[Dict]] = None,
+                        deadline: Optional[Deadline] = None,
+                        profile: Optional[OutputProfile] = None) -> Optional[str]:
+        """Provider.agenerate: the answer, or None on timeout, error or a blocked reply"""
+        timeout = timeout_for(deadline, 30)
+        if timeout < MIN_USEFUL_TIMEOUT:
+            logger.warning("Gemini skipped: request deadline already spent")
+            return None
         try:
-            prompt = self._build_prompt(user_message, context)
+            prompt = self._build_prompt(message, history, profile)
             
-            logger.info(f"Querying Gemini Pro: {user_message[:50]}...")
+            logger.info(f"Querying Gemini Pro: {message[:50]}...")
             
-            response = self.model.generate_content(prompt)
+            response = await self.model.generate_content_async(
+                prompt, generation_config=self._generation_config(profile), request_options={"timeout": timeout})
             
             # Check if response was blocked
             if not response.text:
                 logger.warning("Gemini response was blocked or empty")
-                return "I couldn't generate a response for that query. Please rephrase or contact support."
+                return None
             
             answer = response.text
             logger.info(f"Gemini Pro response: {answer[:50]}...")
@@ -97,13 +125,42 @@ Critical Rules:
             
         except Exception as e:
             logger.error(f"Gemini query failed: {e}")
-            return "I'm having trouble processing that right now. Please try again or contact support."
+            return None
+    
+    async def astream(self, message: str, history: Optional[List[Dict]] = None,
+                      deadline: Optional[Deadline] = None,
+                      profile: Optional[OutputProfile] = None) -> AsyncIterator[str]:
+        """Provider.astream: answer pieces as Gemini streams them"""
+        timeout = timeout_for(deadline, 30)
+        if timeout < MIN_USEFUL_TIMEOUT:
+            return
+        response = await self.model.generate_content_async(
+            self._build_prompt(message, history, profile), stream=True,
+            generation_config=self._generation_config(profile), request_options={"timeout": timeout})
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+    
+    def query(self, user_message: str, context: Optional[List[Dict]] = None,
+              deadline: Optional[Deadline] = None) -> str:
+        """Query Gemini Pro with user message and optional context
+        
+        Args:
+            user_message: The user's message/question
+            context: Optional conversation history [{"role": "user/assistant", "content": "..."}]
+            deadline: Request deadline; the call gets only the time left on it
+            
+        Returns:
+            AI-generated response string
+        """
+        answer = generate_sync(self, user_message, context, deadline)
+        return answer or "I'm having trouble processing that right now. Please try again or contact support."
     
     def is_available(self) -> bool:
         """Check if Gemini service is available"""
         try:
             api_key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
-            return bool(api_key and genai)
+            return bool(api_key and importlib.util.find_spec("google.generativeai"))
         except:
             return False
 
@@ -0,0 +1,230 @@
+"""Intent Classifier for Agent Vish
+
+A small local text classifier that replaces substring keyword matching for
+routing decisions. Messages are turned into hashed word unigram/bigram and
+character trigram features weighted by TF-IDF; each label is represented by
+the normalised centroid of its training examples, and cosine scores are
+turned into a confidence with a softmax. Training on a few hundred labelled
+lines takes milliseconds, so the model is fitted at startup from a JSONL file
+in data/ and no pickled model has to be shipped; `python -m runtime.artifacts
+build` can also prebuild it for workers to map instead.
+
+Callers keep their keyword rules and use them when the confidence is below
+their threshold, or when NumPy is not installed (load_classifier returns
+None then).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import re
+import zlib
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional: without it callers route on keyword rules alone
+    np = None
+
+if TYPE_CHECKING:
+    from runtime.artifacts import Artifact
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+# Below this confidence callers should fall back to their keyword rules
+DEFAULT_THRESHOLD = 0.4
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+# Bound on the per-word hash cache; words past it are hashed on every call
+MAX_CACHED_WORDS = 50000
+
+# Bump when what to_artifact() writes changes, so older artifact files are ignored
+ARTIFACT_VERSION = 1
+
+
+class Prediction(NamedTuple):
+    intent: str
+    confidence: float
+
+
+def word_features(word: str) -> List[str]:
+    """The word itself plus its character trigrams, with < > marking the edges"""
+    padded = f"<{word}>"
+    return [word] + ["#" + padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def load_examples(path: str, label_field: str = "intent") -> Tuple[List[str], List[str]]:
+    """Read (texts, labels) from a JSONL file of {"text": ..., label_field: ...}"""
+    texts, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            texts.append(row["text"])
+            labels.append(row[label_field])
+    return texts, labels
+
+
+class IntentClassifier:
+    """Hashed n-gram TF-IDF vectorizer plus nearest-centroid model"""
+
+    def __init__(self, n_features: int = 2 ** 14, temperature: float = 20.0):
+        """
+        Args:
+            n_features: Hash space size; must be a power of two
+            temperature: Softmax sharpness applied to the cosine scores
+        """
+        if n_features & (n_features - 1):
+            raise ValueError("n_features must be a power of two")
+        self.n_features = n_features
+        self.temperature = temperature
+        self.labels: List[str] = []
+        self._word_cache: Dict[str, Tuple[int, ...]] = {}
+        self.idf: Optional[np.ndarray] = None
+        self.centroids: Optional[np.ndarray] = None  # (n_labels, n_features)
+
+    @classmethod
+    def from_jsonl(cls, path: str, label_field: str = "intent", **kwargs) -> "IntentClassifier":
+        texts, labels = load_examples(path, label_field)
+        return cls(**kwargs).fit(texts, labels)
+
+    def _word_buckets(self, word: str) -> Tuple[int, ...]:
+        """Hashed word_features(word), memoised: most words repeat across messages"""
+        buckets = self._word_cache.get(word)
+        if buckets is None:
+            mask = self.n_features - 1
+            buckets = tuple(zlib.crc32(f.encode()) & mask for f in word_features(word))
+            if len(self._word_cache) < MAX_CACHED_WORDS:
+                self._word_cache[word] = buckets
+        return buckets
+
+    def _hash(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Hashed feature indices and counts (collisions summed) for the
+        words, character trigrams and word bigrams of text"""
+        words = TOKEN_PATTERN.findall(text.lower())
+        mask = self.n_features - 1
+        buckets = [h for word in words for h in self._word_buckets(word)]
+        buckets += [zlib.crc32(f"{a} {b}".encode()) & mask for a, b in zip(words, words[1:])]
+        counts = Counter(buckets)
+        n = len(counts)
+        return (np.fromiter(counts.keys(), dtype=np.intp, count=n),
+                np.fromiter(counts.values(), dtype=np.float32, count=n))
+
+    def _vectorize(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Sparse L2-normalised TF-IDF vector as (indices, values)"""
+        idx, counts = self._hash(text)
+        values = (1.0 + np.log(counts)) * self.idf[idx]
+        norm = np.sqrt(values @ values)
+        if norm > 0:
+            values /= norm
+        return idx, values
+
+    def fit(self, texts: Sequence[str], labels: Sequence[str]) -> "IntentClassifier":
+        if len(texts) != len(labels) or not texts:
+            raise ValueError("need the same, non-zero number of texts and labels")
+        hashed = [self._hash(t) for t in texts]
+
+        df = np.zeros(self.n_features, dtype=np.float32)
+        for idx, _ in hashed:
+            df[idx] += 1
+        # Smoothed IDF; unseen features get the largest weight, which pulls
+        # unfamiliar messages away from every centroid and lowers confidence
+        self.idf = (np.log((1.0 + len(texts)) / (1.0 + df)) + 1.0).astype(np.float32)
+
+        self.labels = sorted(set(labels))
+        row_of = {label: i for i, label in enumerate(self.labels)}
+        centroids = np.zeros((len(self.labels), self.n_features), dtype=np.float32)
+        for text, label in zip(texts, labels):
+            idx, values = self._vectorize(text)
+            centroids[row_of[label], idx] += values
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        self.centroids = centroids / np.maximum(norms, 1e-12)
+        return self
+
+    def to_artifact(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """Arrays and metadata for runtime.artifacts.write_artifact"""
+        return ({"idf": self.idf, "centroids": self.centroids},
+                {"labels": self.labels, "n_features": self.n_features, "temperature": self.temperature})
+
+    @classmethod
+    def from_artifact(cls, artifact: Artifact) -> "IntentClassifier":
+        """A fitted classifier whose arrays are the artifact's read-only mapping"""
+        meta = artifact.meta
+        classifier = cls(n_features=meta["n_features"], temperature=meta["temperature"])
+        classifier.labels = list(meta["labels"])
+        classifier.idf = artifact.arrays["idf"]
+        classifier.centroids = artifact.arrays["centroids"]
+        return classifier
+
+    def _confidences(self, scores: np.ndarray) -> np.ndarray:
+        """Softmax over labels along axis 0"""
+        z = np.exp(self.temperature * (scores - scores.max(axis=0)))
+        return z / z.sum(axis=0)
+
+    def predict(self, text: str) -> Prediction:
+        """Most likely label for one message and its confidence in [0, 1]"""
+        idx, values = self._vectorize(text)
+        # A handful of labels: the softmax is cheaper in plain Python than
+        # through NumPy's per-call overhead
+        scores = (self.centroids[:, idx] @ values).tolist()
+        best = max(range(len(scores)), key=scores.__getitem__)
+        top = scores[best]
+        total = sum(math.exp(self.temperature * (score - top)) for score in scores)
+        return Prediction(self.labels[best], 1.0 / total)
+
+    def predict_batch(self, texts: Iterable[str]) -> List[Prediction]:
+        """predict() for many messages with one gather and one segmented sum"""
+        rows = [self._vectorize(t) for t in texts]
+        if not rows:
+            return []
+        lengths = np.fromiter((len(idx) for idx, _ in rows), dtype=np.intp, count=len(rows))
+        idx = np.concatenate([r[0] for r in rows])
+        values = np.concatenate([r[1] for r in rows])
+        # A trailing zero column keeps reduceat's offsets in range when the
+        # last messages have no features
+        contributions = np.zeros((len(self.labels), len(idx) + 1), dtype=np.float32)
+        contributions[:, :-1] = self.centroids[:, idx] * values
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        scores = np.add.reduceat(contributions, offsets, axis=1)
+        scores[:, lengths == 0] = 0.0
+        probs = self._confidences(scores)
+        best = probs.argmax(axis=0)
+        return [Prediction(self.labels[b], float(probs[b, i])) for i, b in enumerate(best)]
+
+
+def load_classifier(filename: str, label_field: str) -> Optional[IntentClassifier]:
+    """Map the prebuilt artifact for data/<filename> or train a classifier
+    from it, or None when it cannot be loaded; callers then route on keyword
+    rules alone"""
+    if np is None:
+        logger.warning("Intent classifier unavailable: NumPy is not installed")
+        return None
+    from runtime.artifacts import load_artifact
+
+    path = os.path.join(DATA_DIR, filename)
+    artifact = load_artifact(os.path.splitext(filename)[0], ARTIFACT_VERSION, [path])
+    if artifact is not None and artifact.meta.get("label_field") == label_field:
+        return IntentClassifier.from_artifact(artifact)
+    try:
+        return IntentClassifier.from_jsonl(path, label_field)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Intent classifier unavailable ({path}): {e}")
+        return None
+
+
+def build_classifier_artifact(filename: str, label_field: str, directory: Optional[str] = None) -> Dict[str, Any]:
+    """Train on data/<filename> and write the <filename stem> artifact"""
+    from runtime.artifacts import write_artifact
+
+    path = os.path.join(DATA_DIR, filename)
+    arrays, meta = IntentClassifier.from_jsonl(path, label_field).to_artifact()
+    meta["label_field"] = label_field
+    return write_artifact(os.path.splitext(filename)[0], ARTIFACT_VERSION, arrays, meta, [path], directory)
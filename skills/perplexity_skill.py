@@ -1,19 +1,40 @@
 """Perplexity AI Pro Integration Skill for Agent Vish
 
-Provides Perplexity AI Pro integration with real-time web search.
+Provides Perplexity AI Pro integration with real-time web search. Calls go
+through the process's pooled client for the API host (runtime/http_pool.py).
 """
 
 import os
 import logging
-import requests
-from typing import Optional, List, Dict
+from typing import AsyncIterator, Optional, List, Dict
+
+from runtime.deadline import Deadline, MIN_USEFUL_TIMEOUT, timeout_for
+from runtime.http_pool import async_client
+from runtime.output_profile import OutputProfile
+from skills.doc_index import default_doc_index, doc_context
+from skills.provider import generate_sync, openai_stream_deltas
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = """You are Agent Vish, MyOperator's AI assistant.
+                    
+Your role:
+- Provide accurate, factual information
+- Use web search for current information
+- Be professional and helpful
+- Cite sources when possible
+
+Critical Rules:
+- If you don't know something, say so clearly
+- Never make up information
+- Always prioritize accuracy"""
+
 
 class PerplexitySkill:
     """Skill for querying Perplexity AI with web search capabilities"""
     
+    name = "perplexity"
+    
     def __init__(self):
         """Initialize Perplexity skill with API key"""
         api_key = os.environ.get("PERPLEXITY_API_KEY")
@@ -21,78 +42,101 @@ class PerplexitySkill:
             raise ValueError("PERPLEXITY_API_KEY environment variable not set")
         
         self.api_key = api_key
-        self.base_url = "https://api.perplexity.ai/chat/completions"
+        self.base_url = os.environ.get("PERPLEXITY_BASE_URL", "https://api.perplexity.ai")
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
         # Use sonar-pro for your Pro subscription
         self.model = os.environ.get("PERPLEXITY_MODEL", "sonar-pro")
+        self.doc_index = default_doc_index()
         
         logger.info(f"Perplexity skill initialized with model: {self.model}")
     
-    def query(self, user_message: str, context: Optional[List[Dict]] = None) -> str:
+    def _build_messages(self, user_message: str, context: Optional[List[Dict]] = None,
+                        profile: Optional[OutputProfile] = None) -> List[Dict]:
+        """System prompt plus relevant doc chunks, recent history and the message"""
+        system_prompt = SYSTEM_PROMPT
+        if profile is not None and profile.instruction:
+            system_prompt = f"{system_prompt}\n\n{profile.instruction}"
+        docs = doc_context(user_message, self.doc_index)
+        if docs:
+            system_prompt = f"{system_prompt}\n\n{docs}"
+        messages = [{"role": "system", "content": system_prompt}]
+        
+        # Add context if provided
+        if context:
+            messages.extend(context[-3:])
+        
+        # Add user message
+        messages.append({"role": "user", "content": user_message})
+        return messages
+    
+    def _request(self, user_message: str, context: Optional[List[Dict]] = None,
+                 profile: Optional[OutputProfile] = None, stream: bool = False) -> Dict:
+        payload = {
+            "model": self.model,
+            "messages": self._build_messages(user_message, context, profile),
+            "temperature": 0.2,  # Lower for more factual responses
+            "max_tokens": profile.max_tokens if profile is not None else 1000
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+    
+    async def agenerate(self, message: str, history: Optional[List[Dict]] = None,
+                        deadline: Optional[Deadline] = None,
+                        profile: Optional[OutputProfile] = None) -> Optional[str]:
+        """Provider.agenerate: the answer, or None on timeout or API error"""
+        timeout = timeout_for(deadline, 30)
+        if timeout < MIN_USEFUL_TIMEOUT:
+            logger.warning("Perplexity skipped: request deadline already spent")
+            return None
+        logger.info(f"Querying Perplexity: {message[:50]}...")
+        try:
+            status, body = await async_client(self.base_url).post_json(
+                "/chat/completions", self._request(message, history, profile), self.headers, timeout)
+        except Exception as e:
+            logger.error(f"Perplexity query failed: {e!r}")
+            return None
+        if status != 200 or not body:
+            logger.error(f"Perplexity API error: {status} - {str(body)[:200]}")
+            return None
+        answer = body["choices"][0]["message"]["content"]
+        logger.info(f"Perplexity response: {answer[:50]}...")
+        return answer
+    
+    async def astream(self, message: str, history: Optional[List[Dict]] = None,
+                      deadline: Optional[Deadline] = None,
+                      profile: Optional[OutputProfile] = None) -> AsyncIterator[str]:
+        """Provider.astream: answer pieces from the SSE stream"""
+        timeout = timeout_for(deadline, 30)
+        if timeout < MIN_USEFUL_TIMEOUT:
+            return
+        lines = async_client(self.base_url).stream_lines(
+            "/chat/completions", self._request(message, history, profile, stream=True), self.headers, timeout)
+        try:
+            async for piece in openai_stream_deltas(lines):
+                yield piece
+        finally:
+            await lines.aclose()
+    
+    def query(self, user_message: str, context: Optional[List[Dict]] = None,
+              deadline: Optional[Deadline] = None) -> str:
         """Query Perplexity AI with user message
         
         Args:
             user_message: The user's message/question
             context: Optional conversation history
+            deadline: Request deadline; the call gets only the time left on it
             
         Returns:
             AI-generated response string
         """
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            messages = [
-                {
-                    "role": "system",
-                    "content": """You are Agent Vish, MyOperator's AI assistant.
-                    
-Your role:
-- Provide accurate, factual information
-- Use web search for current information
-- Be professional and helpful
-- Cite sources when possible
-
-Critical Rules:
-- If you don't know something, say so clearly
-- Never make up information
-- Always prioritize accuracy"""
-                }
-            ]
-            
-            # Add context if provided
-            if context:
-                messages.extend(context[-3:])
-            
-            # Add user message
-            messages.append({"role": "user", "content": user_message})
-            
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": 0.2,  # Lower for more factual responses
-                "max_tokens": 1000
-            }
-            
-            logger.info(f"Querying Perplexity: {user_message[:50]}...")
-            
-            response = requests.post(self.base_url, json=payload, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                answer = response.json()["choices"][0]["message"]["content"]
-                logger.info(f"Perplexity response: {answer[:50]}...")
-                return answer
-            else:
-                logger.error(f"Perplexity API error: {response.status_code} - {response.text}")
-                return "I'm having trouble accessing real-time information. Please try again."
-                
-        except requests.Timeout:
-            logger.error("Perplexity API timeout")
+        if timeout_for(deadline, 30) < MIN_USEFUL_TIMEOUT:
             return "The search is taking too long. Please try a simpler query."
-        except Exception as e:
-            logger.error(f"Perplexity query failed: {e}")
-            return "I'm having trouble processing that right now. Please try again."
+        answer = generate_sync(self, user_message, context, deadline)
+        return answer or "I'm having trouble accessing real-time information. Please try again."
     
     def is_available(self) -> bool:
         """Check if Perplexity service is available"""
@@ -0,0 +1,90 @@
+"""Provider Protocol shared by the LLM skills
+
+ChatGPT, Gemini, Perplexity and the local Ollama router all expose the same
+two coroutines, so AIRouterSkill can run, race and cancel them on the
+provider loop (runtime/aio.py) without knowing which is which:
+
+    answer = await provider.agenerate(message, history, deadline)
+    async for piece in provider.astream(message, history, deadline): ...
+
+agenerate returns None when the provider could not answer in time; the
+caller decides what to say instead. Cancelling the task (or closing the
+astream iterator early) abandons the call and closes its connection.
+
+Both take an optional OutputProfile (runtime/output_profile.py): its
+instruction goes into the system prompt and its token cap and stop
+sequences into the request. generate_within() streams a reply under a
+profile and closes the stream once the reply budget is filled.
+"""
+
+import json
+import time
+from typing import AsyncIterator, Dict, List, Optional, Protocol, runtime_checkable
+
+from runtime.aio import run_sync
+from runtime.deadline import Deadline, timeout_for
+from runtime.output_profile import OutputProfile, ReplyBudget, output_stats
+
+# Extra seconds a sync caller waits past the provider's own timeout
+SYNC_GRACE_SECONDS = 1.0
+
+
+@runtime_checkable
+class Provider(Protocol):
+    name: str
+
+    async def agenerate(self, message: str, history: Optional[List[Dict]] = None,
+                        deadline: Optional[Deadline] = None,
+                        profile: Optional[OutputProfile] = None) -> Optional[str]:
+        """The whole reply, or None"""
+        ...
+
+    def astream(self, message: str, history: Optional[List[Dict]] = None,
+                deadline: Optional[Deadline] = None,
+                profile: Optional[OutputProfile] = None) -> AsyncIterator[str]:
+        """The reply in pieces as the provider produces them"""
+        ...
+
+
+def generate_sync(provider: Provider, message: str, history: Optional[List[Dict]] = None,
+                  deadline: Optional[Deadline] = None, **options) -> Optional[str]:
+    """agenerate() for sync callers; None when it fails or overruns the deadline"""
+    try:
+        return run_sync(provider.agenerate(message, history, deadline, **options),
+                        timeout_for(deadline, 30) + SYNC_GRACE_SECONDS)
+    except TimeoutError:
+        return None
+
+
+async def generate_within(provider: Provider, message: str, history: Optional[List[Dict]],
+                          deadline: Optional[Deadline], profile: OutputProfile) -> Optional[str]:
+    """The reply streamed under profile, closing the stream as soon as the
+    reply budget is filled; None when nothing usable arrived"""
+    budget = ReplyBudget(profile)
+    start = time.monotonic()
+    stream = provider.astream(message, history, deadline, profile=profile)
+    try:
+        async for piece in stream:
+            if budget.add(piece):
+                break
+    finally:
+        await stream.aclose()
+    text = budget.text
+    output_stats.record(provider.name, profile, budget.received, text, time.monotonic() - start, budget.full)
+    return text or None
+
+
+async def openai_stream_deltas(lines: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Text pieces from an OpenAI-style server-sent event stream"""
+    async for line in lines:
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        try:
+            delta = json.loads(data)["choices"][0].get("delta") or {}
+        except (ValueError, KeyError, IndexError):
+            continue
+        if delta.get("content"):
+            yield delta["content"]
@@ -0,0 +1,379 @@
+"""Incremental Google Sheets sync for report_skill
+
+SheetsSync keeps a local columnar copy of a sheet (memory/sheet_cache.py)
+and brings it up to date with as little downloading as the Sheets API
+allows. The API has no change feed, so a sync works in steps:
+
+    1. Within SHEETS_MAX_AGE seconds of the last check: nothing is fetched.
+    2. Drive's file version is unchanged: one metadata request, no values.
+    3. Otherwise one values:batchGet for the header row, the last
+       SHEETS_TAIL_ROWS rows (where edits to a growing sheet land), one
+       rotating SHEETS_BLOCK_ROWS block of older rows and every row past the
+       copy's end. Only those rows are written into the in-memory copy
+       (rows_changed counts the ones that differ); the column files are
+       then saved whole.
+    4. A changed header or a sheet that got shorter reloads the whole sheet.
+
+Edits above the tail window are picked up when the rotating verification
+reaches their block, so older rows converge within (rows / block) changed
+syncs; call sync(..., full=True) when that is not good enough.
+
+report() and frame() run on the local copy, so repeated analyses cost local
+compute only, and report_skill runs once per version of the copy: its
+output is kept with the copy for every worker. chat_report() is the request
+path: it syncs only within the request's deadline and, when the report for
+the current copy is not ready, queues a "report" job (runtime/jobs.py)
+instead of analysing the sheet on the request thread. Point SHEETS_API_URL /
+DRIVE_API_URL at tests/benchmarks/fake_sheets.py to run without Google.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from memory.sheet_cache import ColumnarSheetCache, SheetTable
+from runtime import http_pool
+from runtime.deadline import Deadline, MIN_USEFUL_TIMEOUT, timeout_for
+
+logger = logging.getLogger(__name__)
+
+SHEETS_URL = "https://sheets.googleapis.com"
+DRIVE_URL = "https://www.googleapis.com"
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly",
+          "https://www.googleapis.com/auth/drive.metadata.readonly"]
+PAGE_ROWS = 10000  # rows per range on a full load
+PAGES_PER_REQUEST = 5
+
+
+def column_letter(index: int) -> str:
+    """0 -> 'A', 27 -> 'AB'"""
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def a1(sheet: str, first_row: int, last_row: Optional[int] = None, width: Optional[int] = None) -> str:
+    """A1 range over sheet rows first_row..last_row (1-based, open-ended when last_row is None)"""
+    title = "'" + sheet.replace("'", "''") + "'"
+    if width is None:
+        return f"{title}!{first_row}:{last_row if last_row is not None else first_row}"
+    end = f"{column_letter(max(width, 1) - 1)}{last_row if last_row is not None else ''}"
+    return f"{title}!A{first_row}:{end}"
+
+
+class SheetsClient:
+    """The two read calls a sync needs, over the pooled requests session"""
+
+    def __init__(self, sheets_url: Optional[str] = None, drive_url: Optional[str] = None,
+                 api_key: Optional[str] = None, timeout: float = 15.0):
+        self.sheets_url = (sheets_url or os.environ.get("SHEETS_API_URL") or SHEETS_URL).rstrip("/")
+        self.drive_url = (drive_url or os.environ.get("DRIVE_API_URL") or DRIVE_URL).rstrip("/")
+        self.api_key = api_key or os.environ.get("SHEETS_API_KEY")
+        self.timeout = timeout
+        self._credentials = None
+        self._requests_lock = threading.Lock()
+        self.requests = 0
+
+    def _auth(self) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """(headers, params): an API key when set, else application default credentials against Google"""
+        if self.api_key:
+            return {}, {"key": self.api_key}
+        if self.sheets_url != SHEETS_URL:
+            return {}, {}  # a local fake server
+        if self._credentials is None:
+            import google.auth
+            self._credentials, _ = google.auth.default(scopes=SCOPES)
+        if not self._credentials.valid:
+            from google.auth.transport.requests import Request
+            self._credentials.refresh(Request())
+        return {"Authorization": f"Bearer {self._credentials.token}"}, {}
+
+    def _get(self, base: str, path: str, params: List[Tuple[str, str]],
+             deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        timeout = timeout_for(deadline, self.timeout)
+        if timeout < MIN_USEFUL_TIMEOUT:
+            raise TimeoutError("request budget spent")
+        headers, auth = self._auth()
+        with self._requests_lock:
+            self.requests += 1
+        response = http_pool.session(base).get(f"{base}{path}", params=params + list(auth.items()),
+                                               headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def version(self, spreadsheet_id: str, deadline: Optional[Deadline] = None) -> str:
+        """Drive's version counter, bumped on every edit to the spreadsheet"""
+        return str(self._get(self.drive_url, f"/drive/v3/files/{spreadsheet_id}",
+                             [("fields", "version"), ("supportsAllDrives", "true")], deadline)["version"])
+
+    def batch_get(self, spreadsheet_id: str, ranges: List[str],
+                  deadline: Optional[Deadline] = None) -> List[List[List[Any]]]:
+        """Rows for each A1 range, unformatted (numbers stay numbers)"""
+        params = [("ranges", r) for r in ranges] + [
+            ("majorDimension", "ROWS"), ("valueRenderOption", "UNFORMATTED_VALUE"),
+            ("dateTimeRenderOption", "FORMATTED_STRING")]
+        payload = self._get(self.sheets_url, f"/v4/spreadsheets/{spreadsheet_id}/values:batchGet",
+                            params, deadline)
+        return [r.get("values", []) for r in payload.get("valueRanges", [])]
+
+
+class SyncResult(NamedTuple):
+    mode: str  # "fresh", "unchanged", "incremental" or "full"
+    rows: int  # rows in the local copy afterwards
+    rows_fetched: int
+    rows_changed: int
+    rows_appended: int
+    seconds: float
+
+
+class SheetsSync:
+    """Keeps local columnar copies of sheets current and runs report_skill on them"""
+
+    def __init__(self, client: Optional[SheetsClient] = None, cache: Optional[ColumnarSheetCache] = None,
+                 tail_rows: Optional[int] = None, block_rows: Optional[int] = None,
+                 max_age: Optional[float] = None):
+        self.client = client or SheetsClient()
+        self.cache = cache or ColumnarSheetCache()
+        self.tail_rows = tail_rows if tail_rows is not None else int(os.environ.get("SHEETS_TAIL_ROWS", "1000"))
+        self.block_rows = block_rows if block_rows is not None else int(os.environ.get("SHEETS_BLOCK_ROWS", "1000"))
+        self.max_age = max_age if max_age is not None else float(os.environ.get("SHEETS_MAX_AGE", "30"))
+        self._lock = threading.Lock()
+        self._frames: Dict[str, Tuple[int, Any]] = {}
+        self._reports: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        self._report_jobs: Dict[str, Tuple[Optional[int], str]] = {}  # key -> (generation, job id)
+        self._jobs = None
+        self._stats: Dict[str, Any] = {"syncs": {}, "rows_fetched": 0, "rows_changed": 0,
+                                       "rows_appended": 0, "seconds": 0.0, "errors": 0,
+                                       "reports": 0, "report_jobs": 0}
+
+    @staticmethod
+    def key(spreadsheet_id: str, sheet: str) -> str:
+        return f"{spreadsheet_id}.{sheet}"
+
+    def sync(self, spreadsheet_id: str, sheet: str, full: bool = False,
+             deadline: Optional[Deadline] = None) -> SyncResult:
+        """Bring the local copy of sheet up to date; each API call is bounded by deadline"""
+        key = self.key(spreadsheet_id, sheet)
+        start = time.monotonic()
+        with self.cache.lock(key):
+            meta = None if full else self.cache.meta(key)
+            now = time.time()
+            if meta and now - meta.get("checked_at", 0) < self.max_age:
+                return self._record(SyncResult("fresh", meta["rows"], 0, 0, 0, time.monotonic() - start))
+            version = self.client.version(spreadsheet_id, deadline)
+            if meta and meta.get("version") == version:
+                self.cache.touch(key, checked_at=now)
+                return self._record(SyncResult("unchanged", meta["rows"], 0, 0, 0, time.monotonic() - start))
+            loaded = self.cache.load(key) if meta else None
+            result = self._incremental(spreadsheet_id, sheet, key, version, loaded, deadline) if loaded else None
+            if result is None:
+                result = self._full(spreadsheet_id, sheet, key, version, deadline)
+        return self._record(result._replace(seconds=time.monotonic() - start))
+
+    def _incremental(self, spreadsheet_id: str, sheet: str, key: str, version: str,
+                     loaded: Tuple[Dict[str, Any], SheetTable],
+                     deadline: Optional[Deadline] = None) -> Optional[SyncResult]:
+        """Fetch the header, tail window, one verification block and new rows; None when a full load is needed"""
+        meta, table = loaded
+        rows, width = len(table), len(table.header)
+        tail_start = max(0, rows - self.tail_rows)
+        blocks = -(-tail_start // self.block_rows) if self.block_rows > 0 else 0
+        verify = meta.get("verify_next", 0) % blocks if blocks else None
+        # Data row i lives on sheet row i + 2 (row 1 is the header)
+        ranges = [a1(sheet, 1), a1(sheet, rows + 2, None, width)]
+        tail_at = block_at = None  # positions in ranges of the optional tail and block
+        if rows > tail_start:
+            tail_at = len(ranges)
+            ranges.append(a1(sheet, tail_start + 2, rows + 1, width))
+        if verify is not None:
+            block_start = verify * self.block_rows
+            block_end = min(block_start + self.block_rows, tail_start)
+            block_at = len(ranges)
+            ranges.append(a1(sheet, block_start + 2, block_end + 1, width))
+        fetched = self.client.batch_get(spreadsheet_id, ranges, deadline)
+        header, appended = fetched[0], fetched[1]
+        if _header(header) != table.header:
+            logger.info("sheets: header of %s changed, reloading", key)
+            return None
+        tail = fetched[tail_at] if tail_at is not None else []
+        if len(tail) < rows - tail_start and not appended:
+            logger.info("sheets: %s got shorter, reloading", key)
+            return None
+        tail = tail + [[]] * (rows - tail_start - len(tail))
+        changed = table.write(tail_start, tail)
+        if verify is not None:
+            block = fetched[block_at]
+            changed += table.write(block_start, block + [[]] * (block_end - block_start - len(block)))
+        table.write(rows, appended)
+        self.cache.save(key, table, version=version, checked_at=time.time(),
+                        verify_next=(verify + 1) if verify is not None else 0)
+        return SyncResult("incremental", len(table), sum(len(r) for r in fetched[1:]), changed, len(appended), 0.0)
+
+    def _full(self, spreadsheet_id: str, sheet: str, key: str, version: str,
+              deadline: Optional[Deadline] = None) -> SyncResult:
+        header = _header(self.client.batch_get(spreadsheet_id, [a1(sheet, 1)], deadline)[0])
+        width, rows, page = len(header), [], 0
+        while True:
+            ranges = [a1(sheet, 2 + (page + i) * PAGE_ROWS, 1 + (page + i + 1) * PAGE_ROWS, width)
+                      for i in range(PAGES_PER_REQUEST)]
+            pages = self.client.batch_get(spreadsheet_id, ranges, deadline)
+            for values in pages:
+                rows.extend(values + [[]] * (PAGE_ROWS - len(values)))
+            page += PAGES_PER_REQUEST
+            if not pages[-1]:
+                break
+        while rows and not rows[-1]:
+            rows.pop()
+        table = SheetTable.from_rows(header, rows)
+        self.cache.save(key, table, version=version, checked_at=time.time(), verify_next=0)
+        return SyncResult("full", len(table), len(rows), 0, len(rows), 0.0)
+
+    def _record(self, result: SyncResult) -> SyncResult:
+        with self._lock:
+            syncs = self._stats["syncs"]
+            syncs[result.mode] = syncs.get(result.mode, 0) + 1
+            self._stats["rows_fetched"] += result.rows_fetched
+            self._stats["rows_changed"] += result.rows_changed
+            self._stats["rows_appended"] += result.rows_appended
+            self._stats["seconds"] += result.seconds
+        return result
+
+    def frame(self, spreadsheet_id: str, sheet: str, sync: bool = True):
+        """The local copy as a pandas DataFrame, synced first unless sync is False"""
+        current = self._frame(spreadsheet_id, sheet, sync)
+        return None if current is None else current[1]
+
+    def _frame(self, spreadsheet_id: str, sheet: str, sync: bool = True) -> Optional[Tuple[int, Any]]:
+        """(generation, DataFrame) of the local copy"""
+        if sync:
+            self.sync(spreadsheet_id, sheet)
+        key = self.key(spreadsheet_id, sheet)
+        meta = self.cache.meta(key)
+        if meta is None:
+            return None
+        with self._lock:
+            cached = self._frames.get(key)
+        if cached and cached[0] == meta["generation"]:
+            return cached
+        with self.cache.lock(key):
+            loaded = self.cache.load(key)
+        if loaded is None:
+            return None
+        current = (loaded[0]["generation"], loaded[1].to_frame())
+        with self._lock:
+            self._frames[key] = current
+        return current
+
+    def _sync_or_warn(self, spreadsheet_id: str, sheet: str, deadline: Optional[Deadline] = None):
+        """sync(), leaving the last copy in place when it fails"""
+        try:
+            self.sync(spreadsheet_id, sheet, deadline=deadline)
+        except Exception as e:
+            logger.warning("sheets: sync of %s failed (%s); using the local copy", self.key(spreadsheet_id, sheet), e)
+            with self._lock:
+                self._stats["errors"] += 1
+
+    def report(self, spreadsheet_id: str, sheet: str, sync: bool = True) -> Optional[Dict[str, Any]]:
+        """report_skill over the local copy, computed once per version of it; falls back
+        to the last copy when the sync fails"""
+        from runtime.jobs import jsonable
+        from skills.core_skills import report_skill
+        if sync:
+            self._sync_or_warn(spreadsheet_id, sheet)
+        current = self._frame(spreadsheet_id, sheet, sync=False)
+        if current is None:
+            return None
+        generation, frame = current
+        report = self._stored_report(spreadsheet_id, sheet, generation)
+        if report is None:
+            report = jsonable(report_skill(frame))
+            key = self.key(spreadsheet_id, sheet)
+            self.cache.save_report(key, generation, report)
+            with self._lock:
+                self._reports[key] = (generation, report)
+                self._stats["reports"] += 1
+        return report
+
+    def _stored_report(self, spreadsheet_id: str, sheet: str,
+                       generation: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """The report of that generation (default: the current copy's) if any process has computed it"""
+        key = self.key(spreadsheet_id, sheet)
+        if generation is None:
+            generation = (self.cache.meta(key) or {}).get("generation")
+            if generation is None:
+                return None
+        with self._lock:
+            cached = self._reports.get(key)
+        if cached and cached[0] == generation:
+            return cached[1]
+        report = self.cache.load_report(key, generation)
+        if report is not None:
+            with self._lock:
+                self._reports[key] = (generation, report)
+        return report
+
+    def chat_report(self, spreadsheet_id: str, sheet: str,
+                    deadline: Optional[Deadline] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """(report, None) when the current copy's report is ready, else (None, id of the
+        "report" job computing it). Only an existing copy is synced here, within deadline;
+        the first download and report_skill itself run in the job runner."""
+        key = self.key(spreadsheet_id, sheet)
+        if self.cache.meta(key) is not None and (deadline is None or not deadline.expired()):
+            self._sync_or_warn(spreadsheet_id, sheet, deadline)
+        report = self._stored_report(spreadsheet_id, sheet)
+        if report is not None:
+            return report, None
+        return None, self._report_job(spreadsheet_id, sheet)
+
+    def _report_job(self, spreadsheet_id: str, sheet: str) -> str:
+        """The queued or running report job for the current copy, submitting one if there is none"""
+        from runtime.jobs import TERMINAL, JobStore
+        key = self.key(spreadsheet_id, sheet)
+        generation = (self.cache.meta(key) or {}).get("generation")
+        with self._lock:
+            if self._jobs is None:
+                self._jobs = JobStore()
+            pending = self._report_jobs.get(key)
+        if pending and pending[0] == generation:
+            job = self._jobs.get(pending[1])
+            if job is not None and job["status"] not in TERMINAL:
+                return pending[1]
+        job_id = self._jobs.submit("report", {"sheet": {"spreadsheet_id": spreadsheet_id, "sheet": sheet}})
+        with self._lock:
+            self._report_jobs[key] = (generation, job_id)
+            self._stats["report_jobs"] += 1
+        return job_id
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, syncs=dict(self._stats["syncs"]))
+        stats["seconds"] = round(stats["seconds"], 3)
+        stats["requests"] = self.client.requests
+        return stats
+
+
+def _header(values: List[List[Any]]) -> List[str]:
+    """Column names from the header row; blank or repeated names get a position suffix"""
+    names: List[str] = []
+    for i, value in enumerate(values[0] if values else []):
+        name = str(value) if value not in (None, "") else f"column_{i + 1}"
+        names.append(f"{name}_{i + 1}" if name in names else name)
+    return names
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_sync() -> SheetsSync:
+    """This process's SheetsSync, configured from the environment"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = SheetsSync()
+        return _default
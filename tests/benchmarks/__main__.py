@@ -0,0 +1,134 @@
+"""Run the Agent Vish benchmark suites
+
+Usage:
+    python -m tests.benchmarks                      # quick run, print results
+    python -m tests.benchmarks --full               # include 100k and 1M row reports
+    python -m tests.benchmarks --save               # store results as the JSON baseline
+    python -m tests.benchmarks --compare            # fail on regressions vs the baseline
+    python -m tests.benchmarks --compare --threshold 0.1 --filter receive_message
+    python -m tests.benchmarks --suite startup      # import times and time to first /chat
+    python -m tests.benchmarks --suite scheduler    # local-LLM throughput with/without the scheduler
+    python -m tests.benchmarks --suite residency    # cold model loads with/without keep-warm
+    python -m tests.benchmarks --suite output       # reply latency with/without output profiles
+    python -m tests.benchmarks --suite sheets       # sheet reports: full download vs synced local copy
+    python -m tests.benchmarks --suite jobs         # /chat latency while reports run inline vs as jobs
+"""
+
+import argparse
+import logging
+import sys
+
+from tests.benchmarks import (
+    bench_hot_path, bench_jobs, bench_output, bench_residency, bench_scheduler, bench_sheets, bench_startup,
+)
+from tests.benchmarks.harness import (
+    DEFAULT_THRESHOLD, compare, format_comparison, format_results,
+    load_baseline, run_benchmark, save_baseline,
+)
+from tests.benchmarks.stub_servers import StubProviderServer
+
+
+def collect(suite: str, stub_url: str, full: bool):
+    if suite == "hot_path":
+        return (
+            bench_hot_path.text_cases()
+            + bench_hot_path.chat_cases()
+            + bench_hot_path.static_cases()
+            + bench_hot_path.logging_cases()
+            + bench_hot_path.profiler_cases()
+            + bench_hot_path.memory_watch_cases()
+            + bench_hot_path.event_log_cases()
+            + bench_hot_path.socket_cases()
+            + bench_hot_path.agent_cases(stub_url)
+            + bench_hot_path.router_cases()
+            + bench_hot_path.classifier_cases()
+            + bench_hot_path.faq_cases()
+            + bench_hot_path.doc_cases()
+            + bench_hot_path.memory_cases()
+            + bench_hot_path.store_cases()
+            + bench_hot_path.provider_cases(stub_url)
+            + bench_hot_path.cascade_cases(stub_url)
+        )
+    if suite == "report":
+        sizes = bench_hot_path.REPORT_SIZES_FULL if full else bench_hot_path.REPORT_SIZES_QUICK
+        return bench_hot_path.report_cases(sizes)
+    raise ValueError(f"Unknown suite: {suite}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tests.benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", action="append",
+                        choices=["hot_path", "report", "startup", "scheduler", "residency", "output", "sheets",
+                                 "jobs"],
+                        help="Suite to run (repeatable, default: hot_path and report)")
+    parser.add_argument("--full", action="store_true", help="Include the slow large-input cases")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--save", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare with the stored baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed median slowdown before failing, as a fraction (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    # Provider code logs every call; keep it out of the timing and the output
+    logging.disable(logging.CRITICAL)
+
+    failed = False
+    with StubProviderServer() as stub:
+        for suite in args.suite or ["hot_path", "report"]:
+            print(f"\n== {suite} ==")
+            if suite == "startup":
+                results = [r for r in bench_startup.startup_results(stub.base_url) if args.filter in r["name"]]
+                print("heaviest imports under `import api`:")
+                for name, cumulative_us in bench_startup.heaviest_imports("api", stub.base_url):
+                    print(f"  {name:<46} {cumulative_us / 1000:>10.1f} ms")
+            elif suite == "scheduler":
+                results, lines = bench_scheduler.scheduler_results()
+                print(f"throughput, stub with {bench_scheduler.CORES} cores:")
+                print("\n".join(lines))
+            elif suite == "residency":
+                results, lines = bench_residency.residency_results()
+                print(f"cold loads, stub unloading after {bench_residency.SERVER_KEEP_ALIVE}s idle:")
+                print("\n".join(lines))
+            elif suite == "output":
+                results, lines = bench_output.output_results()
+                print(f"per call, stub streaming one token every {bench_output.TOKEN_LATENCY * 1000:.0f} ms:")
+                print("\n".join(lines))
+            elif suite == "sheets":
+                results, lines = bench_sheets.sheets_results()
+                print(f"per analysis of a {bench_sheets.SHEET_ROWS}-row sheet on a local fake server:")
+                print("\n".join(lines))
+            elif suite == "jobs":
+                results, lines = bench_jobs.jobs_results()
+                print(f"/chat \"hello\" while analysing {bench_jobs.REPORT_ROWS}-row reports:")
+                print("\n".join(lines))
+            else:
+                cases = [c for c in collect(suite, stub.base_url, args.full) if args.filter in c[0]]
+                results = [run_benchmark(name, fn, **options) for name, fn, options in cases]
+            print(format_results(results))
+            if suite == "hot_path" and args.filter in "faq/deflection":
+                d = bench_hot_path.faq_deflection()
+                print(f"FAQ deflection: {d['faq_answered']} of {d['llm_bound']} LLM-bound messages "
+                      f"({d['deflection_rate'] * 100:.1f}%) answered locally")
+            if suite == "hot_path" and args.filter in "docs/prompt_size":
+                print("mean prompt size per provider call (chars, without -> with doc chunks):")
+                for provider, size in bench_hot_path.prompt_sizes().items():
+                    print(f"  {provider:<12} {size['without_docs']:>6} -> {size['with_docs']:>6}")
+
+            if args.compare:
+                baseline = load_baseline(suite)
+                if baseline is None:
+                    print(f"No baseline stored for '{suite}'; run with --save first")
+                    failed = True
+                else:
+                    rows = compare(results, baseline, args.threshold)
+                    print(format_comparison(rows))
+                    failed = failed or any(row["regression"] for row in rows)
+            if args.save:
+                print(f"Baseline written to {save_baseline(suite, results)}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,544 @@
+"""Benchmark cases for the chat hot path, provider calls and report engine
+
+Each suite function returns a list of (name, fn, options) tuples that the
+runner times with harness.run_benchmark. Provider-bound cases run against a
+StubProviderServer so results measure our own overhead, not the network.
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+Case = Tuple[str, Callable[[], Any], Dict[str, Any]]
+
+# One representative message per receive_message branch
+INTENT_MESSAGES = {
+    "analytics": "show me google analytics for this week",
+    "bio": "tell me about vishal",
+    "skills": "what skills does he have",
+    "projects": "show recent projects",
+    "features": "list the features",
+    "help": "help",
+    "fallback": "zzz quux",
+}
+
+CLASSIFY_MESSAGES = {
+    "research": "what is the latest news on cloud telephony",
+    "conversation": "could you explain call routing",
+    "general": "ivr menus for a small clinic",
+}
+
+# Per-write delay of the log sink in logging_cases
+SLOW_SINK_SECONDS = 0.0001
+
+REPORT_SIZES_QUICK = (1_000,)
+REPORT_SIZES_FULL = (1_000, 100_000, 1_000_000)
+
+LARGE_TEXT = ("hello\x00 world\t\r\n  " * 2000) + ("\x1b[31m plain words " * 2000)
+# Worst cases for the sanitizer: nothing but controls, and non-ASCII with C1 mixed in
+ADVERSARIAL_TEXT = "\x00\x01 \x85\t\x9f\n" * 10000
+UNICODE_TEXT = "नमस्ते दुनिया\x85  ok\x00 " * 3000
+
+# /chat bodies: large, adversarial (escaped and raw controls), and one that
+# only parses after stripping controls between tokens (the slow path)
+CHAT_BODIES = {
+    "small": b'{"message": "tell me about vishal"}',
+    "large": json.dumps({"message": LARGE_TEXT}).encode(),
+    "escaped_controls": json.dumps({"message": ADVERSARIAL_TEXT}).encode(),
+    "raw_controls": b'{"message": "' + ("a\x01\x02\t\n" * 20000).encode() + b'"}',
+    "controls_between_tokens": b'{\x01"message":\x02 "' + (b"word " * 20000) + b'"}',
+}
+
+
+def text_cases() -> List[Case]:
+    from agent_vish import clean_text, sanitize_text
+    from api import strip_control_chars
+
+    short = "  Hi\tthere,\n what can\x07 you do?  "
+    texts = {"short": short, "large": LARGE_TEXT, "adversarial": ADVERSARIAL_TEXT, "unicode": UNICODE_TEXT}
+    cases = []
+    for fn in (clean_text, sanitize_text, strip_control_chars):
+        for label, text in texts.items():
+            cases.append((f"{fn.__name__}/{label}", lambda f=fn, t=text: f(t), {}))
+    return cases
+
+
+def chat_cases() -> List[Case]:
+    from api import admission, app, parse_chat_body
+
+    admission.rate_per_sec = 0  # one benchmark client would exhaust its bucket at once
+    client = app.test_client()
+    cases = []
+    for label, body in CHAT_BODIES.items():
+        cases.append((f"parse_chat_body/{label}", lambda b=body: parse_chat_body(b), {}))
+        cases.append((
+            f"chat_endpoint/{label}",
+            lambda b=body: client.post("/chat", data=b, content_type="application/json"),
+            {},
+        ))
+    return cases
+
+
+def static_cases() -> List[Case]:
+    from api import app, static_assets
+
+    client = app.test_client()
+    gzip_only = {"Accept-Encoding": "gzip"}
+    etag = client.get("/", headers=gzip_only).headers["ETag"]
+    return [
+        ("static/index_gzip", lambda: client.get("/", headers=gzip_only), {}),
+        ("static/index_304", lambda: client.get("/", headers={**gzip_only, "If-None-Match": etag}), {}),
+        ("static/send_static_file", lambda: client.get("/chat.css"), {}),
+        ("static/fingerprinted_js", lambda: client.get(static_assets.url_for("chat.js"), headers=gzip_only), {}),
+        ("static/healthz", lambda: client.get("/healthz"), {}),
+    ]
+
+
+def logging_cases() -> List[Case]:
+    """Cost on the calling thread of one /chat-style log line
+
+    Output goes to a stream that takes SLOW_SINK_SECONDS per write, like a
+    stdout pipe the platform's log collector is slow to read. The run keeps
+    logging.disable() on, so records go through Logger._log, which skips
+    only the (cached) level check.
+    """
+    import logging
+    from runtime.log_setup import (TEXT_FORMAT, CategoryRule, JSONFormatter, QueuedLogging,
+                                   SamplingFilter)
+
+    class SlowSink(io.StringIO):
+        def write(self, text):
+            time.sleep(SLOW_SINK_SECONDS)
+            return len(text)
+
+    sink = SlowSink()
+    message = "How do I set up call routing for my support team? " * 6
+
+    def make_logger(name, handler):
+        log = logging.getLogger(f"bench.logging.{name}")
+        log.handlers[:] = [handler]
+        log.propagate = False
+        log.setLevel(logging.INFO)
+        return log
+
+    sync_handler = logging.StreamHandler(sink)
+    sync_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    sync = make_logger("sync", sync_handler)
+    setups = {
+        "queued": (logging.Formatter(TEXT_FORMAT), {}),
+        "queued_json": (JSONFormatter(), {}),
+        "queued_sampled_out": (logging.Formatter(TEXT_FORMAT), {"bench": CategoryRule(None, 0.0, 0.0)}),
+    }
+    cases = [(
+        "logging/sync_stream",
+        lambda: sync._log(logging.INFO, "Received message: %s",
+                          (message[:200] + ("..." if len(message) > 200 else ""),)),
+        {},
+    )]
+    for name, (formatter, rules) in setups.items():
+        queued = QueuedLogging(sink, formatter, 10 ** 6, SamplingFilter(rules))
+        queued.start()
+        log = make_logger(name, queued.handler)
+        cases.append((f"logging/{name}", lambda log=log: log._log(logging.INFO, "Received message: %.200s", (message,)), {}))
+    return cases
+
+
+def profiler_cases() -> List[Case]:
+    """What the profiling hooks cost the request path while nothing is profiling, and /chat with X-Profile"""
+    import api
+    from runtime import profiler
+
+    client = api.app.test_client()
+    body = CHAT_BODIES["small"]
+    headers = {"X-Profile": "1", "X-Admin-Token": "bench"}
+
+    def phase():
+        with profiler.phase("report:numeric"):
+            pass
+
+    def profiled_chat():
+        with patch.dict(os.environ, {"ADMIN_TOKEN": "bench"}):
+            client.post("/chat", data=body, content_type="application/json", headers=headers)
+
+    return [
+        ("profiler/tag_disabled", lambda: profiler.tag(intent="faq"), {}),
+        ("profiler/phase_disabled", phase, {}),
+        ("profiler/chat_unprofiled", lambda: client.post("/chat", data=body, content_type="application/json"), {}),
+        ("profiler/chat_x_profile", profiled_chat, {"number": 20}),
+    ]
+
+
+def memory_watch_cases() -> List[Case]:
+    """Per-request cost of the memory tracking: an unsampled and a sampled request, and /chat under tracemalloc"""
+    import api
+    from runtime.memory_watch import MemoryWatch
+
+    client = api.app.test_client()
+    body = CHAT_BODIES["small"]
+    unsampled, sampled = MemoryWatch(sample_rate=1e-9), MemoryWatch(sample_rate=1)
+    traced = MemoryWatch()
+
+    def traced_chat():
+        traced.start()
+        try:
+            client.post("/chat", data=body, content_type="application/json")
+        finally:
+            traced.stop()
+
+    def sampled_request():
+        sampled.end("chat:static", sampled.begin())
+
+    return [
+        ("memory_watch/unsampled", unsampled.begin, {}),
+        ("memory_watch/sampled", sampled_request, {}),
+        ("memory_watch/chat_traced", traced_chat, {"number": 50}),
+    ]
+
+
+def event_log_cases() -> List[Case]:
+    """record() on the request thread, and a pushed-down query over 200k logged events"""
+    import tempfile
+
+    import numpy as np
+    from runtime.event_log import EventLog, query
+
+    directory = tempfile.mkdtemp(prefix="bench_events_")
+    log = EventLog(directory, segment_events=20000)
+    log._thread = object()  # nothing drains it: measure the append alone
+    rng = np.random.default_rng(3)
+    intents = ["bio", "help", "faq", "fallback", "analytics"]
+    filled = EventLog(directory, segment_events=20000)
+    for i in range(200000):
+        filled.record(intents[i % 5], "llm" if i % 5 == 3 else "static", "perplexity" if i % 50 == 3 else "",
+                      "chat", float(rng.gamma(2.0, 200.0)), i % 4 == 0, False, f"question {i % 997}",
+                      ts=1_700_000_000 + i)
+    filled.stop()
+
+    def record():
+        if len(log._buffer) > 50000:
+            log._buffer.clear()
+        log.record("faq", "faq", "", "chat", 1.5, False, False, "how do i set up call routing")
+
+    return [
+        ("event_log/record", record, {}),
+        ("event_log/query_200k_provider", lambda: query(directory, ["intent", "latency_ms"],
+                                                        [("provider", "==", "perplexity")]), {"number": 20}),
+        ("event_log/query_200k_last_hour", lambda: query(directory, ["intent"],
+                                                         since=1_700_000_000 + 200000 - 3600), {"number": 20}),
+    ]
+
+
+def socket_cases() -> List[Case]:
+    """A static-intent round trip on a live threaded server: a new HTTP connection, keep-alive, and /ws/chat"""
+    import threading
+
+    import requests
+    from simple_websocket import Client
+    from werkzeug.serving import make_server
+    import api
+    from runtime.chat_socket import _daemon_thread
+
+    api.admission.rate_per_sec = 0  # one benchmark client would exhaust its bucket at once
+    server = make_server("127.0.0.1", 0, api.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"127.0.0.1:{server.port}"
+    body = CHAT_BODIES["small"]
+    headers = {"Content-Type": "application/json"}
+    session = requests.Session()
+    ws = Client.connect(f"ws://{base}/ws/chat", thread_class=_daemon_thread)
+    ws.receive(timeout=5)  # ready
+    frame = json.dumps({"type": "message", "id": 1, "message": json.loads(body)["message"]})
+
+    def over_socket():
+        ws.send(frame)
+        ws.receive(timeout=5)
+
+    return [
+        ("sockets/http_new_connection", lambda: requests.post(f"http://{base}/chat", data=body, headers=headers),
+         {"number": 200}),
+        ("sockets/http_keep_alive", lambda: session.post(f"http://{base}/chat", data=body, headers=headers),
+         {"number": 500}),
+        ("sockets/websocket", over_socket, {"number": 500}),
+    ]
+
+
+def agent_cases(stub_url: str) -> List[Case]:
+    from agent_vish import AgentVish
+
+    with patch.dict(os.environ, {"OLLAMA_BASE_URL": stub_url}):
+        agent = AgentVish()
+    cases = []
+    for intent, message in INTENT_MESSAGES.items():
+        cases.append((f"receive_message/{intent}", lambda m=message: agent.receive_message(m), {}))
+    return cases
+
+
+def router_cases() -> List[Case]:
+    from skills.ai_router_skill import AIRouterSkill
+
+    router = AIRouterSkill({})
+    return [
+        (f"classify_query/{kind}", lambda m=message: router.classify_query(m), {})
+        for kind, message in CLASSIFY_MESSAGES.items()
+    ]
+
+
+def classifier_cases() -> List[Case]:
+    from agent_vish import keyword_intent
+    from skills.intent_classifier import load_classifier
+
+    classifier = load_classifier("intents.jsonl", "intent")
+    messages = list(INTENT_MESSAGES.values())
+    batch = (messages * 37)[:256]
+    cases = [
+        ("intent/keyword_rules", lambda: [keyword_intent(m) for m in messages], {}),
+        ("intent/classifier", lambda: [classifier.predict(m) for m in messages], {}),
+        ("intent/classifier_batch_256", lambda: classifier.predict_batch(batch), {}),
+    ]
+    return cases
+
+
+SYLLABLES = ["ka", "ri", "mo", "ten", "sul", "vor", "ba", "lin", "que", "dra", "pex", "or", "ni", "zu", "chal"]
+COMMON_WORDS = ["what", "is", "how", "do", "i", "the", "a", "my", "can", "to", "for", "of"]
+
+
+def make_faq_entries(count: int, seed: int = 11):
+    """Synthetic FAQ of `count` entries over a few thousand made-up words"""
+    import random
+
+    rng = random.Random(seed)
+    vocab = sorted({"".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(6000)})
+    entries = []
+    for i in range(count):
+        words = rng.sample(COMMON_WORDS, 2) + [rng.choice(vocab) for _ in range(rng.randint(2, 5))]
+        entries.append(([" ".join(words)], f"answer {i}"))
+    return entries
+
+
+def faq_cases() -> List[Case]:
+    from skills.faq_engine import FAQEngine, load_faq
+
+    faq = load_faq()
+    large = FAQEngine().build(make_faq_entries(10_000))
+    question = large.questions[1234]
+    typo = question[:-2] + question[-1]  # drop one letter of the last word
+    return [
+        ("faq/hit", lambda: faq.lookup("how do i reduce churn for smb customers"), {}),
+        ("faq/miss", lambda: faq.lookup("draft a renewal reminder for an enterprise client"), {}),
+        ("faq/10k_exact", lambda: large.lookup(question), {}),
+        ("faq/10k_typo", lambda: large.lookup(typo), {}),
+        ("faq/10k_miss", lambda: large.lookup("compare exotel and knowlarity pricing"), {}),
+    ]
+
+
+def faq_deflection() -> Dict[str, Any]:
+    """Share of LLM-bound messages the FAQ answers, over the load-test mix
+    (weighted) and the fallback examples the intent classifier is trained on"""
+    from agent_vish import AgentVish
+    from skills.intent_classifier import DATA_DIR, load_examples
+
+    with patch("agent_vish.LocalLLMRouter._check_availability", return_value=False):
+        agent = AgentVish()
+    messages = []
+    with open(os.path.join(os.path.dirname(__file__), "..", "loadtest", "messages.jsonl")) as f:
+        for line in f:
+            row = json.loads(line)
+            messages += [row["message"]] * row.get("weight", 1)
+    texts, labels = load_examples(os.path.join(DATA_DIR, "intents.jsonl"))
+    messages += [t for t, label in zip(texts, labels) if label == "fallback"]
+
+    llm_bound = [m for m, intent in zip(messages, agent.classify_batch(messages)) if intent == "fallback"]
+    answered = sum(1 for m in llm_bound if agent.faq.lookup(m.lower()) is not None)
+    return {"messages": len(messages), "llm_bound": len(llm_bound), "faq_answered": answered,
+            "deflection_rate": round(answered / len(llm_bound), 4) if llm_bound else 0.0}
+
+
+DOC_QUERIES = ["how do I set up an ivr menu", "what is in the missed call report", "write a haiku about phones"]
+
+
+def make_vector_index(chunks: int, clusters: int = 200, seed: int = 5):
+    """DocIndex holding `chunks` clustered random vectors; search cost does not
+    depend on the chunk text, so none is embedded"""
+    import numpy as np
+    from skills.doc_index import Chunk, DocIndex
+
+    rng = np.random.default_rng(seed)
+    index = DocIndex(ivf_min_chunks=10 ** 9)
+    centers = rng.normal(size=(clusters, index.embedder.dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, chunks)] + rng.normal(
+        scale=0.6, size=(chunks, index.embedder.dim)).astype(np.float32)
+    index.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    index.chunks = [Chunk("synthetic.md", "", str(i)) for i in range(chunks)]
+    return index
+
+
+def doc_cases() -> List[Case]:
+    import copy
+    from skills.doc_index import default_doc_index
+
+    docs = default_doc_index()
+    brute = make_vector_index(50_000)
+    ivf = copy.copy(brute)
+    ivf.build_ivf()
+    query = "how do I set up an ivr menu"
+    return [
+        ("docs/embed_query", lambda: docs.embedder.embed_one(query), {}),
+        ("docs/context_for", lambda: docs.context_for(query), {}),
+        ("docs/search_brute_50k", lambda: brute.search(query, 3), {}),
+        ("docs/search_ivf_50k", lambda: ivf.search(query, 3), {}),
+    ]
+
+
+def prompt_sizes() -> Dict[str, Dict[str, int]]:
+    """Characters sent to each provider for DOC_QUERIES, without and with doc chunks"""
+    builders = {}
+    with patch.dict(os.environ, {"PERPLEXITY_API_KEY": "stub", "OPENAI_API_KEY": "stub",
+                                 "GOOGLE_API_KEY": "stub"}):
+        from skills.perplexity_skill import PerplexitySkill
+        builders["perplexity"] = (PerplexitySkill(), "_build_messages")
+        try:
+            from skills.chatgpt_skill import ChatGPTSkill
+            builders["chatgpt"] = (ChatGPTSkill(), "_build_messages")
+        except ImportError:
+            pass
+        try:
+            from skills.gemini_skill import GeminiSkill
+            builders["gemini"] = (GeminiSkill(), "_build_prompt")
+        except ImportError:
+            pass
+
+    def size(prompt) -> int:
+        return len(prompt) if isinstance(prompt, str) else sum(len(m["content"]) for m in prompt)
+
+    sizes = {}
+    for name, (skill, method) in sorted(builders.items()):
+        with_docs = sum(size(getattr(skill, method)(q)) for q in DOC_QUERIES)
+        index, skill.doc_index = skill.doc_index, None
+        without = sum(size(getattr(skill, method)(q)) for q in DOC_QUERIES)
+        skill.doc_index = index
+        sizes[name] = {"without_docs": without // len(DOC_QUERIES), "with_docs": with_docs // len(DOC_QUERIES)}
+    return sizes
+
+
+def provider_cases(stub_url: str) -> List[Case]:
+    from agent_vish import LocalLLMRouter
+
+    ollama = LocalLLMRouter(stub_url)
+    cases = [("provider/ollama", lambda: ollama.route("hello"), {"repeat": 3})]
+
+    from runtime.aio import run_sync
+    with patch.dict(os.environ, {"PERPLEXITY_API_KEY": "stub", "PERPLEXITY_BASE_URL": stub_url}):
+        from skills.perplexity_skill import PerplexitySkill
+        perplexity = PerplexitySkill()
+    cases.append(("provider/perplexity", lambda: perplexity.query("hello"), {"repeat": 3}))
+
+    async def fan_out():  # eight calls in flight on the provider loop, one pooled client
+        await asyncio.gather(*(perplexity.agenerate("hello") for _ in range(8)))
+
+    async def stream():
+        async for _ in perplexity.astream("hello"):
+            pass
+
+    cases.append(("provider/perplexity_x8_async", lambda: run_sync(fan_out()), {"repeat": 3}))
+    cases.append(("provider/perplexity_stream", lambda: run_sync(stream()), {"repeat": 3}))
+
+    try:
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "stub", "OPENAI_BASE_URL": f"{stub_url}/v1"}):
+            from skills.chatgpt_skill import ChatGPTSkill
+            chatgpt = ChatGPTSkill()
+    except ImportError:
+        chatgpt = None  # openai SDK not installed
+    if chatgpt is not None:
+        cases.append(("provider/chatgpt", lambda: chatgpt.query("hello"), {"repeat": 3}))
+    return cases
+
+
+def cascade_cases(stub_url: str) -> List[Case]:
+    """Self-check cost alone, and a local call with and without the verifier prompt"""
+    from agent_vish import LocalLLMRouter
+    from runtime.cascade import ModelCascade, Tier, check_answer
+
+    answer = " ".join(f"word{i % 40}" for i in range(120))
+    single = LocalLLMRouter(stub_url)
+    verified = LocalLLMRouter(stub_url)
+    verified.cascade = ModelCascade([Tier("small", "llama3.2:1b", 0.0), Tier("cloud", "cloud", 0.002)],
+                                    verified.generate)
+    return [
+        ("cascade/check_answer", lambda: check_answer(answer), {}),
+        ("cascade/single_tier", lambda: single.route("hello"), {"repeat": 3}),
+        ("cascade/fast_tier_verified", lambda: verified.route("hello"), {"repeat": 3}),
+    ]
+
+
+def memory_cases() -> List[Case]:
+    from memory.memory_manager import MemoryManager
+
+    full = MemoryManager(max_memory_size=100)
+    for i in range(100):
+        full.add_message("user", f"message {i}")
+    return [
+        ("memory/add_message_at_capacity", lambda: full.add_message("user", "hello"), {}),
+        ("memory/get_messages_last_10", lambda: full.get_messages(last_n=10), {}),
+        ("memory/get_memory_size", full.get_memory_size, {}),
+    ]
+
+
+def store_cases() -> List[Case]:
+    """Per-process LocalStore against the cross-worker SQLiteStore"""
+    import atexit
+    import shutil
+    import tempfile
+    from memory.shared_store import LocalStore, SQLiteStore
+
+    tmp = tempfile.mkdtemp(prefix="vish-bench-")
+    atexit.register(shutil.rmtree, tmp, True)
+    cases = []
+    for label, store in (("local", LocalStore()), ("sqlite", SQLiteStore(os.path.join(tmp, "store.db")))):
+        store.cache_set("hit", "cached reply " * 10)
+        for i in range(20):
+            store.session_append("session", "user", f"message {i}")
+        counter = iter(range(10 ** 9))
+        cases += [
+            (f"store/{label}/cache_get_hit", lambda s=store: s.cache_get("hit"), {}),
+            (f"store/{label}/cache_get_miss", lambda s=store: s.cache_get("missing"), {}),
+            (f"store/{label}/cache_set", lambda s=store, c=counter: s.cache_set(f"k{next(c) % 5000}", "reply"), {}),
+            (f"store/{label}/session_append", lambda s=store: s.session_append("session", "user", "hello"), {}),
+            (f"store/{label}/session_messages_last_6", lambda s=store: s.session_messages("session", 6), {}),
+        ]
+    return cases
+
+
+def make_report_frame(rows: int, seed: int = 7):
+    """Build a mixed-type frame shaped like a CS renewal export"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    sales = rng.normal(1000, 250, rows)
+    frame = pd.DataFrame({
+        "region": rng.choice(["North", "South", "East", "West"], rows),
+        "account": rng.integers(0, max(rows // 3, 1), rows).astype(str),
+        "sales": sales,
+        "units": (sales / 50 + rng.normal(0, 2, rows)).round(),
+        "calls": rng.poisson(20, rows),
+    })
+    frame.loc[frame.sample(frac=0.02, random_state=seed).index, "units"] = np.nan
+    return frame
+
+
+def report_cases(sizes=REPORT_SIZES_QUICK) -> List[Case]:
+    from skills.core_skills import report_skill
+
+    cases = []
+    for rows in sizes:
+        frame = make_report_frame(rows)
+        options = {"repeat": 3, "number": 1} if rows >= 100_000 else {}
+        cases.append((f"report_skill/{rows}", lambda f=frame: report_skill(f), options))
+    return cases
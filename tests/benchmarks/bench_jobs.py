@@ -0,0 +1,93 @@
+"""/chat latency while a large report is being analysed
+
+A static-intent /chat message ("hello") is timed through the Flask test
+client in three situations:
+
+    idle        nothing else running
+    inline      report_skill running on a thread in the same process, the
+                best case for analysing an upload inside a request (a sync
+                gunicorn worker would not answer /chat at all until it is done)
+    background  the same reports submitted as jobs to a JobRunner, which runs
+                them niced in child processes
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tests.benchmarks.harness import summarize_samples
+
+REPORT_ROWS = 200_000
+CHAT_REQUESTS = 1000
+
+
+def chat_latencies(client, requests: int) -> List[float]:
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client.post("/chat", json={"message": "hello"})
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def jobs_results(rows: int = REPORT_ROWS, requests: int = CHAT_REQUESTS) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Result rows (per /chat call) plus printable p95 lines"""
+    import api
+    from runtime.jobs import TERMINAL, JobRunner, JobStore
+    from skills.core_skills import report_skill
+    from tests.benchmarks.bench_hot_path import make_report_frame
+
+    client = api.app.test_client()
+    frame = make_report_frame(rows)
+    results, lines = [], []
+
+    def record(mode: str, latencies: List[float]):
+        ordered = sorted(latencies)
+        results.append(summarize_samples(f"jobs/chat_{mode}", [t * 1e6 for t in latencies]))
+        lines.append(f"  {mode:<11} p50 {ordered[len(ordered) // 2] * 1000:>7.2f} ms  "
+                     f"p95 {ordered[int(len(ordered) * 0.95)] * 1000:>7.2f} ms")
+
+    start = time.perf_counter()
+    report_skill(frame)
+    lines.append(f"  (one report_skill on {rows} rows takes {time.perf_counter() - start:.2f} s; "
+                 "a request running it holds its worker that long)")
+    chat_latencies(client, 20)  # warm up
+    record("idle", chat_latencies(client, requests))
+
+    stop = threading.Event()
+
+    def inline_reports():
+        while not stop.is_set():
+            report_skill(frame)
+
+    thread = threading.Thread(target=inline_reports, daemon=True)
+    thread.start()
+    time.sleep(0.2)
+    record("inline", chat_latencies(client, requests))
+    stop.set()
+    thread.join()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "report.csv")
+        frame.to_csv(path, index=False)
+        store = JobStore(os.path.join(tmp, "jobs.sqlite3"))
+        runner = JobRunner(store, poll_interval=0.05).start()
+        try:
+            submitted = time.perf_counter()
+            job_ids = [store.submit("report", {"path": path}, lane="bulk") for _ in range(runner.workers * 4)]
+            time.sleep(0.5)
+            record("background", chat_latencies(client, requests))
+            while not all(store.get(job_id)["status"] in TERMINAL for job_id in job_ids):
+                time.sleep(0.05)
+            elapsed = time.perf_counter() - submitted
+            done = sum(store.get(job_id)["status"] == "done" for job_id in job_ids)
+        finally:
+            runner.stop()
+    lines.append(f"  ({done} of {len(job_ids)} background reports done in {elapsed:.1f} s, "
+                 f"{runner.workers} job worker(s), including reading the CSV)")
+    return results, lines
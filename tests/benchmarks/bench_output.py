@@ -0,0 +1,75 @@
+"""Reply latency and tokens with and without an output profile
+
+Each provider is called against a StubProviderServer that streams a long
+reply a word (one token) at a time: one answering sentence, a newline, then
+the kind of elaboration the chat widget throws away. "uncapped" sends the
+request as before profiles (ChatGPT max_tokens 500, Perplexity 1000,
+Ollama unbounded); "chat" uses the chat profile, which caps the tokens,
+stops at the newline and closes the stream once the reply budget is full.
+"""
+
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tests.benchmarks.harness import summarize_samples
+from tests.benchmarks.stub_servers import StubProviderServer
+
+TOKEN_LATENCY = 0.002
+LONG_REPLY = ("MyOperator routes business calls through a cloud IVR with call recording and analytics.\n"
+              + " ".join(f"Further detail number {i} about plans, setup and integrations." for i in range(40)))
+
+
+def providers(base_url: str) -> Dict[str, Any]:
+    from agent_vish import LocalLLMRouter
+    from runtime.llm_scheduler import GenerationScheduler
+
+    found = {"ollama": LocalLLMRouter(base_url, scheduler=GenerationScheduler(max_concurrent=0))}
+    with patch.dict(os.environ, {"PERPLEXITY_API_KEY": "stub", "PERPLEXITY_BASE_URL": base_url,
+                                 "OPENAI_API_KEY": "stub", "OPENAI_BASE_URL": f"{base_url}/v1"}):
+        from skills.perplexity_skill import PerplexitySkill
+        found["perplexity"] = PerplexitySkill()
+        try:
+            from skills.chatgpt_skill import ChatGPTSkill
+            found["chatgpt"] = ChatGPTSkill()
+        except ImportError:
+            pass  # openai SDK not installed
+    return found
+
+
+def call(provider, profile) -> Callable[[], str]:
+    from runtime.aio import run_sync
+    from skills.provider import generate_within
+
+    if provider.name == "ollama":
+        return lambda: provider.route("what is myoperator", {"profile": profile})
+    if profile is None:
+        return lambda: run_sync(provider.agenerate("what is myoperator"))
+    return lambda: run_sync(generate_within(provider, "what is myoperator", None, None, profile))
+
+
+def output_results(requests: int = 5) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Result rows (per-call latency) plus printable reply-size lines"""
+    from runtime.output_profile import PROFILES
+
+    rows, lines = [], []
+    with StubProviderServer(reply=LONG_REPLY, token_latency=TOKEN_LATENCY) as stub:
+        for name, provider in providers(stub.base_url).items():
+            for mode, profile in (("uncapped", None), ("chat", PROFILES["chat"])):
+                fn = call(provider, profile)
+                fn()  # warm the connection pool
+                sent = stub.tokens_sent
+                latencies, reply = [], ""
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    reply = fn() or ""
+                    latencies.append(time.perf_counter() - start)
+                rows.append(summarize_samples(f"output/{name}/{mode}", [t * 1e6 for t in latencies]))
+                lines.append(f"  {name:<11} {mode:<9} {sorted(latencies)[len(latencies) // 2] * 1000:>7.1f} ms  "
+                             f"reply {len(reply):>5} chars  "
+                             f"sent {(stub.tokens_sent - sent) // requests:>4} tokens/call")
+    return rows, lines
@@ -0,0 +1,74 @@
+"""Cold model loads with and without the residency manager
+
+Sends a sequence of requests with idle gaps through LocalLLMRouter against a
+StubProviderServer that unloads a model once it has been idle longer than
+the server's keep_alive and charges load_latency to the next request.
+Everything is scaled down from minutes to fractions of a second.
+
+"server_default" sends no keep_alive and never pings, as before the
+residency manager; "resident" preloads at start, pings idle models during
+business hours (all day here) and, like a deployment that cannot raise
+keep_alive, still leaves the server default in place.
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tests.benchmarks.harness import summarize_samples
+from tests.benchmarks.stub_servers import StubProviderServer
+
+LOAD_LATENCY = 0.8
+SERVER_KEEP_ALIVE = 0.6
+
+
+def make_gaps(count: int, seed: int = 13) -> List[float]:
+    """Idle gaps between requests: mostly short, some longer than the keep_alive"""
+    rng = random.Random(seed)
+    return [rng.choice([0.05, 0.1, 0.2, 0.9]) for _ in range(count)]
+
+
+def run_mode(base_url: str, resident: bool, gaps: List[float]) -> Dict[str, Any]:
+    from agent_vish import LocalLLMRouter
+    from runtime.llm_scheduler import GenerationScheduler
+    from runtime.residency import ModelResidency
+
+    residency = ModelResidency(base_url, ["llama3.2:1b"], keep_alive=None,
+                               ping_interval=SERVER_KEEP_ALIVE / 2 if resident else 0,
+                               hours=(0, 24 * 60), days=frozenset(range(7)), now=datetime.now)
+    router = LocalLLMRouter(base_url, scheduler=GenerationScheduler(max_concurrent=0), residency=residency)
+    if resident:
+        residency.preload()
+        residency.start()
+    latencies = []
+    try:
+        for gap in gaps:
+            time.sleep(gap)
+            sent = time.perf_counter()
+            router.route("hello")
+            latencies.append(time.perf_counter() - sent)
+    finally:
+        residency.stop()
+    return {"latencies": latencies, "stats": residency.stats()}
+
+
+def residency_results(requests: int = 16) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Result rows (per-request latency) plus printable cold-load lines"""
+    gaps = make_gaps(requests)
+    rows, lines = [], []
+    for name, resident in (("server_default", False), ("resident", True)):
+        with StubProviderServer(load_latency=LOAD_LATENCY, keep_alive=SERVER_KEEP_ALIVE) as stub:
+            run = run_mode(stub.base_url, resident, gaps)
+        latencies = sorted(run["latencies"])
+        rows.append(summarize_samples(f"residency/{name}/latency", [t * 1e6 for t in latencies]))
+        counters = run["stats"]["counters"]
+        lines.append(
+            f"  {name:<15} {counters['cold_requests']:>2} of {requests} requests cold  "
+            f"max {latencies[-1] * 1000:>6.1f} ms  {counters['pings']:>3} pings"
+        )
+    return rows, lines
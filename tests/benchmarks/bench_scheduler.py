@@ -0,0 +1,80 @@
+"""Local-LLM throughput with and without the generation scheduler
+
+Replays the same burst of prompts (mostly short, some long, a few repeated)
+through LocalLLMRouter against a StubProviderServer that models a CPU-bound
+Ollama: per-token decoding latency, per-word prefill, and shared cores that
+slow every generation down once more run than the host has cores.
+
+"free_for_all" is every request calling the model server at once, as before
+the scheduler; "scheduled" goes through GenerationScheduler with the
+concurrency set to the stub's cores.
+"""
+
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tests.benchmarks.harness import summarize_samples
+from tests.benchmarks.stub_servers import StubProviderServer
+
+CORES = 2
+TOKEN_LATENCY = 0.01
+
+
+def make_prompts(count: int, seed: int = 3) -> List[str]:
+    """70% short, 25% medium and 5% long prompts; about one in ten repeats an earlier one"""
+    rng = random.Random(seed)
+    prompts: List[str] = []
+    for _ in range(count):
+        if prompts and rng.random() < 0.1:
+            prompts.append(rng.choice(prompts))
+            continue
+        roll = rng.random()
+        words = rng.randint(8, 20) if roll < 0.7 else rng.randint(60, 120) if roll < 0.95 else rng.randint(300, 500)
+        prompts.append(" ".join(f"w{rng.randint(0, 999)}" for _ in range(words)))
+    return prompts
+
+
+def run_mode(base_url: str, scheduler, prompts: List[str], concurrency: int) -> Dict[str, Any]:
+    from agent_vish import LocalLLMRouter
+
+    router = LocalLLMRouter(base_url, scheduler=scheduler)
+    start = time.perf_counter()
+
+    def send(prompt: str) -> float:
+        sent = time.perf_counter()
+        router.route(prompt)
+        return time.perf_counter() - sent
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(send, prompts))
+    elapsed = time.perf_counter() - start
+    return {"latencies": latencies, "elapsed": elapsed, "stats": scheduler.stats()}
+
+
+def scheduler_results(requests: int = 48, concurrency: int = 16) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Result rows (per-request latency) plus printable throughput lines"""
+    from runtime.llm_scheduler import GenerationScheduler
+
+    prompts = make_prompts(requests)
+    modes = {
+        "free_for_all": lambda: GenerationScheduler(max_concurrent=0),
+        "scheduled": lambda: GenerationScheduler(max_concurrent=CORES, batch_window=0.01),
+    }
+    rows, lines = [], []
+    for name, make in modes.items():
+        with StubProviderServer(token_latency=TOKEN_LATENCY, cores=CORES) as stub:
+            run = run_mode(stub.base_url, make(), prompts, concurrency)
+            served = stub.requests_served
+        rows.append(summarize_samples(f"scheduler/{name}/latency", [t * 1e6 for t in run["latencies"]]))
+        waits = run["stats"]["queue_wait_ms"]
+        lines.append(
+            f"  {name:<14} {requests / run['elapsed']:>6.2f} req/s  {served:>3} generations  "
+            f"queue wait p50 {waits['p50']} ms, p95 {waits['p95']} ms"
+        )
+    return rows, lines
@@ -0,0 +1,70 @@
+"""report_skill over a Google Sheet: downloading it every time vs the synced local copy
+
+The sheet (make_report_frame's renewal export) is served by FakeSheetsServer
+over loopback, so the "full" rows measure the transfer and parsing a full
+download costs without any of Google's network latency; against the real
+API the gap is larger. "unchanged" is a repeat analysis after a version
+check; "append_100" adds rows between analyses, the common case for a
+sheet filled in by a form or a daily export.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tests.benchmarks.fake_sheets import FakeSheetsServer
+from tests.benchmarks.harness import summarize_samples
+
+SHEET_ROWS = 50_000
+APPEND_ROWS = 100
+
+
+def sheet_rows(rows: int, seed: int = 7) -> List[List[Any]]:
+    """Header plus rows of make_report_frame, as the API returns them (NaN as an empty cell)"""
+    from tests.benchmarks.bench_hot_path import make_report_frame
+
+    frame = make_report_frame(rows, seed)
+    values = json.loads(frame.to_json(orient="values"))
+    return [list(frame.columns)] + [["" if v is None else v for v in row] for row in values]
+
+
+def sheets_results(rows: int = SHEET_ROWS, repeat: int = 5) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Result rows (per analysis latency) plus printable download-size lines"""
+    from memory.sheet_cache import ColumnarSheetCache
+    from skills.core_skills import report_skill
+    from skills.sheets_sync import SheetsClient, SheetsSync
+
+    results, lines = [], []
+    extra = sheet_rows(APPEND_ROWS * repeat, seed=11)[1:]
+    with FakeSheetsServer() as fake, tempfile.TemporaryDirectory() as root:
+        fake.add_sheet("bench", "Renewals", sheet_rows(rows))
+        sync = SheetsSync(SheetsClient(fake.base_url, fake.base_url), ColumnarSheetCache(root), max_age=0)
+
+        def full():
+            sync.sync("bench", "Renewals", full=True)
+            return report_skill(sync.frame("bench", "Renewals", sync=False))
+
+        def unchanged():
+            return sync.report("bench", "Renewals")
+
+        def append():
+            fake.append_rows("bench", "Renewals", extra[:APPEND_ROWS])
+            del extra[:APPEND_ROWS]
+            return sync.report("bench", "Renewals")
+
+        full()  # warm the connection pool and take the first copy
+        for mode, fn in (("full", full), ("unchanged", unchanged), (f"append_{APPEND_ROWS}", append)):
+            cells, latencies = fake.cells_served, []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fn()
+                latencies.append(time.perf_counter() - start)
+            results.append(summarize_samples(f"sheets/{mode}", [t * 1e6 for t in latencies]))
+            lines.append(f"  {mode:<11} {sorted(latencies)[len(latencies) // 2] * 1000:>8.1f} ms  "
+                         f"downloaded {(fake.cells_served - cells) // repeat:>7} cells/analysis")
+    return results, lines
@@ -0,0 +1,149 @@
+"""Cold-start benchmarks: import time per module and time to first /chat reply
+
+Every sample runs in a fresh interpreter, since import caching makes
+in-process measurements meaningless. Import times come from -X importtime;
+time to first reply is measured from process start until /chat answers,
+in-process through Flask's test client and under gunicorn with and without
+preload. The local indexes (classifiers, FAQ, docs) are timed built from
+data/ and mapped from prebuilt artifacts (runtime/artifacts.py).
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import requests
+
+from tests.benchmarks.harness import summarize_samples
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+MODULES = [
+    "agent_vish",
+    "api",
+    "memory.memory_manager",
+    "skills.analytics_skill",
+    "skills.core_skills",
+    "skills.ai_router_skill",
+    "skills.chatgpt_skill",
+    "skills.gemini_skill",
+    "skills.perplexity_skill",
+]
+
+_FIRST_CHAT_SCRIPT = """
+import time
+start = time.perf_counter()
+import api
+resp = api.app.test_client().post("/chat", json={"message": "help"})
+assert resp.status_code == 200, resp.status_code
+print(time.perf_counter() - start)
+"""
+
+_INDEXES_SCRIPT = """
+import time
+from skills.doc_index import default_doc_index
+from skills.faq_engine import load_faq
+from skills.intent_classifier import load_classifier
+start = time.perf_counter()
+load_classifier("intents.jsonl", "intent")
+load_classifier("query_types.jsonl", "query_type")
+load_faq()
+default_doc_index()
+print(time.perf_counter() - start)
+"""
+
+
+def _env(stub_url: str, **extra) -> Dict[str, str]:
+    env = dict(os.environ, OLLAMA_BASE_URL=stub_url, PYTHONPATH=ROOT, **extra)
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    return env
+
+
+def import_time_us(module: str, stub_url: str) -> Dict[str, float]:
+    """Cumulative -X importtime microseconds for module and its heaviest imports"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=_env(stub_url), capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, _, rest = line.partition(":")
+        _self_us, cumulative, name = (part.strip() for part in rest.split("|"))
+        times[name] = max(times.get(name, 0.0), float(cumulative))
+    return times
+
+
+def first_chat_in_process_us(stub_url: str) -> float:
+    proc = subprocess.run([sys.executable, "-c", _FIRST_CHAT_SCRIPT], cwd=ROOT,
+                          env=_env(stub_url), capture_output=True, text=True, check=True)
+    return float(proc.stdout.strip().splitlines()[-1]) * 1e6
+
+
+def indexes_us(stub_url: str, artifacts_dir: str = "") -> float:
+    """Microseconds to load the local indexes in a fresh process, from artifacts_dir or built from data/"""
+    extra = {"ARTIFACTS_DIR": artifacts_dir} if artifacts_dir else {"ARTIFACTS": "off"}
+    proc = subprocess.run([sys.executable, "-c", _INDEXES_SCRIPT], cwd=ROOT,
+                          env=_env(stub_url, **extra), capture_output=True, text=True, check=True)
+    return float(proc.stdout.strip().splitlines()[-1]) * 1e6
+
+
+def first_chat_gunicorn_us(stub_url: str, preload: bool, timeout: float = 60.0) -> float:
+    """Spawn gunicorn and poll /chat; returns microseconds to the first 200"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = _env(stub_url, GUNICORN_PRELOAD="1" if preload else "0")
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "api:app", "--bind", f"127.0.0.1:{port}",
+         "--workers", "1", "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                resp = requests.post(f"http://127.0.0.1:{port}/chat", json={"message": "help"}, timeout=5)
+                if resp.status_code == 200:
+                    return (time.perf_counter() - start) * 1e6
+            except requests.ConnectionError:
+                pass
+            if proc.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with code {proc.returncode}")
+            time.sleep(0.01)
+        raise RuntimeError("gunicorn did not answer /chat in time")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def startup_results(stub_url: str, repeat: int = 3) -> List[Dict[str, Any]]:
+    results = []
+    for module in MODULES:
+        samples = [import_time_us(module, stub_url).get(module, 0.0) for _ in range(repeat)]
+        results.append(summarize_samples(f"startup/import/{module}", samples))
+    results.append(summarize_samples(
+        "startup/first_chat/in_process", [first_chat_in_process_us(stub_url) for _ in range(repeat)]))
+    results.append(summarize_samples("startup/indexes/built", [indexes_us(stub_url) for _ in range(repeat)]))
+    with tempfile.TemporaryDirectory() as artifacts_dir:
+        subprocess.run([sys.executable, "-m", "runtime.artifacts", "build", "--dir", artifacts_dir], cwd=ROOT,
+                       env=_env(stub_url), capture_output=True, check=True)
+        results.append(summarize_samples(
+            "startup/indexes/mapped", [indexes_us(stub_url, artifacts_dir) for _ in range(repeat)]))
+    for preload in (False, True):
+        label = "gunicorn_preload" if preload else "gunicorn"
+        results.append(summarize_samples(
+            f"startup/first_chat/{label}", [first_chat_gunicorn_us(stub_url, preload) for _ in range(repeat)]))
+    return results
+
+
+def heaviest_imports(module: str, stub_url: str, top: int = 10) -> List[Any]:
+    """The most expensive transitive imports of module, for the printed profile"""
+    times = import_time_us(module, stub_url)
+    times.pop(module, None)
+    return sorted(times.items(), key=lambda item: item[1], reverse=True)[:top]
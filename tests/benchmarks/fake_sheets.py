@@ -0,0 +1,181 @@
+"""Local fake Google Sheets and Drive server
+
+Serves the handful of endpoints skills/sheets_sync.py uses, over in-memory
+spreadsheets that tests edit directly:
+
+    GET /drive/v3/files/{id}?fields=version
+    GET /v4/spreadsheets/{id}?fields=sheets.properties
+    GET /v4/spreadsheets/{id}/values/{range}
+    GET /v4/spreadsheets/{id}/values:batchGet?ranges=...&ranges=...
+
+Values come back like valueRenderOption=UNFORMATTED_VALUE: numbers as JSON
+numbers, empty cells as "", trailing empty cells and rows left out. Every
+edit bumps the file's version, as Drive does. cells_served counts the
+values sent, i.e. what a sync downloaded.
+"""
+
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+A1_RANGE = re.compile(r"^(?:'((?:[^']|'')+)'|([^!]+))!([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$")
+
+
+def column_index(letters: str) -> int:
+    """'A' -> 0, 'AB' -> 27"""
+    index = 0
+    for ch in letters:
+        index = index * 26 + ord(ch) - 64
+    return index - 1
+
+
+def parse_a1(a1: str) -> Tuple[str, int, Optional[int], int, Optional[int]]:
+    """"'Q1'!B2:D10" -> ("Q1", first row, last row or None, first col, last col or None), zero-based"""
+    match = A1_RANGE.match(a1)
+    if match is None:
+        raise ValueError(f"Bad range {a1!r}")
+    quoted, plain, col1, row1, col2, row2 = match.groups()
+    title = quoted.replace("''", "'") if quoted else plain
+    first_row = int(row1) - 1 if row1 else 0
+    first_col = column_index(col1) if col1 else 0
+    if match.group(5) is None and match.group(6) is None:  # a single cell
+        return title, first_row, first_row, first_col, first_col
+    last_row = int(row2) - 1 if row2 else None
+    last_col = column_index(col2) if col2 else None
+    return title, first_row, last_row, first_col, last_col
+
+
+class _SheetsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Any):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        fake: "FakeSheetsServer" = self.server.fake
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        parts = [unquote(p) for p in url.path.strip("/").split("/")]
+        with fake.lock:
+            fake.requests += 1
+            try:
+                if parts[:3] == ["drive", "v3", "files"] and len(parts) == 4:
+                    book = fake.books[parts[3]]
+                    return self._send_json(200, {"version": str(book["version"])})
+                if parts[:2] != ["v4", "spreadsheets"] or len(parts) < 3:
+                    return self._send_json(404, {"error": {"message": "not found"}})
+                book = fake.books[parts[2].split(":")[0]]
+                if len(parts) == 3:
+                    return self._send_json(200, {"sheets": [
+                        {"properties": {"title": title, "index": i, "gridProperties": {
+                            "rowCount": max(len(rows), 1000), "columnCount": max(map(len, rows), default=26)}}}
+                        for i, (title, rows) in enumerate(book["sheets"].items())]})
+                if parts[2].endswith(":batchGet") or parts[3:] == ["values:batchGet"]:
+                    ranges = query.get("ranges", [])
+                    return self._send_json(200, {"spreadsheetId": parts[2],
+                                                 "valueRanges": [fake.values(book, r) for r in ranges]})
+                if parts[3] == "values" and len(parts) == 5:
+                    return self._send_json(200, fake.values(book, parts[4]))
+            except KeyError as e:
+                return self._send_json(404, {"error": {"message": f"not found: {e}"}})
+            except ValueError as e:
+                return self._send_json(400, {"error": {"message": str(e)}})
+        self._send_json(404, {"error": {"message": "not found"}})
+
+
+class FakeSheetsServer:
+    """In-memory spreadsheets behind the Sheets v4 and Drive v3 read endpoints
+
+    Use as a context manager; base_url is set once the server is listening.
+    Row lists include the header row, as in the sheet.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.books: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.cells_served = 0
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def add_sheet(self, spreadsheet_id: str, title: str, rows: List[List[Any]]):
+        with self.lock:
+            book = self.books.setdefault(spreadsheet_id, {"version": 1, "sheets": {}})
+            book["sheets"][title] = [list(row) for row in rows]
+            book["version"] += 1
+
+    def append_rows(self, spreadsheet_id: str, title: str, rows: List[List[Any]]):
+        with self.lock:
+            book = self.books[spreadsheet_id]
+            book["sheets"][title].extend(list(row) for row in rows)
+            book["version"] += 1
+
+    def set_cell(self, spreadsheet_id: str, title: str, row: int, col: int, value: Any):
+        """Edit one cell; row 0 is the header"""
+        with self.lock:
+            book = self.books[spreadsheet_id]
+            cells = book["sheets"][title][row]
+            cells.extend([""] * (col + 1 - len(cells)))
+            cells[col] = value
+            book["version"] += 1
+
+    def delete_rows(self, spreadsheet_id: str, title: str, start: int, count: int):
+        with self.lock:
+            book = self.books[spreadsheet_id]
+            del book["sheets"][title][start:start + count]
+            book["version"] += 1
+
+    def values(self, book: Dict[str, Any], a1: str) -> Dict[str, Any]:
+        """A ValueRange for a1, trimmed like the real API; caller holds the lock"""
+        title, first_row, last_row, first_col, last_col = parse_a1(a1)
+        rows = book["sheets"][title]
+        picked = []
+        for row in rows[first_row:None if last_row is None else last_row + 1]:
+            cells = row[first_col:None if last_col is None else last_col + 1]
+            while cells and cells[-1] in ("", None):
+                cells = cells[:-1]
+            picked.append(cells)
+        while picked and not picked[-1]:
+            picked.pop()
+        self.cells_served += sum(len(r) for r in picked)
+        result = {"range": a1, "majorDimension": "ROWS"}
+        if picked:
+            result["values"] = picked
+        return result
+
+    def start(self) -> "FakeSheetsServer":
+        server = ThreadingHTTPServer((self.host, self.port), _SheetsHandler)
+        server.daemon_threads = True
+        server.fake = self
+        self._server = server
+        self.port = server.server_address[1]
+        threading.Thread(target=server.serve_forever, name="fake-sheets", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeSheetsServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
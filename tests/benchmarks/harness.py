@@ -0,0 +1,175 @@
+"""Benchmark harness for Agent Vish
+
+Times small callables, stores results as JSON baselines and compares a fresh
+run against a stored baseline so regressions can fail a CI step.
+"""
+
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# A benchmark is flagged as a regression when its median gets this much slower
+DEFAULT_THRESHOLD = 0.25
+
+
+def _autorange(fn: Callable[[], Any], min_time: float = 0.05) -> int:
+    """Find how many calls make up one timed sample of at least min_time seconds"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            return number
+        number *= 10 if elapsed < min_time / 10 else 2
+
+
+def run_benchmark(name: str, fn: Callable[[], Any], repeat: int = 5,
+                  number: Optional[int] = None, min_time: float = 0.05) -> Dict[str, Any]:
+    """Time fn and return per-call statistics in microseconds
+
+    Args:
+        name: Benchmark name used as the baseline key
+        fn: Zero-argument callable to time
+        repeat: Number of timed samples
+        number: Calls per sample; calibrated automatically when omitted
+        min_time: Target duration of one sample when calibrating
+
+    Returns:
+        Dict with name, number, repeat and min/median/mean/max in microseconds
+    """
+    fn()  # warm caches and lazy imports outside the timed region
+    if number is None:
+        number = _autorange(fn, min_time)
+
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            samples.append((time.perf_counter() - start) / number * 1e6)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return summarize_samples(name, samples, number)
+
+
+def summarize_samples(name: str, samples: List[float], number: int = 1) -> Dict[str, Any]:
+    """Build a result row from per-call samples already in microseconds
+
+    Used directly by benchmarks that measure themselves, e.g. in a subprocess.
+    """
+    return {
+        "name": name,
+        "number": number,
+        "repeat": len(samples),
+        "min_us": round(min(samples), 3),
+        "median_us": round(statistics.median(samples), 3),
+        "mean_us": round(statistics.fmean(samples), 3),
+        "max_us": round(max(samples), 3),
+    }
+
+
+def environment() -> Dict[str, str]:
+    """Describe the machine a run was taken on, stored next to the results"""
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "cpu_count": str(os.cpu_count()),
+    }
+
+
+def baseline_path(suite: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{suite}.json")
+
+
+def save_baseline(suite: str, results: List[Dict[str, Any]], path: Optional[str] = None) -> str:
+    """Write results as the JSON baseline for a suite and return the file path"""
+    path = path or baseline_path(suite)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = {
+        "suite": suite,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": environment(),
+        "results": {r["name"]: r for r in results},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return path
+
+
+def load_baseline(suite: str, path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Load a stored baseline, or None if the suite has never been saved"""
+    path = path or baseline_path(suite)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """Compare results against a baseline by median time
+
+    Returns:
+        One row per benchmark present in both, with the relative change and
+        a 'regression' flag set when it is slower by more than threshold
+    """
+    rows = []
+    previous = baseline.get("results", {})
+    for result in results:
+        old = previous.get(result["name"])
+        if not old or not old.get("median_us"):
+            continue
+        change = result["median_us"] / old["median_us"] - 1.0
+        rows.append({
+            "name": result["name"],
+            "baseline_us": old["median_us"],
+            "current_us": result["median_us"],
+            "change": round(change, 4),
+            "regression": change > threshold,
+        })
+    return rows
+
+
+def format_results(results: List[Dict[str, Any]]) -> str:
+    lines = [f"{'benchmark':<48} {'median':>14} {'min':>14} {'calls':>9}"]
+    for r in results:
+        lines.append(
+            f"{r['name']:<48} {_fmt_us(r['median_us']):>14} {_fmt_us(r['min_us']):>14} {r['number']:>9}"
+        )
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'benchmark':<48} {'baseline':>14} {'current':>14} {'change':>9}"]
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        lines.append(
+            f"{row['name']:<48} {_fmt_us(row['baseline_us']):>14} {_fmt_us(row['current_us']):>14} "
+            f"{row['change'] * 100:>+8.1f}%{flag}"
+        )
+    return "\n".join(lines)
+
+
+def _fmt_us(value: float) -> str:
+    if value >= 1e6:
+        return f"{value / 1e6:.3f} s"
+    if value >= 1e3:
+        return f"{value / 1e3:.3f} ms"
+    return f"{value:.3f} us"
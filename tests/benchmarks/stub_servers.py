@@ -0,0 +1,346 @@
+"""Local stub LLM provider server
+
+Speaks just enough of the Ollama, OpenAI and Perplexity HTTP APIs for the
+bot's provider code to run against it, so benchmarks never touch the network.
+"""
+
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+DEFAULT_REPLY = "Agent Vish stub reply: MyOperator helps teams manage business calls."
+GENERATION_PATHS = ("/api/generate", "/v1/chat/completions", "/chat/completions")
+
+
+def parse_latency(spec: str, seed: Optional[int] = None) -> Callable[[], float]:
+    """Build a latency sampler (seconds) from a spec string
+
+    Supported specs:
+        fixed:0.5             always 0.5 s
+        uniform:0.2,1.5       uniform between 0.2 and 1.5 s
+        normal:0.8,0.2        normal with mean 0.8 and stddev 0.2, clipped at 0
+        lognormal:0.8,0.5     lognormal with median 0.8 s and shape 0.5
+        exp:0.8               exponential with mean 0.8 s
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()] if args else []
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def sampled(draw: Callable[[], float]) -> Callable[[], float]:
+        def sample() -> float:
+            with lock:  # random.Random is shared by the server's handler threads
+                return max(0.0, draw())
+        return sample
+
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return sampled(lambda: rng.uniform(values[0], values[1]))
+    if kind == "normal" and len(values) == 2:
+        return sampled(lambda: rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0]) if values[0] > 0 else 0.0
+        return sampled(lambda: rng.lognormvariate(mu, values[1]))
+    if kind == "exp" and len(values) == 1:
+        return sampled(lambda: rng.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0)
+    raise ValueError(f"Invalid latency spec: {spec!r}")
+
+
+def parse_keep_alive(value, default: float) -> float:
+    """Ollama keep_alive ("30m", "90s", "1h", seconds as a number) -> seconds; negative is forever"""
+    if value is None or value == "":
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    units = {"s": 1, "m": 60, "h": 3600}
+    text = str(value).strip()
+    if text[-1:] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            return json.loads(raw) if raw else {}
+        except ValueError:
+            return {}
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": self.server.model}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _ensure_loaded(self, payload: dict) -> float:
+        """Seconds spent loading the model: load_latency unless it is still
+        resident, i.e. used within its last keep_alive"""
+        server = self.server
+        model = payload.get("model", server.model)
+        keep_alive = parse_keep_alive(payload.get("keep_alive"), server.keep_alive)
+        with server.active_lock:
+            expires = server.loaded.get(model)
+            cold = expires is None or expires < time.monotonic()
+            if cold:
+                # Mark it loading so concurrent requests do not load it again
+                server.loaded[model] = math.inf
+        load = server.load_latency if cold else 0.0
+        if load:
+            time.sleep(load)
+        with server.active_lock:
+            server.loaded[model] = math.inf if keep_alive < 0 else time.monotonic() + keep_alive
+        return load
+
+    def _simulate_generation(self, payload: dict):
+        """Sleep for the prompt's prefill plus per-token decoding, slowed down
+        like a CPU-bound model server when more generations run than it has
+        cores: they share the cores and each extra one adds thrashing overhead"""
+        server = self.server
+        prompt_tokens = len(str(payload.get("prompt", "")).split())
+        work = prompt_tokens * server.prefill_latency + len(self._reply_words(payload)[0]) * server.token_latency
+        with server.active_lock:
+            server.active += 1
+        try:
+            done = 0.0
+            while done < work:
+                with server.active_lock:
+                    active = server.active
+                speed = 1.0
+                if server.cores and active > server.cores:
+                    speed = server.cores / active / (1 + server.contention * (active - server.cores))
+                step = min(0.005, (work - done) / speed)
+                time.sleep(step)
+                done += step * speed
+        finally:
+            with server.active_lock:
+                server.active -= 1
+
+    def _reply_words(self, payload: dict):
+        """The reply's words, cut to the request's token cap (one word per
+        token), and whether the cap cut it"""
+        words = self.server.reply.split(" ")
+        limit = payload.get("max_tokens") or (payload.get("options") or {}).get("num_predict")
+        if limit and limit > 0 and len(words) > limit:
+            return words[:limit], True
+        return words, False
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _stream(self, payload: dict):
+        """The reply word by word, token_latency apart: NDJSON for Ollama,
+        server-sent events for the OpenAI-style APIs"""
+        server = self.server
+        ollama = self.path == "/api/generate"
+        model = payload.get("model", server.model)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson" if ollama else "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words, capped = self._reply_words(payload)
+        try:
+            for i, word in enumerate(words):
+                if server.token_latency:
+                    time.sleep(server.token_latency)
+                piece = word if i == len(words) - 1 else word + " "
+                if ollama:
+                    event = json.dumps({"model": model, "response": piece, "done": False}) + "\n"
+                else:
+                    event = "data: " + json.dumps({
+                        "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": model,
+                        "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                    }) + "\n\n"
+                self._write_chunk(event.encode("utf-8"))
+                with server.active_lock:
+                    server.tokens_sent += 1
+            if ollama:
+                tail = json.dumps({"model": model, "response": "", "done": True,
+                                   "done_reason": "length" if capped else "stop",
+                                   "eval_count": len(words)}) + "\n"
+            else:
+                tail = "data: [DONE]\n\n"
+            self._write_chunk(tail.encode("utf-8"))
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            with server.active_lock:
+                server.streams_aborted += 1
+            self.close_connection = True
+
+    def do_POST(self):
+        payload = self._read_json()
+        self.server.requests_served += 1
+        time.sleep(self.server.latency())
+        load = 0.0
+        if self.path == "/api/generate":
+            load = self._ensure_loaded(payload)
+            if "prompt" not in payload:  # load-only request
+                self._send_json(200, {"model": payload.get("model", self.server.model), "response": "",
+                                      "done": True, "done_reason": "load", "load_duration": int(load * 1e9)})
+                return
+        streaming = bool(payload.get("stream"))
+        if self.server.token_latency and self.path in GENERATION_PATHS and not streaming:
+            self._simulate_generation(payload)
+        if self.server.failure_rate and self.server.rng.random() < self.server.failure_rate:
+            self._send_json(500, {"error": "injected failure"})
+            return
+
+        words, capped = self._reply_words(payload)
+        reply = " ".join(words)
+        if not streaming:
+            with self.server.active_lock:
+                self.server.tokens_sent += len(words)
+        if streaming and self.path in GENERATION_PATHS:
+            self._stream(payload)
+        elif self.path == "/api/generate":
+            self._send_json(200, {
+                "model": payload.get("model", self.server.model),
+                "response": reply,
+                "done": True,
+                "done_reason": "length" if capped else "stop",
+                "eval_count": len(words),
+                "load_duration": int(load * 1e9),
+            })
+        elif self.path in ("/v1/chat/completions", "/chat/completions"):
+            self._send_json(200, {
+                "id": "stub",
+                "object": "chat.completion",
+                "model": payload.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": reply},
+                    "finish_reason": "length" if capped else "stop",
+                }],
+                "usage": {"prompt_tokens": 1, "completion_tokens": len(reply.split()), "total_tokens": 1},
+            })
+        else:
+            self._send_json(404, {"error": "not found"})
+
+
+class StubProviderServer:
+    """Threaded stub for Ollama (/api/*), OpenAI (/v1/chat/completions) and Perplexity (/chat/completions)
+
+    Use as a context manager; base_url is set once the server is listening.
+
+    Args:
+        latency: Seconds to wait before answering, a parse_latency spec string,
+            or a zero-argument callable returning seconds
+        failure_rate: Fraction of generation requests answered with HTTP 500
+        reply: Text returned by every provider
+        seed: Seed for the failure-injection random generator
+        token_latency: Seconds per generated token on an idle server
+            (0 disables the generation model)
+        prefill_latency: Seconds per prompt word (default token_latency / 8)
+        cores: Generations the server runs at full speed; past that they share
+            the cores (0 = unlimited)
+        contention: Extra slowdown per generation beyond `cores`
+        load_latency: Seconds a generate call spends loading a model that is
+            not resident (Ollama /api/generate only)
+        keep_alive: Seconds a model stays resident after its last call when
+            the request sends no keep_alive
+
+    Requests with "stream": true get the reply word by word, token_latency
+    apart, as Ollama NDJSON or OpenAI-style server-sent events. A max_tokens
+    or options.num_predict cap cuts the reply at that many words.
+    """
+
+    def __init__(self, latency=0.0, failure_rate: float = 0.0,
+                 reply: str = DEFAULT_REPLY, model: str = "llama3.2:1b",
+                 host: str = "127.0.0.1", port: int = 0, seed: Optional[int] = None,
+                 token_latency: float = 0.0, prefill_latency: Optional[float] = None,
+                 cores: int = 0, contention: float = 0.15,
+                 load_latency: float = 0.0, keep_alive: float = 300.0):
+        if isinstance(latency, str):
+            latency = parse_latency(latency, seed)
+        self.latency: Callable[[], float] = latency if callable(latency) else (lambda: latency)
+        self.failure_rate = failure_rate
+        self.reply = reply
+        self.model = model
+        self.host = host
+        self.port = port
+        self.seed = seed
+        self.token_latency = token_latency
+        self.prefill_latency = token_latency / 8 if prefill_latency is None else prefill_latency
+        self.cores = cores
+        self.contention = contention
+        self.load_latency = load_latency
+        self.keep_alive = keep_alive
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def requests_served(self) -> int:
+        return self._server.requests_served if self._server else 0
+
+    @property
+    def tokens_sent(self) -> int:
+        """Reply words sent, streamed or in whole responses"""
+        return self._server.tokens_sent if self._server else 0
+
+    @property
+    def streams_aborted(self) -> int:
+        """Streams the client closed before the end"""
+        return self._server.streams_aborted if self._server else 0
+
+    def start(self) -> "StubProviderServer":
+        server = ThreadingHTTPServer((self.host, self.port), _StubHandler)
+        server.daemon_threads = True
+        server.latency = self.latency
+        server.failure_rate = self.failure_rate
+        server.reply = self.reply
+        server.model = self.model
+        server.rng = random.Random(self.seed)
+        server.requests_served = 0
+        server.token_latency = self.token_latency
+        server.prefill_latency = self.prefill_latency
+        server.cores = self.cores
+        server.contention = self.contention
+        server.active = 0
+        server.active_lock = threading.Lock()
+        server.load_latency = self.load_latency
+        server.keep_alive = self.keep_alive
+        server.loaded = {}
+        server.tokens_sent = 0
+        server.streams_aborted = 0
+        self._server = server
+        self.port = server.server_address[1]
+        self._thread = threading.Thread(target=server.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "StubProviderServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
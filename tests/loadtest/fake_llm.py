@@ -0,0 +1,40 @@
+"""Standalone fake LLM server for manual load tests
+
+Serves the Ollama, OpenAI and Perplexity endpoints with injected latency and
+failures. Point the app at it with OLLAMA_BASE_URL, PERPLEXITY_BASE_URL and
+OPENAI_BASE_URL (suffix /v1).
+
+Usage:
+    python -m tests.loadtest.fake_llm --port 11500 --latency lognormal:0.8,0.5 --failure-rate 0.02
+"""
+
+import argparse
+import sys
+import time
+
+from tests.benchmarks.stub_servers import StubProviderServer
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tests.loadtest.fake_llm", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency", default="lognormal:0.8,0.5", help="Latency spec, e.g. fixed:0.5 or exp:0.8")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    with StubProviderServer(latency=args.latency, failure_rate=args.failure_rate,
+                            host=args.host, port=args.port, seed=args.seed) as server:
+        print(f"Fake LLM listening on {server.base_url}", flush=True)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
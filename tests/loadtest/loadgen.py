@@ -0,0 +1,267 @@
+"""End-to-end load generator for api:app
+
+Starts a fake LLM server with injected latency, boots api:app under gunicorn
+pointed at it (or targets an already running URL), and replays a weighted
+message mix at a fixed concurrency and arrival rate. Reports throughput and
+p50/p95/p99 latency and error rates per intent class, plus the share of
+replies by source (static, faq, llm, ...), i.e. how much traffic the local
+answer paths keep away from the providers.
+
+Usage:
+    python -m tests.loadtest.loadgen --workers 2 --threads 4 --rate 20 --duration 30
+    python -m tests.loadtest.loadgen --worker-class gthread --llm-latency lognormal:0.8,0.5 --llm-failure-rate 0.05
+    python -m tests.loadtest.loadgen --target http://127.0.0.1:10000 --concurrency 32 --json result.json
+
+Runs are reproducible: the message sequence and arrival times are drawn from
+--seed, and the fake LLM latency sampler is seeded from it as well.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from tests.benchmarks.stub_servers import StubProviderServer
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DEFAULT_MIX = os.path.join(os.path.dirname(os.path.abspath(__file__)), "messages.jsonl")
+
+
+def load_mix(path: str) -> List[Dict[str, Any]]:
+    """Read a JSONL message mix of {"class", "message", "weight"} rows"""
+    mix = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                row = json.loads(line)
+                row.setdefault("weight", 1)
+                mix.append(row)
+    if not mix:
+        raise ValueError(f"Message mix {path} is empty")
+    return mix
+
+
+def build_schedule(mix: List[Dict[str, Any]], total: int, rate: Optional[float],
+                   seed: int) -> List[Dict[str, Any]]:
+    """Draw the replayable request sequence: message, class and send offset
+
+    With a rate, arrivals follow a Poisson process (open loop); without one,
+    every offset is 0 and the run is closed loop at the given concurrency.
+    """
+    rng = random.Random(seed)
+    weights = [row["weight"] for row in mix]
+    offset = 0.0
+    schedule = []
+    for row in rng.choices(mix, weights=weights, k=total):
+        if rate:
+            offset += rng.expovariate(rate)
+        schedule.append({"class": row["class"], "message": row["message"], "at": offset})
+    return schedule
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile, q in [0, 100]"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(q / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Aggregate per-request samples into overall and per-class statistics"""
+    def stats(rows):
+        latencies = [r["latency"] for r in rows]
+        errors = sum(1 for r in rows if not r["ok"])
+        return {
+            "requests": len(rows),
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+            "throughput_rps": round(len(rows) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(max(latencies) * 1000, 2) if latencies else 0.0,
+        }
+
+    classes = sorted({s["class"] for s in samples})
+    # Where replies came from; "faq" replies are requests kept off the providers
+    sources = Counter(s.get("source") or "error" for s in samples)
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "overall": stats(samples),
+        "by_class": {c: stats([s for s in samples if s["class"] == c]) for c in classes},
+        "reply_share": {k: round(v / len(samples), 4) for k, v in sorted(sources.items())},
+    }
+
+
+def drive(base_url: str, schedule: List[Dict[str, Any]], concurrency: int,
+          timeout: float) -> Dict[str, Any]:
+    """Send the schedule to base_url/chat and collect per-request samples
+
+    Latency is measured from the scheduled send time, not from when a client
+    thread became free, so a saturated server is not hidden by client queueing.
+    """
+    local = threading.local()
+    samples = []
+    samples_lock = threading.Lock()
+
+    def session() -> requests.Session:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    def send(item: Dict[str, Any], scheduled: float):
+        ok = False
+        status = None
+        source = None
+        try:
+            resp = session().post(f"{base_url}/chat", json={"message": item["message"]}, timeout=timeout)
+            status = resp.status_code
+            body = resp.json() if status == 200 else {}
+            ok = body.get("ok", False)
+            source = body.get("source")
+        except requests.RequestException:
+            pass
+        latency = time.perf_counter() - scheduled
+        with samples_lock:
+            samples.append({"class": item["class"], "latency": latency, "ok": ok,
+                            "status": status, "source": source})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for item in schedule:
+            scheduled = start + item["at"]
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, item, max(scheduled, start))
+    elapsed = time.perf_counter() - start
+    return summarize(samples, elapsed)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base_url: str, proc: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {proc.returncode}")
+        try:
+            if requests.get(f"{base_url}/", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("gunicorn did not become ready in time")
+
+
+def start_gunicorn(port: int, llm_url: str, workers: int, worker_class: str, threads: int,
+                   extra_args: Optional[List[str]] = None, log_path: Optional[str] = None) -> subprocess.Popen:
+    """Boot api:app under gunicorn with providers pointed at the fake LLM"""
+    env = dict(os.environ, OLLAMA_BASE_URL=llm_url, PERPLEXITY_BASE_URL=llm_url,
+               OPENAI_BASE_URL=f"{llm_url}/v1", PYTHONPATH=ROOT)
+    # Every simulated user shares one client IP; keep the per-client limit
+    # out of the way unless the caller configures it explicitly
+    env.setdefault("RATE_LIMIT_PER_SEC", "0")
+    cmd = [
+        sys.executable, "-m", "gunicorn", "api:app",
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(workers),
+        "--worker-class", worker_class,
+        "--threads", str(threads),
+        "--timeout", "120",
+        "--log-level", "warning",
+    ] + list(extra_args or [])
+    log = open(log_path, "ab") if log_path else subprocess.DEVNULL
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"{'class':<12} {'reqs':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err %':>7}"]
+    rows = list(report["by_class"].items()) + [("overall", report["overall"])]
+    for name, s in rows:
+        lines.append(
+            f"{name:<12} {s['requests']:>6} {s['throughput_rps']:>8} {s['p50_ms']:>9} "
+            f"{s['p95_ms']:>9} {s['p99_ms']:>9} {s['error_rate'] * 100:>6.1f}%"
+        )
+    if report.get("reply_share"):
+        lines.append("replies by source: " + ", ".join(
+            f"{source} {share * 100:.1f}%" for source, share in report["reply_share"].items()))
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tests.loadtest.loadgen", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", help="Drive an already running server instead of starting gunicorn")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="JSONL message mix (default: %(default)s)")
+    parser.add_argument("--requests", type=int, default=0, help="Total requests (default: rate * duration)")
+    parser.add_argument("--rate", type=float, default=10.0, help="Arrival rate in req/s; 0 for closed loop")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of arrivals when --requests is 0")
+    parser.add_argument("--concurrency", type=int, default=16, help="Max in-flight client requests")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request client timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for message order, arrivals and LLM latency")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn worker processes")
+    parser.add_argument("--worker-class", default="sync", help="gunicorn worker class (sync, gthread, ...)")
+    parser.add_argument("--threads", type=int, default=1, help="gunicorn threads per worker")
+    parser.add_argument("--gunicorn-arg", action="append", default=[], help="Extra gunicorn argument (repeatable)")
+    parser.add_argument("--llm-latency", default="lognormal:0.8,0.5", help="Fake LLM latency spec")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0, help="Fraction of LLM calls that fail")
+    parser.add_argument("--server-log", help="Append gunicorn and app output to this file")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.requests:
+        total = args.requests
+    elif args.rate:
+        total = max(1, int(args.rate * args.duration))
+    else:
+        total = 200
+    schedule = build_schedule(load_mix(args.mix), total, args.rate or None, args.seed)
+
+    config = {k: v for k, v in vars(args).items() if k not in ("json_path", "server_log")}
+    if args.target:
+        report = drive(args.target.rstrip("/"), schedule, args.concurrency, args.timeout)
+    else:
+        with StubProviderServer(latency=args.llm_latency, failure_rate=args.llm_failure_rate,
+                                seed=args.seed) as llm:
+            port = _free_port()
+            proc = start_gunicorn(port, llm.base_url, args.workers, args.worker_class,
+                                  args.threads, args.gunicorn_arg, args.server_log)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                _wait_ready(base_url, proc)
+                report = drive(base_url, schedule, args.concurrency, args.timeout)
+                report["llm_requests"] = llm.requests_served
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+
+    report["config"] = config
+    print(format_report(report))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent_vish import AgentVish, clean_text, FALLBACK
+from runtime.admission import AdmissionController, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Unit tests for TokenBucket"""
+
+    def test_burst_then_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2.0, burst=3, clock=clock)
+        self.assertEqual([bucket.try_acquire() for _ in range(4)], [True, True, True, False])
+        self.assertAlmostEqual(bucket.retry_after(), 0.5)
+        clock.now += 0.5
+        self.assertTrue(bucket.try_acquire())
+        clock.now += 100
+        self.assertEqual(bucket.tokens, 0)
+        bucket.try_acquire()
+        self.assertEqual(bucket.tokens, 2)  # capped at burst, minus the one taken
+
+
+class TestAdmissionController(unittest.TestCase):
+    """Unit tests for rate limiting and the LLM slot queue"""
+
+    def test_rate_limit_is_per_client(self):
+        controller = AdmissionController(rate_per_sec=1, burst=1, clock=FakeClock())
+        self.assertEqual(controller.check_rate("a"), 0)
+        self.assertGreater(controller.check_rate("a"), 0)
+        self.assertEqual(controller.check_rate("b"), 0)
+        self.assertEqual(controller.stats()["counters"]["rate_limited"], 1)
+
+    def test_rate_limit_disabled(self):
+        controller = AdmissionController(rate_per_sec=0)
+        self.assertTrue(all(controller.check_rate("a") == 0 for _ in range(100)))
+
+    def test_concurrency_cap_sheds_when_queue_full(self):
+        controller = AdmissionController(max_concurrent_llm=1, max_queue=0)
+        with controller.llm_slot() as first:
+            self.assertTrue(first)
+            with controller.llm_slot() as second:
+                self.assertFalse(second)
+        self.assertEqual(controller.stats()["state"]["llm_in_flight"], 0)
+        self.assertEqual(controller.stats()["counters"]["shed_queue_full"], 1)
+
+    def test_queued_caller_times_out(self):
+        controller = AdmissionController(max_concurrent_llm=1, max_queue=1, queue_timeout=0.05)
+        self.assertTrue(controller.acquire_llm())
+        self.assertFalse(controller.acquire_llm())
+        self.assertEqual(controller.stats()["counters"]["shed_timeout"], 1)
+
+    def test_spent_deadline_is_not_a_full_queue(self):
+        controller = AdmissionController(max_concurrent_llm=1, max_queue=4)
+        self.assertTrue(controller.acquire_llm())
+        self.assertFalse(controller.acquire_llm(timeout=0))
+        counters = controller.stats()["counters"]
+        self.assertEqual((counters["shed_deadline"], counters["shed_queue_full"]), (1, 0))
+
+    def test_queued_caller_gets_released_slot(self):
+        controller = AdmissionController(max_concurrent_llm=1, max_queue=1, queue_timeout=5)
+        self.assertTrue(controller.acquire_llm())
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(controller.acquire_llm()))
+        waiter.start()
+        while controller.stats()["state"]["queue_depth"] == 0:
+            pass
+        controller.release_llm()
+        waiter.join(5)
+        self.assertEqual(results, [True])
+
+
+class TestAgentLoadShedding(unittest.TestCase):
+    """AgentVish answers from the static catalog when the gate says no"""
+
+    def test_shed_to_static_fallback(self):
+        controller = AdmissionController(max_concurrent_llm=0, max_queue=0)
+        with patch("agent_vish.LocalLLMRouter._check_availability", return_value=False):
+            agent = AgentVish(llm_gate=controller.llm_slot)
+        agent.ai_router = MagicMock()
+        self.assertEqual(agent.receive_message("zzz"), clean_text(FALLBACK))
+        agent.ai_router.route.assert_not_called()
+
+
+class TestChatRateLimit(unittest.TestCase):
+    """/chat returns 429 with Retry-After once a client's bucket is empty"""
+
+    def test_429(self):
+        from api import app
+        with patch("api.admission", AdmissionController(rate_per_sec=1, burst=1)):
+            client = app.test_client()
+            headers = {"X-Forwarded-For": "203.0.113.9, 10.0.0.1"}
+            self.assertEqual(client.post("/chat", json={"message": "help"}, headers=headers).status_code, 200)
+            # Only the hop the proxy appended counts, not what the client wrote before it
+            headers = {"X-Forwarded-For": "198.51.100.7, 10.0.0.1"}
+            resp = client.post("/chat", json={"message": "help"}, headers=headers)
+            self.assertEqual(resp.status_code, 429)
+            self.assertIn("Retry-After", resp.headers)
+            stats = client.get("/stats/admission").get_json()
+        self.assertEqual(stats["counters"]["rate_limited"], 1)
+        self.assertEqual(stats["state"]["queue_depth"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from runtime import artifacts
+from runtime.artifacts import artifact_path, load_artifact, read_artifact, write_artifact
+from skills import doc_index, faq_engine, intent_classifier
+from skills.intent_classifier import DATA_DIR
+
+
+class TestArtifactFile(unittest.TestCase):
+    """Layout, checksum and invalidation of one artifact file"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.source = os.path.join(self.dir, "source.jsonl")
+        with open(self.source, "w") as handle:
+            handle.write('{"text": "hello"}\n')
+        self.arrays = {"matrix": np.arange(12, dtype=np.float32).reshape(3, 4), "ids": np.arange(5, dtype=np.int64)}
+
+    def write(self, version=1):
+        return write_artifact("sample", version, self.arrays, {"labels": ["a", "b"]}, [self.source], self.dir)
+
+    def test_round_trip_is_a_read_only_mapping(self):
+        self.write()
+        artifact = load_artifact("sample", 1, [self.source], self.dir)
+        self.assertEqual(artifact.meta, {"labels": ["a", "b"]})
+        for key, value in self.arrays.items():
+            np.testing.assert_array_equal(artifact.arrays[key], value)
+            self.assertFalse(artifact.arrays[key].flags.writeable)
+            self.assertEqual(artifact.arrays[key].ctypes.data % artifacts.ALIGN, 0)
+
+    def test_corruption_is_detected(self):
+        self.write()
+        path = artifact_path("sample", self.dir)
+        with open(path, "r+b") as handle:
+            handle.seek(-3, os.SEEK_END)
+            handle.write(b"\xff")
+        with self.assertRaisesRegex(ValueError, "checksum"):
+            read_artifact(path)
+        # Workers leave the payload unread unless asked to check it
+        self.assertIsNotNone(load_artifact("sample", 1, [self.source], self.dir))
+        with patch.dict(os.environ, {"ARTIFACTS_VERIFY": "1"}):
+            self.assertIsNone(load_artifact("sample", 1, [self.source], self.dir))
+        with open(path, "wb") as handle:
+            handle.write(b"not an artifact")
+        self.assertIsNone(load_artifact("sample", 1, [self.source], self.dir))
+
+    def test_stale_artifacts_are_skipped(self):
+        self.write()
+        self.assertIsNone(load_artifact("sample", 2, [self.source], self.dir))
+        self.assertIsNone(load_artifact("sample", 1, [self.source, __file__], self.dir))
+        self.assertIsNone(load_artifact("missing", 1, [], self.dir))
+        # Touched but identical content still counts as current
+        os.utime(self.source, (time.time() + 10, time.time() + 10))
+        self.assertIsNotNone(load_artifact("sample", 1, [self.source], self.dir))
+        with open(self.source, "a") as handle:
+            handle.write('{"text": "bye"}\n')
+        self.assertIsNone(load_artifact("sample", 1, [self.source], self.dir))
+        self.assertIn("changed", artifacts.artifact_stats()["sample"]["reason"])
+
+    def test_switched_off(self):
+        self.write()
+        with patch.dict(os.environ, {"ARTIFACTS": "off"}):
+            self.assertIsNone(load_artifact("sample", 1, [self.source], self.dir))
+
+
+class TestPrebuiltIndexes(unittest.TestCase):
+    """The classifiers, FAQ and doc index answer the same from artifacts"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.env = patch.dict(os.environ, {"ARTIFACTS_DIR": cls.tmp})
+        cls.env.start()
+        for build in artifacts.builders().values():
+            build(None)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.env.stop()
+        shutil.rmtree(cls.tmp)
+
+    def test_classifier(self):
+        mapped = intent_classifier.load_classifier("intents.jsonl", "intent")
+        self.assertFalse(mapped.centroids.flags.writeable)
+        built = intent_classifier.IntentClassifier.from_jsonl(os.path.join(DATA_DIR, "intents.jsonl"))
+        for message in ("show me google analytics", "who is vishal", "zzz quux"):
+            self.assertEqual(mapped.predict(message), built.predict(message))
+        self.assertEqual(mapped.predict_batch(["help", "projects"]), built.predict_batch(["help", "projects"]))
+
+    def test_faq(self):
+        mapped = faq_engine.load_faq()
+        built = faq_engine.FAQEngine.from_jsonl(os.path.join(DATA_DIR, "faq.jsonl"))
+        for message in ("how do i set up call routing", "waht is an ivr", "pricing"):
+            self.assertEqual(mapped.best_match(message), built.best_match(message))
+
+    def test_docs(self):
+        doc_index.default_doc_index.cache_clear()
+        self.addCleanup(doc_index.default_doc_index.cache_clear)
+        mapped = doc_index.default_doc_index()
+        self.assertFalse(mapped.vectors.flags.writeable)
+        built = doc_index.DocIndex()
+        built.sync(doc_index.DOCS_DIR)
+        self.assertEqual(mapped.search("onboarding checklist", 2), built.search("onboarding checklist", 2))
+
+    def test_cli_verify(self):
+        self.assertEqual(artifacts.main(["verify"]), 0)
+        self.assertEqual(artifacts.main(["list", "faq"]), 0)
+        with self.assertRaises(SystemExit):
+            artifacts.main(["build", "nope"])
+
+
+if __name__ == '__main__':
+    unittest.main()
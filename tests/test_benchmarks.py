@@ -0,0 +1,102 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent_vish import LocalLLMRouter
+from tests.benchmarks.harness import compare, load_baseline, run_benchmark, save_baseline
+from tests.benchmarks.stub_servers import DEFAULT_REPLY, StubProviderServer, parse_latency
+from tests.loadtest.loadgen import build_schedule, percentile, summarize
+
+
+class TestHarness(unittest.TestCase):
+    """Unit tests for the benchmark harness"""
+
+    def test_run_benchmark_reports_timings(self):
+        result = run_benchmark("noop", lambda: None, repeat=2, number=10)
+        self.assertEqual(result["number"], 10)
+        self.assertLessEqual(result["min_us"], result["median_us"])
+        self.assertLessEqual(result["median_us"], result["max_us"])
+
+    def test_baseline_round_trip(self):
+        results = [{"name": "a", "median_us": 10.0}]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "suite.json")
+            save_baseline("suite", results, path=path)
+            baseline = load_baseline("suite", path=path)
+        self.assertEqual(baseline["results"]["a"]["median_us"], 10.0)
+
+    def test_missing_baseline(self):
+        self.assertIsNone(load_baseline("suite", path="/nonexistent/suite.json"))
+
+    def test_compare_flags_regressions_over_threshold(self):
+        baseline = {"results": {"a": {"median_us": 10.0}, "b": {"median_us": 10.0}}}
+        results = [{"name": "a", "median_us": 11.0}, {"name": "b", "median_us": 15.0},
+                   {"name": "new", "median_us": 1.0}]
+        rows = {row["name"]: row for row in compare(results, baseline, threshold=0.2)}
+        self.assertFalse(rows["a"]["regression"])
+        self.assertTrue(rows["b"]["regression"])
+        self.assertNotIn("new", rows)
+
+
+class TestStubProviderServer(unittest.TestCase):
+    """The stub must satisfy the real provider clients"""
+
+    def test_ollama_round_trip(self):
+        with StubProviderServer() as stub:
+            router = LocalLLMRouter(stub.base_url)
+            self.assertTrue(router.available)
+            self.assertEqual(router.route("hi"), DEFAULT_REPLY)
+            self.assertEqual(stub.requests_served, 1)
+
+    def test_failure_injection(self):
+        with StubProviderServer(failure_rate=1.0) as stub:
+            self.assertIsNone(LocalLLMRouter(stub.base_url).route("hi"))
+
+    def test_latency_specs(self):
+        self.assertEqual(parse_latency("fixed:0.25")(), 0.25)
+        sample = parse_latency("uniform:0.1,0.2", seed=3)()
+        self.assertTrue(0.1 <= sample <= 0.2)
+        self.assertGreaterEqual(parse_latency("normal:0,1", seed=3)(), 0.0)
+        with self.assertRaises(ValueError):
+            parse_latency("gamma:1")
+
+
+class TestLoadgen(unittest.TestCase):
+    """Unit tests for the load generator's schedule and statistics"""
+
+    MIX = [{"class": "static", "message": "help", "weight": 3},
+           {"class": "llm", "message": "zzz", "weight": 1}]
+
+    def test_schedule_is_replayable(self):
+        first = build_schedule(self.MIX, 50, rate=10.0, seed=5)
+        self.assertEqual(first, build_schedule(self.MIX, 50, rate=10.0, seed=5))
+        self.assertNotEqual(first, build_schedule(self.MIX, 50, rate=10.0, seed=6))
+        offsets = [item["at"] for item in first]
+        self.assertEqual(offsets, sorted(offsets))
+
+    def test_closed_loop_schedule_has_no_offsets(self):
+        schedule = build_schedule(self.MIX, 10, rate=None, seed=1)
+        self.assertTrue(all(item["at"] == 0.0 for item in schedule))
+
+    def test_percentile(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_summarize_per_class(self):
+        samples = [{"class": "static", "latency": 0.01, "ok": True},
+                   {"class": "llm", "latency": 0.5, "ok": False},
+                   {"class": "llm", "latency": 0.3, "ok": True}]
+        report = summarize(samples, elapsed=1.0)
+        self.assertEqual(report["overall"]["requests"], 3)
+        self.assertEqual(report["by_class"]["llm"]["error_rate"], 0.5)
+        self.assertEqual(report["by_class"]["static"]["p99_ms"], 10.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
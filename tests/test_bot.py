@@ -6,70 +6,86 @@ import os
 # Add parent directory to path to import the bot modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from skills import greet_skill, faq_skill
+from skills.core_skills import greet_skill, faq_skill
+from agent_vish import AgentVish, clean_text, BIO, FALLBACK
 
 
 class TestGreetSkill(unittest.TestCase):
     """Unit tests for greet_skill"""
-    
-    def test_greet_with_name(self):
-        """Test greeting with a provided name"""
-        result = greet_skill.greet("Alice")
-        self.assertIn("Alice", result)
-        self.assertTrue(result.startswith("Hello") or result.startswith("Hi"))
-    
-    def test_greet_without_name(self):
-        """Test greeting without a name"""
-        result = greet_skill.greet()
-        self.assertIsInstance(result, str)
-        self.assertTrue(len(result) > 0)
-    
+
+    def test_greet_with_greeting(self):
+        """Test a plain greeting gets a reply"""
+        result = greet_skill("Hello there")
+        self.assertTrue(result.startswith("Hello"))
+
+    def test_greet_case_insensitive(self):
+        """Test greeting is case insensitive"""
+        self.assertIsNotNone(greet_skill("HEY"))
+
     def test_greet_empty_string(self):
         """Test greeting with empty string"""
-        result = greet_skill.greet("")
-        self.assertIsInstance(result, str)
-        self.assertTrue(len(result) > 0)
-    
-    def test_greet_special_characters(self):
-        """Test greeting with special characters in name"""
-        result = greet_skill.greet("@User123")
-        self.assertIn("@User123", result)
+        self.assertIsNone(greet_skill(""))
+
+    def test_greet_no_greeting(self):
+        """Test non-greeting input is not handled"""
+        self.assertIsNone(greet_skill("show me the report"))
 
 
 class TestFAQSkill(unittest.TestCase):
     """Unit tests for faq_skill"""
-    
+
     def test_faq_valid_question(self):
         """Test FAQ with a valid question"""
-        result = faq_skill.answer_faq("What is AI?")
+        result = faq_skill("What is your name?")
         self.assertIsInstance(result, str)
-        self.assertTrue(len(result) > 0)
-    
+        self.assertIn("Agent Vish", result)
+
     def test_faq_unknown_question(self):
         """Test FAQ with an unknown question"""
-        result = faq_skill.answer_faq("What is the meaning of life?")
-        self.assertIsInstance(result, str)
-        # Should return some default/fallback response
-        self.assertTrue(len(result) > 0)
-    
+        self.assertIsNone(faq_skill("What is the meaning of life?"))
+
     def test_faq_empty_question(self):
         """Test FAQ with empty question"""
-        result = faq_skill.answer_faq("")
-        self.assertIsInstance(result, str)
-    
+        self.assertIsNone(faq_skill(""))
+
     def test_faq_case_insensitive(self):
         """Test FAQ is case insensitive"""
-        result1 = faq_skill.answer_faq("WHAT IS AI?")
-        result2 = faq_skill.answer_faq("what is ai?")
-        # Both should return valid responses
-        self.assertIsInstance(result1, str)
-        self.assertIsInstance(result2, str)
-    
+        self.assertEqual(faq_skill("WHO CREATED YOU"), faq_skill("who created you"))
+
     def test_faq_partial_match(self):
-        """Test FAQ with partial keyword match"""
-        result = faq_skill.answer_faq("Tell me about AI")
+        """Test FAQ matches a question embedded in a longer message"""
+        result = faq_skill("hey, how are you doing?")
         self.assertIsInstance(result, str)
-        self.assertTrue(len(result) > 0)
+
+
+class TestAgentVish(unittest.TestCase):
+    """Unit tests for AgentVish intent routing"""
+
+    def setUp(self):
+        with patch("agent_vish.LocalLLMRouter._check_availability", return_value=False):
+            self.agent = AgentVish()
+
+    def test_bio_intent(self):
+        self.assertEqual(self.agent.receive_message("about vishal"), clean_text(BIO))
+
+    def test_empty_message_is_fallback(self):
+        self.assertEqual(self.agent.receive_message(""), clean_text(FALLBACK))
+
+    def test_replies_are_single_line(self):
+        for msg in ["skills", "projects", "features", "help", "google sheets", "zzz"]:
+            reply = self.agent.receive_message(msg)
+            self.assertNotIn("\n", reply)
+            self.assertTrue(reply)
+
+    def test_fallback_uses_ai_router(self):
+        self.agent.ai_router = MagicMock()
+        self.agent.ai_router.route.return_value = "line one\nline two"
+        self.assertEqual(self.agent.receive_message("zzz"), "line one line two")
+
+    def test_static_intent_skips_ai_router(self):
+        self.agent.ai_router = MagicMock()
+        self.agent.receive_message("skills")
+        self.agent.ai_router.route.assert_not_called()
 
 
 if __name__ == '__main__':
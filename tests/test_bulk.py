@@ -0,0 +1,114 @@
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from runtime import bulk
+
+MESSAGES = ["who is vishal", "show me google analytics", "what is an ivr", "help", "zzz quux"]
+
+
+class TestBulk(unittest.TestCase):
+    """Ordering, checkpoints and resume of the bulk CLI"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.input = os.path.join(tmp.name, "messages.jsonl")
+        self.output = os.path.join(tmp.name, "scored.jsonl")
+        with open(self.input, "w") as handle:
+            for i in range(60):
+                handle.write(json.dumps({"id": f"m{i}", "message": MESSAGES[i % len(MESSAGES)]}) + "\n")
+                if i == 10:
+                    handle.write("\n{not json\n")
+            handle.write('"a bare string"\n')
+
+    def run_bulk(self, **kwargs):
+        kwargs = dict(dict(workers=0, chunk_size=7, progress=0), **kwargs)
+        return bulk.run(self.input, self.output, **kwargs)
+
+    def read_output(self):
+        with open(self.output) as handle:
+            return [json.loads(line) for line in handle]
+
+    def test_results_follow_input_order(self):
+        summary = self.run_bulk(workers=2)
+        rows = self.read_output()
+        self.assertEqual(len(rows), 62)
+        self.assertEqual([row["line"] for row in rows], list(range(1, 12)) + list(range(13, 64)))
+        self.assertEqual(rows[0], {"line": 1, "id": "m0", "intent": "bio", "source": "static", "provider": "",
+                                   "degraded": False, "reply": rows[0]["reply"]})
+        self.assertEqual(rows[2]["source"], "faq")
+        self.assertIn("invalid JSON", rows[11]["error"])
+        self.assertEqual(rows[-1]["line"], 63)
+        self.assertEqual((summary["lines"], summary["errors"]), (63, 1))
+        self.assertEqual(summary["counts"]["source:analytics"], 12)
+
+    def test_intent_mode(self):
+        summary = self.run_bulk(mode="intent")
+        rows = self.read_output()
+        self.assertEqual([row.get("intent") for row in rows[:5]], ["bio", "analytics", "fallback", "help", "fallback"])
+        self.assertNotIn("reply", rows[0])
+        self.assertEqual(sum(summary["counts"].values()), 61)
+
+    def test_resume_after_a_crash(self):
+        self.run_bulk()
+        with open(self.output, "rb") as handle:
+            expected = handle.read()
+        os.remove(self.output + bulk.CHECKPOINT_SUFFIX)
+
+        calls = []
+        real = bulk.process_chunk
+
+        def crash_on_third(chunk, *args):
+            calls.append(chunk)
+            if len(calls) == 3:
+                raise RuntimeError("worker died")
+            return real(chunk, *args)
+
+        with patch.object(bulk, "process_chunk", crash_on_third):
+            with self.assertRaises(RuntimeError):
+                self.run_bulk()
+        checkpoint = bulk.read_checkpoint(self.output)
+        self.assertEqual(checkpoint["lines"], 15)  # two chunks of seven, and the blank line between them
+        with open(self.output, "ab") as handle:
+            handle.write(b'{"line": 99, "partial')  # a torn write past the checkpoint
+
+        summary = self.run_bulk(resume=True)
+        self.assertEqual((summary["resumed_from"], summary["processed"], summary["lines"]), (15, 48, 63))
+        with open(self.output, "rb") as handle:
+            self.assertEqual(handle.read(), expected)
+        self.assertEqual(summary["errors"], 1)  # counts carried over from before the crash
+
+    def test_checkpoint_must_match(self):
+        self.run_bulk()
+        with self.assertRaisesRegex(ValueError, "mode"):
+            self.run_bulk(mode="intent", resume=True)
+
+    def test_resume_needs_the_output(self):
+        self.run_bulk()
+        with open(self.output, "r+b") as handle:
+            handle.truncate(10)
+        with self.assertRaisesRegex(ValueError, "shorter"):
+            self.run_bulk(resume=True)
+        os.remove(self.output)
+        with self.assertRaisesRegex(ValueError, "missing"):
+            self.run_bulk(resume=True)
+
+    def test_cli_reports_throughput(self):
+        out, err = io.StringIO(), io.StringIO()
+        with patch("sys.stdout", out), patch("sys.stderr", err):
+            self.assertEqual(bulk.main([self.input, "-o", self.output, "--workers", "0", "--progress", "1e-9",
+                                        "--chunk-size", "20"]), 0)
+        self.assertRegex(out.getvalue(), r"^63 lines in [\d.]+ s \(\d+/s, 0 workers\), 1 errors; ")
+        self.assertRegex(err.getvalue(), r"\d+ lines, \d+/s")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import itertools
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from runtime.cascade import CLOUD, ModelCascade, Tier, check_answer, parse_tiers
+from runtime.deadline import Deadline
+
+GOOD = "An IVR plays a menu and routes callers by key press."
+TIERS = [Tier("small", "llama3.2:1b", 0.0), Tier("large", "llama3.1:8b", 0.0), Tier("cloud", CLOUD, 2.0)]
+
+
+class FakeModels:
+    """generate() stand-in: canned replies per model, YES from the verifier unless told otherwise"""
+
+    def __init__(self, replies, verdict="YES"):
+        self.replies = replies
+        self.verdict = verdict
+        self.calls = []
+
+    def __call__(self, model, prompt, deadline=None, profile=None):
+        self.calls.append(model)
+        if prompt.startswith("Question:"):
+            return {"response": self.verdict}
+        reply = self.replies.get(model)
+        return None if reply is None else {"response": reply, "prompt_eval_count": 10, "eval_count": 20}
+
+
+class TestCheckAnswer(unittest.TestCase):
+    """Self-check heuristics"""
+
+    def test_reasons(self):
+        self.assertIsNone(check_answer(GOOD))
+        self.assertEqual(check_answer("  "), "empty")
+        self.assertEqual(check_answer("I'm sorry, I can't help with that."), "refusal")
+        self.assertEqual(check_answer("Sure. I don't have enough information about that."), "refusal")
+        self.assertEqual(check_answer("Yes."), "too_short")
+        self.assertEqual(check_answer(GOOD, {"done_reason": "length"}), "truncated")
+        self.assertEqual(check_answer("the call the call " * 10), "repetitive")
+
+    def test_logprob_only_when_configured(self):
+        meta = {"logprobs": [{"token": "a", "logprob": -4.0}, {"token": "b", "logprob": -3.0}]}
+        self.assertIsNone(check_answer(GOOD, meta))
+        self.assertEqual(check_answer(GOOD, meta, min_logprob=-2.0), "low_logprob")
+        self.assertIsNone(check_answer(GOOD, meta, min_logprob=-5.0))
+
+    def test_parse_tiers(self):
+        self.assertEqual(parse_tiers("", "llama3.2:1b"), [Tier("llama3.2:1b", "llama3.2:1b", 0.0)])
+        self.assertEqual(parse_tiers("llama3.2:1b, cloud@0.5", "x"),
+                         [Tier("llama3.2:1b", "llama3.2:1b", 0.0), Tier("cloud", "cloud", 0.5)])
+        with self.assertRaises(ValueError):
+            parse_tiers("cloud@cheap", "x")
+        with self.assertRaises(ValueError):
+            parse_tiers("llama3.2:1b,cloud@0.001,cloud@0.01", "x")
+        with self.assertRaises(ValueError):
+            ModelCascade([Tier("a", "a", 0.0), Tier("a", "b", 1.0)], lambda *a: None)
+
+
+class TestModelCascade(unittest.TestCase):
+    """Escalation between tiers and the metrics it records"""
+
+    def setUp(self):
+        self.cloud = MagicMock()
+        self.cloud.route_query.return_value = "[Gemini] cloud answer with enough words"
+        self.clock = itertools.count(0, 0.5)
+
+    def cascade(self, models, **kwargs):
+        return ModelCascade(TIERS, models, cloud=lambda: self.cloud, clock=lambda: next(self.clock), **kwargs)
+
+    def test_fast_tier_answers(self):
+        models = FakeModels({"llama3.2:1b": GOOD})
+        cascade = self.cascade(models)
+        self.assertEqual(cascade.answer("what is an ivr"), GOOD)
+        self.assertEqual(models.calls, ["llama3.2:1b", "llama3.2:1b"])  # answer, then verifier
+        self.cloud.route_query.assert_not_called()
+
+    def test_escalates_on_refusal_and_verifier(self):
+        models = FakeModels({"llama3.2:1b": "I'm sorry, I cannot answer that.", "llama3.1:8b": GOOD},
+                            verdict="NO")
+        cascade = self.cascade(models)
+        self.assertEqual(cascade.answer("what is an ivr"), "[Gemini] cloud answer with enough words")
+        tiers = {row["name"]: row for row in cascade.stats()["tiers"]}
+        self.assertEqual(tiers["small"]["escalated"], {"refusal": 1})
+        self.assertEqual(tiers["large"]["escalated"], {"verifier": 1})
+        self.assertEqual(tiers["cloud"]["accepted"], 1)
+        self.assertEqual(cascade.stats()["escalation_rate"], 1.0)
+
+    def test_keeps_soft_rejection_when_later_tiers_fail(self):
+        self.cloud.route_query.return_value = None
+        cascade = self.cascade(FakeModels({"llama3.2:1b": GOOD}, verdict="NO"), verify=True)
+        context = {}
+        self.assertEqual(cascade.answer("what is an ivr", context), GOOD)
+        self.assertEqual(context, {"tier": "small", "rejected": "verifier"})
+        cascade = self.cascade(FakeModels({"llama3.2:1b": "I don't know."}))
+        self.assertIsNone(cascade.answer("what is an ivr"))
+
+    def test_savings_against_last_tier(self):
+        models = FakeModels({"llama3.2:1b": GOOD})
+        cascade = self.cascade(models, verify=False)
+        cascade.answer("what is an ivr")
+        models.replies = {}  # local models down: the next two go to the cloud
+        cascade.answer("what is an ivr")
+        cascade.answer("what is an ivr")
+        small = cascade.stats()["tiers"][0]
+        self.assertEqual(small["accepted"], 1)
+        self.assertEqual(small["cost_saved"], round(30 / 1000 * 2.0, 6))
+        self.assertIsNotNone(small["latency_saved_ms"])
+        self.assertEqual(cascade.stats()["answers"], 3)
+
+    def test_reports_the_answering_tier(self):
+        context = {}
+        self.cascade(FakeModels({"llama3.2:1b": GOOD})).answer("what is an ivr", context)
+        self.assertEqual(context, {"tier": "small"})
+        context = {"answered_by": "perplexity"}  # left over from a rejected cloud attempt
+        self.cascade(FakeModels({"llama3.1:8b": GOOD})).answer("what is an ivr", context)
+        self.assertEqual(context, {"tier": "large"})
+
+    def test_spent_deadline_stops_escalation(self):
+        models = FakeModels({"llama3.2:1b": "I'm sorry."})
+        deadline = Deadline(0.0)
+        self.assertIsNone(self.cascade(models).answer("what is an ivr", deadline=deadline))
+        self.assertEqual(models.calls, [])
+
+    def test_from_env(self):
+        env = {"LLM_CASCADE": "llama3.2:1b,cloud@0.002", "LLM_CASCADE_VERIFY": "0",
+               "LLM_CASCADE_MIN_LOGPROB": "-1.5"}
+        with patch.dict(os.environ, env):
+            cascade = ModelCascade.from_env(FakeModels({}), "unused")
+        self.assertEqual([t.name for t in cascade.tiers], ["llama3.2:1b", "cloud"])
+        self.assertFalse(cascade.verify)
+        self.assertTrue(cascade.wants_logprobs)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from runtime.chat_socket import ChatSockets
+
+
+class FakeSocket:
+    """The receive/send/close surface of a simple-websocket connection"""
+
+    def __init__(self):
+        self.incoming = queue.Queue()
+        self.sent = queue.Queue()
+        self.closed = None
+
+    def receive(self, timeout=None):
+        try:
+            frame = self.incoming.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if frame is EOFError:
+            raise EOFError("client went away")
+        return frame
+
+    def send(self, data):
+        self.sent.put(json.loads(data))
+
+    def close(self, reason=None, message=None):
+        self.closed = (reason, message)
+
+    def next(self, timeout=2.0):
+        return self.sent.get(timeout=timeout)
+
+
+class TestChatSockets(unittest.TestCase):
+    """Pipelining, backpressure, streaming and heartbeats of one connection"""
+
+    def start(self, answer, sockets=None, session_id="s1"):
+        ws = FakeSocket()
+        sockets = sockets or ChatSockets()
+        thread = threading.Thread(target=self.serve, args=(sockets, ws, answer, session_id), daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 2)
+        self.addCleanup(ws.incoming.put, EOFError)
+        self.assertEqual(ws.next(), {"type": "ready", "session_id": session_id, "max_pending": sockets.max_pending})
+        return ws
+
+    @staticmethod
+    def serve(sockets, ws, answer, session_id):
+        try:
+            sockets.serve(ws, answer, session_id)
+        except EOFError:
+            pass
+
+    def test_pipelined_messages_are_answered_in_order(self):
+        seen = []
+
+        def answer(frame, sink):
+            seen.append(frame["session_id"])
+            time.sleep(0.01 if frame["message"] == "first" else 0)
+            return {"type": "reply", "reply": frame["message"].upper()}
+
+        ws = self.start(answer)
+        for i, message in enumerate(["first", "second", "third"]):
+            ws.incoming.put(json.dumps({"type": "message", "id": i, "message": message}))
+        ws.incoming.put('{"type": "ping"}')
+        # The pong is not held up behind the answers
+        frames = [ws.next() for _ in range(4)]
+        self.assertEqual(frames[0], {"type": "pong"})
+        self.assertEqual([(f["id"], f["reply"]) for f in frames[1:]], [(0, "FIRST"), (1, "SECOND"), (2, "THIRD")])
+        self.assertEqual(seen, ["s1"] * 3)
+
+    def test_full_queue_refuses_instead_of_buffering(self):
+        started, release = threading.Event(), threading.Event()
+        sockets = ChatSockets(max_pending=2)
+
+        def answer(frame, sink):
+            started.set()
+            release.wait(2)
+            return {"type": "reply", "reply": "ok"}
+
+        ws = self.start(answer, sockets)
+        ws.incoming.put(json.dumps({"id": 0, "message": "hi"}))
+        self.assertTrue(started.wait(2))
+        for i in range(1, 5):  # one being answered, two waiting, two refused
+            ws.incoming.put(json.dumps({"id": i, "message": "hi"}))
+        refused = [ws.next(), ws.next()]
+        release.set()
+        self.assertEqual([(f["id"], f["error"]) for f in refused], [(3, "Busy"), (4, "Busy")])
+        self.assertEqual([ws.next()["id"] for _ in range(3)], [0, 1, 2])
+        self.assertEqual(sockets.stats()["busy"], 2)
+
+    def test_tokens_only_when_asked(self):
+        def answer(frame, sink):
+            if sink is not None:
+                sink("Hel", True)
+                sink("lo", False)
+            return {"type": "reply", "reply": "Hello"}
+
+        ws = self.start(answer)
+        ws.incoming.put(json.dumps({"id": 1, "message": "hi", "stream": True}))
+        ws.incoming.put(json.dumps({"id": 2, "message": "hi"}))
+        frames = [ws.next() for _ in range(4)]
+        self.assertEqual([(f["type"], f["id"]) for f in frames], [("token", 1), ("token", 1), ("reply", 1), ("reply", 2)])
+        self.assertEqual((frames[0]["text"], frames[0]["restart"], frames[1]["restart"]), ("Hel", True, False))
+
+    def test_bad_frames_and_failures(self):
+        def answer(frame, sink):
+            raise RuntimeError("boom")
+
+        ws = self.start(answer)
+        ws.incoming.put("{not json")
+        ws.incoming.put('{"type": "subscribe", "id": 4}')
+        ws.incoming.put('{"id": 5, "message": "hi"}')
+        self.assertEqual(ws.next()["error"], "Invalid JSON")
+        self.assertEqual(ws.next()["error"], "Unknown type")
+        failed = ws.next()
+        self.assertEqual((failed["id"], failed["error"]), (5, "Server error"))
+
+    def test_idle_connections_are_closed(self):
+        sockets = ChatSockets(idle_timeout=0.1)
+        ws = FakeSocket()
+        sockets.serve(ws, lambda frame, sink: {}, None)
+        self.assertEqual(len(ws.next()["session_id"]), 32)  # picked by the server
+        self.assertEqual(ws.closed, (1001, "idle"))
+        self.assertEqual(sockets.stats()["idle_closed"], 1)
+
+    def test_connection_slots(self):
+        sockets = ChatSockets(max_connections=1)
+        self.assertTrue(sockets.reserve())
+        self.assertFalse(sockets.reserve())
+        sockets.release()
+        self.assertTrue(sockets.reserve())
+        self.assertEqual((sockets.stats()["connections"], sockets.stats()["refused"]), (2, 1))
+
+
+class TestSocketEndpoint(unittest.TestCase):
+    """/ws/chat end to end on a threaded server"""
+
+    @classmethod
+    def setUpClass(cls):
+        from werkzeug.serving import make_server
+        import api
+        cls.api = api
+        cls.server = make_server("127.0.0.1", 0, api.app, threaded=True)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"ws://127.0.0.1:{cls.server.port}/ws/chat"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def connect(self, query=""):
+        from simple_websocket import Client
+        ws = Client.connect(self.url + query)
+        self.addCleanup(ws.close)
+        return ws
+
+    def receive(self, ws):
+        return json.loads(ws.receive(timeout=5))
+
+    def test_session_is_bound_to_the_connection(self):
+        ws = self.connect("?session_id=ws-test")
+        self.assertEqual(self.receive(ws)["session_id"], "ws-test")
+        ws.send(json.dumps({"type": "message", "id": "a", "message": "who is vishal"}))
+        ws.send(json.dumps({"type": "message", "id": "b", "message": "  "}))
+        reply, empty = self.receive(ws), self.receive(ws)
+        self.assertEqual((reply["type"], reply["id"], reply["source"]), ("reply", "a", "static"))
+        self.assertIn("Vishal Anand", reply["reply"])
+        self.assertEqual((empty["id"], empty["error"]), ("b", "Empty message"))
+        history = self.api.agent_vish.store.session_messages("ws-test")
+        self.assertEqual([m["content"] for m in history][-2:], ["who is vishal", reply["reply"]])
+
+    def test_refused_when_full(self):
+        from simple_websocket import ConnectionError
+        with patch.object(self.api.chat_sockets, "max_connections", 0):
+            with self.assertRaises(ConnectionError):
+                self.connect()
+        self.assertEqual(self.api.app.test_client().get("/stats/sockets").get_json()["open"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent_vish import AgentVish, LocalLLMRouter
+from runtime.deadline import Deadline, timeout_for
+from skills.ai_router_skill import AIRouterSkill, ALL_MODELS_FAILED_REPLY
+from tests.benchmarks.stub_servers import StubProviderServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDeadline(unittest.TestCase):
+    """Unit tests for Deadline"""
+
+    def test_remaining_and_expiry(self):
+        clock = FakeClock()
+        deadline = Deadline(10, clock=clock)
+        self.assertEqual(deadline.timeout(30), 10)
+        self.assertEqual(deadline.timeout(4), 4)
+        clock.now = 9.5
+        self.assertAlmostEqual(deadline.remaining(), 0.5)
+        self.assertFalse(deadline.expired())
+        clock.now = 11
+        self.assertEqual(deadline.remaining(), 0)
+        self.assertTrue(deadline.expired())
+
+    def test_timeout_for_without_deadline(self):
+        self.assertEqual(timeout_for(None, 30), 30)
+
+
+class TestRouterBudget(unittest.TestCase):
+    """AIRouterSkill shares one deadline across its fallbacks"""
+
+    def make_router(self):
+        router = AIRouterSkill({})
+        router.perplexity, router.chatgpt, router.gemini = AsyncMock(), AsyncMock(), AsyncMock()
+        return router
+
+    def test_stops_falling_back_when_budget_spent(self):
+        clock = FakeClock()
+        deadline = Deadline(5, clock=clock)
+        router = self.make_router()
+
+        def slow_failure(*args, **kwargs):
+            clock.now += 6
+            raise RuntimeError("provider timed out")
+
+        router.perplexity.agenerate.side_effect = slow_failure
+        reply = router.route_query("what is the latest news", {}, deadline)
+        self.assertEqual(reply, ALL_MODELS_FAILED_REPLY)
+        router.chatgpt.agenerate.assert_not_called()
+        router.gemini.agenerate.assert_not_called()
+
+    def test_each_model_gets_the_deadline(self):
+        deadline = Deadline(5)
+        router = self.make_router()
+        router.perplexity.agenerate.return_value = "answer"
+        self.assertEqual(router.route_query("latest news", {"history": []}, deadline), "[Perplexity] answer")
+        self.assertIs(router.perplexity.agenerate.call_args.kwargs["deadline"], deadline)
+
+
+class TestLocalLLMDeadline(unittest.TestCase):
+    """The Ollama call is cut off at the request deadline, not after 30 s"""
+
+    def test_slow_model_respects_deadline(self):
+        with StubProviderServer(latency=2.0) as stub:
+            router = LocalLLMRouter(stub.base_url)
+            start = time.monotonic()
+            self.assertIsNone(router.route("hi", deadline=Deadline(0.3)))
+            self.assertLess(time.monotonic() - start, 1.5)
+
+    def test_spent_deadline_skips_call(self):
+        with StubProviderServer() as stub:
+            router = LocalLLMRouter(stub.base_url)
+            self.assertIsNone(router.route("hi", deadline=Deadline(0)))
+            self.assertEqual(stub.requests_served, 0)
+
+
+class TestDegradedReplies(unittest.TestCase):
+    """Replies report whether they are a degraded fallback"""
+
+    def setUp(self):
+        with patch("agent_vish.LocalLLMRouter._check_availability", return_value=False):
+            self.agent = AgentVish()
+        self.agent.ai_router = MagicMock()
+
+    def test_llm_answer_is_not_degraded(self):
+        self.agent.ai_router.route.return_value = "llm says hi"
+        reply = self.agent.respond("zzz", deadline=Deadline(5))
+        self.assertEqual((reply.source, reply.degraded), ("llm", False))
+
+    def test_expired_deadline_is_degraded(self):
+        reply = self.agent.respond("zzz", deadline=Deadline(0))
+        self.assertEqual((reply.source, reply.degraded), ("static", True))
+        self.agent.ai_router.route.assert_not_called()
+
+    def test_static_intent_is_not_degraded(self):
+        self.assertFalse(self.agent.respond("skills").degraded)
+
+    def test_chat_reports_degraded(self):
+        from api import admission, app
+        self.agent.ai_router.route.return_value = None
+        with patch("api.agent_vish", self.agent), patch.object(admission, "rate_per_sec", 0):
+            body = app.test_client().post("/chat", json={"message": "zzz"}).get_json()
+        self.assertTrue(body["ok"])
+        self.assertTrue(body["degraded"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from skills.doc_index import DocIndex, HashingEmbedder, chunk_document
+
+IVR_DOC = "# IVR\nAn IVR plays a menu to callers and routes them by key press.\n"
+REPORT_DOC = "# Missed call report\nLists unanswered calls with caller number and time.\n"
+
+
+class TestChunking(unittest.TestCase):
+    """Unit tests for chunk_document"""
+
+    def test_headings_and_paragraphs(self):
+        chunks = chunk_document("intro line\n\n# First\npara one\ncontinued\n\npara two\n## Second\nbody")
+        self.assertEqual(chunks, [("", "intro line"), ("First", "para one continued para two"),
+                                  ("Second", "body")])
+
+    def test_long_paragraph_windows_overlap(self):
+        words = [f"w{i}" for i in range(25)]
+        chunks = chunk_document(" ".join(words), max_words=10, overlap=3)
+        self.assertEqual([c[1].split()[0] for c in chunks], ["w0", "w7", "w14", "w21"])
+        self.assertTrue(all(len(c[1].split()) <= 10 for c in chunks))
+
+    def test_packing_respects_max_words(self):
+        text = "\n\n".join(" ".join(["x"] * 6) for _ in range(3))
+        self.assertEqual([len(c[1].split()) for c in chunk_document(text, max_words=12)], [12, 6])
+
+
+class TestDocIndex(unittest.TestCase):
+    """Search, incremental sync and persistence"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.write("glossary.md", IVR_DOC)
+        self.write("reports/missed.md", REPORT_DOC)
+        self.write("README.md", "# Not indexed\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def test_search(self):
+        index = DocIndex()
+        self.assertEqual(index.sync(self.root), {"added": 2, "updated": 0, "removed": 0, "chunks": 2})
+        chunk, score = index.search("how does the ivr menu work", k=1)[0]
+        self.assertEqual((chunk.source, chunk.heading), ("glossary.md", "IVR"))
+        self.assertGreater(score, 0.2)
+        self.assertIn("[glossary.md > IVR]", index.context_for("ivr menu"))
+        self.assertEqual(index.context_for("write a haiku"), "")
+
+    def test_sync_only_embeds_changes(self):
+        index = DocIndex()
+        index.sync(self.root)
+        with patch.object(index.embedder, "embed", wraps=index.embedder.embed) as embed:
+            self.assertEqual(index.sync(self.root), {"added": 0, "updated": 0, "removed": 0, "chunks": 2})
+            embed.assert_not_called()
+            self.write("glossary.md", IVR_DOC + "\nMenus can branch into sub-menus.\n")
+            os.remove(os.path.join(self.root, "reports", "missed.md"))
+            changes = index.sync(self.root)
+            self.assertEqual(embed.call_count, 1)
+        self.assertEqual((changes["updated"], changes["removed"]), (1, 1))
+        self.assertEqual({c.source for c in index.chunks}, {"glossary.md"})
+        self.assertEqual(len(index.vectors), len(index.chunks))
+
+    def test_save_and_load(self):
+        index = DocIndex()
+        index.sync(self.root)
+        path = os.path.join(self.root, "index.npz")
+        index.save(path)
+        loaded = DocIndex.load(path)
+        self.assertEqual(loaded.chunks, index.chunks)
+        self.assertEqual(loaded.sync(self.root)["added"], 0)
+        self.assertEqual(loaded.search("missed calls", 1)[0][0].heading, "Missed call report")
+
+    def test_ivf_matches_brute_force_on_clustered_data(self):
+        brute = DocIndex(embedder=HashingEmbedder(64), ivf_min_chunks=10 ** 6)
+        for i in range(40):
+            brute.add_document(f"doc{i}.md", f"# Topic {i % 4}\n" + " ".join([f"term{i % 4}"] * 5))
+        ivf = DocIndex(embedder=HashingEmbedder(64), ivf_min_chunks=20, nprobe=2)
+        for i in range(40):
+            ivf.add_document(f"doc{i}.md", f"# Topic {i % 4}\n" + " ".join([f"term{i % 4}"] * 5))
+        self.assertIsNotNone(ivf.centroids)
+        self.assertEqual(len(ivf.assignments), 40)
+        expected = {c.heading for c, _ in brute.search("term2", 5)}
+        self.assertEqual({c.heading for c, _ in ivf.search("term2", 5)}, expected)
+
+
+class TestPromptInjection(unittest.TestCase):
+    """Provider prompts carry the relevant chunks and nothing else"""
+
+    def test_perplexity_messages(self):
+        from skills.perplexity_skill import PerplexitySkill
+
+        index = DocIndex()
+        index.add_document("glossary.md", IVR_DOC)
+        with patch.dict(os.environ, {"PERPLEXITY_API_KEY": "stub"}):
+            skill = PerplexitySkill()
+        skill.doc_index = index
+        system = skill._build_messages("how do I set up an ivr")[0]["content"]
+        self.assertIn("routes them by key press", system)
+        self.assertNotIn("documentation", skill._build_messages("write a haiku")[0]["content"])
+
+
+if __name__ == '__main__':
+    unittest.main()
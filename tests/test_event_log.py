@@ -0,0 +1,162 @@
+import io
+import os
+import sys
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+import numpy as np
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from runtime import event_log
+from runtime.event_log import EventLog, message_hash, parse_where, query, scan, segment_paths
+
+
+def record(log, count, start=0, **fields):
+    for i in range(start, start + count):
+        event = dict(intent="fallback" if i % 3 == 0 else "help", source="llm" if i % 3 == 0 else "static",
+                     provider="perplexity" if i % 6 == 0 else "", channel="chat", latency_ms=float(i),
+                     cache_hit=i % 5 == 0, degraded=False, message=f"question {i % 4}", ts=1000.0 + i)
+        event.update(fields)
+        log.record(**event)
+
+
+class TestEventLog(unittest.TestCase):
+    """Buffering, segment rotation and retention"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def make_log(self, **kwargs):
+        log = EventLog(self.dir, flush_seconds=0.05, **kwargs)
+        self.addCleanup(log.stop)
+        return log
+
+    def test_events_are_written_by_the_background_thread(self):
+        log = self.make_log(segment_events=10)
+        record(log, 25)
+        ends = time.monotonic() + 5
+        while log.stats()["written"] < 20 and time.monotonic() < ends:
+            time.sleep(0.02)
+        self.assertEqual(len(segment_paths(self.dir)), 2)  # two full segments, five events still open
+        log.stop()
+        self.assertEqual(log.stats()["written"], 25)
+        frame = query(self.dir)
+        self.assertEqual(list(frame["latency_ms"]), [float(i) for i in range(25)])
+        self.assertEqual(frame["message_hash"][1], message_hash("Question 1 "))
+        self.assertEqual(frame["intent"][0], "fallback")
+
+    def test_full_buffer_drops(self):
+        log = EventLog(self.dir, buffer_size=3)
+        log._thread = object()  # no writer: nothing drains the buffer
+        record(log, 5)
+        self.assertEqual((log.stats()["buffered"], log.stats()["dropped"]), (3, 2))
+
+    def test_restart_after_fork_replaces_held_locks(self):
+        log = self.make_log()
+        log._lock.acquire()
+        log._counts_lock.acquire()  # as if another thread held them at fork
+        log.restart_after_fork()
+        record(log, 2)
+        log.flush()
+        self.assertEqual(log.stats()["written"], 2)
+
+    def test_retention(self):
+        log = self.make_log(segment_events=50, max_mb=0.004)
+        for start in range(0, 400, 50):
+            record(log, 50, start)
+            log.flush()
+        paths = segment_paths(self.dir)
+        self.assertLess(len(paths), 8)
+        self.assertLessEqual(sum(os.path.getsize(p) for p in paths), 0.004 * 1024 * 1024)
+        self.assertEqual(query(self.dir, ["ts"])["ts"].max(), 1399.0)  # the newest are kept
+
+
+class TestScan(unittest.TestCase):
+    """Projection and predicate pushdown"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        log = EventLog(cls.tmp.name)
+        record(log, 100)  # segment 1: ts 1000-1099, fallback and help
+        log.flush()
+        record(log, 100, start=100, intent="bio", provider="")  # segment 2: only bio
+        log.flush()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_projection(self):
+        parts = list(scan(self.tmp.name, ["intent"], [("latency_ms", ">=", 150.0)]))
+        self.assertEqual(len(parts), 1)
+        self.assertEqual(list(parts[0]), ["intent"])
+        self.assertEqual(len(parts[0]["intent"]), 50)
+
+    def test_segments_ruled_out_by_stats_are_not_read(self):
+        real_load = np.load
+        opened = []
+
+        def load(path, **kwargs):
+            opened.append(path)
+            return real_load(path, **kwargs)
+
+        with patch("runtime.event_log.np.load", side_effect=load) as spy:
+            frame = query(self.tmp.name, ["intent", "provider"], [parse_where("provider=perplexity")])
+        self.assertEqual(spy.call_count, 2)  # stats are read from both segments...
+        self.assertEqual(len(frame), 17)
+        self.assertEqual(set(frame["intent"]), {"fallback"})
+        # ...but the data columns of the second, whose dictionary has no "perplexity", never are
+        with patch("runtime.event_log._predicate_mask", wraps=event_log._predicate_mask) as mask:
+            query(self.tmp.name, where=[("intent", "==", "bio")])
+            query(self.tmp.name, since=1100.0, until=1110.0)
+        self.assertEqual(mask.call_count, 2)
+
+    def test_predicates(self):
+        self.assertEqual(parse_where("latency_ms>=2.5"), ("latency_ms", ">=", 2.5))
+        self.assertEqual(parse_where("intent=help,bio"), ("intent", "in", ["help", "bio"]))
+        self.assertEqual(parse_where("cache_hit=true"), ("cache_hit", "==", True))
+        with self.assertRaises(ValueError):
+            parse_where("intent>help")
+        with self.assertRaises(ValueError):
+            parse_where("message=hi")
+        frame = query(self.tmp.name, ["intent"], [parse_where("intent!=bio"), parse_where("cache_hit=1")])
+        self.assertEqual(len(frame), 20)
+        self.assertTrue(query(self.tmp.name, where=[("intent", "==", "nobody")]).empty)
+
+    def test_cli_group_by(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(event_log.main(["--dir", self.tmp.name, "--where", "source=llm",
+                                             "--group-by", "provider"]), 0)
+        self.assertRegex(out.getvalue(), r"\nperplexity +17 ")
+
+
+class TestChatEvents(unittest.TestCase):
+    """/chat records one event per reply"""
+
+    def test_chat_records_event(self):
+        import api
+        with tempfile.TemporaryDirectory() as directory:
+            log = EventLog(directory)
+            with patch.object(api, "event_log", log):
+                api.app.test_client().post("/chat", json={"message": "tell me about vishal", "channel": "sms"})
+            log.stop()
+            frame = query(directory)
+        self.assertEqual(len(frame), 1)
+        row = frame.iloc[0]
+        self.assertEqual((row["intent"], row["source"], row["channel"], bool(row["cache_hit"])),
+                         ("bio", "static", "sms", False))
+        self.assertEqual(row["message_hash"], message_hash("tell me about vishal"))
+        self.assertGreater(row["latency_ms"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
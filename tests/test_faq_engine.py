@@ -0,0 +1,77 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent_vish import AgentVish
+from skills.faq_engine import FAQEngine, load_faq
+
+ENTRIES = [
+    (["what is an ivr", "explain ivr"], "IVR answer"),
+    (["how do i reduce churn"], "Churn answer"),
+    (["what is cloud telephony"], "Telephony answer"),
+]
+
+
+class TestFAQEngine(unittest.TestCase):
+    """Unit tests for the BM25 FAQ index"""
+
+    def setUp(self):
+        self.engine = FAQEngine().build(ENTRIES)
+
+    def test_exact_and_embedded_questions(self):
+        self.assertEqual(self.engine.lookup("What is an IVR?").answer, "IVR answer")
+        self.assertEqual(self.engine.lookup("explain ivr").answer, "IVR answer")
+        self.assertEqual(self.engine.lookup("how do i reduce churn quickly").answer, "Churn answer")
+
+    def test_typos(self):
+        self.assertEqual(self.engine.lookup("how do i reduse churn").answer, "Churn answer")
+        self.assertEqual(self.engine.lookup("what is clod telephony").answer, "Telephony answer")
+        self.assertEqual(self.engine.lookup("what is cloud telephonyy").answer, "Telephony answer")
+
+    def test_weak_matches_are_rejected(self):
+        self.assertIsNone(self.engine.lookup("what is the capital of france"))
+        self.assertIsNone(self.engine.lookup("draft a churn email for a big enterprise account"))
+        self.assertIsNone(self.engine.lookup(""))
+        self.assertLess(self.engine.best_match("what is the capital of france").confidence, 0.6)
+
+    def test_stats(self):
+        self.engine.lookup("explain ivr")
+        self.engine.lookup("zzz")
+        stats = self.engine.stats()
+        self.assertEqual((stats["entries"], stats["questions"]), (3, 4))
+        self.assertEqual(stats["deflection_rate"], 0.5)
+
+    def test_empty_index(self):
+        with self.assertRaises(ValueError):
+            FAQEngine().build([])
+
+    def test_data_file(self):
+        faq = load_faq()
+        self.assertIn("Agent Vish", faq.lookup("what is your name").answer)
+        self.assertIsNone(load_faq("does-not-exist.jsonl"))
+
+
+class TestAgentFAQ(unittest.TestCase):
+    """receive_message answers FAQ questions before calling an LLM"""
+
+    def setUp(self):
+        with patch("agent_vish.LocalLLMRouter._check_availability", return_value=False):
+            self.agent = AgentVish(faq=FAQEngine().build(ENTRIES))
+        self.agent.ai_router = MagicMock()
+        self.agent.ai_router.route.return_value = "an llm answer"
+
+    def test_faq_before_llm(self):
+        reply = self.agent.respond("wat is an ivr")
+        self.assertEqual((reply.text, reply.source), ("IVR answer", "faq"))
+        self.agent.ai_router.route.assert_not_called()
+
+    def test_unmatched_goes_to_llm(self):
+        self.assertEqual(self.agent.respond("zzz quux").source, "llm")
+
+
+if __name__ == '__main__':
+    unittest.main()
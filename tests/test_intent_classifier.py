@@ -0,0 +1,126 @@
+import importlib
+import os
+import sys
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent_vish import AgentVish, keyword_intent
+from skills.ai_router_skill import AIRouterSkill
+from skills.intent_classifier import (
+    DEFAULT_THRESHOLD, IntentClassifier, load_classifier, word_features,
+)
+
+TEXTS = ["show my skills", "list skills please", "tell me about vishal", "who is vishal"]
+LABELS = ["skills", "skills", "bio", "bio"]
+
+
+class TestIntentClassifier(unittest.TestCase):
+    """Unit tests for the hashed n-gram centroid classifier"""
+
+    def setUp(self):
+        self.classifier = IntentClassifier(n_features=2 ** 10).fit(TEXTS, LABELS)
+
+    def test_features(self):
+        self.assertEqual(word_features("hi"), ["hi", "#<hi", "#hi>"])
+        idx, counts = self.classifier._hash("Hi hi there")
+        # 2 x (hi + 2 trigrams), there + 5 trigrams, bigrams "hi hi" and "hi there"
+        self.assertEqual(counts.sum(), 14)
+
+    def test_predict(self):
+        intent, confidence = self.classifier.predict("skills")
+        self.assertEqual(intent, "skills")
+        self.assertGreater(confidence, 0.5)
+        self.assertLessEqual(confidence, 1.0)
+
+    def test_unfamiliar_text_has_low_confidence(self):
+        self.assertAlmostEqual(self.classifier.predict("").confidence, 0.5)
+        classifier = load_classifier("intents.jsonl", "intent")
+        self.assertLess(classifier.predict("xyzzy plugh").confidence, DEFAULT_THRESHOLD)
+
+    def test_batch_matches_single(self):
+        messages = ["", "skills", "about vishal", "", "zzz", ""]
+        batch = self.classifier.predict_batch(messages)
+        for message, prediction in zip(messages, batch):
+            single = self.classifier.predict(message)
+            self.assertEqual(prediction.intent, single.intent)
+            self.assertAlmostEqual(prediction.confidence, single.confidence, places=5)
+        self.assertEqual(self.classifier.predict_batch([]), [])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            IntentClassifier(n_features=1000)
+        with self.assertRaises(ValueError):
+            IntentClassifier().fit([], [])
+
+    def test_missing_training_file(self):
+        self.assertIsNone(load_classifier("does-not-exist.jsonl", "intent"))
+
+    def test_single_message_latency(self):
+        classifier = load_classifier("intents.jsonl", "intent")
+        start = time.perf_counter()
+        for _ in range(200):
+            classifier.predict("what projects has vishal shipped recently")
+        self.assertLess((time.perf_counter() - start) / 200, 0.001)
+
+
+class TestAgentRouting(unittest.TestCase):
+    """AgentVish routes on the trained model and falls back to keywords"""
+
+    def setUp(self):
+        with patch("agent_vish.LocalLLMRouter._check_availability", return_value=False):
+            self.agent = AgentVish()
+
+    def test_trained_intents(self):
+        self.assertEqual(self.agent.classify("what skills does he have"), "skills")
+        self.assertEqual(self.agent.classify("list the features"), "features")
+        self.assertEqual(self.agent.classify("show recent projects"), "projects")
+        # "who" no longer forces the bio answer
+        self.assertEqual(self.agent.classify("who won the cricket match yesterday"), "fallback")
+
+    def test_low_confidence_uses_keyword_rules(self):
+        self.agent.classifier = MagicMock()
+        self.agent.classifier.predict.return_value = ("fallback", 0.1)
+        self.assertEqual(self.agent.classify("skills"), keyword_intent("skills"))
+
+    def test_without_classifier(self):
+        with patch("agent_vish.LocalLLMRouter._check_availability", return_value=False), \
+                patch("skills.intent_classifier.load_classifier", return_value=None):
+            agent = AgentVish()
+        self.assertEqual(agent.classify("about vishal"), "bio")
+        self.assertEqual(agent.classify_batch(["about vishal", "zzz"]), ["bio", "fallback"])
+
+    def test_without_numpy(self):
+        import skills.intent_classifier as module
+        self.addCleanup(importlib.reload, module)
+        with patch.dict(sys.modules, {"numpy": None}):
+            importlib.reload(module)
+            self.assertIsNone(module.load_classifier("intents.jsonl", "intent"))
+            with patch("agent_vish.LocalLLMRouter._check_availability", return_value=False):
+                agent = AgentVish()
+        self.assertIsNone(agent.classifier)
+        for message in ["about vishal", "skills", "zzz"]:
+            self.assertEqual(agent.classify(message), keyword_intent(message))
+
+    def test_classify_batch_matches_classify(self):
+        messages = ["help", "About Vishal", "zzz", "google sheets", "can you write a poem"]
+        self.assertEqual(self.agent.classify_batch(messages),
+                         [self.agent.classify(m.lower()) for m in messages])
+
+
+class TestRouterClassification(unittest.TestCase):
+    """AIRouterSkill.classify_query uses the query-type model"""
+
+    def test_query_types(self):
+        router = AIRouterSkill({})
+        self.assertEqual(router.classify_query("what is the latest news on cloud telephony"), "research")
+        self.assertEqual(router.classify_query("could you explain call routing"), "conversation")
+        # "now" in "know" no longer means research
+        self.assertNotEqual(router.classify_query("a slogan for people who know phones"), "research")
+
+
+if __name__ == '__main__':
+    unittest.main()
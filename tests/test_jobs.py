@@ -0,0 +1,207 @@
+import io
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from runtime import jobs
+from runtime.jobs import JobRunner, JobStore, TERMINAL
+
+
+# Job handlers run in a child process, so they live at module level where it can import them
+
+def sleep_job(payload):
+    time.sleep(payload["seconds"])
+    return {"slept": payload["seconds"]}
+
+
+def hog_job(payload):
+    hog = bytearray(payload["mb"] * 1024 * 1024)
+    hog[::4096] = b"x" * len(hog[::4096])  # touch every page so it is resident
+    time.sleep(5)
+    return {"mb": len(hog)}
+
+
+def rss_job(payload):
+    return {"rss_mb": jobs._rss_mb(os.getpid())}
+
+
+TEST_HANDLERS = dict(jobs.HANDLERS, sleep=sleep_job, hog=hog_job, rss=rss_job)
+
+
+def wait_for(store, job_id, timeout=30.0):
+    ends = time.monotonic() + timeout
+    while time.monotonic() < ends:
+        job = store.get(job_id)
+        if job["status"] in TERMINAL:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} still {store.get(job_id)['status']}")
+
+
+class TestJobStore(unittest.TestCase):
+    """Queue order, cancellation and recovery in the SQLite store"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.store = JobStore(os.path.join(tmp.name, "jobs.sqlite3"))
+
+    def test_interactive_lane_claimed_first(self):
+        bulk = self.store.submit("report", {"n": 1}, lane="bulk")
+        first = self.store.submit("report", {"n": 2})
+        second = self.store.submit("report", {"n": 3}, lane="interactive")
+        self.assertEqual([self.store.claim(jobs.LANES, 1)["id"] for _ in range(3)], [first, second, bulk])
+        self.assertIsNone(self.store.claim(jobs.LANES, 1))
+        with self.assertRaises(ValueError):
+            self.store.submit("report", {}, lane="urgent")
+
+    def test_cancel(self):
+        queued, running = self.store.submit("report", {}), self.store.submit("report", {})
+        self.store.claim(["interactive"], 1)
+        self.assertEqual(self.store.cancel(queued), "running")  # the first one submitted was claimed
+        self.assertEqual(self.store.cancel(running), "cancelled")
+        self.assertEqual(self.store.cancelled([queued, running]), [queued])
+        self.assertIsNone(self.store.cancel("missing"))
+
+    def test_recover_orphans(self):
+        job_id = self.store.submit("report", {})
+        self.store.claim(["interactive"], 999999)
+        self.assertEqual(self.store.recover(lambda pid: False), 1)
+        self.assertEqual(self.store.get(job_id)["status"], "queued")
+        self.store.claim(["interactive"], 999999)
+        self.store.recover(lambda pid: False)
+        self.assertEqual(self.store.get(job_id)["status"], "failed")  # second attempt
+
+    def test_prune(self):
+        done, queued = self.store.submit("report", {}), self.store.submit("report", {})
+        self.store.claim(["interactive"], 1)
+        self.store.finish(done, "done", result={})
+        self.assertEqual(self.store.prune(3600), 0)
+        self.assertEqual(self.store.prune(-1), 1)
+        self.assertIsNone(self.store.get(done))
+        self.assertEqual(self.store.get(queued)["status"], "queued")
+
+    def test_results_are_json_safe(self):
+        import numpy as np
+        job_id = self.store.submit("report", {})
+        self.store.claim(["interactive"], 1)
+        self.store.finish(job_id, "done", result={"n": np.int64(3), "mean": float("nan"), 1: [np.float64(0.5)]})
+        self.assertEqual(self.store.get(job_id)["result"], {"n": 3, "mean": None, "1": [0.5]})
+
+
+class TestJobRunner(unittest.TestCase):
+    """Jobs run in child processes within their limits"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.store = JobStore(os.path.join(tmp.name, "jobs.sqlite3"))
+        patcher = patch.dict(jobs.HANDLERS, TEST_HANDLERS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.runner = JobRunner(self.store, workers=2, poll_interval=0.05, nice=0).start()
+        self.addCleanup(self.runner.stop)
+
+    def test_report_job(self):
+        path = os.path.join(self.tmp, "calls.csv")
+        with open(path, "w") as handle:
+            handle.write("agent,calls,minutes\n" + "".join(f"a{i % 3},{i},{i * 2.5}\n" for i in range(500)))
+        job = wait_for(self.store, self.store.submit("report", {"path": path, "upload": path}))
+        self.assertEqual(job["status"], "done", job["error"])
+        self.assertEqual(job["result"]["summary"]["total_rows"], 500)
+        self.assertFalse(os.path.exists(path))  # the upload is removed once the job finishes
+
+    def test_failure_is_recorded(self):
+        job = wait_for(self.store, self.store.submit("report", {"path": os.path.join(self.tmp, "missing.csv")}))
+        self.assertEqual(job["status"], "failed")
+        self.assertIn("FileNotFoundError", job["error"])
+
+    def test_time_limit_and_cancel(self):
+        slow = self.store.submit("sleep", {"seconds": 10}, seconds=0.3)
+        stuck = self.store.submit("sleep", {"seconds": 10})
+        time.sleep(0.3)
+        self.assertEqual(self.store.cancel(stuck), "running")
+        self.assertEqual(wait_for(self.store, stuck, timeout=5)["status"], "cancelled")
+        job = wait_for(self.store, slow, timeout=5)
+        self.assertEqual((job["status"], job["error"]), ("failed", "time limit (0.3 s)"))
+
+    def test_memory_limit(self):
+        baseline = wait_for(self.store, self.store.submit("rss", {}))["result"]["rss_mb"]
+        job = wait_for(self.store, self.store.submit("hog", {"mb": 200}, memory_mb=int(baseline) + 100))
+        self.assertEqual(job["status"], "failed")
+        self.assertIn("memory limit", job["error"])
+
+    def test_bulk_keeps_a_slot_free(self):
+        for _ in range(2):
+            self.store.submit("sleep", {"seconds": 5}, lane="bulk")
+        time.sleep(0.2)
+        quick = self.store.submit("sleep", {"seconds": 0})
+        self.assertEqual(wait_for(self.store, quick, timeout=4)["status"], "done")
+        self.assertEqual(self.store.stats()["lanes"]["bulk"].get("queued"), 1)
+
+
+class TestJobEndpoints(unittest.TestCase):
+    """Submitting and polling through the API"""
+
+    def setUp(self):
+        import api
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        store = JobStore(os.path.join(tmp.name, "jobs.sqlite3"))
+        patcher = patch.object(api, "_job_store", store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        env = patch.dict(os.environ, {"ADMIN_TOKEN": "secret", "JOBS_SPREADSHEET_IDS": "x, y"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.store, self.client = store, api.app.test_client()
+        self.admin = {"X-Admin-Token": "secret"}
+
+    def test_submit_poll_cancel(self):
+        with patch.dict(os.environ, {"JOBS_UPLOAD_DIR": os.path.dirname(self.store.path)}):
+            response = self.client.post("/jobs/report?lane=bulk", content_type="multipart/form-data",
+                                        data={"file": (io.BytesIO(b"a,b\n1,2\n"), "report.csv")},
+                                        headers=self.admin)
+        self.assertEqual(response.status_code, 202)
+        job_id = response.get_json()["job_id"]
+        job = self.client.get(f"/jobs/{job_id}").get_json()
+        self.assertEqual((job["status"], job["lane"]), ("queued", "bulk"))
+        self.assertNotIn("payload", job)
+        self.assertEqual(self.client.delete(f"/jobs/{job_id}").get_json()["status"], "cancelled")
+        self.assertEqual(self.client.get("/jobs/nope").status_code, 404)
+
+    def test_rejects_bad_input(self):
+        bad_file = {"file": (io.BytesIO(b"x"), "report.exe")}
+        self.assertEqual(self.client.post("/jobs/report", content_type="multipart/form-data",
+                                          data=bad_file, headers=self.admin).status_code, 400)
+        self.assertEqual(self.client.post("/jobs/report", json={}, headers=self.admin).status_code, 400)
+        self.assertEqual(self.client.post("/jobs/report?lane=urgent", json={"sheet": {"spreadsheet_id": "x"}},
+                                          headers=self.admin).status_code, 400)
+
+    def test_admin_and_allowed_sheets_only(self):
+        sheet = {"sheet": {"spreadsheet_id": "y"}}
+        self.assertEqual(self.client.post("/jobs/report", json=sheet).status_code, 403)
+        with patch.dict(os.environ, {"ADMIN_TOKEN": ""}):
+            self.assertEqual(self.client.post("/jobs/report", json=sheet).status_code, 404)
+        self.assertEqual(self.client.post("/jobs/report", json={"sheet": {"spreadsheet_id": "other"}},
+                                          headers=self.admin).status_code, 403)
+        self.assertEqual(self.client.post("/jobs/report", json=sheet, headers=self.admin).status_code, 202)
+
+    def test_events_push_the_result(self):
+        job_id = self.store.submit("report", {})
+        self.store.claim(["interactive"], os.getpid())
+        self.store.finish(job_id, "done", result={"summary": {"total_rows": 3}})
+        body = self.client.get(f"/jobs/{job_id}/events").get_data(as_text=True)
+        self.assertIn("event: result", body)
+        self.assertIn('"total_rows": 3', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from runtime.llm_scheduler import GenerationScheduler
+
+
+class TestGenerationScheduler(unittest.TestCase):
+    """Concurrency cap, ordering, coalescing and shedding"""
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.started = []
+        self.lock = threading.Lock()
+
+    def blocking(self, label):
+        def call():
+            with self.lock:
+                self.started.append(label)
+            self.release.wait(5)
+            return label
+        return call
+
+    def wait_for_started(self, count):
+        for _ in range(500):
+            with self.lock:
+                if len(self.started) >= count:
+                    return
+            time.sleep(0.002)
+        self.fail(f"only {len(self.started)} of {count} calls started")
+
+    def test_caps_concurrency_and_runs_shortest_first(self):
+        scheduler = GenerationScheduler(max_concurrent=1, batch_window=0.0)
+        first = scheduler.submit("first", 50, self.blocking("first"))
+        self.wait_for_started(1)
+        futures = [scheduler.submit(label, cost, self.blocking(label))
+                   for label, cost in [("long", 400), ("short", 5), ("medium", 60)]]
+        time.sleep(0.02)
+        self.assertEqual(self.started, ["first"])
+        self.assertEqual(scheduler.stats()["state"], {"queue_depth": 3, "in_flight": 1})
+        self.release.set()
+        self.assertEqual([f.result(5) for f in [first] + futures], ["first", "long", "short", "medium"])
+        self.assertEqual(self.started, ["first", "short", "medium", "long"])
+
+    def test_identical_requests_share_a_generation(self):
+        scheduler = GenerationScheduler(max_concurrent=2, batch_window=0.0)
+        a = scheduler.submit("same", 10, self.blocking("a"))
+        b = scheduler.submit("same", 10, self.blocking("b"))
+        self.assertIs(a, b)
+        self.release.set()
+        self.assertEqual(a.result(5), "a")
+        self.assertEqual(self.started, ["a"])
+        self.assertEqual(scheduler.stats()["counters"]["coalesced"], 1)
+
+    def test_full_queue_rejects(self):
+        scheduler = GenerationScheduler(max_concurrent=1, batch_window=0.0, max_queue=1)
+        scheduler.submit("running", 1, self.blocking("running"))
+        self.wait_for_started(1)
+        self.assertIsNotNone(scheduler.submit("queued", 1, self.blocking("queued")))
+        self.assertIsNone(scheduler.run("shed", 1, self.blocking("shed")))
+        self.assertEqual(scheduler.stats()["counters"]["rejected"], 1)
+        self.release.set()
+
+    def test_timeout_removes_queued_request(self):
+        scheduler = GenerationScheduler(max_concurrent=1, batch_window=0.0)
+        scheduler.submit("running", 1, self.blocking("running"))
+        self.wait_for_started(1)
+        self.assertIsNone(scheduler.run("late", 1, self.blocking("late"), timeout=0.02))
+        stats = scheduler.stats()
+        self.assertEqual((stats["counters"]["timed_out"], stats["state"]["queue_depth"]), (1, 0))
+        self.release.set()
+
+    def test_batch_window_groups_arrivals(self):
+        scheduler = GenerationScheduler(max_concurrent=4, batch_window=0.05)
+        futures = [scheduler.submit(i, 1, lambda i=i: i) for i in range(3)]
+        self.assertEqual([f.result(5) for f in futures], [0, 1, 2])
+        stats = scheduler.stats()
+        self.assertEqual(stats["counters"]["batches"], 1)
+        self.assertEqual(stats["mean_batch_size"], 3.0)
+        self.assertGreater(stats["queue_wait_ms"]["p50"], 0)
+
+    def test_disabled_calls_directly(self):
+        scheduler = GenerationScheduler(max_concurrent=0)
+        self.assertEqual(scheduler.run("k", 1, lambda: threading.current_thread().name),
+                         threading.current_thread().name)
+        self.assertEqual(scheduler.stats()["counters"]["submitted"], 0)
+
+    def test_errors_reach_the_caller(self):
+        scheduler = GenerationScheduler(max_concurrent=1, batch_window=0.0)
+
+        def fail():
+            raise RuntimeError("model crashed")
+        with self.assertRaises(RuntimeError):
+            scheduler.run("k", 1, fail, timeout=5)
+        self.assertEqual(scheduler.stats()["state"]["in_flight"], 0)
+
+    def test_from_env(self):
+        env = {"OLLAMA_MAX_CONCURRENT": "3", "OLLAMA_BATCH_WINDOW_MS": "25", "OLLAMA_MAX_QUEUE": "7"}
+        with patch.dict(os.environ, env):
+            limits = GenerationScheduler.from_env().stats()["limits"]
+        self.assertEqual(limits, {"max_concurrent": 3, "batch_window": 0.025, "max_queue": 7})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import io
+import json
+import logging
+import os
+import random
+import sys
+import unittest
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from runtime.log_setup import (CategoryRule, JSONFormatter, QueuedLogging, SamplingFilter,
+                               parse_log_level)
+
+
+def record(name, level=logging.INFO, msg="hello %s", args=("world",)):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+class TestParseLogLevel(unittest.TestCase):
+    """LOG_LEVEL syntax"""
+
+    def test_root_and_categories(self):
+        root, rules = parse_log_level("WARNING,api:sample=0.25,skills=DEBUG:rate=5,agent_vish=ERROR")
+        self.assertEqual(root, logging.WARNING)
+        self.assertEqual(rules, {
+            "api": CategoryRule(None, 0.25, 0.0),
+            "skills": CategoryRule(logging.DEBUG, 1.0, 5.0),
+            "agent_vish": CategoryRule(logging.ERROR, 1.0, 0.0),
+        })
+        self.assertEqual(parse_log_level(""), (logging.INFO, {}))
+
+    def test_invalid(self):
+        for spec in ("LOUD", "api=LOUD", "api:every=2"):
+            with self.assertRaises(ValueError):
+                parse_log_level(spec)
+
+
+class TestSamplingFilter(unittest.TestCase):
+    """Per-category sampling and rate limits"""
+
+    def test_sampling_keeps_warnings(self):
+        sampling = SamplingFilter({"api": CategoryRule(None, 0.1, 0.0)}, rng=random.Random(1))
+        kept = sum(sampling.filter(record("api.chat")) for _ in range(1000))
+        self.assertTrue(60 < kept < 140)
+        self.assertTrue(all(sampling.filter(record("api", logging.WARNING)) for _ in range(50)))
+        self.assertTrue(all(sampling.filter(record("apiary")) for _ in range(50)))
+        self.assertEqual(sampling.dropped["api"], 1000 - kept)
+
+    def test_rate_limit_spares_errors(self):
+        sampling = SamplingFilter({"skills": CategoryRule(None, 1.0, 3.0)})
+        kept = [sampling.filter(record("skills.ai_router_skill", logging.WARNING)) for _ in range(10)]
+        self.assertEqual(kept.count(True), 3)
+        self.assertTrue(sampling.filter(record("skills.ai_router_skill", logging.ERROR)))
+
+
+class TestQueuedLogging(unittest.TestCase):
+    """Records are formatted and written by the listener thread"""
+
+    def setUp(self):
+        self.output = io.StringIO()
+        self.logger = logging.getLogger("test_log_setup.queued")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        self.logger.handlers.clear()
+
+    def install(self, formatter, maxsize=100):
+        queued = QueuedLogging(self.output, formatter, maxsize, SamplingFilter({}))
+        self.logger.addHandler(queued.handler)
+        return queued
+
+    def test_json_lines(self):
+        queued = self.install(JSONFormatter())
+        queued.start()
+        self.logger.info("hello %s", "world")
+        try:
+            raise ValueError("bad")
+        except ValueError:
+            self.logger.exception("failed")
+        queued.stop()
+        lines = [json.loads(line) for line in self.output.getvalue().splitlines()]
+        self.assertEqual([(e["level"], e["msg"]) for e in lines], [("INFO", "hello world"), ("ERROR", "failed")])
+        self.assertIn("ValueError: bad", lines[1]["exc"])
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        queued = self.install(logging.Formatter("%(message)s"), maxsize=2)
+        for i in range(5):  # listener not started: nothing drains the queue
+            self.logger.info("line %d", i)
+        self.assertEqual(queued.stats()["dropped_queue_full"], 3)
+        queued.start()
+        queued.stop()
+        self.assertEqual(self.output.getvalue().splitlines(), ["line 0", "line 1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import importlib.util
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from runtime.memory_watch import MemoryWatch, rss_mb
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def grow(store, count):
+    store.extend(bytearray(1024) for _ in range(count))
+
+
+class TestRequestSampling(unittest.TestCase):
+    """RSS growth recorded per request type for one request in N"""
+
+    def test_every_nth_request(self):
+        watch = MemoryWatch(sample_rate=0.25)
+        sampled = [watch.begin() for _ in range(8)]
+        self.assertEqual([value is not None for value in sampled], [False, False, False, True] * 2)
+        self.assertGreater(sampled[3], 0)
+        self.assertIsNone(MemoryWatch(sample_rate=0).begin())
+
+    def test_growth_per_kind(self):
+        watch = MemoryWatch(sample_rate=1)
+        watch.end("chat:llm", watch.begin() - 5)
+        watch.end("chat:llm", watch.begin() + 5)
+        stats = watch.stats()["kinds"]["chat:llm"]
+        self.assertEqual((stats["sampled"], stats["grew"]), (2, 1))
+        self.assertGreaterEqual(stats["max_growth_mb"], 5)
+
+    def test_recycle_threshold(self):
+        self.assertFalse(MemoryWatch().should_recycle())
+        self.assertFalse(MemoryWatch(recycle_mb=rss_mb() * 4).should_recycle())
+        self.assertTrue(MemoryWatch(recycle_mb=1).should_recycle())
+
+
+class TestSnapshots(unittest.TestCase):
+    """tracemalloc snapshots, top sites and diffs"""
+
+    def setUp(self):
+        self.watch = MemoryWatch(keep=3)
+        self.addCleanup(self.watch.stop)
+
+    def test_diff_finds_the_growing_site(self):
+        store = []
+        first = self.watch.snapshot("before")
+        grow(store, 2000)
+        self.watch.snapshot("after")
+        diff = self.watch.diff()
+        self.assertEqual(diff["from"]["id"], first["id"])
+        self.assertIn("test_memory_watch.py", diff["top"][0]["site"])
+        self.assertGreater(diff["top"][0]["size_diff_kb"], 1500)
+        top = self.watch.top(limit=5)
+        self.assertEqual(top["label"], "after")
+        self.assertIn("test_memory_watch.py", top["top"][0]["site"])
+        with self.assertRaises(ValueError):
+            self.watch.top(key="bogus")
+
+    def test_keeps_the_newest_and_stops(self):
+        ids = [self.watch.snapshot()["id"] for _ in range(5)]
+        self.assertEqual([entry["id"] for entry in self.watch.snapshots()], ids[-3:])
+        with self.assertRaises(KeyError):
+            self.watch.top(ids[0])
+        self.watch.stop()
+        self.assertFalse(self.watch.tracing())
+        self.assertEqual(self.watch.snapshots(), [])
+
+
+class TestMemoryEndpoints(unittest.TestCase):
+    """Stats per request type and the admin snapshot endpoints"""
+
+    def setUp(self):
+        import api
+        patcher = patch.object(api, "memory_watch", MemoryWatch(sample_rate=1))
+        self.watch = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.watch.stop)
+        env = patch.dict(os.environ, {"ADMIN_TOKEN": "secret"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.client = api.app.test_client()
+        self.admin = {"X-Admin-Token": "secret"}
+
+    def test_kinds(self):
+        self.client.post("/chat", json={"message": "hello"})
+        self.client.get("/healthz")
+        kinds = self.client.get("/stats/memory").get_json()["kinds"]
+        self.assertIn("healthz", kinds)
+        self.assertTrue(any(kind.startswith("chat:") for kind in kinds))
+
+    def test_snapshot_and_diff(self):
+        self.assertEqual(self.client.post("/admin/memory/snapshots").status_code, 403)
+        self.assertEqual(self.client.get("/admin/memory/diff", headers=self.admin).status_code, 404)
+        self.assertEqual(self.client.post("/admin/memory/snapshots?label=a", headers=self.admin).status_code, 201)
+        self.client.post("/admin/memory/snapshots?label=b", headers=self.admin)
+        diff = self.client.get("/admin/memory/diff?limit=3", headers=self.admin).get_json()
+        self.assertEqual((diff["from"]["label"], diff["to"]["label"], len(diff["top"])), ("a", "b", 3))
+        self.assertEqual(self.client.get("/admin/memory/top?snapshot=99", headers=self.admin).status_code, 404)
+        self.assertEqual(self.client.get("/admin/memory/top?key=x", headers=self.admin).status_code, 400)
+        stopped = self.client.delete("/admin/memory/snapshots", headers=self.admin).get_json()
+        self.assertEqual(stopped, {"tracing": False, "snapshots": []})
+
+    def test_gunicorn_recycles_large_workers(self):
+        spec = importlib.util.spec_from_file_location("gunicorn_conf", os.path.join(ROOT, "gunicorn.conf.py"))
+        conf = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(conf)
+        worker = MagicMock(alive=True)
+        conf.post_request(worker, None, {}, None)
+        self.assertTrue(worker.alive)
+        self.watch.recycle_mb = 1
+        conf.post_request(worker, None, {}, None)
+        self.assertFalse(worker.alive)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent_vish import AgentVish, LocalLLMRouter
+from runtime.aio import run_sync
+from runtime.llm_scheduler import GenerationScheduler
+from runtime.output_profile import (PROFILES, OutputProfile, OutputStats, ReplyBudget, clip,
+                                    output_stats, profile_for, stream_to)
+from skills.provider import generate_within
+from tests.benchmarks.stub_servers import StubProviderServer
+
+ANSWER = "MyOperator is a cloud telephony platform for business calls."
+LONG_REPLY = ANSWER + "\n" + " ".join(f"Extra detail {i} nobody will read." for i in range(30))
+CHAT = PROFILES["chat"]
+
+
+class TestProfiles(unittest.TestCase):
+    """Channel lookup and clipping"""
+
+    def test_profile_for(self):
+        self.assertIs(profile_for(None), CHAT)
+        self.assertIs(profile_for("Detail"), PROFILES["detail"])
+        self.assertIs(profile_for("no-such-channel"), CHAT)
+        with patch.dict(os.environ, {"OUTPUT_CHANNEL": "detail"}):
+            self.assertIs(profile_for(None), PROFILES["detail"])
+
+    def test_clip(self):
+        self.assertEqual(clip("Short.", 50), "Short.")
+        self.assertEqual(clip("First sentence here. Second one runs on and on", 30), "First sentence here.")
+        self.assertEqual(clip("no sentence end in this long reply at all", 20), "no sentence end...")
+
+
+class TestReplyBudget(unittest.TestCase):
+    """Deciding when a stream can be closed"""
+
+    def test_stop_sequence_across_pieces(self):
+        budget = ReplyBudget(CHAT)
+        self.assertFalse(budget.add("\n"))  # a leading newline is not a stop
+        self.assertFalse(budget.add("One answer"))
+        self.assertTrue(budget.add(" here.\nMore"))
+        self.assertEqual(budget.text, "One answer here.")
+
+    def test_character_budget(self):
+        budget = ReplyBudget(OutputProfile("tiny", 20, 8, (), ""))
+        pieces = ["word " for _ in range(10)]
+        taken = next(i for i, piece in enumerate(pieces) if budget.add(piece))
+        self.assertEqual(taken, 3)
+        self.assertLessEqual(len(budget.text), 20)
+
+    def test_stats_savings(self):
+        stats = OutputStats()
+        stats.record("chatgpt", CHAT, "x" * 400, "x" * 300, 0.2, cut=True)
+        row = stats.stats()["providers"]["chatgpt"]
+        self.assertEqual((row["tokens_received"], row["tokens_kept"], row["tokens_discarded"]), (100, 75, 25))
+        self.assertEqual(row["tokens_saved"], 400)  # against the old 500-token cap
+        self.assertAlmostEqual(row["latency_saved_ms"], 800.0)
+        self.assertEqual(row["streams_cut"], 1)
+
+
+class TestProfiledGeneration(unittest.TestCase):
+    """Providers stop at the reply budget instead of waiting for the whole reply"""
+
+    def test_ollama_stream_cut_at_newline(self):
+        with StubProviderServer(reply=LONG_REPLY, token_latency=0.01) as stub:
+            router = LocalLLMRouter(stub.base_url, scheduler=GenerationScheduler(max_concurrent=0))
+            start = time.monotonic()
+            self.assertEqual(router.route("what is myoperator", {"profile": CHAT}), ANSWER)
+            self.assertLess(time.monotonic() - start, 1.0)
+            time.sleep(0.1)
+            self.assertEqual(stub.streams_aborted, 1)
+            self.assertLess(stub.tokens_sent, len(LONG_REPLY.split()) // 2)
+        self.assertGreaterEqual(output_stats.stats()["providers"]["ollama"]["streams_cut"], 1)
+
+    def test_kept_text_streams_to_the_sink(self):
+        pieces = []
+        with StubProviderServer(reply=LONG_REPLY, token_latency=0.001) as stub:
+            # Through the scheduler, so the call runs on another thread than the one that set the sink
+            router = LocalLLMRouter(stub.base_url, scheduler=GenerationScheduler(max_concurrent=1))
+            with stream_to(lambda text, restart: pieces.append((text, restart))):
+                self.assertEqual(router.route("what is myoperator", {"profile": CHAT}), ANSWER)
+            with stream_to(None):
+                router.route("what is myoperator, again", {"profile": CHAT})
+        self.assertEqual("".join(text for text, _ in pieces), ANSWER)
+        self.assertEqual([restart for _, restart in pieces], [True] + [False] * (len(pieces) - 1))
+
+    def test_perplexity_request_and_cutoff(self):
+        from skills.perplexity_skill import PerplexitySkill
+        with StubProviderServer(reply=LONG_REPLY, token_latency=0.01) as stub:
+            with patch.dict(os.environ, {"PERPLEXITY_API_KEY": "test", "PERPLEXITY_BASE_URL": stub.base_url}):
+                skill = PerplexitySkill()
+            payload = skill._request("hi", profile=CHAT)
+            self.assertEqual(payload["max_tokens"], CHAT.max_tokens)
+            self.assertIn(CHAT.instruction, payload["messages"][0]["content"])
+            self.assertEqual(run_sync(generate_within(skill, "hi", None, None, CHAT)), ANSWER)
+
+    def test_channel_reaches_router(self):
+        with patch("agent_vish.LocalLLMRouter._check_availability", return_value=False):
+            agent = AgentVish()
+        agent.ai_router = MagicMock()
+        agent.ai_router.route.return_value = ANSWER
+        agent.respond("zzz quux", channel="detail")
+        self.assertIs(agent.ai_router.route.call_args.args[1]["profile"], PROFILES["detail"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from runtime import profiler
+from runtime.profiler import SamplingProfiler
+
+
+def busy_loop(stop):
+    profiler.tag(intent="analytics", provider="local")
+    with profiler.phase("report:numeric"):
+        while not stop.is_set():
+            sum(i * i for i in range(1000))
+
+
+class TestLabels(unittest.TestCase):
+    """tag() and phase() record nothing unless a profiler is running"""
+
+    def test_noop_while_inactive(self):
+        self.assertFalse(profiler.active())
+        profiler.tag(intent="faq")
+        self.assertIs(profiler.phase("a"), profiler.phase("b"))
+        self.assertEqual(profiler.labels(), {})
+
+    def test_phases_nest(self):
+        session = SamplingProfiler().start()
+        self.addCleanup(session.stop)
+        profiler.tag(intent="faq")
+        with profiler.phase("outer"):
+            with profiler.phase("inner"):
+                self.assertEqual(profiler.labels(), {"intent": "faq", "phase": "inner"})
+            self.assertEqual(profiler.labels()["phase"], "outer")
+        self.assertEqual(profiler.labels(), {"intent": "faq"})
+        profiler.clear()
+        self.assertEqual(profiler.labels(), {})
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """Collapsed stacks with labels as root frames"""
+
+    def test_samples_are_attributed(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_loop, args=(stop,), name="worker")
+        session = SamplingProfiler(interval=0.002).start()
+        worker.start()
+        time.sleep(0.3)
+        session.stop()
+        stop.set()
+        worker.join()
+        self.assertGreater(session.samples, 20)
+        lines = [line for line in session.collapsed().splitlines() if line.startswith("worker;")]
+        self.assertTrue(lines)
+        self.assertTrue(all(line.startswith("worker;intent:analytics;provider:local;") for line in lines))
+        self.assertIn("busy_loop (tests/test_profiler.py:", session.collapsed())
+        self.assertGreater(session.summary()["labels"]["phase:report:numeric"], 0)
+        self.assertFalse(profiler.active())
+
+    def test_one_session_at_a_time(self):
+        results = []
+        first = threading.Thread(target=lambda: results.append(profiler.sample(0.3)))
+        first.start()
+        time.sleep(0.05)
+        self.assertIsNone(profiler.sample(0.1))
+        first.join()
+        self.assertIsInstance(results[0], SamplingProfiler)
+
+
+class TestAdminEndpoints(unittest.TestCase):
+    """Admin auth, on-demand sampling and X-Profile request profiles"""
+
+    def setUp(self):
+        import api
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = patch.dict(os.environ, {"ADMIN_TOKEN": "secret", "PROFILE_DIR": tmp.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = api.app.test_client()
+        self.admin = {"Authorization": "Bearer secret"}
+
+    def test_auth(self):
+        self.assertEqual(self.client.post("/admin/profile?seconds=0").status_code, 403)
+        self.assertEqual(self.client.post("/admin/profile?seconds=0",
+                                          headers={"X-Admin-Token": "wrong"}).status_code, 403)
+        with patch.dict(os.environ, {"ADMIN_TOKEN": ""}):
+            self.assertEqual(self.client.post("/admin/profile?seconds=0", headers=self.admin).status_code, 404)
+        # X-Profile without the token is ignored rather than refused
+        response = self.client.post("/chat", json={"message": "hello"}, headers={"X-Profile": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response.headers)
+
+    def test_sampling_endpoint(self):
+        response = self.client.post("/admin/profile?seconds=0.2&interval_ms=2&format=json", headers=self.admin)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(response.get_json()["samples"], 10)
+        response = self.client.post("/admin/profile?seconds=0.1&idle=1", headers=self.admin)
+        self.assertEqual(response.mimetype, "text/plain")
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in response.get_data(as_text=True).splitlines()))
+        self.assertEqual(self.client.post("/admin/profile?seconds=x", headers=self.admin).status_code, 400)
+
+    def test_request_profile(self):
+        response = self.client.post("/chat", json={"message": "hello"}, headers=dict(self.admin, **{"X-Profile": "1"}))
+        self.assertEqual(response.status_code, 200)
+        profile_id = response.headers["X-Profile-Id"]
+        record = self.client.get(f"/admin/profile/requests/{profile_id}", headers=self.admin).get_json()
+        self.assertEqual(record["path"], "/chat")
+        self.assertIn("intent", record["labels"])
+        self.assertIn("cumulative", record["report"])
+        listed = self.client.get("/admin/profile/requests", headers=self.admin).get_json()["profiles"]
+        self.assertEqual(listed[0]["id"], profile_id)
+        prof = self.client.get(f"/admin/profile/requests/{profile_id}?format=prof", headers=self.admin)
+        self.assertGreater(len(prof.data), 100)
+        self.assertEqual(self.client.get("/admin/profile/requests/../x", headers=self.admin).status_code, 404)
+        self.assertFalse(profiler.active())
+
+
+if __name__ == '__main__':
+    unittest.main()
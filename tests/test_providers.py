@@ -0,0 +1,146 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent_vish import LocalLLMRouter
+from runtime import http_pool
+from runtime.aio import run_sync
+from skills.ai_router_skill import AIRouterSkill, ALL_MODELS_FAILED_REPLY
+from skills.provider import Provider, openai_stream_deltas
+from tests.benchmarks.stub_servers import DEFAULT_REPLY, StubProviderServer
+
+
+class FakeProvider:
+    """Answers after a delay and records whether it was cancelled"""
+
+    def __init__(self, name, delay, answer):
+        self.name, self.delay, self.answer = name, delay, answer
+        self.started = self.cancelled = False
+
+    async def agenerate(self, message, history=None, deadline=None, profile=None):
+        self.started = True
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self.answer
+
+    async def astream(self, message, history=None, deadline=None, profile=None):
+        yield await self.agenerate(message, history, deadline)
+
+
+async def collect(stream, limit=None):
+    pieces = []
+    async for piece in stream:
+        pieces.append(piece)
+        if len(pieces) == limit:
+            break
+    return pieces
+
+
+class TestProviderProtocol(unittest.TestCase):
+    """Every model exposes the same async interface"""
+
+    def test_implementations(self):
+        with StubProviderServer() as stub, patch.dict(os.environ, {"PERPLEXITY_API_KEY": "test"}):
+            router = AIRouterSkill({})  # skills take no constructor arguments
+            self.assertIsNotNone(router.perplexity)
+            self.assertIsInstance(router.perplexity, Provider)
+            self.assertIsInstance(LocalLLMRouter(stub.base_url), Provider)
+
+    def test_sse_deltas(self):
+        async def lines():
+            for line in ('data: {"choices": [{"delta": {"role": "assistant"}}]}', ': keep-alive',
+                         'data: {"choices": [{"delta": {"content": "Hi"}}]}', 'data: not json',
+                         'data: {"choices": [{"delta": {"content": " there"}}]}', 'data: [DONE]',
+                         'data: {"choices": [{"delta": {"content": "late"}}]}'):
+                yield line
+        self.assertEqual(run_sync(collect(openai_stream_deltas(lines()))), ["Hi", " there"])
+
+
+class TestPerplexityProvider(unittest.TestCase):
+    """Perplexity over the pooled client, against the stub server"""
+
+    def skill(self, stub):
+        from skills.perplexity_skill import PerplexitySkill
+        with patch.dict(os.environ, {"PERPLEXITY_API_KEY": "test", "PERPLEXITY_BASE_URL": stub.base_url}):
+            return PerplexitySkill()
+
+    def test_generate_and_stream(self):
+        with StubProviderServer() as stub:
+            skill = self.skill(stub)
+            self.assertEqual(run_sync(skill.agenerate("hello")), DEFAULT_REPLY)
+            self.assertEqual("".join(run_sync(collect(skill.astream("hello")))), DEFAULT_REPLY)
+            self.assertEqual(skill.query("hello"), DEFAULT_REPLY)
+
+    def test_closing_stream_early_aborts_it(self):
+        with StubProviderServer(token_latency=0.02) as stub:
+            skill = self.skill(stub)
+            self.assertEqual(run_sync(collect(skill.astream("hello"), limit=2)), ["Agent ", "Vish "])
+            time.sleep(0.2)
+            self.assertEqual(stub.streams_aborted, 1)
+            self.assertLess(stub.tokens_sent, len(DEFAULT_REPLY.split()))
+
+    def test_failure_is_none(self):
+        with StubProviderServer(failure_rate=1.0) as stub:
+            skill = self.skill(stub)
+            self.assertIsNone(run_sync(skill.agenerate("hello")))
+            self.assertIn("trouble", skill.query("hello"))
+
+    def test_client_is_pooled_per_process(self):
+        with StubProviderServer() as stub:
+            self.assertIs(http_pool.async_client(stub.base_url), http_pool.async_client(stub.base_url + "/"))
+            self.assertIs(http_pool.session(stub.base_url), http_pool.session(stub.base_url))
+
+
+class TestLocalProvider(unittest.TestCase):
+    """LocalLLMRouter as a provider"""
+
+    def test_generate_and_stream(self):
+        with StubProviderServer() as stub:
+            router = LocalLLMRouter(stub.base_url)
+            self.assertEqual(run_sync(router.agenerate("hi")), DEFAULT_REPLY)
+            self.assertEqual("".join(run_sync(collect(router.astream("hi")))), DEFAULT_REPLY)
+
+
+class TestConcurrentRouting(unittest.TestCase):
+    """Fallback and hedging in AIRouterSkill.aroute_query"""
+
+    def make_router(self, hedge_delay, *providers):
+        router = AIRouterSkill({})
+        router.hedge_delay = hedge_delay
+        router.perplexity, router.chatgpt, router.gemini = providers
+        return router
+
+    def test_sequential_fallback(self):
+        first, second, third = FakeProvider("p", 0.01, None), FakeProvider("c", 0.01, "second"), \
+            FakeProvider("g", 0.01, "third")
+        router = self.make_router(None, first, second, third)
+        self.assertEqual(router.route_query("latest news", {}), "[ChatGPT] second")
+        self.assertFalse(third.started)
+
+    def test_hedge_races_slow_provider_and_cancels_it(self):
+        slow, fast, spare = FakeProvider("p", 2.0, "slow"), FakeProvider("c", 0.01, "fast"), \
+            FakeProvider("g", 0.01, "spare")
+        router = self.make_router(0.05, slow, fast, spare)
+        start = time.monotonic()
+        self.assertEqual(router.route_query("latest news", {}), "[ChatGPT] fast")
+        self.assertLess(time.monotonic() - start, 1.0)
+        time.sleep(0.05)
+        self.assertTrue(slow.cancelled)
+        self.assertFalse(spare.started)
+
+    def test_all_fail(self):
+        router = self.make_router(0.01, *(FakeProvider(n, 0.01, None) for n in "pcg"))
+        self.assertEqual(router.route_query("latest news", {}), ALL_MODELS_FAILED_REPLY)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import sys
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from runtime.residency import ModelResidency, parse_days, parse_hours
+from tests.benchmarks.stub_servers import StubProviderServer
+
+MONDAY_NOON = datetime(2026, 10, 19, 12, 0)
+SUNDAY_NOON = datetime(2026, 10, 18, 12, 0)
+MONDAY_NIGHT = datetime(2026, 10, 19, 22, 30)
+
+
+class TestBusinessHours(unittest.TestCase):
+    """Parsing and evaluating the keep-warm window"""
+
+    def test_parse(self):
+        self.assertEqual(parse_hours("09:00-19:30"), (540, 1170))
+        self.assertEqual(parse_days("mon-fri"), frozenset(range(5)))
+        self.assertEqual(parse_days("sat-mon,wed"), frozenset({5, 6, 0, 2}))
+        for bad in ("9-7", "nine-five"):
+            with self.assertRaises(ValueError):
+                parse_hours(bad)
+        with self.assertRaises(ValueError):
+            parse_days("weekdays")
+
+    def test_window(self):
+        def residency(now, hours=(540, 1140)):
+            return ModelResidency("http://unused", ["m"], hours=hours, now=lambda: now)
+        self.assertTrue(residency(MONDAY_NOON).in_business_hours())
+        self.assertFalse(residency(SUNDAY_NOON).in_business_hours())
+        self.assertFalse(residency(MONDAY_NIGHT).in_business_hours())
+        self.assertTrue(residency(MONDAY_NIGHT, hours=(22 * 60, 6 * 60)).in_business_hours())
+
+    def test_from_env(self):
+        env = {"OLLAMA_KEEP_ALIVE": "", "OLLAMA_WARM_HOURS": "08:00-20:00", "OLLAMA_WARM_DAYS": "mon-sat",
+               "OLLAMA_PING_INTERVAL": "60"}
+        with patch.dict(os.environ, env):
+            residency = ModelResidency.from_env("http://unused", ["a", "b", "a"])
+        self.assertEqual(residency.models, ["a", "b"])
+        self.assertEqual(residency.payload_options(), {})
+        self.assertEqual((residency.hours, residency.ping_interval), ((480, 1200), 60.0))
+        self.assertIn(5, residency.days)
+
+
+class TestResidencyAgainstStub(unittest.TestCase):
+    """Preload, pings and cold-load accounting against a stub that unloads idle models"""
+
+    def test_preload_and_cold_requests(self):
+        with StubProviderServer(load_latency=0.6, keep_alive=300) as stub:
+            residency = ModelResidency(stub.base_url, ["llama3.2:1b"], now=lambda: MONDAY_NOON)
+            self.assertEqual(residency.preload(), 1)
+            stats = residency.stats()
+        self.assertEqual(stats["models"]["llama3.2:1b"]["loads"], 1)
+        self.assertEqual(stats["recent_loads"][0]["source"], "preload")
+        self.assertEqual(stats["counters"]["cold_requests"], 0)
+
+        residency.observe("llama3.2:1b", {"load_duration": 2_000_000_000}, 2.4)
+        residency.observe("llama3.2:1b", {"load_duration": 3_000_000}, 0.3)
+        stats = residency.stats()
+        self.assertEqual((stats["counters"]["requests"], stats["counters"]["cold_requests"]), (2, 1))
+        self.assertEqual(stats["cold_start_latency_ms"]["max"], 2400.0)
+
+    def test_pings_only_idle_models_in_business_hours(self):
+        now = [MONDAY_NOON]
+        with StubProviderServer() as stub:
+            residency = ModelResidency(stub.base_url, ["a", "b"], ping_interval=60, now=lambda: now[0],
+                                       clock=lambda: 1000.0)
+            residency.observe("a", {}, 0.1)
+            self.assertEqual(residency.ping_idle(), 1)  # only b was idle
+            self.assertEqual(stub.requests_served, 1)
+            now[0] = SUNDAY_NOON
+            residency._last_used.clear()
+            self.assertEqual(residency.ping_idle(), 0)
+        self.assertEqual(residency.stats()["counters"]["pings"], 1)
+
+    def test_router_records_cold_loads(self):
+        from agent_vish import LocalLLMRouter
+
+        with StubProviderServer(load_latency=0.6) as stub:
+            router = LocalLLMRouter(stub.base_url)
+            router.residency.keep_alive = "10m"
+            self.assertTrue(router.route("hello"))
+            self.assertTrue(router.route("hello again"))
+            stats = router.residency.stats()
+        self.assertEqual((stats["counters"]["requests"], stats["counters"]["cold_requests"]), (2, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import json
+import random
+import re
+import sys
+import os
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent_vish import clean_text, sanitize_text
+from api import admission, app, parse_chat_body
+
+
+def legacy_clean_text(s):
+    """clean_text as it was before the single-pass sanitizer"""
+    s = re.sub(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]", "", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s.replace("\n", " ")
+
+
+def legacy_strip_control_chars(s):
+    """api.strip_control_chars as it was applied to /chat messages"""
+    s = re.sub(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]", "", s)
+    s = re.sub(r"[\t\r\n\v\f]+", " ", s)
+    return s.strip()
+
+
+# Characters that exercise every branch: controls, C1, unicode spaces, non-ASCII letters
+ALPHABET = (
+    [chr(c) for c in range(0x00, 0x21)] + [chr(c) for c in range(0x7F, 0xA1)]
+    + ["a", "Z", "é", "न", " ", "　", " ", "﻿", "😀"]
+)
+
+
+def random_text(rng, length):
+    return "".join(rng.choice(ALPHABET) for _ in range(length))
+
+
+class TestSanitizerParity(unittest.TestCase):
+    """The fused sanitizers must match the regex pipelines they replace"""
+
+    def test_clean_text_parity(self):
+        rng = random.Random(1)
+        for _ in range(2000):
+            text = random_text(rng, rng.randint(0, 40))
+            self.assertEqual(clean_text(text), legacy_clean_text(text), repr(text))
+
+    def test_sanitize_text_matches_message_pipeline(self):
+        # The old /chat path ran strip_control_chars, then AgentVish cleaned again
+        rng = random.Random(2)
+        for _ in range(2000):
+            text = random_text(rng, rng.randint(0, 40))
+            expected = legacy_clean_text(legacy_strip_control_chars(text))
+            self.assertEqual(sanitize_text(text), expected, repr(text))
+
+    def test_ascii_and_unicode_paths(self):
+        self.assertEqual(sanitize_text("  hi\x00\tthere\r\n "), "hi there")
+        self.assertEqual(sanitize_text("नमस्ते\x85 दुनिया !"), "नमस्ते दुनिया !")
+
+    def test_non_string_input(self):
+        self.assertEqual(sanitize_text(None), "")
+        self.assertEqual(clean_text(42), "")
+
+
+class TestParseChatBody(unittest.TestCase):
+    """Unit tests for the /chat body parser"""
+
+    def test_plain_json(self):
+        self.assertEqual(parse_chat_body(b'{"message": "hi"}'), {"message": "hi"})
+
+    def test_raw_control_chars_inside_strings(self):
+        data = parse_chat_body(b'{"message": "line1\nline2\x07"}')
+        self.assertEqual(sanitize_text(data["message"]), "line1 line2")
+
+    def test_control_chars_between_tokens(self):
+        self.assertEqual(parse_chat_body(b'{\x01"message": "hi"}'), {"message": "hi"})
+
+    def test_invalid_utf8_is_replaced(self):
+        data = parse_chat_body(b'{"message": "caf\xe9"}')
+        self.assertEqual(data["message"], "caf�")
+
+    def test_invalid_and_non_object_bodies(self):
+        self.assertIsNone(parse_chat_body(b'{"message": '))
+        self.assertEqual(parse_chat_body(b''), {})
+        self.assertEqual(parse_chat_body(b'["hi"]'), {})
+
+
+class TestChatEndpoint(unittest.TestCase):
+    """Request-level behaviour of /chat"""
+
+    def setUp(self):
+        self.client = app.test_client()
+        patcher = patch.object(admission, "rate_per_sec", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, body):
+        return self.client.post("/chat", data=body, content_type="application/json")
+
+    def test_reply(self):
+        resp = self.post(json.dumps({"message": "  about\n vishal\x00 "}))
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.get_json()["ok"])
+
+    def test_invalid_json(self):
+        self.assertEqual(self.post(b'{"message": ').status_code, 400)
+
+    def test_empty_or_non_string_message(self):
+        self.assertEqual(self.post(json.dumps({"message": " \x00\n"})).status_code, 400)
+        self.assertEqual(self.post(json.dumps({"message": 5})).status_code, 400)
+        self.assertEqual(self.post(b"").status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent_vish import AgentVish
+from memory.memory_manager import MemoryManager
+from memory.shared_store import LocalStore, SQLiteStore, open_store
+
+
+def _append_from_child(path, session_id):
+    store = SQLiteStore(path)
+    store.session_append(session_id, "user", f"from pid {os.getpid()}")
+    store.cache_set("shared", "value from child")
+
+
+class StoreContract:
+    """Behaviour both stores must share; mixed into one TestCase per store"""
+
+    def make_store(self, **kwargs):
+        raise NotImplementedError
+
+    def test_cache_round_trip(self):
+        store = self.make_store()
+        self.assertIsNone(store.cache_get("k"))
+        store.cache_set("k", "v")
+        self.assertEqual(store.cache_get("k"), "v")
+        store.cache_set("k", "v2")
+        self.assertEqual(store.cache_get("k"), "v2")
+
+    def test_cache_ttl(self):
+        store = self.make_store()
+        store.cache_set("k", "v", ttl=-1)
+        self.assertIsNone(store.cache_get("k"))
+
+    def test_cache_is_bounded(self):
+        store = self.make_store(max_cache_entries=5)
+        for i in range(50):
+            store.cache_set(f"k{i}", str(i))
+            time.sleep(0.0005)
+        present = [i for i in range(50) if store.cache_get(f"k{i}") is not None]
+        self.assertLessEqual(len(present), 5 + 8)  # SQLite prunes every few writes
+        self.assertIn(49, present)
+
+    def test_session_history_is_trimmed(self):
+        store = self.make_store(max_session_messages=3)
+        for i in range(5):
+            store.session_append("s1", "user", f"m{i}")
+        store.session_append("s2", "user", "other")
+        self.assertEqual([m["content"] for m in store.session_messages("s1")], ["m2", "m3", "m4"])
+        self.assertEqual([m["content"] for m in store.session_messages("s1", last_n=1)], ["m4"])
+        self.assertEqual(store.session_size("s1"), 3)
+        store.session_clear("s1")
+        self.assertEqual(store.session_messages("s1"), [])
+        self.assertEqual(store.session_size("s2"), 1)
+
+    def test_memory_manager_uses_store(self):
+        store = self.make_store()
+        first = MemoryManager(store=store, session_id="abc")
+        first.add_message("user", "hello")
+        second = MemoryManager(store=store, session_id="abc")
+        self.assertEqual(second.get_messages(), [{"role": "user", "content": "hello"}])
+        self.assertEqual(second.get_memory_size(), 1)
+        self.assertEqual(first.memory, [])
+
+
+class TestLocalStore(StoreContract, unittest.TestCase):
+
+    def make_store(self, **kwargs):
+        return LocalStore(**kwargs)
+
+
+class TestSQLiteStore(StoreContract, unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "store.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_store(self, **kwargs):
+        kwargs.setdefault("prune_interval", 8)
+        return SQLiteStore(self.path, **kwargs)
+
+    def test_visible_across_processes(self):
+        store = self.make_store()
+        store.session_append("s", "user", "from parent")
+        ctx = multiprocessing.get_context("fork")
+        children = [ctx.Process(target=_append_from_child, args=(self.path, "s")) for _ in range(3)]
+        for child in children:
+            child.start()
+        for child in children:
+            child.join(10)
+            self.assertEqual(child.exitcode, 0)
+        self.assertEqual(store.session_size("s"), 4)
+        self.assertEqual(store.cache_get("shared"), "value from child")
+
+    def test_open_store(self):
+        self.assertIsInstance(open_store(self.path), SQLiteStore)
+        self.assertIsInstance(open_store(None), LocalStore)
+
+
+class TestAgentSessions(unittest.TestCase):
+    """AgentVish caches LLM replies and records sessions in its store"""
+
+    def setUp(self):
+        with patch("agent_vish.LocalLLMRouter._check_availability", return_value=False):
+            self.agent = AgentVish(store=LocalStore())
+        self.agent.ai_router = MagicMock()
+        self.agent.ai_router.route.return_value = "an llm answer"
+
+    def test_llm_reply_is_cached(self):
+        self.assertEqual(self.agent.receive_message("zzz"), "an llm answer")
+        self.assertEqual(self.agent.receive_message("ZZZ"), "an llm answer")
+        self.assertEqual(self.agent.ai_router.route.call_count, 1)
+
+    def test_replies_leaning_on_history_are_not_shared(self):
+        self.agent.receive_message("zzz", session_id="u1")  # no history yet: cached
+        self.agent.receive_message("qqq", session_id="u1")  # answered with u1's history
+        self.assertIsNone(self.agent.store.cache_get("llm:chat:qqq"))
+        self.agent.receive_message("qqq", session_id="u2")
+        self.agent.receive_message("zzz")
+        self.assertEqual(self.agent.ai_router.route.call_count, 3)
+
+    def test_rejected_answers_are_not_cached(self):
+        def route(msg, context, deadline=None):
+            context["rejected"] = "verifier"
+            return "a doubtful answer"
+
+        self.agent.ai_router.route.side_effect = route
+        reply = self.agent.respond("zzz")
+        self.assertEqual((reply.source, reply.degraded), ("llm", True))
+        self.agent.respond("zzz")
+        self.assertEqual(self.agent.ai_router.route.call_count, 2)
+
+    def test_session_history_recorded(self):
+        self.agent.receive_message("skills", session_id="u1")
+        self.agent.receive_message("zzz", session_id="u1")
+        history = self.agent.store.session_messages("u1")
+        self.assertEqual([m["role"] for m in history], ["user", "assistant", "user", "assistant"])
+        context = self.agent.ai_router.route.call_args[0][1]
+        self.assertEqual(len(context["history"]), 2)
+
+    def test_no_session_no_history(self):
+        self.agent.receive_message("skills")
+        self.assertEqual(self.agent.store.session_messages(""), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memory.sheet_cache import ColumnarSheetCache, SheetTable
+from runtime.deadline import Deadline
+from runtime.jobs import JobStore, run_report
+from skills.analytics_skill import analytics_skill
+from skills.core_skills import report_skill
+from skills.sheets_sync import SheetsClient, SheetsSync, a1, column_letter
+from tests.benchmarks.fake_sheets import FakeSheetsServer, parse_a1
+
+HEADER = ["date", "agent", "calls", "minutes"]
+
+
+def make_rows(count, start=0):
+    return [[f"2025-03-{i % 28 + 1:02d}", f"agent{i % 5}", i, "" if i % 10 == 3 else i * 2.5]
+            for i in range(start, start + count)]
+
+
+class TestRanges(unittest.TestCase):
+    """A1 notation shared by the client and the fake server"""
+
+    def test_round_trip(self):
+        self.assertEqual(column_letter(0), "A")
+        self.assertEqual(column_letter(27), "AB")
+        self.assertEqual(a1("Q1", 2, 11, 4), "'Q1'!A2:D11")
+        self.assertEqual(parse_a1(a1("it's", 5, None, 28)), ("it's", 4, None, 0, 27))
+        self.assertEqual(parse_a1(a1("Q1", 1)), ("Q1", 0, 0, 0, None))
+
+
+class TestSheetTable(unittest.TestCase):
+    """Columnar rows and the on-disk copy"""
+
+    def test_types_and_changes(self):
+        table = SheetTable.from_rows(HEADER, make_rows(20))
+        self.assertEqual(table.columns["calls"].dtype.kind, "f")
+        self.assertEqual(table.columns["agent"].dtype, object)
+        self.assertEqual(table.write(18, make_rows(4, start=18)), 0)  # two rewritten unchanged, two appended
+        self.assertEqual(len(table), 22)
+        self.assertEqual(table.write(5, [["x", "agent0", "n/a", 1.0]]), 1)
+        self.assertEqual(table.columns["calls"].dtype, object)  # widened by the text cell
+        self.assertEqual(table.to_frame()["calls"].iloc[5], "n/a")
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as root:
+            cache = ColumnarSheetCache(root)
+            table = SheetTable.from_rows(HEADER, make_rows(30))
+            cache.save("book.Q1", table, version="7")
+            meta, loaded = cache.load("book.Q1")
+            self.assertEqual(meta["version"], "7")
+            self.assertTrue(loaded.to_frame().equals(table.to_frame()))
+            cache.save("book.Q1", table, version="8")
+            self.assertEqual(len(os.listdir(cache.path("book.Q1"))), len(HEADER) + 1)  # columns and meta.json
+
+
+class TestSheetsSync(unittest.TestCase):
+    """Incremental sync against the fake Sheets server"""
+
+    def setUp(self):
+        self.fake = FakeSheetsServer().start()
+        self.addCleanup(self.fake.stop)
+        self.fake.add_sheet("book", "Q1", [HEADER] + make_rows(250))
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.cache = ColumnarSheetCache(root.name)
+        self.jobs = JobStore(os.path.join(root.name, "jobs.sqlite3"))
+        env = patch.dict(os.environ, {"JOBS_DB": self.jobs.path})
+        env.start()
+        self.addCleanup(env.stop)
+        self.sync = self.make_sync()
+
+    def make_sync(self):
+        client = SheetsClient(self.fake.base_url, self.fake.base_url)
+        return SheetsSync(client, self.cache, tail_rows=20, block_rows=100, max_age=0)
+
+    def expected(self):
+        rows = self.fake.books["book"]["sheets"]["Q1"]
+        return SheetTable.from_rows(rows[0], rows[1:]).to_frame()
+
+    def assertInSync(self):
+        self.assertTrue(self.sync.frame("book", "Q1", sync=False).equals(self.expected()))
+
+    def test_first_sync_then_unchanged(self):
+        self.assertEqual(self.sync.sync("book", "Q1").mode, "full")
+        self.assertInSync()
+        served = self.fake.cells_served
+        self.assertEqual(self.sync.sync("book", "Q1").mode, "unchanged")
+        self.assertEqual(self.fake.cells_served, served)
+
+    def test_fresh_copy_skips_the_network(self):
+        self.sync.max_age = 60
+        self.sync.sync("book", "Q1")
+        requests = self.fake.requests
+        self.assertEqual(self.sync.sync("book", "Q1").mode, "fresh")
+        self.assertEqual(self.fake.requests, requests)
+
+    def test_appends_and_tail_edits_fetch_only_those_rows(self):
+        self.sync.sync("book", "Q1")
+        self.fake.append_rows("book", "Q1", make_rows(7, start=250))
+        self.fake.set_cell("book", "Q1", 245, 2, 9999)
+        result = self.sync.sync("book", "Q1")
+        self.assertEqual((result.mode, result.rows, result.rows_appended, result.rows_changed),
+                         ("incremental", 257, 7, 1))
+        self.assertLess(result.rows_fetched, 257 // 2)
+        self.assertInSync()
+
+    def test_old_edits_converge_through_verification(self):
+        self.sync.sync("book", "Q1")
+        self.fake.set_cell("book", "Q1", 150, 1, "moved")
+        self.fake.set_cell("book", "Q1", 10, 1, "moved")
+        changed = 0
+        for _ in range(2):  # two blocks above the tail window
+            self.fake.append_rows("book", "Q1", make_rows(1, start=999))
+            changed += self.sync.sync("book", "Q1").rows_changed
+        self.assertEqual(changed, 2)
+        self.assertInSync()
+
+    def test_without_tail_window(self):
+        self.sync.tail_rows = 0  # the verification block is the only range after the appended rows
+        self.sync.sync("book", "Q1")
+        self.fake.set_cell("book", "Q1", 20, 1, "moved")
+        self.fake.append_rows("book", "Q1", make_rows(3, start=250))
+        result = self.sync.sync("book", "Q1")
+        self.assertEqual((result.mode, result.rows_changed, result.rows_appended), ("incremental", 1, 3))
+        self.assertInSync()
+
+    def test_structural_changes_reload(self):
+        self.sync.sync("book", "Q1")
+        self.fake.delete_rows("book", "Q1", 100, 40)
+        self.assertEqual(self.sync.sync("book", "Q1").mode, "full")
+        self.assertInSync()
+        self.fake.set_cell("book", "Q1", 0, 4, "region")
+        self.assertEqual(self.sync.sync("book", "Q1").mode, "full")
+        self.assertEqual(list(self.sync.frame("book", "Q1", sync=False).columns), HEADER + ["region"])
+
+    def test_report_on_local_copy(self):
+        report = self.sync.report("book", "Q1")
+        self.assertEqual(report["summary"]["total_rows"], 250)
+        self.assertEqual(report["summary"], report_skill(self.expected())["summary"])
+        # A second worker reads the same copy without downloading it again
+        other = self.make_sync()
+        served = self.fake.cells_served
+        self.assertEqual(other.report("book", "Q1")["summary"]["total_rows"], 250)
+        self.assertEqual(self.fake.cells_served, served)
+
+    def test_sync_failure_uses_last_copy(self):
+        self.sync.sync("book", "Q1")
+        del self.fake.books["book"]  # the API now answers 404
+        self.assertEqual(self.sync.report("book", "Q1")["summary"]["total_rows"], 250)
+        self.assertEqual(self.sync.stats()["errors"], 1)
+
+    def test_report_is_computed_once_per_version(self):
+        with patch("skills.core_skills.report_skill", wraps=report_skill) as analyse:
+            self.sync.report("book", "Q1")
+            self.make_sync().report("book", "Q1")  # another worker: read from the copy
+            self.assertEqual(analyse.call_count, 1)
+            self.fake.set_cell("book", "Q1", 245, 2, 9999)
+            self.sync.report("book", "Q1")
+            self.assertEqual(analyse.call_count, 2)
+
+    def test_chat_report_queues_a_job_until_ready(self):
+        report, job_id = self.sync.chat_report("book", "Q1")
+        self.assertIsNone(report)
+        self.assertEqual(self.fake.requests, 0)  # no copy yet: the job downloads it
+        self.assertEqual(self.sync.chat_report("book", "Q1"), (None, job_id))  # not submitted twice
+        job = self.jobs.get(job_id)
+        self.assertEqual(job["payload"], {"sheet": {"spreadsheet_id": "book", "sheet": "Q1"}})
+        with patch("skills.sheets_sync._default", self.make_sync()):
+            run_report(job["payload"])  # what the job runner does
+        report, job_id = self.sync.chat_report("book", "Q1")
+        self.assertEqual((report["summary"]["total_rows"], job_id), (250, None))
+
+    def test_chat_report_sync_is_bounded_by_the_deadline(self):
+        self.sync.report("book", "Q1")
+        self.fake.append_rows("book", "Q1", make_rows(5, start=250))
+        requests = self.fake.requests
+        report, job_id = self.sync.chat_report("book", "Q1", Deadline(0.0))
+        self.assertEqual((report["summary"]["total_rows"], job_id), (250, None))  # the last copy's report
+        self.assertEqual(self.fake.requests, requests)
+
+    def test_analytics_skill_reports_configured_sheet(self):
+        env = {"SHEETS_SPREADSHEET_ID": "book", "SHEETS_SHEET": "Q1", "SHEETS_API_URL": self.fake.base_url,
+               "DRIVE_API_URL": self.fake.base_url, "SHEETS_CACHE_DIR": self.cache.root}
+        with patch.dict(os.environ, env), patch("skills.sheets_sync._default", None):
+            self.assertIn("report is being prepared (job ", analytics_skill("summarise my google sheets"))
+            run_report({"sheet": {"spreadsheet_id": "book", "sheet": "Q1"}})
+            reply = analytics_skill("summarise my google sheets")
+        self.assertIn("Q1: 250 rows × 4 columns", reply)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import gzip
+import os
+import sys
+import tempfile
+import unittest
+
+# Add parent directory to path to import the bot modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from runtime.static_assets import IMMUTABLE, StaticAssets, _brotli
+
+PAGE = '<html><head><link rel="stylesheet" href="/app.css"></head><body><script src="app.js"></script>' \
+       '<a href="https://example.com/app.js">x</a></body></html>'
+
+
+class TestStaticAssets(unittest.TestCase):
+    """Fingerprinting, reference rewriting and precompression"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.write("index.html", PAGE)
+        self.write("app.css", "body { color: red; }\n" * 40)
+        self.write("app.js", "console.log('hi');\n" * 40)
+        self.write(".hidden", "skip me")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        with open(os.path.join(self.tmp.name, name), "w") as f:
+            f.write(text)
+
+    def test_fingerprints_and_rewrites(self):
+        assets = StaticAssets(self.tmp.name).build()
+        css_url, js_url = assets.url_for("app.css"), assets.url_for("app.js")
+        self.assertRegex(css_url, r"^/assets/app\.[0-9a-f]{12}\.css$")
+        self.assertEqual(assets.get(css_url).cache_control, IMMUTABLE)
+        self.assertEqual(set(assets.urls), {"index.html", "app.css", "app.js"})
+        html = assets.get("/index.html").encodings["identity"].decode()
+        self.assertIn(f'href="{css_url}"', html)
+        self.assertIn(f'src="{js_url}"', html)
+        self.assertIn('href="https://example.com/app.js"', html)
+
+        self.write("app.css", "body { color: blue; }\n" * 40)
+        rebuilt = StaticAssets(self.tmp.name).build()
+        self.assertNotEqual(rebuilt.url_for("app.css"), css_url)
+        self.assertEqual(rebuilt.url_for("app.js"), js_url)
+        self.assertNotEqual(rebuilt.get("/index.html").etag, assets.get("/index.html").etag)
+
+    def test_precompressed(self):
+        asset = StaticAssets(self.tmp.name).build().get("/index.html")
+        self.assertEqual(gzip.decompress(asset.encodings["gzip"]), asset.encodings["identity"])
+        self.assertEqual("br" in asset.encodings, _brotli() is not None)
+
+
+class TestAssetEndpoints(unittest.TestCase):
+    """Encoding negotiation, cache headers, 304s and /healthz"""
+
+    @classmethod
+    def setUpClass(cls):
+        from api import app, static_assets
+        cls.client = app.test_client()
+        cls.assets = static_assets
+
+    def test_index_negotiates_encoding(self):
+        response = self.client.get("/", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(response.headers["Cache-Control"], "no-cache")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertIn(b"Agent Vish", gzip.decompress(response.data))
+        plain = self.client.get("/chat.html", headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("Content-Encoding", plain.headers)
+        self.assertNotEqual(plain.headers["ETag"], response.headers["ETag"])
+
+    def test_repeat_visit_is_304(self):
+        first = self.client.get("/", headers={"Accept-Encoding": "gzip"})
+        again = self.client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["ETag"]})
+        self.assertEqual((again.status_code, again.data), (304, b""))
+
+    def test_fingerprinted_assets(self):
+        url = self.assets.url_for("chat.js")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Cache-Control"], IMMUTABLE)
+        self.assertEqual(self.client.get("/assets/chat.000000000000.js").status_code, 404)
+
+    def test_healthz(self):
+        response = self.client.get("/healthz")
+        self.assertEqual((response.status_code, response.data), (200, b"ok"))
+
+
+if __name__ == '__main__':
+    unittest.main()